@@ -0,0 +1,295 @@
+"""
+Avaliacao online: previsoes registradas x esperas realizadas.
+
+Cada execucao de avaliar:
+- le do log de line-up (log_lineup) so os deltas depois da marca d'agua e
+  extrai as atracacoes: situacao ATRAC* ou saida do line-up ("removido",
+  que guarda a ultima ETA); espera real = instante do evento - ultima ETA;
+- junta cada atracacao, por porto + navio (IMO ou nome normalizado), a
+  ultima previsao do log de previsoes gerada ate a chegada (merge_asof);
+- atualiza, por porto x perfil x modelo e nos agregados porto x perfil e
+  perfil, o MAE e o vies exponenciais (span SPAN_MAE) e um sketch de
+  quantis do erro absoluto.
+
+O estado (marca d'agua, navios avaliados recentemente e sketches) fica num
+JSON gravado atomicamente. mae_esperado da ao app o MAE ao vivo da chave
+mais especifica com MINIMO_OBSERVACOES, ou o valor fixo do perfil.
+
+Uso: python pipelines/avaliar_previsoes.py [--intervalo-min 30] [--ciclos 0]
+"""
+
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from estatisticas_espera import K_PADRAO, SketchQuantis
+from log_lineup import LogLineup, navio_id
+from log_previsoes import LogPrevisoes
+from registro_portos import registro
+
+AVALIACAO_PATH = Path("data/avaliacao_online.json")
+SPAN_MAE = 50
+MINIMO_OBSERVACOES = 20
+JANELA_PREVISAO_DIAS = 30
+ANTECEDENCIA_MAX_H = 24
+DEDUPLICAR_DIAS = 10
+SITUACAO_ATRACADO = "ATRAC"
+TODOS = "TODOS"
+PREMIUM = "PREMIUM"
+CASAS_DECIMAIS = 2
+
+
+def chave_avaliacao(porto, perfil, modelo):
+    return f"{porto}|{perfil}|{modelo}"
+
+
+def modelo_avaliado(tier, modelo_usado):
+    """Modelo da previsao para a avaliacao: PREMIUM ou o modelo basico usado."""
+    modelo = pd.Series(modelo_usado, dtype="str").fillna("nenhum")
+    return modelo.where(pd.Series(tier, dtype="str").ne(PREMIUM).to_numpy(), PREMIUM)
+
+
+def atracacoes(deltas):
+    """
+    Primeira atracacao de cada navio nos deltas: situacao ATRAC* ou saida do line-up.
+
+    Saidas mais de ANTECEDENCIA_MAX_H antes da ETA (cancelamento, omissao) sao descartadas;
+    atracacoes antes da ETA contam espera zero.
+    """
+    situacao = deltas["situacao"].fillna("").astype("str").str.upper()
+    atracou = (situacao.str.contains(SITUACAO_ATRACADO) & deltas["evento"].ne("removido")) | (
+        deltas["evento"].eq("removido") & ~situacao.str.contains(SITUACAO_ATRACADO)
+    )
+    eventos = deltas[atracou & deltas["eta"].notna()].sort_values("valido_desde", kind="stable")
+    eventos = eventos.drop_duplicates(["porto_norm", "navio_id"], keep="first")
+    espera = (eventos["valido_desde"] - eventos["eta"]).dt.total_seconds() / 3600
+    eventos = pd.DataFrame({
+        "porto_norm": eventos["porto_norm"].astype("str"),
+        "navio_id": eventos["navio_id"].astype("str"),
+        "navio": eventos["navio"],
+        "chegada": eventos["eta"].astype("datetime64[ns]"),
+        "atracou_em": eventos["valido_desde"].astype("datetime64[ns]"),
+        "espera_real_h": espera.clip(lower=0),
+    })
+    return eventos[espera >= -ANTECEDENCIA_MAX_H].reset_index(drop=True)
+
+
+def previsoes_por_navio(previsoes):
+    """Previsoes do log com porto_norm, navio_id e modelo prontos para o as-of join."""
+    df = pd.DataFrame({
+        "porto_norm": previsoes["porto"].astype("str"),
+        "navio_id": navio_id(previsoes["Navio"], previsoes["imo"]),
+        "gerado_em": previsoes["gerado_em"].astype("datetime64[ns]"),
+        "perfil": previsoes["perfil"].fillna(TODOS).astype("str"),
+        "modelo": modelo_avaliado(previsoes["tier"], previsoes["modelo_usado"]).to_numpy(),
+        "tempo_espera_previsto_horas": previsoes["tempo_espera_previsto_horas"],
+        "run_id": previsoes["run_id"],
+    })
+    return df.dropna(subset=["navio_id", "tempo_espera_previsto_horas"])
+
+
+def juntar_previsoes(eventos, previsoes, janela_dias=JANELA_PREVISAO_DIAS):
+    """Ultima previsao de cada navio gerada ate a chegada (ate janela_dias antes); erro_h = previsto - real."""
+    if eventos.empty or previsoes.empty:
+        return eventos.assign(erro_h=np.nan).iloc[0:0]
+    casados = pd.merge_asof(
+        eventos.sort_values("chegada"),
+        previsoes.sort_values("gerado_em"),
+        left_on="chegada",
+        right_on="gerado_em",
+        by=["porto_norm", "navio_id"],
+        direction="backward",
+        tolerance=pd.Timedelta(days=janela_dias),
+    ).dropna(subset=["tempo_espera_previsto_horas"])
+    casados["erro_h"] = casados["tempo_espera_previsto_horas"] - casados["espera_real_h"]
+    return casados.reset_index(drop=True)
+
+
+class AvaliacaoOnline:
+    """MAE/vies exponenciais e sketches do erro absoluto por porto x perfil x modelo, em JSON."""
+
+    def __init__(self, caminho=AVALIACAO_PATH, k=K_PADRAO):
+        self.caminho = Path(caminho) if caminho else None
+        self.k = k
+        self.alpha = 2.0 / (SPAN_MAE + 1)
+        self.marca = None
+        self.avaliados = {}
+        self.chaves = {}
+        if self.caminho and self.caminho.exists():
+            with self.caminho.open("r", encoding="utf-8") as fh:
+                dados = json.load(fh)
+            self.marca = pd.Timestamp(dados["marca"]) if dados.get("marca") else None
+            self.avaliados = dados.get("avaliados", {})
+            for chave, item in dados.get("chaves", {}).items():
+                self.chaves[chave] = {**item, "sketch": SketchQuantis.de_dict(item["sketch"])}
+
+    # ------------------------------------------------------------------
+    # Atualizacao
+    # ------------------------------------------------------------------
+    def _atualizar(self, chave, erro_h):
+        item = self.chaves.get(chave)
+        if item is None:
+            item = self.chaves[chave] = {
+                "n": 0, "mae": abs(erro_h), "vies": erro_h, "sketch": SketchQuantis(self.k),
+            }
+        else:
+            item["mae"] += self.alpha * (abs(erro_h) - item["mae"])
+            item["vies"] += self.alpha * (erro_h - item["vies"])
+        item["n"] += 1
+        item["sketch"].adicionar(abs(erro_h))
+
+    def observar(self, porto, perfil, modelo, erro_h):
+        """Registra um erro (h) na chave porto x perfil x modelo e nos agregados."""
+        if erro_h is None or pd.isna(erro_h):
+            return
+        erro_h = float(erro_h)
+        self._atualizar(chave_avaliacao(porto, perfil, modelo), erro_h)
+        self._atualizar(chave_avaliacao(porto, perfil, TODOS), erro_h)
+        self._atualizar(chave_avaliacao(TODOS, perfil, TODOS), erro_h)
+
+    def avaliar(self, log_lineup=None, log_previsoes=None, ate=None):
+        """
+        Processa as atracacoes novas (depois da marca d'agua) e atualiza os erros.
+
+        Returns:
+            Dict com atracacoes, casadas, mae_lote_h e a nova marca d'agua.
+        """
+        log_lineup = log_lineup or LogLineup()
+        log_previsoes = log_previsoes or LogPrevisoes()
+        deltas = log_lineup.deltas(ate=ate, desde=self.marca)
+        resumo = {"atracacoes": 0, "casadas": 0, "mae_lote_h": None, "marca": None}
+        if deltas.empty:
+            resumo["marca"] = str(self.marca) if self.marca is not None else None
+            return resumo
+        self.marca = deltas["valido_desde"].max()
+        resumo["marca"] = str(self.marca)
+
+        eventos = atracacoes(deltas)
+        recentes = {
+            k: pd.Timestamp(v) for k, v in self.avaliados.items()
+            if self.marca - pd.Timestamp(v) <= pd.Timedelta(days=DEDUPLICAR_DIAS)
+        }
+        chaves = eventos["porto_norm"] + "|" + eventos["navio_id"]
+        # Mesmo navio ja avaliado ha poucos dias (ex.: ATRACADO e depois removido)
+        repetido = np.array([
+            k in recentes and t - recentes[k] <= pd.Timedelta(days=DEDUPLICAR_DIAS)
+            for k, t in zip(chaves, eventos["atracou_em"])
+        ], dtype=bool)
+        eventos = eventos[~repetido]
+        recentes.update({k: t for k, t in zip(chaves[~repetido], eventos["atracou_em"])})
+        self.avaliados = {k: str(v) for k, v in recentes.items()}
+        resumo["atracacoes"] = len(eventos)
+        if eventos.empty:
+            return resumo
+
+        inicio = eventos["chegada"].min() - pd.Timedelta(days=JANELA_PREVISAO_DIAS)
+        previsoes = log_previsoes.ler(
+            inicio=inicio,
+            colunas=["porto", "run_id", "gerado_em", "Navio", "imo", "perfil", "tier",
+                     "modelo_usado", "tempo_espera_previsto_horas"],
+        )
+        casados = juntar_previsoes(eventos, previsoes_por_navio(previsoes))
+        for porto, perfil, modelo, erro in zip(
+            casados["porto_norm"], casados["perfil"], casados["modelo"], casados["erro_h"]
+        ):
+            self.observar(porto, perfil, modelo, erro)
+        resumo["casadas"] = len(casados)
+        if not casados.empty:
+            resumo["mae_lote_h"] = round(float(casados["erro_h"].abs().mean()), CASAS_DECIMAIS)
+        return resumo
+
+    def salvar(self):
+        if self.caminho is None:
+            return
+        dados = {
+            "marca": str(self.marca) if self.marca is not None else None,
+            "avaliados": self.avaliados,
+            "chaves": {
+                chave: {
+                    "n": item["n"],
+                    "mae": round(item["mae"], CASAS_DECIMAIS),
+                    "vies": round(item["vies"], CASAS_DECIMAIS),
+                    "sketch": item["sketch"].para_dict(),
+                }
+                for chave, item in self.chaves.items()
+            },
+        }
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = self.caminho.with_suffix(".tmp")
+        with temporario.open("w", encoding="utf-8") as fh:
+            json.dump(dados, fh)
+        os.replace(temporario, self.caminho)
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def mae(self, porto, perfil, modelo=None, minimo=MINIMO_OBSERVACOES):
+        """MAE ao vivo (h) da chave mais especifica com `minimo` observacoes; NaN se nenhuma."""
+        for chave in (
+            chave_avaliacao(porto, perfil, modelo) if modelo else None,
+            chave_avaliacao(porto, perfil, TODOS),
+            chave_avaliacao(TODOS, perfil, TODOS),
+        ):
+            item = self.chaves.get(chave) if chave else None
+            if item is not None and item["n"] >= minimo:
+                return item["mae"]
+        return float("nan")
+
+    def tabela(self):
+        """Uma linha por chave: observacoes, MAE e vies exponenciais e quantis do erro absoluto."""
+        linhas = []
+        for chave, item in sorted(self.chaves.items()):
+            porto, perfil, modelo = chave.split("|")
+            linhas.append({
+                "porto": porto,
+                "perfil": perfil,
+                "modelo": modelo,
+                "observacoes": item["n"],
+                "mae_h": round(item["mae"], CASAS_DECIMAIS),
+                "vies_h": round(item["vies"], CASAS_DECIMAIS),
+                "erro_abs_p50_h": round(item["sketch"].quantil(0.5), CASAS_DECIMAIS),
+                "erro_abs_p90_h": round(item["sketch"].quantil(0.9), CASAS_DECIMAIS),
+            })
+        return pd.DataFrame(linhas, columns=[
+            "porto", "perfil", "modelo", "observacoes", "mae_h", "vies_h", "erro_abs_p50_h", "erro_abs_p90_h",
+        ])
+
+
+@lru_cache(maxsize=2)
+def _carregar_cache(caminho, mtime_ns):
+    return AvaliacaoOnline(caminho)
+
+
+def carregar_avaliacao(caminho=AVALIACAO_PATH):
+    """Avaliacao em cache por processo (recarrega se o arquivo mudar); None se ausente."""
+    caminho = Path(caminho)
+    if not caminho.exists():
+        return None
+    return _carregar_cache(str(caminho), caminho.stat().st_mtime_ns)
+
+
+def mae_esperado(porto_nome, perfis, modelos=None, padrao=None, caminho=AVALIACAO_PATH):
+    """
+    mae_esperado por linha: MAE ao vivo do porto x perfil x modelo ou, sem observacoes
+    suficientes, o padrao (dict por perfil ou valor unico).
+    """
+    perfis = pd.Series(perfis, dtype="str")
+    if isinstance(padrao, dict):
+        resultado = perfis.map(padrao).astype("float64")
+    else:
+        resultado = pd.Series(np.nan if padrao is None else float(padrao), index=perfis.index)
+    avaliacao = carregar_avaliacao(caminho)
+    if avaliacao is None or not avaliacao.chaves:
+        return resultado
+    modelos = pd.Series(TODOS if modelos is None else modelos, index=perfis.index, dtype="str").fillna(TODOS)
+    porto = registro().chave(registro().id(porto_nome))
+    pares = pd.DataFrame({"perfil": perfis, "modelo": modelos})
+    for (perfil, modelo), linhas in pares.groupby(["perfil", "modelo"], sort=False).groups.items():
+        vivo = avaliacao.mae(porto, perfil, modelo)
+        if not pd.isna(vivo):
+            resultado.loc[linhas] = vivo
+    return resultado
@@ -0,0 +1,440 @@
+"""
+Backtest historico do caminho de previsao (inferir_lineup_inteligente).
+
+Para cada porto e data de referencia D:
+- line-up pontual: ultimo snapshot de cada navio do historico de line-ups
+  conhecido ate D (ExtraidoEm, data do arquivo de origem ou Atualizacao),
+  com chegada entre D e D + horizonte_max_dias;
+- contexto em D: clima e previsao da climatologia a partir de D, AIS do
+  ultimo arquivo de data/ais_features ate D, economia com os padroes do app
+  (o mesmo modo degradado da inferencia sem rede) e estatisticas de espera
+  (mediana do porto, MA5) so com as esperas conhecidas ate D;
+- realizado: espera do proprio historico (tempo_espera_horas ou Atracacao -
+  chegada) ou, na falta, a atracacao ANTAQ mais proxima da ultima ETA do
+  navio no mesmo porto (merge_asof com tolerancia).
+
+Cada (porto, D) e pontuado numa chamada (as features de fila dependem do
+line-up do dia); os lotes porto x bloco de datas rodam num pool de processos,
+com os modelos carregados uma vez por processo. metricas e calibracao
+resumem o erro por porto, perfil e horizonte (dias entre D e a chegada).
+
+Uso: python pipelines/backtest_previsoes.py --inicio 2025-01-01 --fim 2025-12-31
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from climatologia import clima_fallback, previsao_fallback
+from estatisticas_espera import EstatisticasEspera
+from historico_lineup import HISTORICO_DIR
+from lineup_schema import normalizar_lineup
+from registro_portos import ID_DESCONHECIDO, normalizar_texto, registro
+
+ANTAQ_DIR = Path("data/antaq")
+AIS_FEATURES_DIR = Path("data/ais_features")
+BACKTEST_DIR = Path("data/backtest")
+HORIZONTE_MAX_DIAS = 30
+HORIZONTES_DIAS = [0, 1, 3, 7, 15, 30]
+AIS_VALIDADE_DIAS = 7
+TOLERANCIA_ANTAQ_H = 12
+DIAS_POR_LOTE = 31
+COLUNAS_RESULTADO = [
+    "porto", "porto_id", "data_referencia", "chave_navio", "Navio", "perfil",
+    "data_chegada_dt", "horizonte_dias", "tempo_espera_previsto_horas",
+    "mae_esperado", "tier", "modelo_usado",
+]
+DATA_ARQUIVO_RE = r"(\d{4}-\d{2}-\d{2})"
+
+
+# ----------------------------------------------------------------------
+# Line-up pontual
+# ----------------------------------------------------------------------
+def conhecido_em(df):
+    """Instante em que cada linha do historico passou a ser conhecida (NaT se nao houver)."""
+    conhecido = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    if "ExtraidoEm" in df.columns:
+        conhecido = conhecido.fillna(df["ExtraidoEm"])
+    if "source_file" in df.columns:
+        datas = df["source_file"].astype("str").str.extract(DATA_ARQUIVO_RE)[0]
+        conhecido = conhecido.fillna(pd.to_datetime(datas, errors="coerce", format="%Y-%m-%d"))
+    if "Atualizacao" in df.columns:
+        conhecido = conhecido.fillna(df["Atualizacao"])
+    return conhecido.astype("datetime64[ns]")
+
+
+def preparar_historico(df):
+    """Historico tipado com conhecido_em e chave_navio (porto + IMO ou nome normalizado)."""
+    tipado = normalizar_lineup(df)
+    tipado["conhecido_em"] = conhecido_em(tipado)
+    nome = tipado["Navio"] if "Navio" in tipado.columns else pd.Series("", index=tipado.index)
+    navio = pd.Series(nome, dtype="str").fillna("").map(normalizar_texto)
+    if "imo" in tipado.columns:
+        imo = pd.Series(tipado["imo"], dtype="str").fillna("").str.strip().str.replace(r"\.0$", "", regex=True)
+        navio = navio.where(imo.eq(""), "IMO" + imo)
+    tipado["chave_navio"] = tipado["porto_id"].astype("str") + ":" + navio
+    validas = (
+        tipado["data_chegada_dt"].notna()
+        & tipado["conhecido_em"].notna()
+        & navio.ne("")
+        & tipado["porto_id"].ne(ID_DESCONHECIDO)
+    )
+    return tipado[validas].sort_values("conhecido_em", kind="stable").reset_index(drop=True)
+
+
+def lineup_em(historico, data, horizonte_max_dias=HORIZONTE_MAX_DIAS):
+    """Line-up como era conhecido em `data`: ultimo snapshot de cada navio com chegada no horizonte."""
+    data = pd.Timestamp(data)
+    conhecidas = historico[historico["conhecido_em"] <= data]
+    ultimo = conhecidas.drop_duplicates("chave_navio", keep="last")
+    inicio = data.normalize()
+    janela = (ultimo["data_chegada_dt"] >= inicio) & (
+        ultimo["data_chegada_dt"] < inicio + pd.Timedelta(days=horizonte_max_dias)
+    )
+    return ultimo[janela].reset_index(drop=True)
+
+
+# ----------------------------------------------------------------------
+# Contexto pontual
+# ----------------------------------------------------------------------
+@lru_cache(maxsize=1)
+def _arquivos_ais(diretorio):
+    arquivos = sorted(Path(diretorio).glob("ais_features_*.parquet"))
+    datas = pd.to_datetime([re.sub(r"\D", "", a.stem)[-8:] for a in arquivos], errors="coerce", format="%Y%m%d")
+    return arquivos, datas
+
+
+@lru_cache(maxsize=8)
+def _ler_ais(caminho):
+    return pd.read_parquet(caminho)
+
+
+def ais_em(porto_nome, data, diretorio=AIS_FEATURES_DIR):
+    """Features AIS do porto do ultimo arquivo ate `data` (None se nao houver ou se muito antigo)."""
+    arquivos, datas = _arquivos_ais(str(diretorio))
+    data = pd.Timestamp(data).normalize()
+    validos = [i for i, d in enumerate(datas) if pd.notna(d) and data - pd.Timedelta(days=AIS_VALIDADE_DIAS) <= d <= data]
+    if not validos:
+        return None
+    df = _ler_ais(str(arquivos[validos[-1]]))
+    coluna = "portname" if "portname" in df.columns else "port_name"
+    if coluna not in df.columns:
+        return None
+    df = df[registro().ids(df[coluna]) == registro().id(porto_nome)]
+    return df if not df.empty else None
+
+
+class EsperaPontual:
+    """
+    EstatisticasEspera alimentada so com as esperas conhecidas ate cada data.
+
+    Cada chegada (chave_navio + data de chegada) entra uma vez, no primeiro
+    snapshot que traz a espera; datas crescentes so acrescentam o que passou
+    a ser conhecido desde a anterior.
+    """
+
+    def __init__(self, historico):
+        if "tempo_espera_horas" in historico.columns:
+            espera = pd.to_numeric(historico["tempo_espera_horas"], errors="coerce")
+            historico = historico[espera.notna()].sort_values("conhecido_em", kind="stable")
+            historico = historico.drop_duplicates(["chave_navio", "data_chegada_dt"])
+        else:
+            historico = historico.head(0)
+        self.esperas = historico.reset_index(drop=True)
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.estatisticas = EstatisticasEspera()
+        self._posicao = 0
+
+    def em(self, data):
+        fim = int(self.esperas["conhecido_em"].searchsorted(pd.Timestamp(data), side="right"))
+        if fim < self._posicao:
+            self._reiniciar()
+        self.estatisticas.observar_lote(
+            self.esperas.iloc[self._posicao:fim],
+            coluna_data="data_chegada_dt",
+            colunas_dimensao={"berco": "Berco"},
+        )
+        self._posicao = fim
+        return self.estatisticas
+
+
+def contexto_em(porto_nome, data, horizonte_max_dias=HORIZONTE_MAX_DIAS, ais_dir=AIS_FEATURES_DIR, espera=None):
+    """
+    live_data como o app montaria em `data` sem rede (climatologia, AIS local, economia padrao).
+
+    espera (EsperaPontual) entra como espera_stats: a mediana do porto e a
+    MA5 do app saem das esperas conhecidas ate `data`, nao do historico atual.
+    """
+    data = pd.Timestamp(data).normalize()
+    return {
+        "clima": clima_fallback(porto_nome, data),
+        "pam": None,
+        "precos": None,
+        "forecast": previsao_fallback(porto_nome, dias=horizonte_max_dias, inicio=data),
+        "eta_base": data.date(),
+        "ais_df": ais_em(porto_nome, data, ais_dir),
+        "espera_stats": espera.em(data) if espera is not None else None,
+    }
+
+
+# ----------------------------------------------------------------------
+# Pontuacao
+# ----------------------------------------------------------------------
+def prever_app(lineup, live_data, porto_nome):
+    """Caminho de previsao do app (mesma selecao de modelo por qualidade e tier premium)."""
+    import streamlit_app as app
+
+    df_pred, *_ = app.inferir_lineup_inteligente(
+        lineup,
+        live_data,
+        porto_nome.upper(),
+        tem_dados_terminal=app.has_terminal_data(lineup),
+        track_quality=True,
+    )
+    return df_pred
+
+
+def _pontuar_lote(tarefa):
+    """Pontua as datas de um lote (um porto); devolve (linhas em COLUNAS_RESULTADO, erros por data)."""
+    prever = tarefa["prever"] or prever_app
+    historico = tarefa["historico"]
+    porto = tarefa["porto"]
+    espera = EsperaPontual(historico)
+    partes = []
+    erros = []
+    for data in tarefa["datas"]:
+        lineup = lineup_em(historico, data, tarefa["horizonte_max_dias"])
+        if lineup.empty:
+            continue
+        contexto = contexto_em(porto, data, tarefa["horizonte_max_dias"], tarefa["ais_dir"], espera)
+        try:
+            df_pred = prever(lineup, contexto, porto)
+        except Exception as exc:
+            erros.append({"porto": porto, "data_referencia": str(data.date()), "erro": f"{type(exc).__name__}: {exc}"})
+            continue
+        if df_pred is None or df_pred.empty:
+            continue
+        df_pred = df_pred.assign(porto=porto, data_referencia=pd.Timestamp(data))
+        for coluna in COLUNAS_RESULTADO:
+            if coluna not in df_pred.columns:
+                df_pred[coluna] = np.nan
+        partes.append(df_pred[COLUNAS_RESULTADO])
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_RESULTADO), erros
+    resultado = pd.concat(partes, ignore_index=True)
+    resultado["horizonte_dias"] = (
+        resultado["data_chegada_dt"] - resultado["data_referencia"].dt.normalize()
+    ).dt.total_seconds() / 86400
+    return resultado, erros
+
+
+def _init_worker():
+    # Um processo por nucleo: sem threads extras do OpenMP em cada um
+    os.environ["OMP_NUM_THREADS"] = "1"
+
+
+def pontuar(historico, datas, portos=None, prever=None, processos=None,
+            horizonte_max_dias=HORIZONTE_MAX_DIAS, dias_por_lote=DIAS_POR_LOTE, ais_dir=AIS_FEATURES_DIR):
+    """
+    Previsoes de cada porto em cada data de `datas` a partir do historico preparado.
+
+    processos=1 roda no proprio processo; senao, lotes porto x bloco de datas
+    vao para um ProcessPoolExecutor (prever precisa ser picklavel). Falhas de
+    uma data nao interrompem o lote: voltam na lista de erros.
+
+    Returns:
+        (previsoes, erros)
+    """
+    datas = [pd.Timestamp(d) for d in datas]
+    nomes = historico.groupby("porto_id")["porto"].first() if "porto" in historico.columns else pd.Series(dtype="str")
+    if portos:
+        alvo = {registro().id(p) for p in portos}
+        nomes = nomes[nomes.index.isin(alvo)]
+    tarefas = []
+    for porto_id, nome in nomes.items():
+        sub = historico[historico["porto_id"] == porto_id]
+        sub = sub[sub["conhecido_em"] <= max(datas)] if datas else sub.head(0)
+        if sub.empty:
+            continue
+        for i in range(0, len(datas), dias_por_lote):
+            tarefas.append({
+                "porto": str(nome),
+                "historico": sub,
+                "datas": datas[i:i + dias_por_lote],
+                "horizonte_max_dias": horizonte_max_dias,
+                "prever": prever,
+                "ais_dir": str(ais_dir),
+            })
+    if not tarefas:
+        return pd.DataFrame(columns=COLUNAS_RESULTADO), []
+    processos = max(1, min(processos or os.cpu_count() or 1, len(tarefas)))
+    if processos == 1:
+        partes = [_pontuar_lote(t) for t in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=processos, initializer=_init_worker) as pool:
+            partes = list(pool.map(_pontuar_lote, tarefas))
+    erros = [erro for _, erros_lote in partes for erro in erros_lote]
+    partes = [p for p, _ in partes if not p.empty]
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_RESULTADO), erros
+    return pd.concat(partes, ignore_index=True), erros
+
+
+# ----------------------------------------------------------------------
+# Realizado
+# ----------------------------------------------------------------------
+def realizados_historico(historico):
+    """Por navio: ultima ETA conhecida e espera realizada (h) quando o historico a traz."""
+    espera = pd.Series(np.nan, index=historico.index)
+    if "tempo_espera_horas" in historico.columns:
+        espera = pd.to_numeric(historico["tempo_espera_horas"], errors="coerce")
+    if "Atracacao" in historico.columns:
+        atracacao = (historico["Atracacao"] - historico["data_chegada_dt"]).dt.total_seconds() / 3600
+        espera = espera.fillna(atracacao.where(atracacao >= 0))
+    realizados = historico.assign(espera_real_h=espera).groupby("chave_navio").agg(
+        porto_id=("porto_id", "last"),
+        chegada_final=("data_chegada_dt", "last"),
+        espera_real_h=("espera_real_h", "last"),
+    )
+    realizados["fonte_real"] = np.where(realizados["espera_real_h"].notna(), "historico", None)
+    return realizados.reset_index()
+
+
+def atracacoes_antaq(inicio, fim, base_dir=ANTAQ_DIR):
+    """Atracacoes do armazem ANTAQ local (porto_id, data_chegada, espera_real_h) no intervalo."""
+    caminho = Path(base_dir) / "atracacao"
+    vazio = pd.DataFrame({
+        "porto_id": pd.Series(dtype="int64"),
+        "data_chegada": pd.Series(dtype="datetime64[ns]"),
+        "espera_real_h": pd.Series(dtype="float64"),
+    })
+    if not caminho.exists():
+        return vazio
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    df = pd.read_parquet(
+        caminho,
+        columns=["data_chegada", "data_atracacao", "porto_atracacao"],
+        filters=[("ano", ">=", inicio.year), ("ano", "<=", fim.year)],
+    )
+    chegada = pd.to_datetime(df["data_chegada"], errors="coerce").astype("datetime64[ns]")
+    atracacao = pd.to_datetime(df["data_atracacao"], errors="coerce").astype("datetime64[ns]")
+    df = pd.DataFrame({
+        "porto_id": registro().ids(df["porto_atracacao"]).astype("int64"),
+        "data_chegada": chegada,
+        "espera_real_h": (atracacao - chegada).dt.total_seconds() / 3600,
+    })
+    df = df[df["data_chegada"].between(inicio, fim) & (df["espera_real_h"] >= 0)]
+    return df.dropna().sort_values("data_chegada").reset_index(drop=True) if not df.empty else vazio
+
+
+def juntar_realizado(previsoes, realizados, antaq=None, tolerancia_h=TOLERANCIA_ANTAQ_H):
+    """
+    Acrescenta espera_real_h, fonte_real e erro_h (previsto - real) as previsoes.
+
+    Navios sem espera no historico recebem a atracacao ANTAQ mais proxima da
+    ultima ETA no mesmo porto (dentro da tolerancia; cada atracacao casa com
+    um unico navio).
+    """
+    realizados = realizados.copy()
+    if antaq is not None and not antaq.empty:
+        faltando = realizados[realizados["espera_real_h"].isna() & realizados["chegada_final"].notna()]
+        if not faltando.empty:
+            casados = pd.merge_asof(
+                faltando.drop(columns=["espera_real_h", "fonte_real"]).sort_values("chegada_final"),
+                antaq.assign(chegada_final=antaq["data_chegada"]).sort_values("chegada_final"),
+                on="chegada_final",
+                by="porto_id",
+                direction="nearest",
+                tolerance=pd.Timedelta(hours=tolerancia_h),
+            ).dropna(subset=["espera_real_h"])
+            # Cada atracacao vale para um navio so: o de ETA mais proxima
+            casados["distancia"] = (casados["chegada_final"] - casados["data_chegada"]).abs()
+            casados = (
+                casados.sort_values("distancia", kind="stable")
+                .drop_duplicates(["porto_id", "data_chegada"])
+                .set_index("chave_navio")["espera_real_h"]
+            )
+            faltas = realizados["chave_navio"].map(casados)
+            realizados["fonte_real"] = realizados["fonte_real"].where(faltas.isna(), "antaq")
+            realizados["espera_real_h"] = realizados["espera_real_h"].fillna(faltas)
+    resultado = previsoes.merge(
+        realizados[["chave_navio", "espera_real_h", "fonte_real"]], on="chave_navio", how="left"
+    )
+    resultado["erro_h"] = resultado["tempo_espera_previsto_horas"] - resultado["espera_real_h"]
+    return resultado
+
+
+# ----------------------------------------------------------------------
+# Metricas
+# ----------------------------------------------------------------------
+def faixa_horizonte(dias, limites=HORIZONTES_DIAS):
+    """Faixas de horizonte ('0-1d', '1-3d', ...) a partir dos dias ate a chegada."""
+    rotulos = [f"{a}-{b}d" for a, b in zip(limites[:-1], limites[1:])]
+    return pd.cut(dias, bins=limites, labels=rotulos, right=False)
+
+
+def metricas(resultado, por=("porto", "perfil", "horizonte")):
+    """MAE, vies, mediana do erro absoluto e cobertura do mae_esperado por grupo."""
+    df = resultado.dropna(subset=["erro_h"]).assign(horizonte=lambda d: faixa_horizonte(d["horizonte_dias"]))
+    df = df.assign(
+        erro_abs_h=df["erro_h"].abs(),
+        dentro_mae=(df["erro_h"].abs() <= df["mae_esperado"]).where(df["mae_esperado"].notna()),
+        real_abaixo=(df["espera_real_h"] <= df["tempo_espera_previsto_horas"]).astype(float),
+    )
+    return df.groupby(list(por), observed=True).agg(
+        previsoes=("erro_h", "size"),
+        navios=("chave_navio", "nunique"),
+        mae_h=("erro_abs_h", "mean"),
+        mediana_erro_abs_h=("erro_abs_h", "median"),
+        vies_h=("erro_h", "mean"),
+        mae_esperado_h=("mae_esperado", "mean"),
+        cobertura_mae=("dentro_mae", "mean"),
+        frac_real_abaixo=("real_abaixo", "mean"),
+    ).round(3).reset_index()
+
+
+def calibracao(resultado, faixas=5, por=("porto", "perfil")):
+    """Espera media prevista x realizada por faixa de quantil do previsto dentro de cada grupo."""
+    df = resultado.dropna(subset=["erro_h", "tempo_espera_previsto_horas"]).copy()
+    if df.empty:
+        return pd.DataFrame(columns=[*por, "faixa", "previsoes", "previsto_medio_h", "real_medio_h"])
+    postos = df.groupby(list(por))["tempo_espera_previsto_horas"].rank(method="first", pct=True)
+    df["faixa"] = np.ceil(postos * faixas).clip(1, faixas).astype(int)
+    return df.groupby([*por, "faixa"]).agg(
+        previsoes=("erro_h", "size"),
+        previsto_medio_h=("tempo_espera_previsto_horas", "mean"),
+        real_medio_h=("espera_real_h", "mean"),
+    ).round(2).reset_index()
+
+
+def executar_backtest(historico_bruto, inicio, fim, passo_dias=1, portos=None, prever=None,
+                      processos=None, antaq_dir=ANTAQ_DIR, horizonte_max_dias=HORIZONTE_MAX_DIAS,
+                      ais_dir=AIS_FEATURES_DIR):
+    """Historico bruto -> (previsoes pontuais de inicio a fim com o realizado juntado, erros)."""
+    historico = preparar_historico(historico_bruto)
+    datas = pd.date_range(pd.Timestamp(inicio).normalize(), pd.Timestamp(fim).normalize(), freq=f"{passo_dias}D")
+    previsoes, erros = pontuar(
+        historico, datas, portos=portos, prever=prever, processos=processos,
+        horizonte_max_dias=horizonte_max_dias, ais_dir=ais_dir,
+    )
+    antaq = None
+    if antaq_dir is not None:
+        antaq = atracacoes_antaq(
+            datas.min(), datas.max() + pd.Timedelta(days=horizonte_max_dias + 1), antaq_dir
+        )
+    return juntar_realizado(previsoes, realizados_historico(historico), antaq), erros
+
+
+def carregar_historico(destino=HISTORICO_DIR):
+    """Todas as particoes do historico de line-ups (data/lineup_history/porto=*/dados.parquet)."""
+    arquivos = sorted(Path(destino).glob("porto=*/dados.parquet"))
+    if not arquivos:
+        return pd.DataFrame()
+    return pd.concat([pd.read_parquet(a) for a in arquivos], ignore_index=True)
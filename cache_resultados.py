@@ -0,0 +1,140 @@
+"""
+Cache de resultados compartilhado entre sessoes (um por processo do app).
+
+- CacheLRUBytes: LRU limitado pelo tamanho em bytes dos valores (DataFrames
+  medidos com memory_usage(deep=True)); ao passar do limite descarta os
+  menos usados. Sessoes recebem o mesmo objeto (referencia, sem copia): os
+  valores guardados sao tratados como imutaveis.
+- obter_ou_calcular: pedidos simultaneos da mesma chave esperam um unico
+  calculo (ex.: varios analistas abrindo o mesmo porto).
+- impressao: hash estavel de dicts/listas/DataFrames para compor chaves.
+"""
+
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from pipeline_cache import hash_dataframe
+
+LIMITE_PADRAO_MB = 512
+
+
+def tamanho_bytes(valor):
+    """Memoria aproximada do valor (DataFrames e arrays pelo conteudo, containers recursivos)."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum() if isinstance(valor, pd.DataFrame) else uso)
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_bytes(k) + tamanho_bytes(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple, set)):
+        return sys.getsizeof(valor) + sum(tamanho_bytes(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+def _serializavel(valor):
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return hash_dataframe(valor.to_frame() if isinstance(valor, pd.Series) else valor)
+    return str(valor)
+
+
+def impressao(*partes):
+    """Hash das partes (dicts, listas, escalares, DataFrames) para chave de cache."""
+    texto = json.dumps(partes, sort_keys=True, default=_serializavel)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+class CacheLRUBytes:
+    """LRU thread-safe limitado em bytes, com calculo unico por chave."""
+
+    def __init__(self, limite_bytes=LIMITE_PADRAO_MB * 1024 * 1024):
+        self.limite_bytes = int(limite_bytes)
+        self._itens = OrderedDict()
+        self._calculando = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.descartes = 0
+
+    def obter(self, chave, padrao=None):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.faltas += 1
+                return padrao
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[0]
+
+    def guardar(self, chave, valor):
+        """Guarda o valor (e devolve); valores maiores que o limite nao sao guardados."""
+        tamanho = tamanho_bytes(valor)
+        with self._lock:
+            antigo = self._itens.pop(chave, None)
+            if antigo is not None:
+                self.bytes -= antigo[1]
+            if tamanho > self.limite_bytes:
+                return valor
+            self._itens[chave] = (valor, tamanho)
+            self.bytes += tamanho
+            while self.bytes > self.limite_bytes:
+                _, (_, liberado) = self._itens.popitem(last=False)
+                self.bytes -= liberado
+                self.descartes += 1
+        return valor
+
+    def obter_ou_calcular(self, chave, calcular):
+        """Valor da chave; na falta, calcula uma vez (pedidos concorrentes esperam o mesmo calculo)."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return item[0]
+            self.faltas += 1
+            futuro = self._calculando.get(chave)
+            dono = futuro is None
+            if dono:
+                futuro = self._calculando[chave] = Future()
+        if not dono:
+            return futuro.result()
+        try:
+            valor = self.guardar(chave, calcular())
+            futuro.set_result(valor)
+            return valor
+        except Exception as exc:
+            futuro.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._calculando.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self.bytes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "itens": len(self._itens),
+                "mb": round(self.bytes / 1024 / 1024, 2),
+                "limite_mb": round(self.limite_bytes / 1024 / 1024, 2),
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "descartes": self.descartes,
+            }
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __contains__(self, chave):
+        return chave in self._itens
@@ -0,0 +1,193 @@
+"""
+Climatologia por porto e dia do ano para o modo degradado (sem rede).
+
+construir_climatologia agrega series diarias historicas (mare_clima, INMET)
+em medias e quantis por porto x dia do ano, suavizados por uma janela
+circular de +-JANELA_DIAS. Climatologia carrega a tabela num array denso
+[porto, dia do ano, coluna] e responde vetores de datas por indexacao direta.
+
+Gerar a tabela: python pipelines/construir_climatologia.py
+"""
+
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from registro_portos import registro
+
+CLIMATOLOGIA_PATH = Path("data/climatologia.parquet")
+VARIAVEIS = (
+    "temp_media_dia",
+    "temp_max_dia",
+    "temp_min_dia",
+    "precipitacao_dia",
+    "vento_rajada_max_dia",
+    "vento_velocidade_media",
+    "vento_velocidade_max_dia",
+    "umidade_media_dia",
+    "wave_height_max",
+)
+QUANTIS = (0.1, 0.5, 0.9)
+JANELA_DIAS = 7
+PORTO_GERAL = "*"
+
+# Mesmos valores conservadores usados pelo app quando nao ha climatologia
+VALORES_PADRAO = {
+    "temp_media_dia": 25.0,
+    "temp_max_dia": 30.0,
+    "temp_min_dia": 20.0,
+    "precipitacao_dia": 0.0,
+    "vento_rajada_max_dia": 5.0,
+    "vento_velocidade_media": 3.0,
+    "vento_velocidade_max_dia": 3.0,
+    "umidade_media_dia": 70.0,
+    "wave_height_max": 0.0,
+}
+FONTES_FALLBACK = ("climatologia", "default", "default_conservative")
+
+
+def chave_porto(nome):
+    """Chave canonica do registro de portos (ex.: 'Porto de Paranaguá (PR)' -> 'PARANAGUA')."""
+    reg = registro()
+    return reg.chave(reg.id(nome))
+
+
+def _chaves_porto(serie):
+    return registro().chaves(serie)
+
+
+def dia_do_ano(datas):
+    """Dia do ano 1..365 (29/02 e dias seguintes de anos bissextos alinhados ao ano comum)."""
+    datas = pd.DatetimeIndex(pd.to_datetime(pd.Series(datas).to_numpy()))
+    dia = datas.dayofyear.to_numpy()
+    ajuste = datas.is_leap_year & (datas.month > 2)
+    return np.clip(dia - ajuste.astype(int), 1, 365)
+
+
+def construir_climatologia(df, col_porto="porto", col_data="data", variaveis=VARIAVEIS,
+                           janela=JANELA_DIAS, quantis=QUANTIS):
+    """Medias e quantis por porto x dia do ano, com janela circular de +-janela dias."""
+    variaveis = [v for v in variaveis if v in df.columns]
+    base = df[[col_porto, col_data, *variaveis]].dropna(subset=[col_porto, col_data])
+    base = pd.DataFrame({
+        "porto": _chaves_porto(base[col_porto]),
+        "dia_do_ano": dia_do_ano(base[col_data]),
+        **{v: base[v].to_numpy(dtype=float) for v in variaveis},
+    })
+    # Linha agregada de todos os portos, usada para portos sem historico
+    base = pd.concat([base, base.assign(porto=PORTO_GERAL)], ignore_index=True)
+
+    deslocamentos = np.arange(-janela, janela + 1)
+    expandido = base.loc[base.index.repeat(len(deslocamentos))].reset_index(drop=True)
+    expandido["dia_do_ano"] = (expandido["dia_do_ano"] - 1 + np.tile(deslocamentos, len(base))) % 365 + 1
+
+    grupos = expandido.groupby(["porto", "dia_do_ano"])[variaveis]
+    partes = [grupos.mean().add_suffix("_media")]
+    for q in quantis:
+        partes.append(grupos.quantile(q).add_suffix(f"_p{int(round(q * 100))}"))
+    partes.append(grupos.count().max(axis=1).rename("n_obs") // len(deslocamentos))
+    return pd.concat(partes, axis=1).reset_index()
+
+
+class Climatologia:
+    """Consulta vetorizada (porto, data) -> estatisticas climaticas do dia do ano."""
+
+    def __init__(self, tabela):
+        self.colunas = [c for c in tabela.columns if c not in ("porto", "dia_do_ano", "n_obs")]
+        self.portos = {p: i for i, p in enumerate(sorted(tabela["porto"].unique()))}
+        self._posicao = {c: i for i, c in enumerate(self.colunas)}
+        cubo = np.full((len(self.portos), 366, len(self.colunas)), np.nan)
+        idx_porto = tabela["porto"].map(self.portos).to_numpy()
+        cubo[idx_porto, tabela["dia_do_ano"].to_numpy()] = tabela[self.colunas].to_numpy(dtype=float)
+        geral = self.portos.get(PORTO_GERAL)
+        if geral is not None:
+            # Variaveis/dias sem dado no porto herdam a climatologia geral
+            cubo = np.where(np.isnan(cubo), cubo[geral][None, :, :], cubo)
+        self._cubo = cubo
+        self._geral = geral
+
+    @classmethod
+    def carregar(cls, caminho=CLIMATOLOGIA_PATH):
+        caminho = Path(caminho)
+        if not caminho.exists():
+            return None
+        return cls(pd.read_parquet(caminho))
+
+    def consultar(self, portos, datas, estatistica="media"):
+        """DataFrame com VARIAVEIS para cada (porto, data); portos pode ser um unico nome."""
+        datas = pd.Series(pd.to_datetime(datas if np.ndim(datas) else [datas]))
+        if np.ndim(portos) == 0:
+            portos = [portos] * len(datas)
+        chaves = _chaves_porto(portos)
+        indice = pd.Series(chaves).map(self.portos)
+        if self._geral is not None:
+            indice = indice.fillna(self._geral)
+        indice = indice.fillna(-1).to_numpy(dtype=int)
+        dias = dia_do_ano(datas)
+
+        saida = {}
+        conhecido = indice >= 0
+        for var in VARIAVEIS:
+            coluna = self._posicao.get(f"{var}_{estatistica}")
+            valores = np.full(len(datas), np.nan)
+            if coluna is not None:
+                valores[conhecido] = self._cubo[indice[conhecido], dias[conhecido], coluna]
+            saida[var] = np.where(np.isnan(valores), VALORES_PADRAO[var], valores)
+        return pd.DataFrame(saida, index=datas.index)
+
+
+@lru_cache(maxsize=2)
+def _carregar_cache(caminho, mtime_ns):
+    return Climatologia.carregar(caminho)
+
+
+def carregar_climatologia(caminho=CLIMATOLOGIA_PATH):
+    """Climatologia em cache por processo (recarrega se o arquivo mudar); None se ausente."""
+    caminho = Path(caminho)
+    if not caminho.exists():
+        return None
+    return _carregar_cache(str(caminho), caminho.stat().st_mtime_ns)
+
+
+def clima_fallback(porto, data=None, caminho=CLIMATOLOGIA_PATH):
+    """Clima do dia no formato do app: climatologia do porto ou valores conservadores."""
+    clim = carregar_climatologia(caminho)
+    data = pd.Timestamp(pd.Timestamp.today() if data is None else data).normalize()
+    if clim is None:
+        valores = dict(VALORES_PADRAO)
+        valores.update({"chuva_acumulada_ultimos_3dias": 0.0, "fonte": "default"})
+    else:
+        dias = clim.consultar(porto, pd.date_range(data - pd.Timedelta(days=2), data))
+        valores = {k: float(v) for k, v in dias.iloc[-1].items()}
+        valores["chuva_acumulada_ultimos_3dias"] = float(dias["precipitacao_dia"].sum())
+        valores["fonte"] = "climatologia"
+    valores["amplitude_termica"] = valores["temp_max_dia"] - valores["temp_min_dia"]
+    valores["ressaca"] = int(valores["wave_height_max"] > 2.5)
+    return valores
+
+
+def previsao_fallback(porto, dias=7, inicio=None, caminho=CLIMATOLOGIA_PATH):
+    """Previsao de N dias a partir da climatologia (mesmo formato de get_weather_forecast)."""
+    inicio = pd.Timestamp(pd.Timestamp.today() if inicio is None else inicio).normalize()
+    datas = pd.date_range(inicio, periods=dias)
+    clim = carregar_climatologia(caminho)
+    if clim is None:
+        valores = pd.DataFrame([VALORES_PADRAO] * dias)
+    else:
+        valores = clim.consultar(porto, datas).reset_index(drop=True)
+    return [
+        {
+            "data": d.strftime("%Y-%m-%d"),
+            "temp_media": float(v["temp_media_dia"]),
+            "temp_max": float(v["temp_max_dia"]),
+            "temp_min": float(v["temp_min_dia"]),
+            "precipitacao": float(v["precipitacao_dia"]),
+            "rajada_max": float(v["vento_rajada_max_dia"]),
+            "vento_max": float(v["vento_velocidade_max_dia"]),
+            "wave_height_max": float(v["wave_height_max"]),
+            "ressaca": int(v["wave_height_max"] > 2.5),
+        }
+        for d, (_, v) in zip(datas, valores.iterrows())
+    ]
@@ -0,0 +1,289 @@
+"""
+Coleta de line-ups por plugins (um adaptador por porto/terminal).
+
+- BuscadorCondicional: GET com If-None-Match/If-Modified-Since e hash do
+  conteudo; pagina sem mudanca nao e reprocessada. ETag, Last-Modified e
+  hash ficam em data/cache/coleta/http.json entre execucoes.
+- CicloColeta: uma busca por URL por ciclo, compartilhada entre adaptadores
+  (ex.: tabela e PDFs da mesma pagina da EMAP), com adaptadores em paralelo.
+- AdaptadorLineup: declara as URLs e converte as paginas num DataFrame bruto;
+  o ciclo devolve o line-up ja no esquema tipado (lineup_schema).
+
+Novos portos: subclasse de AdaptadorLineup decorada com @registrar_adaptador.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+import requests
+from bs4 import BeautifulSoup
+
+from lineup_schema import normalize_column_name, normalizar_lineup
+
+CACHE_HTTP_PATH = Path("data/cache/coleta/http.json")
+INTERVALO_PADRAO_MIN = 15
+HEADERS_PADRAO = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+}
+
+ADAPTADORES = {}
+
+
+def registrar_adaptador(classe):
+    """Registra o adaptador pelo nome (usado pelo pipeline de coleta)."""
+    ADAPTADORES[classe.nome] = classe
+    return classe
+
+
+@dataclass
+class Pagina:
+    url: str
+    texto: Optional[str]
+    alterada: bool
+    status: int
+    estado: Optional[dict] = None
+
+
+class BuscadorCondicional:
+    """GET condicional (ETag/Last-Modified) + hash do conteudo, com estado persistido."""
+
+    def __init__(self, cache_path=CACHE_HTTP_PATH, sessao=None, timeout=20):
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.sessao = sessao or requests.Session()
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.estado = {}
+        if self.cache_path and self.cache_path.exists():
+            with self.cache_path.open("r", encoding="utf-8") as fh:
+                self.estado = json.load(fh)
+
+    def buscar(self, url, verificar_ssl=True, condicional=True):
+        """
+        Pagina da URL; com 304 (nao modificada) vem sem texto e alterada=False.
+
+        O novo ETag/hash so vale apos confirmar(pagina), depois que a pagina foi
+        processada com sucesso (uma falha no parse nao marca a pagina como vista).
+        """
+        anterior = self.estado.get(url, {})
+        headers = dict(HEADERS_PADRAO)
+        if condicional and anterior.get("etag"):
+            headers["If-None-Match"] = anterior["etag"]
+        if condicional and anterior.get("last_modified"):
+            headers["If-Modified-Since"] = anterior["last_modified"]
+        resposta = self.sessao.get(url, headers=headers, timeout=self.timeout, verify=verificar_ssl)
+        if resposta.status_code == 304:
+            return Pagina(url, None, False, 304)
+        resposta.raise_for_status()
+        texto = resposta.text
+        hash_conteudo = hashlib.sha256(texto.encode("utf-8")).hexdigest()
+        estado = {
+            "etag": resposta.headers.get("ETag"),
+            "last_modified": resposta.headers.get("Last-Modified"),
+            "hash": hash_conteudo,
+            "verificado_em": datetime.now().isoformat(timespec="seconds"),
+        }
+        return Pagina(url, texto, hash_conteudo != anterior.get("hash"), resposta.status_code, estado)
+
+    def confirmar(self, pagina):
+        if pagina.estado is not None:
+            with self._lock:
+                self.estado[pagina.url] = pagina.estado
+
+    def salvar(self):
+        if not self.cache_path:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, self.cache_path.open("w", encoding="utf-8") as fh:
+            json.dump(self.estado, fh, indent=2)
+
+
+class AdaptadorLineup:
+    """Base dos adaptadores: URLs da fonte + conversao das paginas em line-up bruto."""
+
+    nome = ""
+    porto = ""
+    verificar_ssl = True
+
+    def urls(self) -> List[str]:
+        raise NotImplementedError
+
+    def converter(self, paginas: Dict[str, str]) -> Optional[pd.DataFrame]:
+        """DataFrame bruto (colunas da fonte) a partir do HTML de cada URL."""
+        raise NotImplementedError
+
+
+class CicloColeta:
+    """Um ciclo de coleta: cada URL e buscada no maximo uma vez, adaptadores em paralelo."""
+
+    def __init__(self, buscador=None, workers=8):
+        self.buscador = buscador or BuscadorCondicional()
+        self.workers = workers
+        self._paginas = {}
+        self._lock = threading.Lock()
+
+    def pagina(self, url, verificar_ssl=True):
+        with self._lock:
+            futuro = self._paginas.get(url)
+            dono = futuro is None
+            if dono:
+                futuro = self._paginas[url] = Future()
+        if dono:
+            try:
+                futuro.set_result(self.buscador.buscar(url, verificar_ssl=verificar_ssl))
+            except Exception as exc:
+                futuro.set_exception(exc)
+        return futuro.result()
+
+    def _executar(self, adaptador, forcar, tipado):
+        paginas = [self.pagina(url, adaptador.verificar_ssl) for url in adaptador.urls()]
+        if not forcar and not any(p.alterada for p in paginas):
+            return None
+        # 304 em parte das URLs de um adaptador com mudanca: busca o conteudo sem condicional
+        paginas = [
+            p if p.texto is not None else self.buscador.buscar(p.url, adaptador.verificar_ssl, condicional=False)
+            for p in paginas
+        ]
+        bruto = adaptador.converter({p.url: p.texto for p in paginas})
+        for p in paginas:
+            self.buscador.confirmar(p)
+        if bruto is None or bruto.empty:
+            return None
+        return normalizar_lineup(bruto, porto_nome=adaptador.porto) if tipado else bruto
+
+    def executar(self, adaptadores, forcar=False, tipado=True):
+        """
+        Roda os adaptadores; devolve {nome: line-up (tipado ou bruto), None se nada mudou, ou Exception}.
+        """
+        resultados = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futuros = {a.nome: pool.submit(self._executar, a, forcar, tipado) for a in adaptadores}
+            for nome, futuro in futuros.items():
+                try:
+                    resultados[nome] = futuro.result()
+                except Exception as exc:
+                    resultados[nome] = exc
+        self.buscador.salvar()
+        return resultados
+
+
+def executar_agendado(adaptadores, ao_coletar, intervalo_min=INTERVALO_PADRAO_MIN, ciclos=None, buscador=None,
+                      forcar_primeiro=False):
+    """
+    Repete um ciclo a cada intervalo_min; ao_coletar({nome: df}) recebe os line-ups alterados do ciclo.
+
+    forcar_primeiro processa todos os adaptadores no primeiro ciclo, mesmo sem mudanca
+    (ex.: para o chamador conhecer o line-up atual de cada fonte).
+    """
+    buscador = buscador or BuscadorCondicional()
+    executados = 0
+    while ciclos is None or executados < ciclos:
+        inicio = time.monotonic()
+        forcar = forcar_primeiro and executados == 0
+        alterados = {}
+        for nome, resultado in CicloColeta(buscador).executar(adaptadores, forcar=forcar).items():
+            if isinstance(resultado, pd.DataFrame):
+                alterados[nome] = resultado
+            elif isinstance(resultado, Exception):
+                print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] ERRO {nome}: {resultado}")
+        if alterados:
+            ao_coletar(alterados)
+        executados += 1
+        if ciclos is not None and executados >= ciclos:
+            break
+        time.sleep(max(0.0, intervalo_min * 60 - (time.monotonic() - inicio)))
+
+
+def _chave_navio(serie):
+    return serie.astype("str").str.upper().str.replace(r"[^A-Z0-9]", "", regex=True)
+
+
+# ---------------------------------------------------------------------------
+# Itaqui (EMAP + APEM)
+# ---------------------------------------------------------------------------
+
+@registrar_adaptador
+class EmapItaqui(AdaptadorLineup):
+    """Navios esperados/atracados/fundeados da pagina oficial da EMAP."""
+
+    nome = "emap_itaqui"
+    porto = "Itaqui"
+
+    def __init__(self, base_url="https://www.portodoitaqui.com"):
+        self.base_url = base_url.rstrip("/")
+        self.url = f"{self.base_url}/porto-agora/navios/esperados"
+
+    def urls(self):
+        return [self.url]
+
+    def converter(self, paginas):
+        dfs = pd.read_html(StringIO(paginas[self.url]), flavor="bs4")
+        if not dfs:
+            return None
+        df = pd.concat(dfs, ignore_index=True)
+        df.columns = [normalize_column_name(c) for c in df.columns]
+        if "navio" in df.columns:
+            df["join_key"] = _chave_navio(df["navio"])
+        df["source_system"] = "EMAP"
+        df["extracted_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return df
+
+    def pdfs_do_dia(self, html, hoje=None):
+        """Links de mapas de atracacao do dia na mesma pagina (sem nova requisicao)."""
+        hoje = hoje or datetime.now()
+        soup = BeautifulSoup(html, "html.parser")
+        novos = []
+        for link in soup.find_all("a", href=re.compile(r"mapa.*atrac", re.IGNORECASE)):
+            txt = (link.get_text() + str(link.get("href"))).lower()
+            if hoje.strftime("%d") in txt and hoje.strftime("%m") in txt:
+                url = link.get("href")
+                if not url.startswith("http"):
+                    url = f"{self.base_url}{url}" if url.startswith("/") else f"{self.base_url}/{url}"
+                novos.append({
+                    "doc_name": link.get_text().strip(),
+                    "url": url,
+                    "found_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                })
+        return novos
+
+
+@registrar_adaptador
+class ApemItaqui(AdaptadorLineup):
+    """Navios atracados informados pela praticagem (APEM)."""
+
+    nome = "apem_itaqui"
+    porto = "Itaqui"
+
+    def __init__(self, url="http://www.apem-ma.com.br/?module=berthedships"):
+        self.url = url
+
+    def urls(self):
+        return [self.url]
+
+    def converter(self, paginas):
+        dfs = pd.read_html(StringIO(paginas[self.url]), match="Berco", flavor="bs4")
+        validos = []
+        for df in dfs:
+            df.columns = [normalize_column_name(c) for c in df.columns]
+            if "navio" in df.columns and "berco" in df.columns:
+                # Remove cabecalhos repetidos no meio da tabela
+                df = df[df["navio"].notna() & (df["navio"].astype("str").str.lower() != "navio")].copy()
+                if not df.empty:
+                    df["join_key"] = _chave_navio(df["navio"])
+                    validos.append(df)
+        if not validos:
+            return None
+        df = pd.concat(validos, ignore_index=True)
+        df["source_system"] = "APEM"
+        df["extracted_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return df
@@ -0,0 +1,211 @@
+"""
+Monitor de drift das features: histogramas do treino x histogramas do serving.
+
+O treino grava no *_metadata.json, por feature numerica, os cortes por
+quantis e as proporcoes de cada bin (alem de media, desvio e fracao de
+nulos). No serving, cada lote pontuado so incrementa contagens nesses
+mesmos bins (searchsorted + bincount), entao o custo e de microssegundos
+por linha; PSI e KS saem das contagens acumuladas sem reler dados.
+
+Uso:
+    referencia = referencia_features(df_treino, features)   # no treino
+    monitor = MonitorDrift()
+    monitor.observar("VEGETAL", X_serving, metadata)         # a cada lote
+    monitor.relatorio()                                      # PSI/KS por feature
+"""
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+BINS = 10
+PSI_LIMIAR = 0.25
+KS_LIMIAR = 0.3
+MINIMO_LINHAS = 100
+JANELA_LINHAS = 20_000
+INTERVALO_ALERTA_S = 60
+AMOSTRA_REFERENCIA = 500_000
+
+
+def _arredondar(valores):
+    return [float(f"{v:.6g}") for v in valores]
+
+
+def referencia_features(df, features, ignorar=(), bins=BINS, amostra=AMOSTRA_REFERENCIA):
+    """Histograma compacto (cortes por quantis + proporcoes) de cada feature numerica."""
+    if len(df) > amostra:
+        df = df.sample(amostra, random_state=42)
+    referencia = {}
+    for feature in features:
+        if feature in ignorar or feature not in df.columns:
+            continue
+        coluna = df[feature]
+        if isinstance(coluna.dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(coluna):
+            continue
+        valores = pd.to_numeric(coluna, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        finitos = valores[np.isfinite(valores)]
+        if len(finitos) == 0:
+            continue
+        # So os cortes internos: os bins das pontas ficam abertos (-inf, +inf)
+        cortes = np.unique(np.quantile(finitos, np.linspace(0, 1, bins + 1)[1:-1]))
+        contagens = np.bincount(np.searchsorted(cortes, finitos, side="right"), minlength=len(cortes) + 1)
+        referencia[feature] = {
+            "cortes": _arredondar(cortes),
+            "proporcoes": _arredondar(contagens / len(finitos)),
+            "media": float(f"{finitos.mean():.6g}"),
+            "desvio": float(f"{finitos.std():.6g}"),
+            "nulos": round(1 - len(finitos) / len(valores), 4),
+            "n": int(len(valores)),
+        }
+    return referencia
+
+
+def psi_proporcoes(p_ref, p_atual):
+    """PSI entre duas distribuicoes nos mesmos bins (proporcoes)."""
+    p_ref = np.clip(np.asarray(p_ref, dtype=float), 1e-6, None)
+    p_atual = np.clip(np.asarray(p_atual, dtype=float), 1e-6, None)
+    return float(np.sum((p_atual - p_ref) * np.log(p_atual / p_ref)))
+
+
+def ks_proporcoes(p_ref, p_atual):
+    """KS entre as CDFs binadas (limite inferior do KS sobre os valores brutos)."""
+    return float(np.max(np.abs(np.cumsum(p_ref) - np.cumsum(p_atual))))
+
+
+class _Acumulador:
+    """Contagens do serving nos bins de referencia de um perfil/treino."""
+
+    def __init__(self, referencia):
+        self.features = list(referencia)
+        self.cortes = [np.asarray(referencia[f]["cortes"], dtype=float) for f in self.features]
+        self.p_ref = [np.asarray(referencia[f]["proporcoes"], dtype=float) for f in self.features]
+        self.referencia = referencia
+        self.contagens = [np.zeros(len(c) + 1) for c in self.cortes]
+        self.nulos = np.zeros(len(self.features))
+        self.soma = np.zeros(len(self.features))
+        self.linhas = 0.0
+
+    def adicionar(self, X):
+        presentes = [f for f in self.features if f in X.columns]
+        if not presentes:
+            return
+        try:
+            matriz = X[presentes].to_numpy(dtype=float, na_value=np.nan)
+        except (TypeError, ValueError):
+            matriz = X[presentes].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        posicao = {f: j for j, f in enumerate(presentes)}
+        for i, feature in enumerate(self.features):
+            j = posicao.get(feature)
+            if j is None:
+                continue
+            valores = matriz[:, j]
+            finitos = np.isfinite(valores)
+            self.nulos[i] += len(valores) - finitos.sum()
+            valores = valores[finitos]
+            self.soma[i] += valores.sum()
+            self.contagens[i] += np.bincount(
+                np.searchsorted(self.cortes[i], valores, side="right"), minlength=len(self.contagens[i])
+            )
+        self.linhas += len(X)
+        if self.linhas > JANELA_LINHAS:
+            # Decaimento: metade do peso para o passado, sem guardar linhas
+            for contagem in self.contagens:
+                contagem *= 0.5
+            self.nulos *= 0.5
+            self.soma *= 0.5
+            self.linhas *= 0.5
+
+    def metricas(self):
+        linhas = []
+        for i, feature in enumerate(self.features):
+            validos = self.contagens[i].sum()
+            if validos == 0:
+                continue
+            p_atual = self.contagens[i] / validos
+            ref = self.referencia[feature]
+            linhas.append({
+                "feature": feature,
+                "linhas": int(round(self.linhas)),
+                "psi": round(psi_proporcoes(self.p_ref[i], p_atual), 4),
+                "ks": round(ks_proporcoes(self.p_ref[i], p_atual), 4),
+                "media_treino": ref["media"],
+                "media_serving": float(f"{self.soma[i] / validos:.6g}"),
+                "nulos_treino": ref["nulos"],
+                "nulos_serving": round(float(self.nulos[i] / self.linhas), 4) if self.linhas else 0.0,
+            })
+        return linhas
+
+
+class MonitorDrift:
+    """Histogramas do serving por perfil, comparados a referencia do treino (thread-safe)."""
+
+    def __init__(self, psi_limiar=PSI_LIMIAR, ks_limiar=KS_LIMIAR, minimo=MINIMO_LINHAS,
+                 intervalo_alerta_s=INTERVALO_ALERTA_S):
+        self.psi_limiar = psi_limiar
+        self.ks_limiar = ks_limiar
+        self.minimo = minimo
+        self.intervalo_alerta_s = intervalo_alerta_s
+        self._acumuladores = {}
+        self._versoes = {}
+        self._alertados = {}
+        self._ultimo_alerta = {}
+        self._sem_referencia = set()
+        self._lock = threading.Lock()
+
+    def observar(self, perfil, X, metadata, modelo="completo"):
+        """Acumula o lote; devolve as features que acabaram de entrar em drift."""
+        chave = (perfil, modelo)
+        referencia = metadata.get("drift_referencia")
+        if not referencia:
+            # Modelo salvo sem referencia: fica visivel em sem_referencia()
+            self._sem_referencia.add(chave)
+            return []
+        if X is None or len(X) == 0:
+            return []
+        versao = metadata.get("trained_at")
+        with self._lock:
+            # Modelo retreinado: recomeca contra a nova referencia
+            if self._versoes.get(chave) != versao or chave not in self._acumuladores:
+                self._acumuladores[chave] = _Acumulador(referencia)
+                self._versoes[chave] = versao
+                self._alertados[chave] = set()
+                self._ultimo_alerta[chave] = float("-inf")
+            acumulador = self._acumuladores[chave]
+            acumulador.adicionar(X)
+            agora = time.monotonic()
+            if acumulador.linhas < self.minimo or agora - self._ultimo_alerta[chave] < self.intervalo_alerta_s:
+                return []
+            self._ultimo_alerta[chave] = agora
+            em_drift = {m["feature"] for m in acumulador.metricas() if self._em_drift(m)}
+            novas = sorted(em_drift - self._alertados[chave])
+            self._alertados[chave] = em_drift
+            return novas
+
+    def sem_referencia(self):
+        """Perfis x modelos pontuados cujo metadata nao tem drift_referencia."""
+        with self._lock:
+            return sorted(self._sem_referencia - set(self._acumuladores))
+
+    def _em_drift(self, metrica):
+        return metrica["psi"] > self.psi_limiar or metrica["ks"] > self.ks_limiar
+
+    def relatorio(self, perfil=None):
+        """PSI/KS por perfil x modelo x feature (em drift e maior PSI primeiro)."""
+        with self._lock:
+            linhas = [
+                {"perfil": p, "modelo": modelo, **m}
+                for (p, modelo), acumulador in self._acumuladores.items()
+                if perfil is None or p == perfil
+                for m in acumulador.metricas()
+            ]
+        tabela = pd.DataFrame(linhas, columns=[
+            "perfil", "modelo", "feature", "linhas", "psi", "ks", "media_treino", "media_serving",
+            "nulos_treino", "nulos_serving",
+        ])
+        tabela["drift"] = (
+            (tabela["linhas"] >= self.minimo)
+            & ((tabela["psi"] > self.psi_limiar) | (tabela["ks"] > self.ks_limiar))
+        )
+        return tabela.sort_values(["drift", "psi"], ascending=False, ignore_index=True)
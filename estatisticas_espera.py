@@ -0,0 +1,188 @@
+"""
+Estatisticas incrementais de tempo de espera por porto, terminal, berco e perfil.
+
+Cada chave (ex.: "SANTOS", "SANTOS|berco=TGL SUL", "SANTOS|perfil=VEGETAL")
+guarda um sketch de quantis (KLL) e as ultimas 5 esperas, para a MA5 com a
+mesma definicao do treino (media das 5 observacoes anteriores). observar
+custa O(1) amortizado, o estado e persistido num JSON compacto e a leitura
+(mediana, MA5) nao toca no historico.
+"""
+
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from registro_portos import registro
+
+K_PADRAO = 128
+JANELA_MA = 5
+CASAS_DECIMAIS = 2
+MINIMO_OBSERVACOES = 10
+DIMENSOES = ("terminal", "berco", "perfil")
+
+
+class SketchQuantis:
+    """Sketch KLL de quantis: memoria O(k), atualizacao O(1) amortizada."""
+
+    def __init__(self, k=K_PADRAO, niveis=None, paridade=0, n=0):
+        self.k = k
+        self.niveis = niveis if niveis is not None else [[]]
+        self.paridade = paridade
+        self.n = n
+
+    def _capacidade(self, nivel):
+        profundidade = len(self.niveis) - 1 - nivel
+        return max(2, int(math.ceil(self.k * (2 / 3) ** profundidade)))
+
+    def adicionar(self, valor):
+        self.niveis[0].append(float(valor))
+        self.n += 1
+        if sum(map(len, self.niveis)) > sum(self._capacidade(h) for h in range(len(self.niveis))):
+            self._compactar()
+
+    def _compactar(self):
+        for h, nivel in enumerate(self.niveis):
+            if len(nivel) < self._capacidade(h):
+                continue
+            if h + 1 == len(self.niveis):
+                self.niveis.append([])
+            nivel.sort()
+            # Com tamanho impar o maior item fica no nivel (peso preservado)
+            resto = [nivel.pop()] if len(nivel) % 2 else []
+            # Alterna o deslocamento entre compactacoes (deterministico, sem vies)
+            self.niveis[h + 1].extend(nivel[self.paridade::2])
+            self.paridade ^= 1
+            self.niveis[h] = resto
+            return
+
+    def quantil(self, q):
+        """Quantil q (0-1); interpolado entre itens, exato enquanto nao houve compactacao."""
+        if self.n == 0:
+            return float("nan")
+        valores = np.concatenate([np.asarray(nivel, dtype=float) for nivel in self.niveis])
+        pesos = np.concatenate([np.full(len(nivel), 2.0 ** h) for h, nivel in enumerate(self.niveis)])
+        ordem = np.argsort(valores, kind="stable")
+        valores, pesos = valores[ordem], pesos[ordem]
+        posicoes = (np.cumsum(pesos) - pesos / 2) / pesos.sum()
+        return float(np.interp(q, posicoes, valores))
+
+    def para_dict(self):
+        return {
+            "k": self.k,
+            "n": self.n,
+            "paridade": self.paridade,
+            "niveis": [[round(v, CASAS_DECIMAIS) for v in nivel] for nivel in self.niveis],
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        return cls(k=dados["k"], niveis=dados["niveis"], paridade=dados["paridade"], n=dados["n"])
+
+
+def chave_espera(porto, terminal=None, berco=None, perfil=None):
+    """Chave da estatistica: porto canonico + no maximo uma dimensao ("" sem porto)."""
+    base = registro().chave(registro().id(porto))
+    if not base:
+        return ""
+    for nome, valor in zip(DIMENSOES, (terminal, berco, perfil)):
+        if valor is not None and not pd.isna(valor) and str(valor).strip():
+            return f"{base}|{nome}={str(valor).strip().upper()}"
+    return base
+
+
+class EstatisticasEspera:
+    """Sketches de quantis + ultimas esperas (MA5) por chave, persistidos em JSON."""
+
+    def __init__(self, caminho=None, k=K_PADRAO):
+        self.caminho = Path(caminho) if caminho else None
+        self.k = k
+        self.chaves = {}
+        if self.caminho and self.caminho.exists():
+            with self.caminho.open("r", encoding="utf-8") as fh:
+                dados = json.load(fh)
+            for chave, item in dados.items():
+                self.chaves[chave] = {
+                    "sketch": SketchQuantis.de_dict(item["sketch"]),
+                    # Arquivos antigos so tinham a MA exponencial ("ma")
+                    "ultimas": item.get("ultimas", [item["ma"]] if "ma" in item else []),
+                }
+
+    def _atualizar(self, chave, espera_h):
+        item = self.chaves.get(chave)
+        if item is None:
+            item = self.chaves[chave] = {"sketch": SketchQuantis(self.k), "ultimas": []}
+        item["ultimas"] = (item["ultimas"] + [float(espera_h)])[-JANELA_MA:]
+        item["sketch"].adicionar(espera_h)
+
+    def observar(self, porto, espera_h, terminal=None, berco=None, perfil=None):
+        """Registra uma espera observada no porto e em cada dimensao informada."""
+        chave = chave_espera(porto)
+        if not chave or espera_h is None or pd.isna(espera_h) or espera_h < 0:
+            return
+        self._atualizar(chave, espera_h)
+        for nome, valor in zip(DIMENSOES, (terminal, berco, perfil)):
+            chave = chave_espera(porto, **{nome: valor})
+            if "|" in chave:
+                self._atualizar(chave, espera_h)
+
+    def observar_lote(self, df, coluna_espera="tempo_espera_horas", coluna_porto="porto",
+                      coluna_data=None, porto_nome=None, colunas_dimensao=None):
+        """
+        Registra as esperas de um DataFrame (historico de line-up, episodios AIS), na ordem de chegada.
+
+        colunas_dimensao mapeia terminal/berco/perfil para as colunas do frame (padrao: mesmo nome).
+        """
+        if df is None or df.empty or coluna_espera not in df.columns:
+            return 0
+        if coluna_data and coluna_data in df.columns:
+            df = df.sort_values(coluna_data, kind="stable")
+        nomes = {nome: nome for nome in DIMENSOES}
+        nomes.update(colunas_dimensao or {})
+        colunas = {nome: df[coluna] if coluna in df.columns else None for nome, coluna in nomes.items()}
+        portos = df[coluna_porto] if coluna_porto in df.columns else pd.Series(porto_nome, index=df.index)
+        esperas = pd.to_numeric(df[coluna_espera], errors="coerce")
+        contagem = 0
+        for i, (porto, espera) in enumerate(zip(portos, esperas)):
+            if pd.isna(espera):
+                continue
+            valores = {nome: (serie.iat[i] if serie is not None else None) for nome, serie in colunas.items()}
+            self.observar(porto, espera, **valores)
+            contagem += 1
+        return contagem
+
+    def contagem(self, porto, **dimensao):
+        item = self.chaves.get(chave_espera(porto, **dimensao))
+        return item["sketch"].n if item else 0
+
+    def quantil(self, porto, q, minimo=MINIMO_OBSERVACOES, **dimensao):
+        """Quantil da espera (h) ou None com menos de `minimo` observacoes."""
+        item = self.chaves.get(chave_espera(porto, **dimensao))
+        if item is None or item["sketch"].n < minimo:
+            return None
+        return item["sketch"].quantil(q)
+
+    def mediana(self, porto, minimo=MINIMO_OBSERVACOES, **dimensao):
+        return self.quantil(porto, 0.5, minimo=minimo, **dimensao)
+
+    def ma5(self, porto, minimo=1, **dimensao):
+        """Media das ultimas 5 esperas (h), como a tempo_espera_ma5 do treino, ou None."""
+        item = self.chaves.get(chave_espera(porto, **dimensao))
+        if item is None or item["sketch"].n < minimo or not item["ultimas"]:
+            return None
+        return float(np.mean(item["ultimas"]))
+
+    def salvar(self, caminho=None):
+        caminho = Path(caminho) if caminho else self.caminho
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        dados = {
+            chave: {
+                "sketch": item["sketch"].para_dict(),
+                "ultimas": [round(v, CASAS_DECIMAIS + 2) for v in item["ultimas"]],
+            }
+            for chave, item in self.chaves.items()
+        }
+        with caminho.open("w", encoding="utf-8") as fh:
+            json.dump(dados, fh, separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,204 @@
+"""
+Historico de line-ups particionado por porto canonico.
+
+Layout em HISTORICO_DIR:
+- porto=<CHAVE>/dados.parquet: linhas do porto (colunas normalizadas +
+  porto_norm, a chave do registro de portos, ja calculada na gravacao);
+- estatisticas.parquet: por porto x mes x perfil (com totais mes=0 e
+  perfil=TODOS) -> registros, espera mediana/media (h) e chegadas por dia;
+- espera_sketches.json: sketches de quantis + MA5 exponencial da espera
+  (estatisticas_espera), alimentados so com as linhas novas de cada anexo;
+- manifesto.json: impressao dos arquivos de origem ja importados.
+
+anexar so reescreve as particoes dos portos recebidos e recalcula as
+estatisticas desses portos; a leitura no app abre so a particao pedida.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from estatisticas_espera import EstatisticasEspera
+from lineup_schema import coalesce_duplicate_columns, normalize_column_name, normalizar_lineup
+from pipeline_cache import impressao_arquivos
+from registro_portos import normalizar_texto, registro
+
+HISTORICO_DIR = Path("data/lineup_history")
+ARQUIVO_ESTATISTICAS = "estatisticas.parquet"
+ARQUIVO_MANIFESTO = "manifesto.json"
+ARQUIVO_ESPERA = "espera_sketches.json"
+PORTO_SEM_NOME = "DESCONHECIDO"
+TODOS = "TODOS"
+COLUNAS_ESTATISTICAS = [
+    "porto_norm", "mes", "perfil", "nome", "registros",
+    "espera_mediana_h", "espera_media_h", "chegadas_por_dia",
+]
+
+
+def _bruto(df):
+    df = df.rename(columns={c: normalize_column_name(c) for c in df.columns})
+    return coalesce_duplicate_columns(df)
+
+
+def _chaves(df):
+    if "porto" not in df.columns:
+        return pd.Series(PORTO_SEM_NOME, index=df.index)
+    chaves = pd.Series(registro().chaves(df["porto"]), index=df.index)
+    return chaves.replace("", PORTO_SEM_NOME)
+
+
+def _estatisticas_porto(chave, df):
+    """Linhas da tabela de estatisticas para a particao de um porto."""
+    tipado = normalizar_lineup(df.drop(columns=["porto_norm"]))
+    chegada = tipado["data_chegada_dt"]
+    espera = (
+        pd.to_numeric(tipado["tempo_espera_horas"], errors="coerce")
+        if "tempo_espera_horas" in tipado.columns
+        else pd.Series(np.nan, index=tipado.index)
+    )
+    base = pd.DataFrame({
+        "mes": chegada.dt.month.fillna(0).astype(int),
+        "perfil": tipado["perfil"].astype(str),
+        "espera": espera.to_numpy(),
+        "dia": chegada.dt.normalize(),
+    })
+    nomes = df["porto"].dropna().astype(str).str.strip() if "porto" in df.columns else pd.Series(dtype=str)
+    nome = nomes.mode().iloc[0] if not nomes.empty else chave
+
+    linhas = []
+    for por_mes in (False, True):
+        for por_perfil in (False, True):
+            chaves_grupo = [c for c, usar in (("mes", por_mes), ("perfil", por_perfil)) if usar]
+            dados = base[base["mes"] > 0] if por_mes else base
+            grupos = dados.groupby(chaves_grupo, observed=True) if chaves_grupo else [((), dados)]
+            for rotulo, grupo in grupos:
+                rotulo = rotulo if isinstance(rotulo, tuple) else (rotulo,)
+                valores = dict(zip(chaves_grupo, rotulo))
+                dias = grupo["dia"].dropna()
+                linhas.append({
+                    "porto_norm": chave,
+                    "mes": int(valores.get("mes", 0)),
+                    "perfil": valores.get("perfil", TODOS),
+                    "nome": nome,
+                    "registros": int(len(grupo)),
+                    "espera_mediana_h": float(grupo["espera"].median()),
+                    "espera_media_h": float(grupo["espera"].mean()),
+                    "chegadas_por_dia": float(len(dias) / dias.nunique()) if len(dias) else np.nan,
+                })
+    return pd.DataFrame(linhas, columns=COLUNAS_ESTATISTICAS)
+
+
+def linha_estatistica(tabela, porto_nome, mes=0, perfil=TODOS):
+    """Linha (Series) da tabela de estatisticas para porto/mes/perfil, ou None."""
+    if tabela is None or tabela.empty:
+        return None
+    chave = registro().chave(registro().id(porto_nome)) or normalizar_texto(porto_nome)
+    linha = tabela[(tabela["porto_norm"] == chave) & (tabela["mes"] == mes) & (tabela["perfil"] == perfil)]
+    return linha.iloc[0] if not linha.empty else None
+
+
+class HistoricoLineup:
+    """Historico de line-ups particionado por porto, com estatisticas por porto."""
+
+    def __init__(self, destino=HISTORICO_DIR):
+        self.destino = Path(destino)
+
+    def espera(self):
+        """Estatisticas incrementais de espera (sketches) do historico."""
+        return EstatisticasEspera(self.destino / ARQUIVO_ESPERA)
+
+    def _particao(self, chave):
+        return self.destino / f"porto={chave}" / "dados.parquet"
+
+    def _ler_manifesto(self):
+        caminho = self.destino / ARQUIVO_MANIFESTO
+        if not caminho.exists():
+            return {}
+        with caminho.open("r", encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def anexar(self, df):
+        """Acrescenta linhas (sem duplicar) e atualiza as estatisticas; devolve os portos tocados."""
+        if df is None or df.empty:
+            return []
+        df = _bruto(df)
+        df["porto_norm"] = _chaves(df)
+        chave_unica = ["id_evento"] if "id_evento" in df.columns else None
+        espera = self.espera()
+        tocados = []
+        for chave, novos in df.groupby("porto_norm", sort=True):
+            caminho = self._particao(chave)
+            existentes = pd.read_parquet(caminho) if caminho.exists() else novos.head(0)
+            combinado = pd.concat([existentes, novos], ignore_index=True)
+            # Colunas de texto como str para o parquet ter um esquema estavel entre anexos
+            combinado = combinado.astype({c: "str" for c in combinado.columns if combinado[c].dtype == object})
+            ineditas = ~combinado.duplicated(subset=chave_unica, keep="first")
+            ineditas.iloc[:len(existentes)] = False
+            if "tempo_espera_horas" in combinado.columns and ineditas.any():
+                espera.observar_lote(
+                    normalizar_lineup(combinado.loc[ineditas]),
+                    coluna_porto="porto_norm",
+                    coluna_data="data_chegada_dt",
+                    colunas_dimensao={"berco": "Berco"},
+                )
+            combinado = combinado.drop_duplicates(subset=chave_unica, keep="last").reset_index(drop=True)
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            combinado.to_parquet(caminho, index=False)
+            tocados.append(chave)
+        espera.salvar()
+        self._atualizar_estatisticas(tocados)
+        return tocados
+
+    def _atualizar_estatisticas(self, chaves):
+        caminho = self.destino / ARQUIVO_ESTATISTICAS
+        atuais = pd.read_parquet(caminho) if caminho.exists() else pd.DataFrame(columns=COLUNAS_ESTATISTICAS)
+        atuais = atuais[~atuais["porto_norm"].isin(chaves)]
+        novas = [_estatisticas_porto(chave, pd.read_parquet(self._particao(chave))) for chave in chaves]
+        tabela = pd.concat([t for t in (atuais, *novas) if not t.empty], ignore_index=True)
+        tabela = tabela.sort_values(["porto_norm", "mes", "perfil"], kind="stable").reset_index(drop=True)
+        self.destino.mkdir(parents=True, exist_ok=True)
+        tabela.to_parquet(caminho, index=False)
+
+    def sincronizar(self, origem):
+        """Importa um parquet de historico monolitico quando ele muda (tamanho/mtime)."""
+        origem = Path(origem)
+        if not origem.exists():
+            return []
+        manifesto = self._ler_manifesto()
+        impressao = impressao_arquivos([origem])
+        if manifesto.get(str(origem)) == impressao:
+            return []
+        tocados = self.anexar(pd.read_parquet(origem))
+        manifesto[str(origem)] = impressao
+        self.destino.mkdir(parents=True, exist_ok=True)
+        with (self.destino / ARQUIVO_MANIFESTO).open("w", encoding="utf-8") as fh:
+            json.dump(manifesto, fh, indent=2)
+        return tocados
+
+    def ler(self, porto_nome, colunas=None):
+        """Linhas de um porto (so a particao dele); DataFrame vazio se nao houver."""
+        chave = registro().chave(registro().id(porto_nome)) if porto_nome else ""
+        caminho = self._particao(chave)
+        if not chave or not caminho.exists():
+            return pd.DataFrame()
+        return pd.read_parquet(caminho, columns=colunas)
+
+    def estatisticas(self, porto_nome=None, mes=0, perfil=TODOS):
+        """Tabela de estatisticas; com porto_nome, a linha (Series) do porto/mes/perfil ou None."""
+        caminho = self.destino / ARQUIVO_ESTATISTICAS
+        tabela = pd.read_parquet(caminho) if caminho.exists() else pd.DataFrame(columns=COLUNAS_ESTATISTICAS)
+        if porto_nome is None:
+            return tabela
+        return linha_estatistica(tabela, porto_nome, mes, perfil)
+
+    def portos(self, tabela=None):
+        """Nome de exibicao de cada porto no historico (chave -> nome)."""
+        tabela = self.estatisticas() if tabela is None else tabela
+        tabela = tabela[(tabela["mes"] == 0) & (tabela["perfil"] == TODOS) & (tabela["porto_norm"] != PORTO_SEM_NOME)]
+        return dict(zip(tabela["porto_norm"], tabela["nome"]))
+
+    def __len__(self):
+        tabela = self.estatisticas()
+        return int(tabela.loc[(tabela["mes"] == 0) & (tabela["perfil"] == TODOS), "registros"].sum())
@@ -0,0 +1,109 @@
+"""
+Cache do Dataset binado do LightGBM.
+
+Constroi o Dataset (binning de todas as features) uma unica vez por perfil,
+fatia folds temporais via subset() (mesmos bins, sem re-binning) e salva o
+binario em disco para reuso em execucoes seguintes. O binario e validado por
+hash do conteudo de X/y e dos parametros de construcao.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from pipeline_cache import hash_dataframe
+
+DEFAULT_CACHE_DIR = Path("data/cache/lgb_datasets")
+
+# feature_pre_filter=False permite treinar folds com min_data_in_leaf diferentes
+# sobre o mesmo Dataset construido
+DATASET_PARAMS = {"max_bin": 255, "feature_pre_filter": False, "verbose": -1}
+
+
+def params_sklearn_para_core(**params):
+    """Traduz parametros do wrapper sklearn para lgb.train (mesmo modelo)."""
+    traducao = {
+        "random_state": "seed",
+        "min_child_samples": "min_data_in_leaf",
+        "subsample": "bagging_fraction",
+        "colsample_bytree": "feature_fraction",
+        "n_jobs": "num_threads",
+    }
+    core = {}
+    for chave, valor in params.items():
+        if valor is None:
+            continue
+        core[traducao.get(chave, chave)] = valor
+    if core.get("bagging_fraction", 1.0) < 1.0:
+        core.setdefault("bagging_freq", 1)
+    return core
+
+
+class CacheDatasetLGB:
+    """Dataset binado por perfil, com subsets para folds e persistencia binaria."""
+
+    def __init__(self, X, y, nome, categorical_feature="auto", cache_dir=DEFAULT_CACHE_DIR,
+                 params=None, persistir=True):
+        self.X = X
+        self.y = y
+        self.nome = nome
+        self.categorical_feature = categorical_feature
+        self.cache_dir = Path(cache_dir)
+        self.params = {**DATASET_PARAMS, **(params or {})}
+        self.persistir = persistir
+        self.origem = None
+        self._dataset = None
+
+    def _chave(self):
+        conteudo = hash_dataframe(self.X.assign(__y__=np.asarray(self.y)))
+        return hash_dataframe(pd.DataFrame({
+            "conteudo": [conteudo],
+            "params": [json.dumps(self.params, sort_keys=True)],
+            "cat": [json.dumps(self.categorical_feature, default=str)],
+        }))[:16]
+
+    def _pandas_categorical(self):
+        return [
+            list(self.X[col].cat.categories)
+            for col in self.X.columns
+            if isinstance(self.X[col].dtype, pd.CategoricalDtype)
+        ] or None
+
+    def completo(self):
+        """Dataset construido com todas as linhas (carrega do binario se valido)."""
+        if self._dataset is not None:
+            return self._dataset
+        chave = self._chave()
+        binario = self.cache_dir / f"{self.nome.lower()}-{chave}.bin"
+        if self.persistir and binario.exists():
+            ds = lgb.Dataset(str(binario), params=self.params, free_raw_data=False)
+            ds.construct()
+            # O binario nao guarda o mapeamento de categorias do pandas
+            ds.pandas_categorical = self._pandas_categorical()
+            self.origem = "binario"
+        else:
+            ds = lgb.Dataset(
+                self.X,
+                label=np.asarray(self.y),
+                categorical_feature=self.categorical_feature,
+                params=self.params,
+                free_raw_data=False,
+            )
+            ds.construct()
+            self.origem = "construido"
+            if self.persistir:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                # Escrita atomica: varios processos podem construir o mesmo perfil
+                tmp = binario.with_suffix(f".{os.getpid()}.tmp")
+                ds.save_binary(str(tmp))
+                os.replace(tmp, binario)
+        self._dataset = ds
+        return ds
+
+    def subset(self, indices):
+        """Fatia de linhas reaproveitando os bins do Dataset completo."""
+        return self.completo().subset(np.asarray(indices).tolist())
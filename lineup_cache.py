@@ -0,0 +1,118 @@
+"""
+Cache de conversao de line-ups (xlsx/csv/parquet) para Parquet tipado.
+
+Cada arquivo de line-up ganha um sidecar em CACHE_LINEUP_DIR:
+- <nome>.parquet: o line-up ja em esquema tipado (lineup_schema);
+- <nome>.json: manifesto com portos, linhas, intervalo de chegada e a
+  impressao da origem (tamanho/mtime) e do codigo de normalizacao.
+
+O sidecar so e refeito quando a origem ou normalizar_lineup mudam, inclusive
+a taxonomia de cargas (coluna perfil) e o registro de portos (porto_id:
+codigo, PORTOS e os CSVs de portos). O indice de portos do app le apenas os
+manifestos, sem abrir os dados.
+"""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from lineup_schema import _coluna_porto, ler_lineup, normalizar_lineup
+from pipeline_cache import hash_codigo, impressao_arquivos
+from registro_portos import ID_DESCONHECIDO, PORT_MAPPING_PATH, PORTS_CONFIG_PATH, registro
+
+CACHE_LINEUP_DIR = Path("data/cache/lineups")
+
+
+def _caminhos(fonte, destino):
+    base = f"{fonte.stem}_{fonte.suffix.lower().lstrip('.')}"
+    return Path(destino) / f"{base}.parquet", Path(destino) / f"{base}.json"
+
+
+@lru_cache(maxsize=1)
+def _hash_normalizacao():
+    # Segue perfis_lineup (taxonomia_carga) e registro() (registro_portos)
+    return hash_codigo(normalizar_lineup)
+
+
+def _impressao(fonte):
+    return {
+        "arquivo": impressao_arquivos([fonte]),
+        "codigo": _hash_normalizacao(),
+        "registro": impressao_arquivos([PORTS_CONFIG_PATH, PORT_MAPPING_PATH]),
+    }
+
+
+def _ler_manifesto(caminho):
+    if not caminho.exists():
+        return {}
+    try:
+        with caminho.open("r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _data_iso(valor):
+    return None if pd.isna(valor) else pd.Timestamp(valor).isoformat()
+
+
+def converter_lineup(fonte, destino=CACHE_LINEUP_DIR, forcar=False):
+    """
+    Garante o sidecar Parquet + manifesto do line-up e devolve o manifesto.
+
+    Reconverte so se a origem (tamanho/mtime) ou o codigo de normalizacao mudaram.
+    """
+    fonte = Path(fonte)
+    sidecar, caminho_manifesto = _caminhos(fonte, destino)
+    impressao = _impressao(fonte)
+    manifesto = _ler_manifesto(caminho_manifesto)
+    if not forcar and manifesto.get("impressao") == impressao and sidecar.exists():
+        return manifesto
+
+    df = ler_lineup(fonte)
+    col_porto = _coluna_porto(df)
+    portos = []
+    if col_porto is not None:
+        portos = [p for p in df[col_porto].dropna().astype(str).str.strip().unique().tolist() if p]
+    chegada = df["data_chegada_dt"]
+    manifesto = {
+        "fonte": str(fonte),
+        "impressao": impressao,
+        "linhas": int(len(df)),
+        "coluna_porto": col_porto,
+        "portos": portos,
+        "chegada_min": _data_iso(chegada.min()),
+        "chegada_max": _data_iso(chegada.max()),
+    }
+    Path(destino).mkdir(parents=True, exist_ok=True)
+    df.to_parquet(sidecar, index=False)
+    with caminho_manifesto.open("w", encoding="utf-8") as fh:
+        json.dump(manifesto, fh, indent=2, ensure_ascii=False)
+    return manifesto
+
+
+def ler_lineup_cache(fonte, porto_nome=None, destino=CACHE_LINEUP_DIR):
+    """Line-up tipado lido do sidecar (convertendo antes, se preciso)."""
+    fonte = Path(fonte)
+    manifesto = converter_lineup(fonte, destino)
+    sidecar, _ = _caminhos(fonte, destino)
+    df = pd.read_parquet(sidecar)
+    if manifesto.get("coluna_porto") is None and porto_nome:
+        # Sem coluna de porto o ID vem do porto do arquivo, como em normalizar_lineup
+        df["porto_id"] = registro().id(porto_nome)
+    elif "porto_id" not in df.columns:
+        df["porto_id"] = ID_DESCONHECIDO
+    return df
+
+
+def manifestos_lineup(fontes, destino=CACHE_LINEUP_DIR):
+    """Manifesto de cada arquivo (fonte -> dict); arquivos ilegiveis ficam de fora."""
+    manifestos = {}
+    for fonte in fontes:
+        try:
+            manifestos[Path(fonte)] = converter_lineup(fonte, destino)
+        except Exception:
+            continue
+    return manifestos
@@ -0,0 +1,199 @@
+"""
+Esquema tipado unico para line-ups (parquet, xlsx, csv e historico).
+
+normalizar_lineup converte qualquer fonte para as mesmas colunas e tipos:
+- Chegada/Atracacao/Atualizacao/ExtraidoEm: datetime64 (dia primeiro);
+- data_chegada_dt: Chegada, ou Atualizacao/ExtraidoEm quando Chegada
+  nao tem nenhuma data valida (NaT onde faltar);
+- DWT: float; Berco/Pier/Mercadoria/perfil: category;
+- porto_id: ID inteiro do registro de portos.
+
+As datas sao interpretadas uma unica vez aqui; o restante do app usa as
+colunas tipadas. validar_lineup devolve avisos (texto) sobre o resultado.
+"""
+
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from registro_portos import ID_DESCONHECIDO, registro
+from taxonomia_carga import perfis_lineup
+
+# Nomes normalizados (normalize_column_name) -> nomes usados no app
+COLUNAS_LINEUP = {
+    "navio": "Navio",
+    "produto": "Mercadoria",
+    "carga": "Mercadoria",
+    "mercadoria": "Mercadoria",
+    "prev_chegada": "Chegada",
+    "chegada": "Chegada",
+    "previsao": "Chegada",
+    "pier": "Pier",
+    "berco": "Berco",
+    "dwt": "DWT",
+    "atracacao": "Atracacao",
+    "ultima_atualizacao": "Atualizacao",
+    "extracted_at": "ExtraidoEm",
+    "tx_comercial": "TX_COMERCIAL",
+    "tx_efetiva": "TX_EFETIVA",
+    "laytime": "Laytime",
+    "incoterm": "INCOTERM",
+    "ano": "Ano",
+    "mes": "Mes",
+}
+COLUNAS_MINIMAS = ["Navio", "Mercadoria", "Chegada", "Berco"]
+COLUNAS_DATA = ["Chegada", "Atracacao", "Atualizacao", "ExtraidoEm"]
+COLUNAS_CATEGORICAS = ["Berco", "Pier", "Mercadoria", "perfil"]
+FALLBACK_CHEGADA = ["Atualizacao", "ExtraidoEm"]
+PORT_COLUMN_CANDIDATES = [
+    "porto",
+    "porto_nome",
+    "nome_porto",
+    "port",
+    "port_name",
+    "descricao_porto",
+    "porto_desc",
+]
+
+
+def normalize_column_name(valor):
+    texto = unicodedata.normalize("NFKD", str(valor))
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
+    texto = re.sub(r"[^A-Za-z0-9]+", "_", texto).strip("_").lower()
+    return texto
+
+
+def coalesce_duplicate_columns(df):
+    if df is None or df.empty:
+        return df
+    if not df.columns.duplicated().any():
+        return df
+    df = df.copy()
+    combined = {}
+    seen = set()
+    for name in df.columns:
+        if name in seen:
+            continue
+        seen.add(name)
+        cols = df.loc[:, name]
+        if isinstance(cols, pd.DataFrame):
+            combined[name] = cols.bfill(axis=1).iloc[:, 0]
+        else:
+            combined[name] = cols
+    return pd.DataFrame(combined)
+
+
+def _coluna_porto(df):
+    normalizadas = {normalize_column_name(c): c for c in df.columns}
+    for candidato in PORT_COLUMN_CANDIDATES:
+        if candidato in normalizadas:
+            return normalizadas[candidato]
+    return None
+
+
+FORMATOS_DATA = ["%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y", "ISO8601"]
+
+
+def _datas(serie):
+    """Datas dos formatos usuais (dia primeiro ou ISO), interpretando so os valores unicos."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        # Com fuso (parquet/xlsx tz-aware) vira UTC sem fuso, como os textos
+        if serie.dt.tz is not None:
+            serie = serie.dt.tz_convert("UTC").dt.tz_localize(None)
+        return serie.astype("datetime64[ns]")
+    codigos, unicos = pd.factorize(serie)
+    texto = pd.Series(unicos, dtype="str").str.strip()
+    datas = pd.Series(pd.NaT, index=texto.index, dtype="datetime64[ns, UTC]")
+    for formato in FORMATOS_DATA:
+        faltando = datas.isna()
+        if not faltando.any():
+            break
+        datas[faltando] = pd.to_datetime(texto[faltando], errors="coerce", format=formato, utc=True)
+    faltando = datas.isna() & texto.ne("")
+    if faltando.any():
+        datas[faltando] = pd.to_datetime(
+            texto[faltando], errors="coerce", dayfirst=True, format="mixed", utc=True
+        )
+    # Horarios com fuso viram UTC sem fuso; os sem fuso ficam como vieram
+    valores = np.append(datas.dt.tz_localize(None).to_numpy(), np.datetime64("NaT"))
+    return pd.Series(valores[codigos], index=serie.index)
+
+
+def lineup_vazio():
+    """Line-up sem linhas, ja no esquema tipado."""
+    return normalizar_lineup(pd.DataFrame(columns=COLUNAS_MINIMAS))
+
+
+def normalizar_lineup(df, porto_nome=None):
+    """
+    Renomeia, tipa e identifica o porto de um line-up bruto de qualquer fonte.
+
+    porto_id vem da coluna de porto, se houver; senao, de porto_nome.
+    """
+    df = df.rename(columns={c: normalize_column_name(c) for c in df.columns})
+    df = coalesce_duplicate_columns(df.rename(columns=COLUNAS_LINEUP))
+    df = df.copy()
+    if "Pier" in df.columns and "Berco" not in df.columns:
+        df["Berco"] = df["Pier"]
+
+    for col in COLUNAS_DATA:
+        if col in df.columns:
+            df[col] = _datas(df[col])
+    chegada = df["Chegada"] if "Chegada" in df.columns else pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    if chegada.isna().all():
+        for col in FALLBACK_CHEGADA:
+            if col in df.columns and df[col].notna().any():
+                chegada = df[col]
+                break
+    df["data_chegada_dt"] = chegada
+
+    if "DWT" in df.columns:
+        df["DWT"] = pd.to_numeric(df["DWT"], errors="coerce").astype(float)
+
+    reg = registro()
+    col_porto = _coluna_porto(df)
+    if col_porto is not None:
+        df["porto_id"] = reg.ids(df[col_porto])
+    else:
+        df["porto_id"] = np.int64(reg.id(porto_nome) if porto_nome else ID_DESCONHECIDO)
+    df["porto_id"] = df["porto_id"].astype(np.int64)
+
+    df["perfil"] = perfis_lineup(df)
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def validar_lineup(df):
+    """Avisos sobre o line-up tipado (colunas ausentes, datas e DWT invalidos)."""
+    avisos = []
+    if df is None or df.empty:
+        return avisos
+    faltando = [c for c in COLUNAS_MINIMAS if c not in df.columns]
+    if faltando:
+        avisos.append(f"Colunas ausentes no line-up: {', '.join(faltando)}")
+    sem_eta = int(df["data_chegada_dt"].isna().sum()) if "data_chegada_dt" in df.columns else len(df)
+    if sem_eta:
+        avisos.append(f"{sem_eta} de {len(df)} linhas sem data de chegada valida")
+    if "DWT" in df.columns:
+        invalidos = int((df["DWT"] <= 0).sum())
+        if invalidos:
+            avisos.append(f"{invalidos} linhas com DWT nao positivo")
+    if "porto_id" in df.columns and (df["porto_id"] == ID_DESCONHECIDO).all():
+        avisos.append("Porto do line-up nao identificado")
+    return avisos
+
+
+def ler_lineup(caminho, porto_nome=None):
+    """Le um arquivo de line-up (parquet, xlsx ou csv) direto no esquema tipado."""
+    sufixo = caminho.suffix.lower()
+    if sufixo == ".parquet":
+        bruto = pd.read_parquet(caminho)
+    elif sufixo == ".xlsx":
+        bruto = pd.read_excel(caminho)
+    else:
+        bruto = pd.read_csv(caminho)
+    return normalizar_lineup(bruto, porto_nome=porto_nome)
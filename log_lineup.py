@@ -0,0 +1,232 @@
+"""
+Log append-only de snapshots de line-up (change data capture).
+
+Cada coleta e comparada com o estado atual de cada navio, identificado por
+(porto_norm, navio_id) - IMO quando houver, senao o nome normalizado. So as
+mudancas sao gravadas, com o instante valido_desde:
+- "novo": navio apareceu no line-up;
+- "alterado": mudou ETA, berco ou situacao;
+- "removido": saiu do line-up (atracou/partiu).
+
+Layout em LOG_LINEUP_DIR:
+- deltas/porto=<CHAVE>/<AAAAmmddTHHMMSS>.parquet: deltas de uma coleta;
+- indice.parquet: uma linha por arquivo de delta (porto, caminho, intervalo
+  de valido_desde), para a reconstrucao ler so os arquivos necessarios;
+- estado.parquet: ultimo estado de cada navio (base da proxima comparacao).
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from lineup_schema import normalizar_lineup
+from registro_portos import normalizar_texto, registro
+
+LOG_LINEUP_DIR = Path("data/lineup_log")
+CAMPOS_RASTREADOS = ["eta", "berco", "situacao"]
+COLUNAS_DELTA = ["porto_norm", "navio_id", "navio", "valido_desde", "evento", *CAMPOS_RASTREADOS]
+COLUNAS_SITUACAO = ["situacao", "status", "operacao"]
+PORTO_SEM_NOME = "DESCONHECIDO"
+
+
+def _vazio():
+    return pd.DataFrame({
+        "porto_norm": pd.Series(dtype="str"),
+        "navio_id": pd.Series(dtype="str"),
+        "navio": pd.Series(dtype="str"),
+        "valido_desde": pd.Series(dtype="datetime64[ns]"),
+        "evento": pd.Series(dtype="str"),
+        "eta": pd.Series(dtype="datetime64[ns]"),
+        "berco": pd.Series(dtype="str"),
+        "situacao": pd.Series(dtype="str"),
+    })
+
+
+def _texto(serie):
+    serie = serie.astype("str").str.strip()
+    return serie.where(serie.ne("") & serie.notna())
+
+
+def navio_id(nomes, imo=None):
+    """Identificador do navio: IMO (7+ digitos) quando houver, senao o nome normalizado."""
+    ids = _texto(nomes).map(normalizar_texto, na_action="ignore")
+    if imo is not None:
+        digitos = _texto(imo).str.replace(r"\D", "", regex=True)
+        ids = ("IMO" + digitos).where(digitos.str.len() >= 7, ids)
+    return ids
+
+
+def snapshot_para_estado(df, porto_nome=None):
+    """Estado (porto_norm, navio_id, navio, eta, berco, situacao) de uma coleta bruta."""
+    tipado = normalizar_lineup(df, porto_nome=porto_nome)
+    reg = registro()
+    chaves = pd.Series(
+        np.where(tipado["porto_id"] >= 0, [reg.chave(pid) for pid in tipado["porto_id"]], PORTO_SEM_NOME),
+        index=tipado.index,
+    )
+    ausente = pd.Series(np.nan, index=tipado.index, dtype="str")
+    nomes = _texto(tipado["Navio"]) if "Navio" in tipado.columns else ausente
+    ids = navio_id(nomes, tipado["imo"] if "imo" in tipado.columns else None)
+    situacao = next((c for c in COLUNAS_SITUACAO if c in tipado.columns), None)
+    estado = pd.DataFrame({
+        "porto_norm": chaves.astype("str"),
+        "navio_id": ids.astype("str"),
+        "navio": nomes.astype("str"),
+        "eta": tipado["data_chegada_dt"].astype("datetime64[ns]"),
+        "berco": _texto(tipado["Berco"]) if "Berco" in tipado.columns else ausente,
+        "situacao": _texto(tipado[situacao]).str.upper() if situacao else ausente,
+    })
+    estado = estado[estado["navio_id"].notna() & estado["navio_id"].ne("")]
+    # Linhas repetidas do mesmo navio na coleta: vale a ultima
+    return estado.drop_duplicates(["porto_norm", "navio_id"], keep="last").reset_index(drop=True)
+
+
+def _diferente(a, b):
+    return ~((a == b).fillna(False) | (a.isna() & b.isna()))
+
+
+class LogLineup:
+    """Log de deltas de line-up por (porto, navio) com reconstrucao pontual."""
+
+    def __init__(self, destino=LOG_LINEUP_DIR):
+        self.destino = Path(destino)
+
+    def _ler(self, nome):
+        caminho = self.destino / nome
+        return pd.read_parquet(caminho) if caminho.exists() else None
+
+    def estado_atual(self):
+        estado = self._ler("estado.parquet")
+        return estado if estado is not None else _vazio().drop(columns=["evento"])
+
+    def registrar(self, df, porto_nome=None, capturado_em=None):
+        """
+        Compara a coleta com o estado atual e grava so as mudancas.
+
+        Navios ausentes viram "removido" apenas nos portos presentes na coleta.
+        Devolve os deltas gravados.
+        """
+        capturado_em = pd.Timestamp(capturado_em or pd.Timestamp.now()).floor("s")
+        novo = snapshot_para_estado(df, porto_nome=porto_nome)
+        anterior = self.estado_atual()
+        anterior = anterior[anterior["porto_norm"].isin(novo["porto_norm"].unique())]
+
+        chave = ["porto_norm", "navio_id"]
+        junto = novo.merge(anterior, on=chave, how="outer", suffixes=("", "_ant"), indicator=True)
+        alterado = np.zeros(len(junto), dtype=bool)
+        for campo in CAMPOS_RASTREADOS:
+            alterado |= _diferente(junto[campo], junto[f"{campo}_ant"]).to_numpy()
+        evento = np.select(
+            [junto["_merge"].eq("left_only"), junto["_merge"].eq("right_only"), alterado],
+            ["novo", "removido", "alterado"],
+            default="",
+        )
+        removido = evento == "removido"
+        for campo in ["navio", *CAMPOS_RASTREADOS]:
+            # Removido mantem o ultimo valor conhecido
+            junto.loc[removido, campo] = junto.loc[removido, f"{campo}_ant"]
+        junto["evento"] = evento
+        junto["valido_desde"] = capturado_em
+        deltas = junto.loc[evento != "", COLUNAS_DELTA].reset_index(drop=True)
+        deltas = pd.concat([_vazio(), deltas], ignore_index=True).astype(_vazio().dtypes.to_dict())
+        if deltas.empty:
+            return deltas
+
+        indice = self._ler("indice.parquet")
+        linhas_indice = []
+        for porto, parte in deltas.groupby("porto_norm", sort=True):
+            relativo = Path("deltas") / f"porto={porto}" / f"{capturado_em:%Y%m%dT%H%M%S}.parquet"
+            caminho = self.destino / relativo
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            if caminho.exists():
+                # Duas coletas no mesmo segundo: acumula no mesmo arquivo
+                parte = pd.concat([pd.read_parquet(caminho), parte], ignore_index=True)
+            parte.to_parquet(caminho, index=False)
+            linhas_indice.append({
+                "porto_norm": porto,
+                "arquivo": relativo.as_posix(),
+                "inicio": capturado_em,
+                "fim": capturado_em,
+                "linhas": len(parte),
+            })
+        indice = pd.concat([t for t in (indice, pd.DataFrame(linhas_indice)) if t is not None and not t.empty],
+                           ignore_index=True)
+        indice = indice.drop_duplicates("arquivo", keep="last")
+        indice.to_parquet(self.destino / "indice.parquet", index=False)
+
+        # Estado: ultimo valor de cada navio; removidos saem do estado
+        estado = self.estado_atual()
+        estado = estado.set_index(chave)
+        atualizados = deltas.set_index(chave)
+        estado = estado.drop(index=atualizados.index, errors="ignore")
+        vivos = atualizados[atualizados["evento"] != "removido"].drop(columns=["evento", "valido_desde"])
+        estado = pd.concat([estado, vivos]).reset_index()
+        estado.to_parquet(self.destino / "estado.parquet", index=False)
+        return deltas
+
+    def deltas(self, porto_nome=None, ate=None, desde=None):
+        """
+        Deltas do log (opcionalmente de um porto, ate um instante e depois de `desde`),
+        lendo so os arquivos do indice.
+        """
+        indice = self._ler("indice.parquet")
+        if indice is None or indice.empty:
+            return _vazio()
+        if porto_nome is not None:
+            indice = indice[indice["porto_norm"] == registro().chave(registro().id(porto_nome))]
+        if ate is not None:
+            indice = indice[indice["inicio"] <= pd.Timestamp(ate)]
+        if desde is not None:
+            indice = indice[indice["fim"] > pd.Timestamp(desde)]
+        if indice.empty:
+            return _vazio()
+        partes = [pd.read_parquet(self.destino / arquivo) for arquivo in indice["arquivo"]]
+        deltas = pd.concat(partes, ignore_index=True)
+        if ate is not None:
+            deltas = deltas[deltas["valido_desde"] <= pd.Timestamp(ate)]
+        if desde is not None:
+            deltas = deltas[deltas["valido_desde"] > pd.Timestamp(desde)]
+        return deltas.sort_values("valido_desde", kind="stable").reset_index(drop=True)
+
+    def estado_em(self, instante, porto_nome=None):
+        """Line-up como estava no instante (ultimo delta de cada navio, sem os removidos)."""
+        deltas = self.deltas(porto_nome=porto_nome, ate=instante)
+        if deltas.empty:
+            return deltas.drop(columns=["evento"])
+        ultimo = deltas.drop_duplicates(["porto_norm", "navio_id"], keep="last")
+        ultimo = ultimo[ultimo["evento"] != "removido"]
+        return ultimo.drop(columns=["evento"]).reset_index(drop=True)
+
+    def deslizamento_eta(self, porto_nome=None):
+        """
+        Por visita de navio: primeira e ultima ETA, revisoes de ETA, deslizamento (h),
+        primeira vez visto, saida do line-up e permanencia (h). Cada evento `removido`
+        encerra a visita; o mesmo navio voltando ao porto abre a visita seguinte.
+        """
+        deltas = self.deltas(porto_nome=porto_nome)
+        if deltas.empty:
+            return pd.DataFrame()
+        removido = deltas["evento"].eq("removido")
+        # Visita = remocoes anteriores do mesmo navio (a remocao fecha a propria visita)
+        deltas["visita"] = (
+            removido.astype(int).groupby([deltas["porto_norm"], deltas["navio_id"]]).cumsum() - removido
+        )
+        chave = ["porto_norm", "navio_id", "visita"]
+        com_eta = deltas[deltas["eta"].notna() & ~removido]
+        # Revisao = ETA diferente da anterior do mesmo navio na mesma visita
+        eta_anterior = com_eta.groupby(chave)["eta"].shift()
+        revisoes = (eta_anterior.notna() & com_eta["eta"].ne(eta_anterior)).groupby(
+            [com_eta[c] for c in chave]
+        ).sum()
+        etas = com_eta.groupby(chave)["eta"].agg(primeira_eta="first", ultima_eta="last")
+        vistos = deltas.groupby(chave).agg(
+            navio=("navio", "last"),
+            primeira_vez=("valido_desde", "first"),
+        )
+        saidas = deltas[removido].groupby(chave)["valido_desde"].last().rename("saida")
+        resultado = vistos.join(etas).join(revisoes.rename("revisoes_eta")).join(saidas)
+        resultado["revisoes_eta"] = resultado["revisoes_eta"].fillna(0).astype(int)
+        resultado["deslizamento_eta_h"] = (resultado["ultima_eta"] - resultado["primeira_eta"]).dt.total_seconds() / 3600
+        resultado["permanencia_h"] = (resultado["saida"] - resultado["primeira_vez"]).dt.total_seconds() / 3600
+        return resultado.reset_index()
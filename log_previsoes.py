@@ -0,0 +1,305 @@
+"""
+Log de previsoes em Parquet particionado por porto e data de referencia.
+
+Cada execucao de previsao (app sob demanda ou worker) e anexada com:
+- run_id, versao_modelo, gerado_em e hash_contexto (clima/economia/AIS);
+- hash_features: hash das colunas de entrada de cada navio;
+- os campos da previsao (espera, probabilidade, ETA com espera, tier...).
+
+Layout em LOG_PREVISOES_DIR: porto=<CHAVE>/data=<AAAA-MM-DD>/part-*.parquet.
+A escrita e feita por uma thread em lotes (registrar nao bloqueia); quando
+uma particao passa de COMPACTAR_A_PARTIR arquivos, eles viram um unico
+compactado-*.parquet. A leitura usa pyarrow.dataset com projecao de
+colunas e filtro por porto/data (so as particoes pedidas sao abertas).
+
+Leitura concorrente com a compactacao: o compactado lista no metadata do
+Parquet os arquivos que substitui (ignorados enquanto ainda existirem) e a
+leitura refaz a listagem se um arquivo sumir no meio. Uma trava
+.compactando mais velha que TRAVA_VALIDADE_S (processo que caiu) e
+descartada.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from registro_portos import normalizar_texto, registro
+
+LOG_PREVISOES_DIR = Path("data/previsoes_log")
+LOTE_LINHAS = 5000
+INTERVALO_ESCRITA_S = 5.0
+COMPACTAR_A_PARTIR = 16
+ARQUIVO_TRAVA = ".compactando"
+TRAVA_VALIDADE_S = 600
+META_SUBSTITUI = b"log_previsoes.substitui"
+TENTATIVAS_LEITURA = 5
+COLUNAS_LOG = {
+    "run_id": "str",
+    "versao_modelo": "str",
+    "gerado_em": "datetime64[ns]",
+    "hash_contexto": "str",
+    "hash_features": "uint64",
+    "Navio": "str",
+    "imo": "str",
+    "Berco": "str",
+    "perfil": "str",
+    "data_chegada_dt": "datetime64[ns]",
+    "tempo_espera_previsto_horas": "float64",
+    "tempo_espera_previsto_dias": "float64",
+    "probabilidade_prevista": "float64",
+    "eta_mais_espera": "datetime64[ns]",
+    "mae_esperado": "float64",
+    "confianca_previsao": "float64",
+    "tier": "str",
+    "modelo_usado": "str",
+}
+PARTICOES = pa.schema([("porto", pa.string()), ("data", pa.string())])
+
+
+def _chave_porto(porto_nome):
+    return registro().chave(registro().id(porto_nome)) or normalizar_texto(porto_nome)
+
+
+def _substituidos(arquivos):
+    """Caminhos (str) que algum compactado-*.parquet da lista ja substitui."""
+    substituidos = set()
+    for arquivo in map(Path, arquivos):
+        if arquivo.name.startswith("compactado-"):
+            metadata = pq.read_schema(arquivo).metadata or {}
+            nomes = json.loads(metadata.get(META_SUBSTITUI, b"[]"))
+            substituidos.update(str(arquivo.parent / nome) for nome in nomes)
+    return substituidos
+
+
+def hash_linhas(df, colunas):
+    """Hash (uint64) por linha das colunas de entrada (valores como texto, estavel entre dtypes)."""
+    colunas = [c for c in colunas if c in df.columns]
+    if not colunas:
+        return np.zeros(len(df), dtype="uint64")
+    return pd.util.hash_pandas_object(df[colunas].astype("str"), index=False).to_numpy()
+
+
+def frame_log(df_pred, run_id, versao_modelo, hash_contexto="", colunas_entrada=(), gerado_em=None):
+    """Linhas do log (esquema fixo COLUNAS_LOG) para uma execucao de previsao."""
+    gerado_em = pd.Timestamp(gerado_em or datetime.now())
+    base = pd.DataFrame({
+        "run_id": run_id,
+        "versao_modelo": versao_modelo,
+        "gerado_em": gerado_em.floor("s"),
+        "hash_contexto": hash_contexto,
+        "hash_features": hash_linhas(df_pred, colunas_entrada),
+    }, index=df_pred.index)
+    for coluna, dtype in list(COLUNAS_LOG.items())[len(base.columns):]:
+        serie = df_pred[coluna] if coluna in df_pred.columns else pd.Series(np.nan, index=df_pred.index)
+        if dtype.startswith("datetime"):
+            serie = pd.to_datetime(serie, errors="coerce")
+        elif dtype == "float64":
+            serie = pd.to_numeric(serie, errors="coerce")
+        base[coluna] = serie
+    return base.astype(COLUNAS_LOG).reset_index(drop=True)
+
+
+class LogPrevisoes:
+    """Log particionado de previsoes com escrita em lote numa thread."""
+
+    def __init__(self, destino=LOG_PREVISOES_DIR, lote_linhas=LOTE_LINHAS,
+                 intervalo_s=INTERVALO_ESCRITA_S, compactar_a_partir=COMPACTAR_A_PARTIR):
+        self.destino = Path(destino)
+        self.lote_linhas = lote_linhas
+        self.intervalo_s = intervalo_s
+        self.compactar_a_partir = compactar_a_partir
+        self._fila = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+    def registrar(self, df_pred, porto_nome, data_referencia, versao_modelo="", hash_contexto="",
+                  colunas_entrada=(), run_id=None):
+        """Enfileira uma execucao de previsao (nao bloqueia); devolve o run_id."""
+        run_id = run_id or uuid.uuid4().hex[:16]
+        if df_pred is None or df_pred.empty:
+            return run_id
+        linhas = frame_log(df_pred, run_id, versao_modelo, hash_contexto, colunas_entrada)
+        particao = (_chave_porto(porto_nome), str(pd.Timestamp(data_referencia).date()))
+        self._iniciar()
+        self._fila.put((particao, linhas))
+        return run_id
+
+    def descarregar(self):
+        """Espera a gravacao de tudo o que ja foi registrado."""
+        if self._thread is None:
+            return
+        feito = threading.Event()
+        self._fila.put(feito)
+        feito.wait()
+
+    def _iniciar(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._escritor, name="log-previsoes", daemon=True)
+                self._thread.start()
+                atexit.register(self.descarregar)
+
+    def _escritor(self):
+        pendentes = {}
+        linhas = 0
+        ultimo = time.monotonic()
+        while True:
+            try:
+                item = self._fila.get(timeout=self.intervalo_s)
+            except queue.Empty:
+                item = None
+            aviso = None
+            if isinstance(item, threading.Event):
+                aviso = item
+            elif item is not None:
+                particao, frame = item
+                pendentes.setdefault(particao, []).append(frame)
+                linhas += len(frame)
+            vencido = time.monotonic() - ultimo >= self.intervalo_s
+            if pendentes and (aviso is not None or vencido or linhas >= self.lote_linhas):
+                for particao, frames in pendentes.items():
+                    try:
+                        self._gravar(particao, pd.concat(frames, ignore_index=True))
+                    except Exception as exc:
+                        print(f"[log_previsoes] falha ao gravar {particao}: {exc}")
+                pendentes, linhas, ultimo = {}, 0, time.monotonic()
+            if aviso is not None:
+                aviso.set()
+
+    def _diretorio(self, porto, data):
+        return self.destino / f"porto={porto}" / f"data={data}"
+
+    def _gravar(self, particao, frame):
+        diretorio = self._diretorio(*particao)
+        diretorio.mkdir(parents=True, exist_ok=True)
+        nome = f"part-{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+        temporario = diretorio / f".{nome}.tmp"
+        frame.to_parquet(temporario, index=False)
+        os.replace(temporario, diretorio / nome)
+        if len(list(diretorio.glob("part-*.parquet"))) >= self.compactar_a_partir:
+            self.compactar_particao(diretorio)
+
+    # ------------------------------------------------------------------
+    # Compactacao
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _travar(trava):
+        """Cria a trava (True) ou False se outra compactacao valida a tem; trava velha e descartada."""
+        for _ in range(2):
+            try:
+                os.close(os.open(trava, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - trava.stat().st_mtime < TRAVA_VALIDADE_S:
+                        return False
+                    # Renomear antes de apagar: so um processo leva a trava velha
+                    velha = trava.with_name(f"{trava.name}.{uuid.uuid4().hex[:8]}")
+                    os.rename(trava, velha)
+                    velha.unlink(missing_ok=True)
+                except FileNotFoundError:
+                    pass
+        return False
+
+    def compactar_particao(self, diretorio):
+        """Junta os arquivos da particao num so; devolve quantos foram juntados (0 se ja havia trava)."""
+        diretorio = Path(diretorio)
+        trava = diretorio / ARQUIVO_TRAVA
+        if not self._travar(trava):
+            return 0
+        try:
+            arquivos = sorted(diretorio.glob("*.parquet"))
+            # Originais de uma compactacao que caiu antes de apaga-los
+            substituidos = _substituidos(arquivos)
+            for arquivo in arquivos:
+                if str(arquivo) in substituidos:
+                    arquivo.unlink(missing_ok=True)
+            arquivos = [a for a in arquivos if str(a) not in substituidos]
+            if len(arquivos) < 2:
+                return 0
+            juntos = pa.Table.from_pandas(
+                pd.concat([pd.read_parquet(a) for a in arquivos], ignore_index=True), preserve_index=False
+            )
+            # Leitores que listarem o compactado junto com os originais ignoram os originais
+            substitui = json.dumps([a.name for a in arquivos]).encode()
+            juntos = juntos.replace_schema_metadata({**(juntos.schema.metadata or {}), META_SUBSTITUI: substitui})
+            nome = f"compactado-{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+            temporario = diretorio / f".{nome}.tmp"
+            pq.write_table(juntos, temporario)
+            os.replace(temporario, diretorio / nome)
+            for arquivo in arquivos:
+                arquivo.unlink(missing_ok=True)
+            return len(arquivos)
+        finally:
+            trava.unlink(missing_ok=True)
+
+    def compactar(self, minimo=2):
+        """Compacta todas as particoes com pelo menos `minimo` arquivos."""
+        self.descarregar()
+        total = 0
+        for diretorio in sorted(self.destino.glob("porto=*/data=*")):
+            if len(list(diretorio.glob("*.parquet"))) >= minimo:
+                total += self.compactar_particao(diretorio)
+        return total
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def dataset(self, filtro=None):
+        """Dataset dos arquivos das particoes do filtro, sem os ja substituidos por um compactado."""
+        particionamento = ds.partitioning(PARTICOES, flavor="hive")
+        completo = ds.dataset(self.destino, format="parquet", partitioning=particionamento)
+        arquivos = [f.path for f in completo.get_fragments(filter=filtro)]
+        substituidos = _substituidos(arquivos)
+        return ds.dataset(
+            [a for a in arquivos if a not in substituidos],
+            format="parquet",
+            schema=completo.schema,
+            partitioning=particionamento,
+            partition_base_dir=str(self.destino),
+        )
+
+    def ler(self, porto_nome=None, inicio=None, fim=None, colunas=None):
+        """
+        Previsoes registradas, com projecao de colunas e filtro por porto e data de referencia.
+
+        porto e data (AAAA-MM-DD) vem das particoes e podem ser pedidos em colunas.
+        """
+        colunas = list(colunas) if colunas is not None else list(COLUNAS_LOG) + ["porto", "data"]
+        if not self.destino.exists():
+            return pd.DataFrame(columns=colunas)
+        filtro = None
+        condicoes = []
+        if porto_nome is not None:
+            condicoes.append(ds.field("porto") == _chave_porto(porto_nome))
+        if inicio is not None:
+            condicoes.append(ds.field("data") >= str(pd.Timestamp(inicio).date()))
+        if fim is not None:
+            condicoes.append(ds.field("data") <= str(pd.Timestamp(fim).date()))
+        for condicao in condicoes:
+            filtro = condicao if filtro is None else filtro & condicao
+        # Uma compactacao concorrente pode apagar arquivos ja listados: lista de novo
+        for tentativa in range(TENTATIVAS_LEITURA):
+            try:
+                tabela = self.dataset(filtro).to_table(columns=colunas, filter=filtro)
+                break
+            except FileNotFoundError:
+                if tentativa == TENTATIVAS_LEITURA - 1:
+                    raise
+                time.sleep(0.05 * (tentativa + 1))
+        return tabela.to_pandas()
@@ -0,0 +1,105 @@
+"""
+Esquemas tipados e utilitarios de memoria para os frames de treino.
+
+- aplicar_schema: projeta so as colunas do esquema e converte tipos
+  (numericos reduzidos, texto como category, chaves inteiras).
+- reduzir_memoria: downcast float64 -> float32, texto -> category e poda de
+  categorias sem uso apos filtros.
+- rss_mb / rss_pico_mb: memoria residente atual e pico do processo.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCHEMA_ANTAQ = {
+    'idatracacao': 'Int64',
+    'data_chegada': 'datetime',
+    'data_atracacao': 'datetime',
+    'ano': 'int16',
+    'mes': 'int8',
+    'nome_porto': 'category',
+    'nome_terminal': 'category',
+    'tipo_navegacao': 'category',
+    'tipo_de_operacao': 'category',
+    'municipio': 'category',
+    'uf': 'category',
+    'tipo_carga': 'category',
+    'natureza_carga': 'category',
+    'cdmercadoria': 'category',
+    'stsh4': 'category',
+    'movimentacao_total_toneladas': 'float32',
+}
+
+
+def _converter(serie, dtype):
+    if dtype == 'datetime':
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            return serie
+        # Mesmo criterio do calcular_target: dd/mm/aaaa quando vier texto
+        return pd.to_datetime(serie, dayfirst=True, errors='coerce')
+    if dtype == 'category':
+        return serie.astype('string').astype('category')
+    if dtype in ('Int64', 'int8', 'int16', 'int32'):
+        valores = pd.to_numeric(serie, errors='coerce')
+        if dtype != 'Int64' and not valores.isna().any():
+            return valores.astype(dtype)
+        return valores.astype('Int64')
+    if dtype.startswith('float'):
+        return pd.to_numeric(serie, errors='coerce').astype(dtype)
+    return serie.astype(dtype)
+
+
+def aplicar_schema(df, schema):
+    """Mantem apenas as colunas do esquema (na ordem) com os tipos definidos."""
+    colunas = [c for c in schema if c in df.columns]
+    out = df[colunas].copy()
+    for col in colunas:
+        out[col] = _converter(out[col], schema[col])
+    return out
+
+
+def reduzir_memoria(df, categoricas=(), excluir=()):
+    """Downcast de floats para float32, texto listado para category e poda de categorias sem uso."""
+    for col in df.columns:
+        if col in excluir:
+            continue
+        serie = df[col]
+        if serie.dtype == np.float64:
+            df[col] = serie.astype(np.float32)
+        elif isinstance(serie.dtype, pd.CategoricalDtype):
+            # Apos filtros, evita dummies/categorias de valores que nao existem mais
+            df[col] = serie.cat.remove_unused_categories()
+        elif col in categoricas:
+            df[col] = serie.astype('category')
+    return df
+
+
+def memoria_frame_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def rss_mb():
+    """Memoria residente atual (MB); None se indisponivel."""
+    try:
+        with open('/proc/self/statm') as fh:
+            paginas = int(fh.read().split()[1])
+        return paginas * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return rss_pico_mb()
+
+
+def rss_pico_mb():
+    """Pico de memoria residente do processo (MB); None se indisponivel."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB; macOS em bytes
+    return pico / 1024 ** 2 if sys.platform == 'darwin' else pico / 1024
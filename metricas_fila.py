@@ -0,0 +1,99 @@
+"""
+Kernels vetorizados de metricas de fila por grupo (porto/terminal).
+
+- fila_na_chegada: navios do grupo que chegaram antes e ainda nao atracaram.
+- contar_em_janela: chegadas do grupo numa janela [t - antes, t + depois].
+- media_movel_espera: media movel do tempo de espera por grupo, por padrao
+  sem a propria observacao (sem vazamento do target).
+
+Recebem Series/arrays alinhados e devolvem numpy arrays na ordem de entrada.
+O custo e O(n log n) por grupo (ordenacao + searchsorted), em vez de uma
+mascara sobre o frame inteiro para cada linha.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _posicoes_por_grupo(grupos, n):
+    """Posicoes de cada grupo (na ordem original); grupos nulos sao ignorados."""
+    if grupos is None:
+        return [np.arange(n)] if n else []
+    codigos, _ = pd.factorize(pd.Series(grupos).to_numpy(), sort=False)
+    ordem = np.argsort(codigos, kind='stable')
+    cortes = np.flatnonzero(np.diff(codigos[ordem])) + 1
+    return [pos for pos in np.split(ordem, cortes) if len(pos) and codigos[pos[0]] >= 0]
+
+
+def _tempos(serie):
+    return pd.to_datetime(pd.Series(serie).to_numpy()).to_numpy(dtype='datetime64[ns]')
+
+
+def contar_em_janela(tempos, grupos=None, antes=pd.Timedelta(0), depois=pd.Timedelta(0),
+                     incluir_inicio=True, incluir_fim=True, excluir_proprio=False):
+    """
+    Conta registros do mesmo grupo com tempo em [t - antes, t + depois].
+
+    incluir_inicio/incluir_fim controlam se as bordas sao fechadas;
+    excluir_proprio desconta o proprio registro (janela que contem t).
+    Registros com tempo nulo ficam com 0 e nao entram na contagem.
+    """
+    t = _tempos(tempos)
+    antes = pd.Timedelta(antes).to_timedelta64()
+    depois = pd.Timedelta(depois).to_timedelta64()
+    contagem = np.zeros(len(t), dtype=np.int64)
+    for pos in _posicoes_por_grupo(grupos, len(t)):
+        pos = pos[~np.isnat(t[pos])]
+        if not len(pos):
+            continue
+        tg = t[pos]
+        ordenado = np.sort(tg)
+        inicio = np.searchsorted(ordenado, tg - antes, side='left' if incluir_inicio else 'right')
+        fim = np.searchsorted(ordenado, tg + depois, side='right' if incluir_fim else 'left')
+        contagem[pos] = np.maximum(fim - inicio - int(excluir_proprio), 0)
+    return contagem
+
+
+def fila_na_chegada(chegadas, atracacoes, grupos=None):
+    """
+    Navios na fila no momento de cada chegada (sweep-line por grupo).
+
+    fila = chegadas anteriores no grupo - atracacoes ate o instante da chegada.
+    """
+    chegada = _tempos(chegadas)
+    atracacao = _tempos(atracacoes)
+    fila = np.zeros(len(chegada), dtype=np.int64)
+    for pos in _posicoes_por_grupo(grupos, len(chegada)):
+        partidas = atracacao[pos]
+        partidas = np.sort(partidas[~np.isnat(partidas)])
+        pos = pos[~np.isnat(chegada[pos])]
+        if not len(pos):
+            continue
+        pos = pos[np.argsort(chegada[pos], kind='stable')]
+        anteriores = np.arange(len(pos))
+        atracados = np.searchsorted(partidas, chegada[pos], side='right')
+        fila[pos] = np.maximum(anteriores - atracados, 0)
+    return fila
+
+
+def media_movel_espera(valores, grupos=None, janela=5, excluir_atual=True):
+    """
+    Media movel por grupo (janela de observacoes; None = media expandida).
+
+    Os valores devem estar em ordem cronologica dentro de cada grupo. Com
+    excluir_atual=True a media usa so observacoes anteriores (shift de 1).
+    """
+    serie = pd.Series(np.asarray(valores, dtype=float))
+    if grupos is None:
+        codigos = np.zeros(len(serie), dtype=np.int64)
+    else:
+        codigos, _ = pd.factorize(pd.Series(grupos).to_numpy(), sort=False)
+    chave = pd.Series(codigos)
+    agrupado = serie.groupby(chave, sort=False)
+    janelas = agrupado.expanding(min_periods=1) if janela is None else agrupado.rolling(janela, min_periods=1)
+    medias = janelas.mean().reset_index(level=0, drop=True).sort_index()
+    if excluir_atual:
+        medias = medias.groupby(chave, sort=False).shift(1)
+    medias = medias.to_numpy(copy=True)
+    medias[codigos < 0] = np.nan
+    return medias
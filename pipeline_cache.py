@@ -0,0 +1,321 @@
+"""
+Cache por etapa (hash de conteudo) para pipelines de features em pandas.
+
+Cada etapa declara de quais outras depende. A chave de cache combina o hash
+das entradas, o hash do codigo da funcao (e das funcoes, classes e
+constantes que ela usa, inclusive dentro de lambdas e comprehensions e em
+outros modulos do projeto; bibliotecas instaladas ficam de fora), os
+parametros e a impressao digital de arquivos externos. Alterar uma etapa
+invalida apenas ela e as dependentes.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import re
+import sys
+import sysconfig
+import time
+import types
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from memoria_dados import memoria_frame_mb, rss_mb, rss_pico_mb
+
+DEFAULT_CACHE_DIR = Path("data/cache/etapas")
+
+
+@dataclass
+class Etapa:
+    nome: str
+    func: Callable
+    deps: Sequence[str]
+    params: Dict = field(default_factory=dict)
+    arquivos: Sequence = ()
+    versao: str = "1"
+
+
+def hash_dataframe(df):
+    """Hash estavel do conteudo de um DataFrame (colunas, dtypes e valores)."""
+    h = hashlib.sha256()
+    h.update(json.dumps([str(c) for c in df.columns]).encode())
+    h.update(json.dumps([str(t) for t in df.dtypes]).encode())
+    try:
+        valores = pd.util.hash_pandas_object(df, index=True).to_numpy()
+        h.update(valores.tobytes())
+    except TypeError:
+        # Colunas com objetos nao hashaveis (listas, dicts)
+        h.update(pickle.dumps(df, protocol=4))
+    return h.hexdigest()
+
+
+def _nomes_codigo(codigo):
+    """Nomes globais do codigo e das lambdas, comprehensions e funcoes aninhadas."""
+    nomes = set(codigo.co_names)
+    for const in codigo.co_consts:
+        if isinstance(const, types.CodeType):
+            nomes |= _nomes_codigo(const)
+    return nomes
+
+
+def _repr_estavel(valor):
+    """repr independente de ordem de hash (sets) e de enderecos de memoria."""
+    if isinstance(valor, (set, frozenset)):
+        return "{" + ", ".join(sorted(_repr_estavel(v) for v in valor)) + "}"
+    if isinstance(valor, dict):
+        return "{" + ", ".join(f"{_repr_estavel(k)}: {_repr_estavel(v)}" for k, v in valor.items()) + "}"
+    if isinstance(valor, (list, tuple)):
+        return type(valor).__name__ + "[" + ", ".join(_repr_estavel(v) for v in valor) + "]"
+    return re.sub(r" at 0x[0-9a-fA-F]+", "", repr(valor))
+
+
+# Biblioteca padrao e pacotes instalados: codigo de terceiros nao entra no hash
+_DIRETORIOS_EXTERNOS = tuple(sorted({
+    str(Path(caminho).resolve())
+    for chave, caminho in sysconfig.get_paths().items()
+    if chave in ("stdlib", "platstdlib", "purelib", "platlib")
+}))
+
+
+@lru_cache(maxsize=None)
+def _modulo_do_projeto(nome):
+    arquivo = getattr(sys.modules.get(nome), "__file__", None)
+    if not arquivo:
+        return False
+    caminho = str(Path(arquivo).resolve())
+    return "site-packages" not in caminho and not caminho.startswith(_DIRETORIOS_EXTERNOS)
+
+
+def _seguir(alvo, nome, modulo, nomes, raiz, objetos, constantes):
+    """Entra em funcoes/classes/modulos do projeto referenciados; guarda constantes."""
+    if not isinstance(alvo, type) and hasattr(alvo, "__wrapped__"):
+        # lru_cache, functools.wraps
+        alvo = inspect.unwrap(alvo)
+    if isinstance(alvo, (types.FunctionType, type)):
+        origem = getattr(alvo, "__module__", None)
+        if origem == modulo or _modulo_do_projeto(origem):
+            _referencias(alvo, raiz, objetos, constantes)
+    elif isinstance(alvo, types.ModuleType):
+        # import modulo; modulo.funcao(...)
+        if alvo not in objetos and _modulo_do_projeto(alvo.__name__):
+            objetos.add(alvo)
+            for atributo in sorted(nomes & set(vars(alvo))):
+                _seguir(getattr(alvo, atributo), atributo, alvo.__name__, nomes, raiz, objetos, constantes)
+    elif not callable(alvo):
+        # Constantes (ex.: JANELA_DIAS, PORTOS); as de outros modulos levam o nome do modulo
+        chave = nome if modulo == raiz else f"{modulo}.{nome}"
+        constantes[chave] = _repr_estavel(alvo)
+
+
+def _referencias(obj, raiz, objetos, constantes):
+    if obj in objetos:
+        return
+    objetos.add(obj)
+    if isinstance(obj, type):
+        for membro in vars(obj).values():
+            membro = getattr(membro, "__func__", getattr(membro, "fget", membro))
+            if isinstance(membro, types.FunctionType):
+                _referencias(membro, raiz, objetos, constantes)
+        return
+    nomes = _nomes_codigo(obj.__code__)
+    for nome in nomes:
+        if nome in obj.__globals__:
+            _seguir(obj.__globals__[nome], nome, obj.__module__, nomes, raiz, objetos, constantes)
+
+
+def _fonte(obj):
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        codigo = getattr(obj, "__code__", None)
+        return codigo.co_code.hex() if codigo is not None else repr(sorted(vars(obj)))
+
+
+def hash_codigo(func):
+    """Hash do codigo-fonte da funcao, das funcoes e classes do projeto que ela usa e das constantes."""
+    raiz = func.__module__
+    objetos, constantes = set(), {}
+    _referencias(func, raiz, objetos, constantes)
+    rotulos = {}
+    for obj in objetos:
+        if isinstance(obj, types.ModuleType):
+            continue
+        rotulo = obj.__qualname__ if obj.__module__ == raiz else f"{obj.__module__}.{obj.__qualname__}"
+        rotulos[rotulo] = obj
+    h = hashlib.sha256()
+    for rotulo in sorted(rotulos):
+        h.update(rotulo.encode())
+        h.update(_fonte(rotulos[rotulo]).encode())
+    for nome in sorted(constantes):
+        h.update(nome.encode())
+        h.update(constantes[nome].encode())
+    return h.hexdigest()
+
+
+def _gravar_atomico(destino, escrever):
+    """Grava num temporario do mesmo diretorio e troca com os.replace (leitores nunca veem arquivo parcial)."""
+    temporario = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+    try:
+        escrever(temporario)
+        os.replace(temporario, destino)
+    finally:
+        temporario.unlink(missing_ok=True)
+
+
+def impressao_arquivos(arquivos):
+    """Tamanho e mtime dos arquivos externos lidos pela etapa."""
+    itens = []
+    for arq in arquivos:
+        caminho = Path(arq)
+        alvos = sorted(caminho.glob("*")) if caminho.is_dir() else [caminho]
+        for alvo in alvos:
+            if alvo.exists():
+                st = alvo.stat()
+                itens.append([str(alvo), st.st_size, st.st_mtime_ns])
+            else:
+                itens.append([str(alvo), None, None])
+    return itens
+
+
+def _arredondar(valor):
+    return round(valor, 1) if valor is not None else None
+
+
+class DagEtapas:
+    """Executa etapas em ordem topologica, reaproveitando saidas em Parquet."""
+
+    def __init__(self, etapas: List[Etapa], cache_dir=DEFAULT_CACHE_DIR, ativo=True,
+                 pos_etapa: Optional[Callable] = None):
+        self.etapas = {e.nome: e for e in etapas}
+        self.cache_dir = Path(cache_dir)
+        self.ativo = ativo
+        # Transformacao aplicada a toda saida antes do cache (ex.: reduzir memoria)
+        self.pos_etapa = pos_etapa
+        self.relatorio: List[Dict] = []
+
+    def _ordem(self, entradas):
+        ordem, visitando, feitos = [], set(), set(entradas)
+
+        def visitar(nome):
+            if nome in feitos:
+                return
+            if nome not in self.etapas:
+                raise KeyError(f"Dependencia desconhecida: {nome}")
+            if nome in visitando:
+                raise ValueError(f"Ciclo no DAG em: {nome}")
+            visitando.add(nome)
+            for dep in self.etapas[nome].deps:
+                visitar(dep)
+            visitando.discard(nome)
+            feitos.add(nome)
+            ordem.append(nome)
+
+        for nome in self.etapas:
+            visitar(nome)
+        return ordem
+
+    def _chave(self, etapa, chaves):
+        payload = {
+            "nome": etapa.nome,
+            "versao": etapa.versao,
+            "codigo": hash_codigo(etapa.func),
+            "params": etapa.params,
+            "deps": [chaves[d] for d in etapa.deps],
+            "arquivos": impressao_arquivos(etapa.arquivos),
+            "pos_etapa": hash_codigo(self.pos_etapa) if self.pos_etapa else None,
+        }
+        bruto = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(bruto).hexdigest()
+
+    def _caminho(self, nome, chave):
+        return self.cache_dir / f"{nome}-{chave[:16]}"
+
+    def _ler_cache(self, base):
+        parquet = base.with_suffix(".parquet")
+        if parquet.exists():
+            return pd.read_parquet(parquet)
+        pkl = base.with_suffix(".pkl")
+        if pkl.exists():
+            return pd.read_pickle(pkl)
+        return None
+
+    def _gravar_cache(self, base, df):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            _gravar_atomico(base.with_suffix(".parquet"), df.to_parquet)
+        except Exception:
+            # Tipos que o Arrow nao serializa: cai para pickle
+            _gravar_atomico(base.with_suffix(".pkl"), df.to_pickle)
+
+    def executar(self, entradas: Dict[str, pd.DataFrame], alvo: Optional[str] = None):
+        """Roda o DAG a partir dos DataFrames de entrada; retorna as saidas por etapa."""
+        resultados = dict(entradas)
+        chaves = {nome: hash_dataframe(df) for nome, df in entradas.items()}
+        self.relatorio = []
+        ordem = self._ordem(entradas)
+        consumidores = {}
+        for nome in ordem:
+            for dep in self.etapas[nome].deps:
+                consumidores[dep] = consumidores.get(dep, 0) + 1
+        for nome in ordem:
+            etapa = self.etapas[nome]
+            inicio = time.perf_counter()
+            chave = self._chave(etapa, chaves)
+            base = self._caminho(nome, chave)
+            df = self._ler_cache(base) if self.ativo else None
+            status = "cache"
+            if df is None:
+                df = etapa.func(*[resultados[d] for d in etapa.deps])
+                if self.pos_etapa is not None:
+                    df = self.pos_etapa(df)
+                status = "executada"
+                if self.ativo:
+                    self._gravar_cache(base, df)
+            resultados[nome] = df
+            chaves[nome] = chave
+            if alvo is not None:
+                # Libera saidas intermediarias que nenhuma etapa restante usa
+                for dep in etapa.deps:
+                    consumidores[dep] -= 1
+                    if consumidores[dep] == 0 and dep != alvo:
+                        resultados.pop(dep, None)
+            self.relatorio.append({
+                "etapa": nome,
+                "status": status,
+                "segundos": round(time.perf_counter() - inicio, 3),
+                "linhas": int(len(df)),
+                "chave": chave[:16],
+                "frame_mb": round(memoria_frame_mb(df), 1),
+                "rss_mb": _arredondar(rss_mb()),
+                "rss_pico_mb": _arredondar(rss_pico_mb()),
+            })
+        if self.ativo:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            _gravar_atomico(
+                self.cache_dir / "ultimo_relatorio.json",
+                lambda caminho: caminho.write_text(json.dumps(self.relatorio, indent=2), encoding="utf-8"),
+            )
+        return resultados[alvo] if alvo else resultados
+
+    def imprimir_relatorio(self):
+        print("=" * 70)
+        print("ETAPAS DO PIPELINE (cache)")
+        print("=" * 70)
+        total = 0.0
+        hits = 0
+        for item in self.relatorio:
+            total += item["segundos"]
+            hits += item["status"] == "cache"
+            pico = item["rss_pico_mb"]
+            pico_txt = f"{pico:>8.0f}MB" if pico is not None else f"{'-':>10}"
+            print(
+                f"  {item['etapa']:<40} {item['status']:<10} {item['segundos']:>8.2f}s "
+                f"{item['linhas']:>10,} {item['frame_mb']:>8.1f}MB {pico_txt}"
+            )
+        print(f"  Total: {total:.2f}s | cache hits: {hits}/{len(self.relatorio)}")
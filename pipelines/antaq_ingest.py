@@ -0,0 +1,258 @@
+import argparse
+import re
+import shutil
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Dumps anuais do Estatistico Aquaviario (ANTAQ):
+#   2023Atracacao.txt, 2023Carga.txt, 2023TemposAtracacao.txt
+# Separador ';' e encoding latin-1/utf-8-sig conforme o ano.
+ARQUIVO_RE = re.compile(r"^(\d{4})(Atracacao|Carga|TemposAtracacao)\.txt$", re.IGNORECASE)
+
+MESES = {
+    "jan": 1, "fev": 2, "mar": 3, "abr": 4, "mai": 5, "jun": 6,
+    "jul": 7, "ago": 8, "set": 9, "out": 10, "nov": 11, "dez": 12,
+}
+
+# Colunas no mesmo nome usado pelo BigQuery (br_antaq_estatistico_aquaviario)
+COLUNAS_ATRACACAO = [
+    "idatracacao", "data_chegada", "data_atracacao", "data_desatracacao",
+    "ano", "mes", "porto_atracacao", "terminal", "tipo_de_navegacao_da_atracacao",
+    "tipo_de_operacao", "municipio", "sguf",
+]
+COLUNAS_CARGA = [
+    "idatracacao", "tipo_operacao_da_carga", "natureza_da_carga",
+    "cdmercadoria", "stsh4", "vlpesocargabruta",
+]
+COLUNAS_TEMPOS = [
+    "idatracacao", "tesperaatracacao", "tesperainicioop", "toperacao",
+    "tesperadesatracacao", "tatracado", "testadia",
+]
+
+
+def normalizar_coluna(nome):
+    texto = unicodedata.normalize("NFKD", str(nome))
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
+    texto = re.sub(r"[^a-z0-9]+", "_", texto.strip().lower())
+    return texto.strip("_")
+
+
+def normalizar_porto(nome):
+    texto = unicodedata.normalize("NFKD", str(nome or ""))
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
+    return re.sub(r"[^A-Z0-9]+", "_", texto.upper()).strip("_") or "DESCONHECIDO"
+
+
+def parse_numero_br(serie):
+    """Converte '1.234,5' em float (vetorizado)."""
+    texto = serie.astype("string").str.strip()
+    texto = texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    return pd.to_numeric(texto, errors="coerce").astype("float64")
+
+
+def detectar_encoding(caminho, amostra=1 << 20):
+    with open(caminho, "rb") as fh:
+        bruto = fh.read(amostra)
+    try:
+        bruto.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        # Caractere multibyte cortado no fim da amostra nao conta como erro
+        if exc.start < len(bruto) - 3:
+            return "latin-1"
+    return "utf-8-sig"
+
+
+def ler_dump(caminho, colunas, chunksize):
+    """Le o dump em blocos, so com as colunas de interesse."""
+    encoding = detectar_encoding(caminho)
+    header = pd.read_csv(caminho, sep=";", nrows=0, encoding=encoding)
+    originais = {normalizar_coluna(c): c for c in header.columns}
+    usar = [originais[c] for c in colunas if c in originais]
+    faltando = [c for c in colunas if c not in originais]
+    if faltando:
+        print(f"    WARN. {caminho.name}: colunas ausentes {faltando}")
+    leitor = pd.read_csv(
+        caminho,
+        sep=";",
+        encoding=encoding,
+        usecols=usar,
+        dtype=str,
+        chunksize=chunksize,
+    )
+    for chunk in leitor:
+        chunk.columns = [normalizar_coluna(c) for c in chunk.columns]
+        yield chunk
+
+
+def tipar_atracacao(chunk):
+    df = chunk.copy()
+    for col in ("data_chegada", "data_atracacao", "data_desatracacao"):
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], dayfirst=True, errors="coerce")
+    df["ano"] = pd.to_numeric(df.get("ano"), errors="coerce").astype("Int16")
+    df["mes"] = df.get("mes").astype("string").str.strip().str.lower().str[:3].map(MESES).astype("Int8")
+    df["porto_key"] = df["porto_atracacao"].map(normalizar_porto)
+    return df
+
+
+def agregar_carga_chunk(chunk):
+    """Agregacao parcial por idatracacao: linha de maior peso + soma."""
+    df = chunk[chunk["vlpesocargabruta"].notna()].copy()
+    df["vlpesocargabruta"] = parse_numero_br(df["vlpesocargabruta"])
+    soma = df.groupby("idatracacao")["vlpesocargabruta"].sum(min_count=1)
+    top = (
+        df.sort_values("vlpesocargabruta", ascending=False, na_position="last")
+        .drop_duplicates("idatracacao")
+        .set_index("idatracacao")
+    )
+    top["movimentacao_total_toneladas"] = soma
+    return top.reset_index()
+
+
+def combinar_carga(parciais):
+    """Combina as agregacoes parciais (mesma regra do ARRAY_AGG ... LIMIT 1)."""
+    if not parciais:
+        return pd.DataFrame(columns=[
+            "idatracacao", "tipo_carga", "natureza_carga", "cdmercadoria",
+            "stsh4", "movimentacao_total_toneladas",
+        ])
+    df = pd.concat(parciais, ignore_index=True)
+    soma = df.groupby("idatracacao")["movimentacao_total_toneladas"].sum(min_count=1)
+    top = (
+        df.sort_values("vlpesocargabruta", ascending=False, na_position="last")
+        .drop_duplicates("idatracacao")
+        .set_index("idatracacao")
+    )
+    top["movimentacao_total_toneladas"] = soma
+    top = top.reset_index().rename(columns={
+        "tipo_operacao_da_carga": "tipo_carga",
+        "natureza_da_carga": "natureza_carga",
+    })
+    return top[[
+        "idatracacao", "tipo_carga", "natureza_carga", "cdmercadoria",
+        "stsh4", "movimentacao_total_toneladas",
+    ]]
+
+
+def _limpar_particao(base, ano):
+    destino = base / f"ano={ano}"
+    if destino.exists():
+        shutil.rmtree(destino)
+
+
+def ingerir_atracacao(caminho, ano, out_dir, chunksize):
+    base = out_dir / "atracacao"
+    _limpar_particao(base, ano)
+    total = 0
+    for i, chunk in enumerate(ler_dump(caminho, COLUNAS_ATRACACAO, chunksize)):
+        df = tipar_atracacao(chunk)
+        df["ano"] = df["ano"].fillna(ano)
+        df = df[df["ano"] == ano]
+        if df.empty:
+            continue
+        for porto_key, sub in df.groupby("porto_key", sort=False):
+            destino = base / f"ano={ano}" / f"porto={porto_key}"
+            destino.mkdir(parents=True, exist_ok=True)
+            sub.drop(columns=["porto_key", "ano"]).to_parquet(destino / f"part-{i:04d}.parquet", index=False)
+        total += len(df)
+    print(f"    Atracacao {ano}: {total:,} registros")
+    return total
+
+
+def ingerir_carga(caminho, ano, out_dir, chunksize):
+    base = out_dir / "carga_top"
+    _limpar_particao(base, ano)
+    parciais = [agregar_carga_chunk(chunk) for chunk in ler_dump(caminho, COLUNAS_CARGA, chunksize)]
+    top = combinar_carga(parciais)
+    destino = base / f"ano={ano}"
+    destino.mkdir(parents=True, exist_ok=True)
+    top.to_parquet(destino / "part-0000.parquet", index=False)
+    print(f"    Carga {ano}: {len(top):,} atracacoes com carga")
+    return len(top)
+
+
+def ingerir_tempos(caminho, ano, out_dir, chunksize):
+    base = out_dir / "tempos_atracacao"
+    _limpar_particao(base, ano)
+    frames = []
+    for chunk in ler_dump(caminho, COLUNAS_TEMPOS, chunksize):
+        for col in COLUNAS_TEMPOS[1:]:
+            if col in chunk.columns:
+                chunk[col] = parse_numero_br(chunk[col]).astype(np.float32)
+        frames.append(chunk)
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUNAS_TEMPOS)
+    destino = base / f"ano={ano}"
+    destino.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(destino / "part-0000.parquet", index=False)
+    print(f"    TemposAtracacao {ano}: {len(df):,} registros")
+    return len(df)
+
+
+INGESTORES = {
+    "atracacao": ingerir_atracacao,
+    "carga": ingerir_carga,
+    "temposatracacao": ingerir_tempos,
+}
+
+
+def listar_dumps(input_dir, anos=None):
+    dumps = []
+    for caminho in sorted(Path(input_dir).glob("*.txt")):
+        match = ARQUIVO_RE.match(caminho.name)
+        if not match:
+            continue
+        ano = int(match.group(1))
+        if anos and ano not in anos:
+            continue
+        dumps.append((ano, match.group(2).lower(), caminho))
+    return dumps
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ingerir dumps anuais ANTAQ (Atracacao/Carga/TemposAtracacao) em Parquet particionado."
+    )
+    parser.add_argument(
+        "--input-dir",
+        default="data/antaq/raw",
+        help="Diretorio com os TXT anuais da ANTAQ.",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default="data/antaq",
+        help="Diretorio do armazem Parquet.",
+    )
+    parser.add_argument(
+        "--anos",
+        nargs="*",
+        type=int,
+        default=None,
+        help="Anos a ingerir (padrao: todos encontrados).",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=500_000,
+        help="Linhas por bloco de leitura.",
+    )
+    args = parser.parse_args()
+
+    dumps = listar_dumps(args.input_dir, set(args.anos) if args.anos else None)
+    if not dumps:
+        print("Nenhum dump ANTAQ encontrado.")
+        return
+
+    out_dir = Path(args.output_dir)
+    print("=" * 70)
+    print(f"INGESTAO ANTAQ -> {out_dir}")
+    print("=" * 70)
+    for ano, tipo, caminho in dumps:
+        INGESTORES[tipo](caminho, ano, out_dir, args.chunksize)
+    print(f"Salvo: {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
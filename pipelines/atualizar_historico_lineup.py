@@ -0,0 +1,40 @@
+import argparse
+import sys
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path para importar historico_lineup
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pandas as pd
+
+from historico_lineup import HISTORICO_DIR, HistoricoLineup
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Anexar line-ups ao historico particionado por porto e atualizar as estatisticas."
+    )
+    parser.add_argument(
+        "arquivos",
+        nargs="*",
+        default=["lineups_previstos/lineup_history.parquet"],
+        help="Parquets de line-up a anexar (padrao: lineups_previstos/lineup_history.parquet).",
+    )
+    parser.add_argument("--output-dir", default=str(HISTORICO_DIR), help="Diretorio do historico particionado.")
+    args = parser.parse_args()
+
+    historico = HistoricoLineup(args.output_dir)
+    print("=" * 70)
+    print(f"HISTORICO DE LINE-UPS -> {historico.destino}")
+    print("=" * 70)
+    for arquivo in map(Path, args.arquivos):
+        if not arquivo.exists():
+            print(f"  ✗ {arquivo}: nao encontrado")
+            continue
+        tocados = historico.anexar(pd.read_parquet(arquivo))
+        print(f"  ✓ {arquivo}: portos atualizados: {', '.join(tocados) or '-'}")
+    print(f"Registros: {len(historico):,} | Portos: {len(historico.portos())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path para importar avaliacao_online
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from avaliacao_online import AVALIACAO_PATH, AvaliacaoOnline
+from log_lineup import LOG_LINEUP_DIR, LogLineup
+from log_previsoes import LOG_PREVISOES_DIR, LogPrevisoes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Avaliacao online: junta atracacoes novas do log de line-up as previsoes registradas."
+    )
+    parser.add_argument("--log-lineup-dir", default=str(LOG_LINEUP_DIR), help="Log de line-up (atracacoes).")
+    parser.add_argument("--log-previsoes-dir", default=str(LOG_PREVISOES_DIR), help="Log de previsoes.")
+    parser.add_argument("--estado", default=str(AVALIACAO_PATH), help="JSON com marca d'agua e erros.")
+    parser.add_argument("--intervalo-min", type=float, default=30, help="Intervalo entre execucoes.")
+    parser.add_argument("--ciclos", type=int, default=1, help="Numero de execucoes (0 = continuo).")
+    args = parser.parse_args()
+
+    log_lineup = LogLineup(args.log_lineup_dir)
+    log_previsoes = LogPrevisoes(args.log_previsoes_dir)
+    executados = 0
+    while not args.ciclos or executados < args.ciclos:
+        inicio = time.monotonic()
+        print("=" * 70)
+        print(f"AVALIACAO ONLINE -> {args.estado}")
+        print("=" * 70)
+        avaliacao = AvaliacaoOnline(args.estado)
+        resumo = avaliacao.avaliar(log_lineup, log_previsoes)
+        avaliacao.salvar()
+        print(f"Atracacoes novas: {resumo['atracacoes']} | com previsao: {resumo['casadas']} | "
+              f"MAE do lote: {resumo['mae_lote_h'] if resumo['mae_lote_h'] is not None else '-'} h | "
+              f"marca: {resumo['marca']}")
+        tabela = avaliacao.tabela()
+        if not tabela.empty:
+            print(tabela.to_string(index=False))
+        print(f"({time.monotonic() - inicio:.1f}s)")
+        executados += 1
+        if args.ciclos and executados >= args.ciclos:
+            break
+        time.sleep(max(0.0, args.intervalo_min * 60 - (time.monotonic() - inicio)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Adiciona o diretório raiz ao path para importar backtest
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import backtest as bt
+from historico_lineup import HISTORICO_DIR
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backtest do caminho de previsao: line-ups pontuais do historico -> previsao -> espera realizada."
+    )
+    parser.add_argument("--inicio", required=True, help="Primeira data de referencia (AAAA-MM-DD).")
+    parser.add_argument("--fim", required=True, help="Ultima data de referencia (AAAA-MM-DD).")
+    parser.add_argument("--passo-dias", type=int, default=1, help="Intervalo entre datas de referencia.")
+    parser.add_argument("--portos", nargs="*", help="Portos (padrao: todos do historico).")
+    parser.add_argument("--processos", type=int, default=None, help="Processos no pool (padrao: nucleos).")
+    parser.add_argument("--horizonte-max-dias", type=int, default=bt.HORIZONTE_MAX_DIAS,
+                        help="Chegadas consideradas a partir de cada data.")
+    parser.add_argument("--historico-dir", default=str(HISTORICO_DIR), help="Historico de line-ups particionado.")
+    parser.add_argument("--parquet", nargs="*", default=[],
+                        help="Parquets de line-up adicionais (ex.: lineups_previstos/lineup_history.parquet).")
+    parser.add_argument("--antaq-dir", default=str(bt.ANTAQ_DIR), help="Armazem ANTAQ local (realizado).")
+    parser.add_argument("--output-dir", default=str(bt.BACKTEST_DIR), help="Diretorio de saida.")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"BACKTEST {args.inicio} -> {args.fim} (passo {args.passo_dias} d)")
+    print("=" * 70)
+    partes = [bt.carregar_historico(args.historico_dir)] + [pd.read_parquet(p) for p in args.parquet]
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        print("Historico de line-ups vazio: nada a testar.")
+        return
+
+    inicio = time.perf_counter()
+    resultado, erros = bt.executar_backtest(
+        pd.concat(partes, ignore_index=True),
+        args.inicio,
+        args.fim,
+        passo_dias=args.passo_dias,
+        portos=args.portos,
+        processos=args.processos,
+        antaq_dir=args.antaq_dir,
+        horizonte_max_dias=args.horizonte_max_dias,
+    )
+    segundos = time.perf_counter() - inicio
+    for erro in erros[:10]:
+        print(f"  ERRO {erro['porto']} {erro['data_referencia']}: {erro['erro']}")
+    if len(erros) > 10:
+        print(f"  ... e mais {len(erros) - 10} erros")
+    if resultado.empty:
+        print("Nenhuma previsao no intervalo.")
+        return
+
+    saida = Path(args.output_dir)
+    saida.mkdir(parents=True, exist_ok=True)
+    resultado.to_parquet(saida / "previsoes.parquet", index=False)
+    bt.metricas(resultado).to_csv(saida / "metricas.csv", index=False)
+    bt.metricas(resultado, por=("porto",)).to_csv(saida / "metricas_porto.csv", index=False)
+    bt.calibracao(resultado).to_csv(saida / "calibracao.csv", index=False)
+    if erros:
+        pd.DataFrame(erros).to_csv(saida / "erros.csv", index=False)
+
+    com_real = resultado["erro_h"].notna()
+    print(f"Previsoes: {len(resultado):,} | datas: {resultado['data_referencia'].nunique()} | "
+          f"portos: {resultado['porto'].nunique()} | {segundos:.1f}s")
+    print(f"Com espera realizada: {int(com_real.sum()):,} "
+          f"({resultado.loc[com_real, 'fonte_real'].value_counts().to_dict()})")
+    if com_real.any():
+        print(f"MAE geral: {resultado.loc[com_real, 'erro_h'].abs().mean():.1f} h")
+        print(bt.metricas(resultado, por=("porto", "horizonte")).to_string(index=False))
+    print(f"-> {saida}")
+
+
+if __name__ == "__main__":
+    main()
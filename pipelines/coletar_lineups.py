@@ -0,0 +1,58 @@
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# Adiciona o diretório raiz ao path para importar coleta_lineup
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from coleta_lineup import ADAPTADORES, INTERVALO_PADRAO_MIN, executar_agendado
+from log_lineup import LOG_LINEUP_DIR, LogLineup
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Coletar line-ups dos adaptadores registrados (requisicoes condicionais) e gravar no log de deltas."
+    )
+    parser.add_argument(
+        "--adaptadores",
+        nargs="*",
+        default=sorted(ADAPTADORES),
+        help=f"Adaptadores a executar (disponiveis: {', '.join(sorted(ADAPTADORES))}).",
+    )
+    parser.add_argument("--intervalo-min", type=float, default=INTERVALO_PADRAO_MIN, help="Intervalo entre ciclos.")
+    parser.add_argument("--ciclos", type=int, default=1, help="Numero de ciclos (0 = continuo).")
+    parser.add_argument("--log-dir", default=str(LOG_LINEUP_DIR), help="Diretorio do log de line-up.")
+    args = parser.parse_args()
+
+    desconhecidos = [nome for nome in args.adaptadores if nome not in ADAPTADORES]
+    if desconhecidos:
+        parser.error(f"adaptadores desconhecidos: {', '.join(desconhecidos)}")
+    adaptadores = [ADAPTADORES[nome]() for nome in args.adaptadores]
+    log = LogLineup(args.log_dir)
+
+    # Ultimo line-up de cada fonte: fontes do mesmo porto sao gravadas juntas,
+    # senao a coleta de uma marcaria os navios da outra como removidos
+    ultimos = {}
+
+    def ao_coletar(alterados):
+        ultimos.update(alterados)
+        for porto in sorted({ADAPTADORES[nome].porto for nome in alterados}):
+            fontes = [nome for nome in ultimos if ADAPTADORES[nome].porto == porto]
+            df = pd.concat([ultimos[nome] for nome in fontes], ignore_index=True)
+            deltas = log.registrar(df, porto_nome=porto)
+            print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {porto} ({', '.join(fontes)}): "
+                  f"{len(df)} linhas, {len(deltas)} mudancas gravadas")
+
+    print("=" * 70)
+    print(f"COLETA DE LINE-UPS: {', '.join(args.adaptadores)} (a cada {args.intervalo_min:g} min)")
+    print("=" * 70)
+    executar_agendado(
+        adaptadores, ao_coletar, intervalo_min=args.intervalo_min, ciclos=args.ciclos or None, forcar_primeiro=True
+    )
+
+
+if __name__ == "__main__":
+    main()
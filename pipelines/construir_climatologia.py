@@ -0,0 +1,97 @@
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Adiciona o diretório raiz ao path para importar plano_1/climatologia
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import plano_1
+from climatologia import CLIMATOLOGIA_PATH, JANELA_DIAS, construir_climatologia
+
+# Colunas da tabela diaria de mare_clima -> nomes usados no app
+COLUNAS_MARE_CLIMA = {
+    "mc_precip_dia": "precipitacao_dia",
+    "mc_wind_speed_media": "vento_velocidade_media",
+    "mc_wind_speed_max": "vento_velocidade_max_dia",
+    "mc_wind_gust_max": "vento_rajada_max_dia",
+    "mc_wave_height_max": "wave_height_max",
+}
+
+
+def carregar_mare_clima():
+    """Serie diaria porto x dia dos parquets de mare_clima (tabela materializada)."""
+    df = plano_1.carregar_clima_mare_clima_diario()
+    if df.empty:
+        return df
+    df = df.rename(columns=COLUNAS_MARE_CLIMA)
+    return df[["porto_norm", "data", *[c for c in COLUNAS_MARE_CLIMA.values() if c in df.columns]]]
+
+
+def carregar_inmet():
+    """Serie diaria do INMET (BigQuery) por porto, via estacao do municipio do porto."""
+    df_antaq = plano_1.extrair_dados_antaq_carga()
+    mapa = {m: e for m, e in plano_1.mapear_estacoes_por_municipio(df_antaq).items() if e}
+    portos = df_antaq[["nome_porto", "municipio"]].drop_duplicates().astype(object)
+    portos["id_estacao"] = portos["municipio"].map(mapa)
+    portos = portos.dropna(subset=["id_estacao"])
+    df_clima = plano_1.extrair_dados_climaticos(station_ids=sorted(set(mapa.values())))
+    df_clima["id_estacao"] = df_clima["id_estacao"].astype(object)
+    df = portos.merge(df_clima, on="id_estacao", how="inner")
+    df["porto_norm"] = plano_1._normalizar_portos_clima(df["nome_porto"])
+    df["data"] = plano_1._chave_dia(df["data"])
+    return df.drop(columns=["nome_porto", "municipio", "id_estacao", "ano", "mes"], errors="ignore")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Construir a climatologia porto x dia do ano usada como fallback de clima."
+    )
+    parser.add_argument(
+        "--output",
+        default=str(CLIMATOLOGIA_PATH),
+        help="Arquivo Parquet de saida.",
+    )
+    parser.add_argument(
+        "--inmet",
+        action="store_true",
+        help="Inclui INMET via BigQuery (temperatura/umidade); requer credenciais.",
+    )
+    parser.add_argument(
+        "--janela",
+        type=int,
+        default=JANELA_DIAS,
+        help="Suavizacao: +-N dias em torno de cada dia do ano.",
+    )
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("CLIMATOLOGIA POR PORTO x DIA DO ANO")
+    print("=" * 70)
+    df = carregar_mare_clima()
+    print(f"mare_clima: {len(df):,} dias")
+    if args.inmet:
+        df_inmet = carregar_inmet()
+        print(f"INMET: {len(df_inmet):,} dias")
+        # INMET tem prioridade nas variaveis em comum; mare_clima completa o resto
+        chaves = ["porto_norm", "data"]
+        df = (
+            df_inmet.set_index(chaves).combine_first(df.set_index(chaves)).reset_index()
+            if not df.empty else df_inmet
+        )
+    if df.empty:
+        print("Nenhum historico de clima disponivel.")
+        return
+
+    tabela = construir_climatologia(df, col_porto="porto_norm", col_data="data", janela=args.janela)
+    saida = Path(args.output)
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    tabela.to_parquet(saida, index=False)
+    portos = sorted(p for p in tabela["porto"].unique() if p != "*")
+    print(f"Portos: {', '.join(portos)}")
+    print(f"Salvo: {saida} ({len(tabela):,} linhas)")
+
+
+if __name__ == "__main__":
+    main()
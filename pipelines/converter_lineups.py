@@ -0,0 +1,39 @@
+import argparse
+import sys
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path para importar lineup_cache
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from lineup_cache import CACHE_LINEUP_DIR, converter_lineup
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Converter line-ups (xlsx/csv/parquet) para sidecars Parquet tipados com manifesto."
+    )
+    parser.add_argument("--lineup-dir", default="lineups", help="Diretorio com os arquivos de line-up.")
+    parser.add_argument("--output-dir", default=str(CACHE_LINEUP_DIR), help="Diretorio dos sidecars.")
+    parser.add_argument("--forcar", action="store_true", help="Reconverte mesmo sem alteracao na origem.")
+    args = parser.parse_args()
+
+    origem = Path(args.lineup_dir)
+    arquivos = sorted(p for ext in ("*.parquet", "*.xlsx", "*.csv") for p in origem.glob(ext))
+    print("=" * 70)
+    print(f"CONVERSAO DE LINE-UPS: {origem} -> {args.output_dir}")
+    print("=" * 70)
+    for arquivo in arquivos:
+        try:
+            manifesto = converter_lineup(arquivo, args.output_dir, forcar=args.forcar)
+        except Exception as exc:
+            print(f"  ✗ {arquivo.name}: {exc}")
+            continue
+        portos = ", ".join(manifesto["portos"]) or "-"
+        print(f"  ✓ {arquivo.name}: {manifesto['linhas']} linhas | portos: {portos} | "
+              f"chegada {manifesto['chegada_min'] or '-'} a {manifesto['chegada_max'] or '-'}")
+    if not arquivos:
+        print("Nenhum line-up encontrado.")
+
+
+if __name__ == "__main__":
+    main()
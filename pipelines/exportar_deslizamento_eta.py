@@ -0,0 +1,35 @@
+import argparse
+import sys
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path para importar log_lineup
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from log_lineup import LOG_LINEUP_DIR, LogLineup
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exportar deslizamento de ETA e permanencia no line-up por navio a partir do log de deltas."
+    )
+    parser.add_argument("--log-dir", default=str(LOG_LINEUP_DIR), help="Diretorio do log de line-up.")
+    parser.add_argument("--porto", default=None, help="Filtrar um porto (padrao: todos).")
+    parser.add_argument("--output", default="data/treino/deslizamento_eta.parquet", help="Parquet de saida.")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"DESLIZAMENTO DE ETA <- {args.log_dir}")
+    print("=" * 70)
+    df = LogLineup(args.log_dir).deslizamento_eta(porto_nome=args.porto)
+    if df.empty:
+        print("Log vazio: nada a exportar.")
+        return
+    saida = Path(args.output)
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(saida, index=False)
+    print(f"Navios: {len(df):,} | Portos: {df['porto_norm'].nunique()} | "
+          f"deslizamento medio: {df['deslizamento_eta_h'].mean():.1f} h -> {saida}")
+
+
+if __name__ == "__main__":
+    main()
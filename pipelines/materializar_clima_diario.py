@@ -0,0 +1,40 @@
+import argparse
+import sys
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path para importar plano_1
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import plano_1
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Materializar a tabela porto x dia de clima/oceano a partir dos parquets de mare_clima."
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=str(plano_1.CLIMA_DIARIO_DIR),
+        help="Diretorio da tabela materializada.",
+    )
+    parser.add_argument(
+        "--forcar",
+        action="store_true",
+        help="Reagrega todas as fontes mesmo sem alteracao.",
+    )
+    args = parser.parse_args()
+
+    tabela = plano_1.tabela_clima_mare_clima(Path(args.output_dir))
+    print("=" * 70)
+    print(f"CLIMA DIARIO (mare_clima) -> {tabela.destino}")
+    print("=" * 70)
+    alteradas = tabela.atualizar(forcar=args.forcar)
+    print(f"Fontes reprocessadas: {', '.join(alteradas) if alteradas else 'nenhuma (ja atualizada)'}")
+    df = tabela.ler()
+    if not df.empty:
+        print(f"Linhas: {len(df):,} | Portos: {df['porto_norm'].nunique()} | "
+              f"{df['data'].min():%Y-%m-%d} a {df['data'].max():%Y-%m-%d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path para importar streamlit_app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import streamlit as st
+
+import streamlit_app as app
+from previsoes_materializadas import PREVISOES_DIR, ArmazemPrevisoes, materializar
+
+
+def prever_porto_do_dia(porto, data_referencia):
+    """Mesmo caminho do app: line-up do porto na janela de 7 dias -> previsao."""
+    lineup_path = app.find_lineup_file(porto)
+    df_lineup_full, _ = app.load_history_data(porto, lineup_path)
+    df_lineup = app.filter_lineup_horizon(df_lineup_full, days=7, reference_date=data_referencia)
+    if df_lineup.empty:
+        return df_lineup, None, None
+    previsao = app.prever_porto(porto, df_lineup, lineup_path, data_referencia)
+    return df_lineup, previsao["df_pred"], app.info_previsao(previsao)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Materializar previsoes de todos os portos com line-up (worker periodico do app)."
+    )
+    parser.add_argument("--portos", nargs="*", help="Portos a prever (padrao: todos com line-up).")
+    parser.add_argument("--data", help="Data de referencia AAAA-MM-DD (padrao: hoje, a cada execucao).")
+    parser.add_argument("--intervalo-min", type=float, default=30, help="Intervalo entre execucoes.")
+    parser.add_argument("--ciclos", type=int, default=1, help="Numero de execucoes (0 = continuo).")
+    parser.add_argument("--output-dir", default=str(PREVISOES_DIR), help="Diretorio do armazem de previsoes.")
+    args = parser.parse_args()
+
+    armazem = ArmazemPrevisoes(args.output_dir)
+    executados = 0
+    while not args.ciclos or executados < args.ciclos:
+        inicio = time.monotonic()
+        # Line-ups e historico relidos a cada execucao
+        st.cache_data.clear()
+        data_referencia = datetime.strptime(args.data, "%Y-%m-%d").date() if args.data else datetime.today().date()
+        portos = args.portos or [p for p in app.list_lineup_ports() if p != "NACIONAL"]
+        print("=" * 70)
+        print(f"PREVISOES MATERIALIZADAS ({data_referencia:%d/%m/%Y}) -> {armazem.destino}")
+        print("=" * 70)
+        versao = materializar(
+            portos,
+            lambda porto: prever_porto_do_dia(porto, data_referencia),
+            armazem,
+            data_referencia,
+        )
+        app.log_previsoes().descarregar()
+        manifesto = armazem.manifesto(versao)
+        for info in manifesto["portos"].values():
+            print(f"  ✓ {info['porto']}: {info['linhas']} navios ({info.get('modo', 'BASIC')})")
+        for porto, erro in manifesto.get("erros", {}).items():
+            print(f"  ✗ {porto}: {erro}")
+        print(f"Versao publicada: {versao} ({time.monotonic() - inicio:.1f}s)")
+        executados += 1
+        if args.ciclos and executados >= args.ciclos:
+            break
+        time.sleep(max(0.0, args.intervalo_min * 60 - (time.monotonic() - inicio)))
+
+
+if __name__ == "__main__":
+    main()
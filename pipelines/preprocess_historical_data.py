@@ -19,6 +19,8 @@ import sys
 # Adiciona o diretório raiz ao path para importar módulos do streamlit
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from metricas_fila import contar_em_janela
+
 
 def load_raw_history():
     """Carrega dados históricos brutos."""
@@ -153,31 +155,13 @@ def calculate_queue_metrics(df):
         print("❌ Colunas necessárias não disponíveis")
         return None
 
-    # Para cada navio, contar quantos outros navios estavam aguardando
-    # no mesmo porto na mesma data
-    df_sorted = df.copy()
-    df_sorted['prev_chegada_dt'] = pd.to_datetime(df_sorted['prev_chegada'], errors='coerce')
-
-    # Agrupa por porto e data para contar fila
-    queue_metrics = []
-
-    for idx, row in df_sorted.iterrows():
-        porto = row['porto']
-        data_chegada = row['prev_chegada_dt']
-
-        if pd.isna(data_chegada):
-            queue_metrics.append(0)
-            continue
-
-        # Conta navios no mesmo porto que chegaram na mesma janela temporal
-        same_port = df_sorted['porto'] == porto
-        same_timeframe = (
-            (df_sorted['prev_chegada_dt'] >= data_chegada - timedelta(days=1)) &
-            (df_sorted['prev_chegada_dt'] <= data_chegada + timedelta(days=1))
-        )
-
-        queue_count = (same_port & same_timeframe).sum() - 1  # Exclui o próprio navio
-        queue_metrics.append(max(0, queue_count))
+    # Para cada navio, contar quantos outros navios do mesmo porto
+    # chegaram na janela de ±1 dia (exclui o próprio navio)
+    prev_chegada_dt = pd.to_datetime(df['prev_chegada'], errors='coerce')
+    queue_metrics = contar_em_janela(
+        prev_chegada_dt, df['porto'],
+        antes=timedelta(days=1), depois=timedelta(days=1), excluir_proprio=True,
+    )
 
     print(f"✅ Métricas de fila calculadas (aproximadas)")
     print(f"   Fila média: {np.mean(queue_metrics):.1f} navios")
@@ -14,6 +14,11 @@ from datetime import datetime
 import pickle
 import sys
 
+# Adiciona o diretório raiz ao path para importar drift_features
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from drift_features import referencia_features
+
 # Tenta importar LightGBM
 try:
     import lightgbm as lgb
@@ -203,7 +208,7 @@ def train_light_model(profile, X_train, y_train, X_val, y_val, X_test, y_test):
     }
 
 
-def save_light_model(profile, models, features, metrics, output_dir="models"):
+def save_light_model(profile, models, features, metrics, output_dir="models", X=None):
     """Salva modelo light treinado."""
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -236,6 +241,9 @@ def save_light_model(profile, models, features, metrics, output_dir="models"):
         },
         "metrics": metrics,
     }
+    if X is not None:
+        # Histogramas de referencia para o monitor de drift do app
+        metadata["drift_referencia"] = referencia_features(X, features)
 
     with open(output_dir / f"{prefix}_metadata.json", "w") as f:
         json.dump(metadata, f, indent=2)
@@ -332,7 +340,8 @@ def main():
                 profile,
                 result,
                 available_features,
-                result["metrics"]
+                result["metrics"],
+                X=X_clean,
             )
 
             results[profile] = result
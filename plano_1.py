@@ -15,6 +15,15 @@ from google.cloud import bigquery
 import lightgbm as lgb
 import xgboost as xgb
 from sklearn.model_selection import TimeSeriesSplit
+
+from drift_features import referencia_features
+from lgb_dataset_cache import CacheDatasetLGB, params_sklearn_para_core
+from memoria_dados import SCHEMA_ANTAQ, aplicar_schema, reduzir_memoria, rss_mb
+from metricas_fila import fila_na_chegada, media_movel_espera
+from pipeline_cache import DagEtapas, Etapa
+from registro_portos import PORTS_CONFIG_PATH, registro
+from tabela_diaria import FonteDiaria, TabelaDiaria
+from taxonomia_carga import SH4_POR_PERFIL
 from sklearn.metrics import (
     mean_absolute_error,
     mean_squared_error,
@@ -29,27 +38,18 @@ warnings.filterwarnings('ignore')
 AIS_FEATURES_PATH = Path("data/ais_features.parquet")
 PORT_MAPPING_PATH = Path("data/port_mapping.csv")
 MARE_DIR = Path("data/mare_clima")
+ANTAQ_LOCAL_DIR = Path("data/antaq")
 MARE_CLIMA_DATASET_1 = MARE_DIR / "portos_brasil_historico_portos_hibridos.parquet"
 MARE_CLIMA_DATASET_2 = MARE_DIR / "dados_historicos_complementares_portos_oceanicos_v2.parquet"
 MARE_CLIMA_DATASET_3 = MARE_DIR / "dados_historicos_portos_hibridos_arco_norte_v4_real.parquet"
-MARE_PORT_FILE_BY_NORM = {
-    "ANTONINA": "antonina_extremos_2020_2026.csv",
-    "BARCARENA": "barcarena_extremos_2020_2026.csv",
-    "ITAQUI": "itaqui_extremos_2020_2026.csv",
-    "PARANAGUA": "paranagua_extremos_2020_2026.csv",
-    "PECEM": "pecem_extremos_2020_2026.csv",
-    "RECIFE": "recife_extremos_2020_2026.csv",
-    "RIOGRANDE": "riograande_extremos_2020_2026.csv",
-    "SALVADOR": "salvador_extremos_2020_2026.csv",
-    "SANTOS": "santos_extremos_2020_2026.csv",
-    "SUAPE": "suape_extremos_2020_2026.csv",
-    "VILADOCONDE": "viladoconde_extremos_2020_2026.csv",
-}
-UF_CODES = {
-    "AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES", "GO", "MA",
-    "MT", "MS", "MG", "PA", "PB", "PR", "PE", "PI", "RJ", "RN",
-    "RS", "RO", "RR", "SC", "SP", "SE", "TO",
-}
+
+
+def _chave_dia(serie, dayfirst=False):
+    """Data (sem hora) como datetime64: chave de join inteira em vez de objetos date."""
+    dt = pd.to_datetime(serie, dayfirst=dayfirst, errors='coerce')
+    if getattr(dt.dt, 'tz', None) is not None:
+        dt = dt.dt.tz_localize(None)
+    return dt.dt.normalize()
 
 
 def _env_flag(name, default=True):
@@ -62,6 +62,11 @@ def _env_flag(name, default=True):
 USE_MARE_FEATURES = _env_flag("USE_MARE_FEATURES", True)
 USE_MARE_CLIMA = _env_flag("USE_MARE_CLIMA", True)
 SAVE_MODELS = _env_flag("SAVE_MODELS", True)
+USE_ANTAQ_LOCAL = _env_flag("USE_ANTAQ_LOCAL", True)
+USE_PIPELINE_CACHE = _env_flag("USE_PIPELINE_CACHE", True)
+PIPELINE_CACHE_DIR = Path(os.getenv("PIPELINE_CACHE_DIR", "data/cache/etapas"))
+USE_CLIMA_DIARIO_MATERIALIZADO = _env_flag("USE_CLIMA_DIARIO_MATERIALIZADO", True)
+CLIMA_DIARIO_DIR = Path(os.getenv("CLIMA_DIARIO_DIR", "data/cache/clima_diario"))
 EXTRAPOLATE_MISSING_PRICES = _env_flag("EXTRAPOLATE_MISSING_PRICES", True)
 
 
@@ -80,42 +85,51 @@ class EnsembleRegressor:
 # Perfis de modelagem por mercadoria (ajustar conforme base)
 PROFILES_TO_RUN = ["VEGETAL"]
 
-# HS/mercadoria (cdmercadoria) conforme mapeamento SH4
-CARGA_PROFILES = {
-    'VEGETAL': [
-        '1201',  # soja
-        '1005',  # milho
-        '1701',  # acucar
-        '2304',  # farelo de soja
-        '1001',  # trigo
-        '1003',  # cevada
-        '1006',  # arroz
-        '1107',  # malte
-        '2302',  # farelos diversos
-        '2306',  # tortas de oleaginosas
-        '1205',  # colza
-        '1206',  # girassol
-    ],
-    'MINERAL': [
-        '2601',  # minerio de ferro
-        '2606',  # bauxita
-        '2602',  # manganes
-        '2501',  # sal
-        '2523',  # cimento/clinker
-        '2603',  # cobre
-        '2510',  # fosfatos naturais
-    ],
-    'FERTILIZANTE': [
-        '3102',  # nitrogenados (ureia)
-        '3104',  # potassicos (kcl)
-        '3105',  # compostos (npk)
-        '3103',  # fosfatados
-        '3101',  # organicos
-    ],
-}
+# HS/mercadoria (cdmercadoria) conforme mapeamento SH4 (taxonomia_carga.TAXONOMIA)
+CARGA_PROFILES = SH4_POR_PERFIL
+
+def carregar_dados_antaq_local(base_dir=ANTAQ_LOCAL_DIR, ano_min=2020):
+    """Le o armazem Parquet gerado por pipelines/antaq_ingest.py (mesmas colunas do BigQuery)."""
+    base_dir = Path(base_dir)
+    filtros = [('ano', '>=', ano_min)]
+    atracacao = pd.read_parquet(
+        base_dir / "atracacao",
+        columns=[
+            'idatracacao', 'data_chegada', 'data_atracacao', 'ano', 'mes',
+            'porto_atracacao', 'terminal', 'tipo_de_navegacao_da_atracacao',
+            'tipo_de_operacao', 'municipio', 'sguf',
+        ],
+        filters=filtros,
+    )
+    carga = pd.read_parquet(
+        base_dir / "carga_top",
+        columns=[
+            'idatracacao', 'tipo_carga', 'natureza_carga', 'cdmercadoria',
+            'stsh4', 'movimentacao_total_toneladas',
+        ],
+        filters=filtros,
+    )
+    atracacao = atracacao.dropna(subset=['data_chegada', 'data_atracacao', 'mes'])
+    for frame in (atracacao, carga):
+        frame['idatracacao'] = pd.to_numeric(frame['idatracacao'], errors='coerce').astype('Int64')
+    df = atracacao.merge(carga, on='idatracacao', how='left')
+    df = df.rename(columns={
+        'porto_atracacao': 'nome_porto',
+        'terminal': 'nome_terminal',
+        'tipo_de_navegacao_da_atracacao': 'tipo_navegacao',
+        'sguf': 'uf',
+    })
+    df = aplicar_schema(df, SCHEMA_ANTAQ)
+    return df.sort_values('data_chegada').reset_index(drop=True)
+
 
 def extrair_dados_antaq_carga(project_id='antaqdados'):
     """Extrai dados de atracacao e carga da ANTAQ."""
+    if USE_ANTAQ_LOCAL and (ANTAQ_LOCAL_DIR / "atracacao").exists():
+        print("[1/4] Lendo dados ANTAQ do armazem local...")
+        df = carregar_dados_antaq_local()
+        print(f"    OK. {len(df):,} registros | RSS {rss_mb() or 0:.0f}MB")
+        return df
     client = bigquery.Client(project=project_id)
     query = """
     WITH carga_agregada AS (
@@ -209,8 +223,8 @@ def extrair_dados_antaq_carga(project_id='antaqdados'):
         a.data_chegada
     """
     print("[1/4] Extraindo dados ANTAQ...")
-    df = client.query(query).to_dataframe()
-    print(f"    OK. {len(df):,} registros")
+    df = aplicar_schema(client.query(query).to_dataframe(), SCHEMA_ANTAQ)
+    print(f"    OK. {len(df):,} registros | RSS {rss_mb() or 0:.0f}MB")
     return df
 
 
@@ -243,8 +257,8 @@ def extrair_dados_climaticos(project_id='antaqdados', station_ids=None):
         ano, mes, data, id_estacao
     """.format(station_filter=station_filter)
     print("[2/4] Extraindo dados climaticos (INMET)...")
-    df_clima = client.query(query).to_dataframe()
-    print(f"    OK. {len(df_clima):,} registros")
+    df_clima = reduzir_memoria(client.query(query).to_dataframe(), categoricas=('id_estacao',))
+    print(f"    OK. {len(df_clima):,} registros | RSS {rss_mb() or 0:.0f}MB")
     return df_clima
 
 
@@ -350,10 +364,8 @@ def extrair_precos_commodities():
 def integrar_clima_com_atracacao(df_antaq, df_clima):
     """Join entre atracacao e clima por data + estacao."""
     print("Integrando clima com atracacoes...")
-    df_antaq['data_chegada_date'] = pd.to_datetime(
-        df_antaq['data_chegada'], dayfirst=True, errors='coerce'
-    ).dt.date
-    df_clima['data'] = pd.to_datetime(df_clima['data'], dayfirst=True, errors='coerce').dt.date
+    df_antaq['data_chegada_date'] = _chave_dia(df_antaq['data_chegada'], dayfirst=True)
+    df_clima['data'] = _chave_dia(df_clima['data'], dayfirst=True)
     df_clima_clean = df_clima.drop(columns=['ano', 'mes'], errors='ignore')
     df = df_antaq.merge(
         df_clima_clean,
@@ -368,7 +380,7 @@ def integrar_clima_com_atracacao(df_antaq, df_clima):
 def filtrar_granel_solido(df):
     """Filtra apenas cargas de granel solido."""
     df = df.copy()
-    natureza_norm = df['natureza_carga'].apply(normalizar_texto)
+    natureza_norm = df['natureza_carga'].map(normalizar_texto)
     mask = natureza_norm.str.contains('GRANELSOLIDO', na=False)
     return df[mask]
 
@@ -389,48 +401,15 @@ def normalizar_texto(valor):
     return re.sub(r'[^A-Z0-9]', '', texto)
 
 
-def _normalizar_porto_base(nome_porto):
-    """Remove prefixos comuns de porto para matching com dados de maré."""
-    norm = normalizar_texto(nome_porto)
-    for prefix in ("PORTODE", "PORTODO", "PORTO"):
-        if norm.startswith(prefix):
-            return norm[len(prefix):]
-    return norm
-
-
-def _normalizar_porto_clima(nome_porto):
-    """Normaliza nome de porto (remove prefixos e UF) para clima.
-
-    A remoção de UF só ocorre se o nome original continha parênteses
-    (ex: 'Santos (SP)') indicando que a UF foi adicionada explicitamente,
-    não quando faz parte do nome do porto (ex: 'Suape' não deve virar 'Sua').
-    """
-    if pd.isna(nome_porto):
-        return ""
-    original = str(nome_porto)
-    norm = _normalizar_porto_base(nome_porto)
-    # Só remove UF se o nome original tinha parênteses (ex: "Santos (SP)")
-    # ou se tinha formato "NomeUF" colado (ex: "BarcarenaPA")
-    has_parentheses = '(' in original
-    has_uf_suffix = len(norm) > 4 and norm[-2:] in UF_CODES
-    # Para nomes curtos (<=6 chars normalizados), não remover UF pois pode ser parte do nome
-    if has_parentheses or (has_uf_suffix and len(norm) > 6):
-        candidate = norm[:-2]
-        # Verificar se a remoção não deixa um nome muito curto ou inválido
-        if len(candidate) >= 3:
-            norm = candidate
-    return norm
+def _normalizar_portos_clima(serie):
+    """Chave canonica do registro de portos (normaliza apenas os valores unicos)."""
+    return pd.Series(registro().chaves(serie), index=serie.index)
 
 
 def _resolver_arquivo_mare(nome_porto):
     """Retorna o arquivo de extremos de maré para o porto (se houver)."""
-    if not nome_porto:
-        return None
-    norm = normalizar_texto(nome_porto)
-    if norm in MARE_PORT_FILE_BY_NORM:
-        return MARE_PORT_FILE_BY_NORM[norm]
-    base = _normalizar_porto_base(nome_porto)
-    return MARE_PORT_FILE_BY_NORM.get(base)
+    porto = registro().porto(nome_porto) if nome_porto else None
+    return porto.arquivo_mare if porto else None
 
 
 def _carregar_extremos_mare(caminho_csv):
@@ -524,23 +503,21 @@ def adicionar_features_mare(df):
         return df
 
     extremos_cache = {}
-    df['porto_norm'] = df['nome_porto'].apply(_normalizar_porto_base)
-    for porto_norm in df['porto_norm'].dropna().unique():
-        arquivo = MARE_PORT_FILE_BY_NORM.get(porto_norm)
-        if not arquivo:
-            continue
+    reg = registro()
+    porto_id = reg.ids(df['nome_porto'])
+    arquivos = reg.atributo(porto_id, 'arquivo_mare')
+    for arquivo in pd.unique(arquivos[pd.notna(arquivos)]):
         caminho = MARE_DIR / arquivo
         if not caminho.exists():
             continue
         if arquivo not in extremos_cache:
             extremos_cache[arquivo] = _carregar_extremos_mare(caminho)
         extremos = extremos_cache[arquivo]
-        mask = df['porto_norm'] == porto_norm
+        mask = arquivos == arquivo
         feats = _interpolar_mare_para_timestamps(extremos, df.loc[mask, 'data_chegada_dt'])
         df.loc[mask, ['mare_astronomica', 'mare_subindo', 'mare_horas_ate_extremo', 'tem_mare_astronomica']] = feats[
             ['mare_astronomica', 'mare_subindo', 'mare_horas_ate_extremo', 'tem_mare_astronomica']
         ].to_numpy()
-    df = df.drop(columns=['porto_norm'], errors='ignore')
     return df
 
 
@@ -548,8 +525,8 @@ def _agregar_clima_diario(df, ts_col, port_col, precip_col=None, wind_speed_col=
     df = df.copy()
     df[ts_col] = pd.to_datetime(df[ts_col], errors='coerce')
     df = df.dropna(subset=[ts_col, port_col])
-    df['data'] = df[ts_col].dt.date
-    df['porto_norm'] = df[port_col].apply(_normalizar_porto_clima)
+    df['data'] = _chave_dia(df[ts_col])
+    df['porto_norm'] = _normalizar_portos_clima(df[port_col])
 
     agg_map = {}
     if precip_col and precip_col in df.columns:
@@ -567,70 +544,75 @@ def _agregar_clima_diario(df, ts_col, port_col, precip_col=None, wind_speed_col=
     return agg
 
 
-def carregar_clima_mare_clima_diario():
-    """Carrega e agrega dados climáticos dos parquets mare_clima (diário)."""
-    frames_inmet = []
+def _agregar_mare_clima_hibridos(arquivo):
+    """INMET hibridos (Sul): precipitacao, vento e rajada diarios."""
+    cols = ['timestamp', 'station', 'precip', 'wind_speed', 'wind_gust']
+    df1 = pd.read_parquet(arquivo, columns=cols)
+    return _agregar_clima_diario(
+        df1, ts_col='timestamp', port_col='station',
+        precip_col='precip', wind_speed_col='wind_speed', wind_gust_col='wind_gust'
+    )
+
 
-    if MARE_CLIMA_DATASET_1.exists():
-        cols = ['timestamp', 'station', 'precip', 'wind_speed', 'wind_gust']
-        df1 = pd.read_parquet(MARE_CLIMA_DATASET_1, columns=cols)
-        frames_inmet.append(
-            _agregar_clima_diario(
-                df1, ts_col='timestamp', port_col='station',
-                precip_col='precip', wind_speed_col='wind_speed', wind_gust_col='wind_gust'
-            )
-        )
+def _agregar_mare_clima_arco_norte(arquivo):
+    """INMET hibridos (Arco Norte): precipitacao e vento diarios."""
+    cols = ['timestamp', 'station', 'precip', 'wind_speed_10m']
+    df3 = pd.read_parquet(arquivo, columns=cols)
+    df3 = df3.rename(columns={'wind_speed_10m': 'wind_speed'})
+    return _agregar_clima_diario(
+        df3, ts_col='timestamp', port_col='station',
+        precip_col='precip', wind_speed_col='wind_speed'
+    )
 
-    if MARE_CLIMA_DATASET_3.exists():
-        cols = ['timestamp', 'station', 'precip', 'wind_speed_10m']
-        df3 = pd.read_parquet(MARE_CLIMA_DATASET_3, columns=cols)
-        df3 = df3.rename(columns={'wind_speed_10m': 'wind_speed'})
-        frames_inmet.append(
-            _agregar_clima_diario(
-                df3, ts_col='timestamp', port_col='station',
-                precip_col='precip', wind_speed_col='wind_speed'
-            )
-        )
 
+def _agregar_mare_clima_era5(arquivo):
+    """ERA5 (portos oceanicos): vento diario."""
+    cols_wind = ['time', 'port', 'wind_speed_10m']
+    df2 = pd.read_parquet(arquivo, columns=cols_wind)
+    df2 = df2.rename(columns={'wind_speed_10m': 'wind_speed'})
+    return _agregar_clima_diario(
+        df2, ts_col='time', port_col='port', wind_speed_col='wind_speed'
+    )
+
+
+def _agregar_mare_clima_oceano(arquivo):
+    """ERA5 (portos oceanicos): ondas, frente fria e pressao diarias."""
+    cols_ocean = ['time', 'port', 'wave_height', 'frente_fria', 'pressao_anomalia']
+    try:
+        df2_ocean = pd.read_parquet(arquivo, columns=cols_ocean)
+        df2_ocean['time'] = pd.to_datetime(df2_ocean['time'], errors='coerce')
+        df2_ocean = df2_ocean.dropna(subset=['time', 'port'])
+        df2_ocean['data'] = _chave_dia(df2_ocean['time'])
+        df2_ocean['porto_norm'] = _normalizar_portos_clima(df2_ocean['port'])
+        # Agregar por dia
+        return df2_ocean.groupby(['porto_norm', 'data']).agg(
+            mc_wave_height_max=('wave_height', 'max'),
+            mc_wave_height_media=('wave_height', 'mean'),
+            mc_frente_fria=('frente_fria', 'max'),  # Se houve frente fria no dia
+            mc_pressao_anomalia=('pressao_anomalia', 'mean'),
+        ).reset_index()
+    except Exception:
+        return pd.DataFrame()
+
+
+def _combinar_clima_mare_clima(agregados):
+    """Une os agregados diarios por fonte numa tabela porto x dia."""
+    frames_inmet = [agregados[n] for n in ('hibridos', 'arco_norte') if n in agregados]
     df_inmet = pd.concat(frames_inmet, ignore_index=True) if frames_inmet else pd.DataFrame()
     if not df_inmet.empty:
+        agg_inmet = {
+            'mc_precip_dia': 'sum',
+            'mc_wind_speed_media': 'mean',
+            'mc_wind_speed_max': 'max',
+            'mc_wind_gust_max': 'max',
+        }
         df_inmet = (
             df_inmet.groupby(['porto_norm', 'data'], as_index=False)
-            .agg({
-                'mc_precip_dia': 'sum',
-                'mc_wind_speed_media': 'mean',
-                'mc_wind_speed_max': 'max',
-                'mc_wind_gust_max': 'max',
-            })
+            .agg({c: f for c, f in agg_inmet.items() if c in df_inmet.columns})
         )
 
-    df_era5 = pd.DataFrame()
-    df_ocean = pd.DataFrame()
-    if MARE_CLIMA_DATASET_2.exists():
-        # Carregar vento para clima
-        cols_wind = ['time', 'port', 'wind_speed_10m']
-        df2 = pd.read_parquet(MARE_CLIMA_DATASET_2, columns=cols_wind)
-        df2 = df2.rename(columns={'wind_speed_10m': 'wind_speed'})
-        df_era5 = _agregar_clima_diario(
-            df2, ts_col='time', port_col='port', wind_speed_col='wind_speed'
-        )
-        # Carregar features oceanográficas (ondas, frente fria)
-        cols_ocean = ['time', 'port', 'wave_height', 'frente_fria', 'pressao_anomalia']
-        try:
-            df2_ocean = pd.read_parquet(MARE_CLIMA_DATASET_2, columns=cols_ocean)
-            df2_ocean['time'] = pd.to_datetime(df2_ocean['time'], errors='coerce')
-            df2_ocean = df2_ocean.dropna(subset=['time', 'port'])
-            df2_ocean['data'] = df2_ocean['time'].dt.date
-            df2_ocean['porto_norm'] = df2_ocean['port'].apply(_normalizar_porto_clima)
-            # Agregar por dia
-            df_ocean = df2_ocean.groupby(['porto_norm', 'data']).agg(
-                mc_wave_height_max=('wave_height', 'max'),
-                mc_wave_height_media=('wave_height', 'mean'),
-                mc_frente_fria=('frente_fria', 'max'),  # Se houve frente fria no dia
-                mc_pressao_anomalia=('pressao_anomalia', 'mean'),
-            ).reset_index()
-        except Exception:
-            df_ocean = pd.DataFrame()
+    df_era5 = agregados.get('era5', pd.DataFrame())
+    df_ocean = agregados.get('oceano', pd.DataFrame())
 
     if df_inmet.empty and df_era5.empty:
         return pd.DataFrame()
@@ -672,21 +654,52 @@ def carregar_clima_mare_clima_diario():
     return df_final
 
 
+def tabela_clima_mare_clima(destino=None):
+    """Tabela porto x dia materializada a partir dos parquets horarios de mare_clima."""
+    fontes = [
+        FonteDiaria('hibridos', MARE_CLIMA_DATASET_1, _agregar_mare_clima_hibridos),
+        FonteDiaria('arco_norte', MARE_CLIMA_DATASET_3, _agregar_mare_clima_arco_norte),
+        FonteDiaria('era5', MARE_CLIMA_DATASET_2, _agregar_mare_clima_era5),
+        FonteDiaria('oceano', MARE_CLIMA_DATASET_2, _agregar_mare_clima_oceano),
+    ]
+    return TabelaDiaria(fontes, _combinar_clima_mare_clima, destino or CLIMA_DIARIO_DIR)
+
+
+def carregar_clima_mare_clima_diario(data_min=None, data_max=None):
+    """Carrega dados climáticos diários de mare_clima (materializados, se habilitado)."""
+    tabela = tabela_clima_mare_clima()
+    if not USE_CLIMA_DIARIO_MATERIALIZADO:
+        agregados = {
+            fonte.nome: fonte.agregar(fonte.arquivo)
+            for fonte in tabela.fontes
+            if fonte.arquivo.exists()
+        }
+        return _combinar_clima_mare_clima(agregados)
+    alteradas = tabela.atualizar()
+    if alteradas:
+        print(f"Clima diario (mare_clima) materializado: {', '.join(alteradas)}")
+    return tabela.ler(data_min=data_min, data_max=data_max)
+
+
 def integrar_clima_mare_clima(df):
     """Integra clima dos arquivos mare_clima para complementar o INMET."""
     df = df.copy()
-    clima_mc = carregar_clima_mare_clima_diario()
+    if 'data_chegada_date' not in df.columns:
+        df['data_chegada_date'] = _chave_dia(df['data_chegada'], dayfirst=True)
+    clima_mc = carregar_clima_mare_clima_diario(
+        data_min=df['data_chegada_date'].min(), data_max=df['data_chegada_date'].max()
+    )
     if clima_mc.empty:
         return df
 
-    if 'data_chegada_date' not in df.columns:
-        df['data_chegada_date'] = pd.to_datetime(df['data_chegada'], dayfirst=True, errors='coerce').dt.date
-    df['porto_norm'] = df['nome_porto'].apply(_normalizar_porto_clima)
+    reg = registro()
+    df['porto_id'] = reg.ids(df['nome_porto'])
+    clima_mc = clima_mc.assign(porto_id=reg.ids(clima_mc['porto_norm'])).drop(columns=['porto_norm'])
 
     merged = df.merge(
         clima_mc,
-        left_on=['porto_norm', 'data_chegada_date'],
-        right_on=['porto_norm', 'data'],
+        left_on=['porto_id', 'data_chegada_date'],
+        right_on=['porto_id', 'data'],
         how='left'
     )
 
@@ -708,22 +721,10 @@ def integrar_clima_mare_clima(df):
     # Criar feature de ressaca (ondas > 2.5m)
     merged['ressaca'] = (merged['wave_height_max'] > 2.5).astype(int)
 
-    merged = merged.drop(columns=['porto_norm', 'data'], errors='ignore')
+    merged = merged.drop(columns=['porto_id', 'data'], errors='ignore')
     return merged
 
 
-def _load_port_mapping():
-    if not PORT_MAPPING_PATH.exists():
-        return {}
-    mapping_df = pd.read_csv(PORT_MAPPING_PATH)
-    if mapping_df.empty:
-        return {}
-    mapping_df = mapping_df.dropna(subset=['portname', 'nome_porto_antaq'])
-    mapping_df['portname_norm'] = mapping_df['portname'].apply(normalizar_texto)
-    mapping_df['nome_porto_norm'] = mapping_df['nome_porto_antaq'].apply(normalizar_texto)
-    return dict(zip(mapping_df['nome_porto_norm'], mapping_df['portname_norm']))
-
-
 def integrar_ais_features(df, ais_path=AIS_FEATURES_PATH):
     """Integra features AIS por porto/dia (agregadas)."""
     df = df.copy()
@@ -755,19 +756,18 @@ def integrar_ais_features(df, ais_path=AIS_FEATURES_PATH):
     else:
         ais_port_col = 'portname'
 
-    ais['date'] = pd.to_datetime(ais['date'], errors='coerce').dt.date
+    ais['date'] = _chave_dia(ais['date'])
     ais = ais.dropna(subset=['date', ais_port_col])
-    ais['portname_norm'] = ais[ais_port_col].apply(normalizar_texto)
-
-    mapping = _load_port_mapping()
-    df['porto_norm'] = df['nome_porto'].apply(normalizar_texto)
-    df['ais_norm'] = df['porto_norm'].map(mapping).fillna(df['porto_norm'])
-    df['data_chegada_date'] = df['data_chegada_dt'].dt.date
+    # Nomes AIS e ANTAQ resolvem para o mesmo ID pelo registro (port_mapping.csv)
+    reg = registro()
+    ais['porto_id'] = reg.ids(ais[ais_port_col])
+    df['porto_id'] = reg.ids(df['nome_porto'])
+    df['data_chegada_date'] = _chave_dia(df['data_chegada_dt'])
 
     merged = df.merge(
-        ais[['date', 'portname_norm'] + feature_cols],
-        left_on=['data_chegada_date', 'ais_norm'],
-        right_on=['date', 'portname_norm'],
+        ais[['date', 'porto_id'] + feature_cols],
+        left_on=['data_chegada_date', 'porto_id'],
+        right_on=['date', 'porto_id'],
         how='left'
     )
 
@@ -775,7 +775,7 @@ def integrar_ais_features(df, ais_path=AIS_FEATURES_PATH):
         merged[col] = merged[col].fillna(0.0)
 
     return merged.drop(
-        columns=['date', 'portname_norm', 'ais_norm', 'porto_norm', 'data_chegada_date'],
+        columns=['date', 'porto_id', 'data_chegada_date'],
         errors='ignore'
     )
 
@@ -807,14 +807,22 @@ def aplicar_corte_percentil(df, col, group_col, p=0.95):
     """Corta valores acima do percentil por grupo."""
     df = df.copy()
     limites = df.groupby(group_col)[col].quantile(p).to_dict()
-    df['limite_percentil'] = df[group_col].map(limites)
+    df['limite_percentil'] = df[group_col].map(limites).astype(float)
     df = df[df[col] <= df['limite_percentil']]
     return df.drop(columns=['limite_percentil'])
 
 
-def classificar_espera(series):
-    """Classifica espera em tercis (qcut) para balancear as classes."""
-    return pd.qcut(series, q=3, labels=[0, 1, 2]).astype(int)
+def cortes_espera(series):
+    """Limites internos dos tercis de espera (gravados no metadata)."""
+    _, cortes = pd.qcut(series, q=3, retbins=True)
+    return [float(c) for c in cortes[1:-1]]
+
+
+def classificar_espera(series, cortes=None):
+    """Classifica espera em tercis (qcut) ou nos cortes de um treino anterior (pd.cut)."""
+    if cortes is None:
+        return pd.qcut(series, q=3, labels=[0, 1, 2]).astype(int)
+    return pd.cut(series, [-np.inf, *cortes, np.inf], labels=[0, 1, 2]).astype(int)
 
 
 def integrar_producao_agricola(df, df_pam):
@@ -968,7 +976,7 @@ def criar_chuva_acumulada_ultimos_3dias(df):
 def criar_features_commodities(df):
     """Identifica commodities e cria indices de mercado."""
     print("Criando features de commodities...")
-    df['natureza_carga_norm'] = df['natureza_carga'].astype(str).str.upper()
+    df['natureza_carga_norm'] = df['natureza_carga'].astype(str).str.upper().astype('category')
     df['flag_celulose'] = df['natureza_carga_norm'].str.contains('CELULOSE|PASTA', na=False).astype(int)
     df['flag_algodao'] = df['natureza_carga_norm'].str.contains('ALGODAO', na=False).astype(int)
     df['flag_soja'] = df['natureza_carga_norm'].str.contains('SOJA', na=False).astype(int)
@@ -1037,20 +1045,9 @@ def calcular_fila_no_momento(df):
     """Conta quantos navios estavam esperando no momento da chegada."""
     print("Calculando fila no momento da chegada...")
     df = df.sort_values(['nome_terminal', 'data_chegada_dt']).reset_index(drop=True)
-    fila = np.zeros(len(df), dtype=float)
-    for _, idx in df.groupby('nome_terminal', sort=False).groups.items():
-        sub = df.loc[idx]
-        chegadas = sub['data_chegada_dt'].to_numpy()
-        atracacoes = sub['data_atracacao_dt'].to_numpy()
-        order = np.argsort(chegadas)
-        chegadas_sorted = chegadas[order]
-        atracacoes_sorted = np.sort(atracacoes)
-        for j, pos in enumerate(order):
-            t = chegadas_sorted[j]
-            arrivals_before = j
-            departures_before = np.searchsorted(atracacoes_sorted, t, side='right')
-            fila[idx[pos]] = max(arrivals_before - departures_before, 0)
-    df['navios_no_fundeio_na_chegada'] = fila
+    df['navios_no_fundeio_na_chegada'] = fila_na_chegada(
+        df['data_chegada_dt'], df['data_atracacao_dt'], df['nome_terminal']
+    ).astype(float)
     return df
 
 
@@ -1058,12 +1055,52 @@ def criar_lag_features(df):
     """Media movel do tempo de espera."""
     print("Criando lag features...")
     df = df.sort_values(['nome_terminal', 'data_chegada_dt']).reset_index(drop=True)
-    df['tempo_espera_ma5'] = df.groupby('nome_terminal')['tempo_espera_horas'].transform(
-        lambda x: x.rolling(5, min_periods=1).mean().shift(1)
-    ).fillna(0)
+    df['tempo_espera_ma5'] = media_movel_espera(df['tempo_espera_horas'], df['nome_terminal'], janela=5)
+    df['tempo_espera_ma5'] = df['tempo_espera_ma5'].fillna(0)
     return df
 
 
+def montar_etapas_features(profile):
+    """Define o DAG de integracao/feature engineering usado por preparar_dados."""
+    vegetal = profile == "VEGETAL"
+    etapas = [
+        Etapa('integrar_clima', integrar_clima_com_atracacao, ('antaq', 'clima')),
+    ]
+    anterior = 'integrar_clima'
+    if USE_MARE_CLIMA:
+        etapas.append(Etapa(
+            'integrar_clima_mare_clima', integrar_clima_mare_clima, (anterior,),
+            arquivos=(MARE_CLIMA_DATASET_1, MARE_CLIMA_DATASET_2, MARE_CLIMA_DATASET_3),
+        ))
+        anterior = 'integrar_clima_mare_clima'
+    etapas.append(Etapa('integrar_producao_agricola', integrar_producao_agricola, (anterior, 'pam')))
+    etapas.append(Etapa('integrar_precos_commodities', integrar_precos_commodities,
+                        ('integrar_producao_agricola', 'precos'),
+                        params={'extrapolar': EXTRAPOLATE_MISSING_PRICES}))
+    anterior = 'integrar_precos_commodities'
+    sequencia = [('calcular_target', calcular_target, {}, ())]
+    if vegetal and USE_MARE_FEATURES:
+        sequencia.append(('adicionar_features_mare', adicionar_features_mare, {}, (MARE_DIR,)))
+    sequencia += [
+        ('criar_features_temporais', criar_features_temporais, {}, ()),
+        ('criar_target_encoding_porto', criar_target_encoding_porto, {}, ()),
+        ('criar_features_climaticas_avancadas', criar_features_climaticas_avancadas, {}, ()),
+    ]
+    if vegetal:
+        sequencia.append(('criar_chuva_acumulada_ultimos_3dias', criar_chuva_acumulada_ultimos_3dias, {}, ()))
+    sequencia += [
+        ('criar_features_commodities', criar_features_commodities, {}, ()),
+        ('integrar_ais_features', integrar_ais_features, {}, (AIS_FEATURES_PATH, PORT_MAPPING_PATH, PORTS_CONFIG_PATH)),
+        ('calcular_fila_no_momento', calcular_fila_no_momento, {}, ()),
+        ('calcular_densidade_fila', calcular_densidade_fila, {}, ()),
+        ('criar_lag_features', criar_lag_features, {}, ()),
+    ]
+    for nome, func, params, arquivos in sequencia:
+        etapas.append(Etapa(nome, func, (anterior,), params=params, arquivos=arquivos))
+        anterior = nome
+    return etapas
+
+
 def preparar_dados():
     """Pipeline de integracao e preparacao completo."""
     print("=" * 70)
@@ -1074,33 +1111,27 @@ def preparar_dados():
     profile_key = PROFILE.upper()
     if profile_key in CARGA_PROFILES:
         df_antaq = filtrar_por_cdmercadoria(df_antaq, CARGA_PROFILES[profile_key])
+    df_antaq = reduzir_memoria(df_antaq)
     station_map = mapear_estacoes_por_municipio(df_antaq)
     df_antaq['id_estacao'] = df_antaq['municipio'].map(station_map)
     station_ids = [sid for sid in df_antaq['id_estacao'].dropna().unique()]
     df_clima = extrair_dados_climaticos(station_ids=station_ids)
     df_pam = extrair_dados_producao_agricola()
     df_precos = extrair_precos_commodities()
-    df = integrar_clima_com_atracacao(df_antaq, df_clima)
-    if USE_MARE_CLIMA:
-        df = integrar_clima_mare_clima(df)
-    df = integrar_producao_agricola(df, df_pam)
-    df = integrar_precos_commodities(df, df_precos)
     print("=" * 70)
     print("FEATURE ENGINEERING")
     print("=" * 70)
-    df = calcular_target(df)
-    if PROFILE.upper() == "VEGETAL" and USE_MARE_FEATURES:
-        df = adicionar_features_mare(df)
-    df = criar_features_temporais(df)
-    df = criar_target_encoding_porto(df)
-    df = criar_features_climaticas_avancadas(df)
-    if PROFILE.upper() == "VEGETAL":
-        df = criar_chuva_acumulada_ultimos_3dias(df)
-    df = criar_features_commodities(df)
-    df = integrar_ais_features(df)
-    df = calcular_fila_no_momento(df)
-    df = calcular_densidade_fila(df)
-    df = criar_lag_features(df)
+    dag = DagEtapas(
+        montar_etapas_features(PROFILE.upper()),
+        cache_dir=PIPELINE_CACHE_DIR,
+        ativo=USE_PIPELINE_CACHE,
+        pos_etapa=reduzir_memoria,
+    )
+    df = dag.executar(
+        {'antaq': df_antaq, 'clima': df_clima, 'pam': df_pam, 'precos': df_precos},
+        alvo='criar_lag_features',
+    )
+    dag.imprimir_relatorio()
     features = [
         'nome_porto', 'nome_terminal', 'tipo_navegacao', 'tipo_carga',
         'natureza_carga', 'cdmercadoria', 'stsh4',
@@ -1186,61 +1217,58 @@ def gerar_splits_temporais(df, n_splits=3, gap_days=7):
     return splits
 
 
-def treinar_modelo(df, features, target):
-    """Treina modelo LightGBM com validacao temporal."""
-    print("=" * 70)
-    print("TREINAMENTO DO MODELO (LightGBM)")
-    print("=" * 70)
+LGB_CAT_FEATURES = [
+    'nome_porto', 'nome_terminal', 'tipo_navegacao',
+    'tipo_carga', 'natureza_carga', 'cdmercadoria', 'stsh4'
+]
+
+
+def preparar_matriz_lgb(df, features, target):
+    """X com categorias para o LightGBM e y do target."""
     X = df[features].copy()
     y = df[target].copy()
-    cat_features = [
-        'nome_porto', 'nome_terminal', 'tipo_navegacao',
-        'tipo_carga', 'natureza_carga', 'cdmercadoria', 'stsh4'
-    ]
-    for col in cat_features:
+    for col in LGB_CAT_FEATURES:
         X[col] = X[col].astype('category')
-    splits = gerar_splits_temporais(df, n_splits=3, gap_days=7)
-    mae_scores = []
-    rmse_scores = []
-    r2_scores = []
-    print("Executando Time Series Cross-Validation (3 folds)...")
-    for fold, (train_idx, val_idx) in enumerate(splits):
-        X_train, X_val = X.iloc[train_idx], X.iloc[val_idx]
-        y_train, y_val = y.iloc[train_idx], y.iloc[val_idx]
-        model = lgb.LGBMRegressor(
-            objective='regression',
-            n_estimators=500,
-            learning_rate=0.05,
-            max_depth=7,
-            num_leaves=31,
-            min_child_samples=20,
-            random_state=42,
-            verbose=-1
-        )
-        y_train_log = np.log1p(y_train)
-        y_val_log = np.log1p(y_val)
-        model.fit(
-            X_train, y_train_log,
-            eval_set=[(X_val, y_val_log)],
-            callbacks=[lgb.early_stopping(50, verbose=False)]
-        )
-        preds = np.expm1(model.predict(X_val))
-        mae = mean_absolute_error(y_val, preds)
-        rmse = np.sqrt(mean_squared_error(y_val, preds))
-        r2 = r2_score(y_val, preds)
-        mae_scores.append(mae)
-        rmse_scores.append(rmse)
-        r2_scores.append(r2)
-        print(
-            f"Fold {fold + 1}/3 -> MAE: {mae:.2f}h | RMSE: {rmse:.2f}h | R2: {r2:.3f}"
-        )
-    print("=" * 70)
-    print("RESULTADO FINAL (Cross-Validation)")
-    print("=" * 70)
-    print(f"MAE medio:  {np.mean(mae_scores):.2f} +- {np.std(mae_scores):.2f} horas")
-    print(f"RMSE medio: {np.mean(rmse_scores):.2f} +- {np.std(rmse_scores):.2f} horas")
-    print(f"R2 medio:   {np.mean(r2_scores):.3f} +- {np.std(r2_scores):.3f}")
-    print("Treinando modelo final com dataset completo...")
+    return X, y
+
+
+def criar_cache_dataset_lgb(X, y, nome):
+    """Dataset binado (alvo em log1p) compartilhado entre os folds do perfil."""
+    return CacheDatasetLGB(X, np.log1p(y), nome, persistir=USE_PIPELINE_CACHE)
+
+
+def treinar_fold_lgb(X, y, train_idx, val_idx, n_jobs=None, cache=None):
+    """Treina e avalia um fold temporal do LightGBM (alvo em log1p)."""
+    if cache is None:
+        cache = CacheDatasetLGB(X, np.log1p(y), 'fold', persistir=False)
+    y_val = y.iloc[val_idx]
+    params = params_sklearn_para_core(
+        objective='regression',
+        learning_rate=0.05,
+        max_depth=7,
+        num_leaves=31,
+        min_child_samples=20,
+        random_state=42,
+        n_jobs=n_jobs,
+        verbose=-1
+    )
+    booster = lgb.train(
+        params,
+        cache.subset(train_idx),
+        num_boost_round=500,
+        valid_sets=[cache.subset(val_idx)],
+        callbacks=[lgb.early_stopping(50, verbose=False)]
+    )
+    preds = np.expm1(booster.predict(X.iloc[val_idx], num_iteration=booster.best_iteration))
+    return {
+        'mae': mean_absolute_error(y_val, preds),
+        'rmse': np.sqrt(mean_squared_error(y_val, preds)),
+        'r2': r2_score(y_val, preds),
+    }
+
+
+def treinar_lgb_final(X, y, features, n_jobs=None):
+    """Refit do LightGBM com o dataset completo; retorna modelo e importancias."""
     model_final = lgb.LGBMRegressor(
         objective='regression',
         n_estimators=500,
@@ -1248,6 +1276,7 @@ def treinar_modelo(df, features, target):
         max_depth=7,
         num_leaves=31,
         random_state=42,
+        n_jobs=n_jobs,
         verbose=-1
     )
     model_final.fit(X, np.log1p(y))
@@ -1255,13 +1284,51 @@ def treinar_modelo(df, features, target):
         'feature': features,
         'importance': model_final.feature_importances_
     }).sort_values('importance', ascending=False)
+    return model_final, importance
+
+
+def resumir_cv(scores):
+    """Imprime o resumo do cross-validation a partir das metricas por fold."""
+    mae_scores = [s['mae'] for s in scores]
+    rmse_scores = [s['rmse'] for s in scores]
+    r2_scores = [s['r2'] for s in scores]
+    print("=" * 70)
+    print("RESULTADO FINAL (Cross-Validation)")
+    print("=" * 70)
+    print(f"MAE medio:  {np.mean(mae_scores):.2f} +- {np.std(mae_scores):.2f} horas")
+    print(f"RMSE medio: {np.mean(rmse_scores):.2f} +- {np.std(rmse_scores):.2f} horas")
+    print(f"R2 medio:   {np.mean(r2_scores):.3f} +- {np.std(r2_scores):.3f}")
+
+
+def treinar_modelo(df, features, target, n_jobs=None):
+    """Treina modelo LightGBM com validacao temporal."""
+    print("=" * 70)
+    print("TREINAMENTO DO MODELO (LightGBM)")
+    print("=" * 70)
+    X, y = preparar_matriz_lgb(df, features, target)
+    splits = gerar_splits_temporais(df, n_splits=3, gap_days=7)
+    cache = criar_cache_dataset_lgb(X, y, f"{globals().get('PROFILE', 'default')}_reg")
+    cache.completo()
+    print(f"Dataset LightGBM: {cache.origem}")
+    scores = []
+    print("Executando Time Series Cross-Validation (3 folds)...")
+    for fold, (train_idx, val_idx) in enumerate(splits):
+        fold_scores = treinar_fold_lgb(X, y, train_idx, val_idx, n_jobs=n_jobs, cache=cache)
+        scores.append(fold_scores)
+        print(
+            f"Fold {fold + 1}/3 -> MAE: {fold_scores['mae']:.2f}h | "
+            f"RMSE: {fold_scores['rmse']:.2f}h | R2: {fold_scores['r2']:.3f}"
+        )
+    resumir_cv(scores)
+    print("Treinando modelo final com dataset completo...")
+    model_final, importance = treinar_lgb_final(X, y, features, n_jobs=n_jobs)
     print("TOP 20 FEATURES MAIS IMPORTANTES")
     for _, row in importance.head(20).iterrows():
         print(f"{row['feature']:.<50} {row['importance']:.2f}")
     return model_final, importance
 
 
-def treinar_classificador(df, features, target):
+def treinar_classificador(df, features, target, n_jobs=None):
     """Classifica o tempo de espera em faixas (curta/media/longa)."""
     print("=" * 70)
     print("TREINAMENTO DO MODELO (LightGBM - Classificacao)")
@@ -1294,9 +1361,12 @@ def treinar_classificador(df, features, target):
         max_depth=7,
         num_leaves=31,
         class_weight='balanced',
-        random_state=42
+        random_state=42,
+        n_jobs=n_jobs
     )
     model.fit(X_train, y_train)
+    # Limites das classes aprendidas (reaplicados no retreino incremental)
+    model.cortes_espera_ = cortes_espera(train_df[target])
     preds = model.predict(X_test)
     proba = model.predict_proba(X_test)
 
@@ -1309,7 +1379,7 @@ def treinar_classificador(df, features, target):
     return model
 
 
-def treinar_modelo_xgboost(df, features, target, model_reg=None):
+def treinar_modelo_xgboost(df, features, target, model_reg=None, n_jobs=None, profile=None):
     """Treina modelo XGBoost com validação temporal (últimos 6 meses)."""
     print("=" * 70)
     print("TREINAMENTO DO MODELO (XGBoost)")
@@ -1342,7 +1412,8 @@ def treinar_modelo_xgboost(df, features, target, model_reg=None):
         subsample=0.8,
         colsample_bytree=0.8,
         random_state=42,
-        tree_method='hist'
+        tree_method='hist',
+        n_jobs=n_jobs
     )
     model.fit(X_train, y_train)
     preds = model.predict(X_test)
@@ -1352,11 +1423,13 @@ def treinar_modelo_xgboost(df, features, target, model_reg=None):
     print(f"Teste (ultimos 6 meses) -> MAE: {mae:.2f}h | RMSE: {rmse:.2f}h | R2: {r2:.3f}")
     booster = model.get_booster()
     score = booster.get_score(importance_type='gain')
+    # Um arquivo por perfil: perfis treinados em paralelo nao se sobrescrevem
+    importancia = f"xgb_feature_importance_{profile.lower()}" if profile else 'xgb_feature_importance'
     if score:
         imp = pd.DataFrame([
             {'feature': k, 'gain': v} for k, v in score.items()
         ]).sort_values('gain', ascending=False)
-        imp.to_csv('xgb_feature_importance.csv', index=False)
+        imp.to_csv(f'{importancia}.csv', index=False)
         print("Top 15 features (XGBoost gain):")
         print(imp.head(15).to_string(index=False))
         try:
@@ -1366,11 +1439,11 @@ def treinar_modelo_xgboost(df, features, target, model_reg=None):
             ax.set_title('XGBoost Feature Importance (gain)')
             ax.set_xlabel('gain')
             plt.tight_layout()
-            plt.savefig('xgb_feature_importance.png', dpi=150)
+            plt.savefig(f'{importancia}.png', dpi=150)
             plt.close()
-            print("Salvo: xgb_feature_importance.png")
+            print(f"Salvo: {importancia}.png")
         except Exception:
-            print("Matplotlib indisponivel; salvei apenas xgb_feature_importance.csv")
+            print(f"Matplotlib indisponivel; salvei apenas {importancia}.csv")
 
     # Experimento: hiperparametros mais agressivos com top 15 features
     top15 = None
@@ -1389,7 +1462,8 @@ def treinar_modelo_xgboost(df, features, target, model_reg=None):
             reg_alpha=0.1,
             reg_lambda=0.1,
             random_state=42,
-            tree_method='hist'
+            tree_method='hist',
+            n_jobs=n_jobs
         )
         model_agressivo.fit(X_train_top, y_train)
         preds_agressivo = model_agressivo.predict(X_test_top)
@@ -1428,7 +1502,8 @@ def treinar_modelo_xgboost(df, features, target, model_reg=None):
     return model
 
 
-def salvar_modelos(profile, features, target, model_reg, model_clf, model_xgb):
+def salvar_modelos(profile, features, target, model_reg, model_clf, model_xgb,
+                   data_cutoff=None, extra=None, dados=None):
     if not SAVE_MODELS:
         print("SAVE_MODELS=0 -> pulando salvamento de modelos.")
         return
@@ -1446,6 +1521,16 @@ def salvar_modelos(profile, features, target, model_reg, model_clf, model_xgb):
             "ensemble_reg": f"{profile.lower()}_ensemble_reg.pkl",
         },
     }
+    if data_cutoff is not None:
+        # Ultima chegada vista no treino (base do retreino incremental)
+        artifacts["data_cutoff"] = pd.Timestamp(data_cutoff).isoformat()
+    if getattr(model_clf, "cortes_espera_", None) is not None:
+        artifacts["cortes_classe"] = model_clf.cortes_espera_
+    if dados is not None:
+        # Histogramas de referencia para o monitor de drift do serving
+        artifacts["drift_referencia"] = referencia_features(dados, features, ignorar=LGB_CAT_FEATURES)
+    if extra:
+        artifacts.update(extra)
     with (output_dir / artifacts["artifacts"]["lgb_reg"]).open("wb") as f:
         pickle.dump(model_reg, f)
     with (output_dir / artifacts["artifacts"]["lgb_clf"]).open("wb") as f:
@@ -1473,16 +1558,18 @@ def main():
             print("=" * 70)
             df_final, features, target = preparar_dados()
             model_reg, _ = treinar_modelo(df_final, features, target)
-            model_xgb = treinar_modelo_xgboost(df_final, features, target, model_reg=model_reg)
+            model_xgb = treinar_modelo_xgboost(df_final, features, target, model_reg=model_reg, profile=PROFILE)
             model_clf = treinar_classificador(df_final, features, target)
-            salvar_modelos(PROFILE, features, target, model_reg, model_clf, model_xgb)
+            salvar_modelos(PROFILE, features, target, model_reg, model_clf, model_xgb,
+                           data_cutoff=df_final['data_chegada_dt'].max(), dados=df_final)
     else:
         df_final, features, target = preparar_dados()
         model_reg, _ = treinar_modelo(df_final, features, target)
         model_xgb = treinar_modelo_xgboost(df_final, features, target, model_reg=model_reg)
         model_clf = treinar_classificador(df_final, features, target)
         profile_name = globals().get("PROFILE", "default")
-        salvar_modelos(profile_name, features, target, model_reg, model_clf, model_xgb)
+        salvar_modelos(profile_name, features, target, model_reg, model_clf, model_xgb,
+                       data_cutoff=df_final['data_chegada_dt'].max(), dados=df_final)
     print("=" * 70)
     print("PIPELINE COMPLETO EXECUTADO COM SUCESSO")
     print("=" * 70)
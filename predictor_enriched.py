@@ -25,6 +25,10 @@ import pandas as pd
 import requests
 from sklearn.preprocessing import LabelEncoder
 
+from climatologia import clima_fallback
+from historico_lineup import HistoricoLineup, linha_estatistica
+from taxonomia_carga import SH4_DESCONHECIDO, classificar_texto
+
 warnings.filterwarnings("ignore")
 
 # ============================================================================
@@ -131,19 +135,20 @@ class EnrichedPredictor:
     Enriquece automaticamente os dados do scraping com features calculadas:
     - Clima (API Open-Meteo gratuita)
     - Safra e preços (tabelas pré-carregadas)
-    - Fila histórica (lineup_history.parquet)
+    - Fila histórica (historico particionado de lineup_history.parquet)
     - Features AIS estimadas (médias)
     """
 
     def __init__(self):
         """Inicializa o preditor carregando modelos e dados históricos."""
         self.models = self._load_models()
-        self.lineup_history = self._load_lineup_history()
+        self.historico = self._load_lineup_history()
+        self.estatisticas_historico = self.historico.estatisticas()
         self.porto_stats = self._calculate_porto_stats()
 
         print(Colors.success("[OK] EnrichedPredictor inicializado com sucesso"))
         print(Colors.info(f"   Modelos carregados: {list(self.models.keys())}"))
-        print(Colors.info(f"   Historico de lineups: {len(self.lineup_history)} registros"))
+        print(Colors.info(f"   Historico de lineups: {len(self.historico)} registros"))
 
     def _load_models(self) -> Dict:
         """Carrega modelos completos e light para cada perfil."""
@@ -188,48 +193,27 @@ class EnrichedPredictor:
 
         return models
 
-    def _load_lineup_history(self) -> pd.DataFrame:
-        """Carrega histórico de lineups (se existir)."""
-        if LINEUP_HISTORY.exists():
-            try:
-                df = pd.read_parquet(LINEUP_HISTORY)
-                if 'prev_chegada' in df.columns:
-                    # Tentar converter para datetime, ignorar erros
-                    df['prev_chegada'] = pd.to_datetime(df['prev_chegada'], errors='coerce')
-                # Renomear 'porto' para 'nome_porto' se necessário
-                if 'porto' in df.columns and 'nome_porto' not in df.columns:
-                    df['nome_porto'] = df['porto']
-                return df
-            except Exception as e:
-                print(Colors.warning(f"[AVISO] Erro ao carregar lineup_history.parquet: {e}"))
-                return pd.DataFrame()
-        else:
-            # Retornar DataFrame vazio se não existir
-            return pd.DataFrame()
+    def _load_lineup_history(self) -> HistoricoLineup:
+        """Historico de lineups particionado por porto (importa o parquet se mudou)."""
+        historico = HistoricoLineup()
+        try:
+            historico.sincronizar(LINEUP_HISTORY)
+        except Exception as e:
+            print(Colors.warning(f"[AVISO] Erro ao carregar lineup_history.parquet: {e}"))
+        return historico
 
     def _calculate_porto_stats(self) -> Dict:
-        """Calcula estatísticas históricas por porto."""
+        """Estatísticas históricas por porto (tabela pré-calculada do histórico)."""
         stats = {}
 
         try:
-            if len(self.lineup_history) > 0 and 'nome_porto' in self.lineup_history.columns:
-                for porto in PORTOS.keys():
-                    porto_data = self.lineup_history[
-                        self.lineup_history['nome_porto'] == porto
-                    ]
-
-                    if len(porto_data) > 0 and 'tempo_espera_horas' in porto_data.columns:
-                        tempo_medio = porto_data["tempo_espera_horas"].mean()
-                        stats[porto] = {
-                            "tempo_medio": tempo_medio if not pd.isna(tempo_medio) else 48.0,
-                            "count": len(porto_data),
-                        }
-                    else:
-                        stats[porto] = {"tempo_medio": 48.0, "count": 0}
-            else:
-                # Valores default
-                for porto in PORTOS.keys():
-                    stats[porto] = {"tempo_medio": 48.0, "count": 0}
+            for porto in PORTOS.keys():
+                linha = linha_estatistica(self.estatisticas_historico, porto)
+                tempo_medio = linha["espera_media_h"] if linha is not None else np.nan
+                stats[porto] = {
+                    "tempo_medio": tempo_medio if not pd.isna(tempo_medio) else 48.0,
+                    "count": int(linha["registros"]) if linha is not None and not pd.isna(tempo_medio) else 0,
+                }
         except Exception as e:
             print(Colors.warning(f"[AVISO] Erro ao calcular estatisticas de portos: {e}"))
             # Valores default em caso de erro
@@ -274,26 +258,16 @@ class EnrichedPredictor:
             }
 
         except Exception as e:
-            print(Colors.warning(f"[AVISO] Erro ao buscar clima: {e}. Usando valores medios."))
-            # Fallback: usar médias regionais
-            regiao = coords["regiao"]
-            mes = data.month
-
-            # Médias regionais (valores aproximados)
-            clima_medio = {
-                "SUDESTE": {1: {"temp": 26.5, "precip": 250, "vento": 15, "umidade": 78}},
-                "SUL": {1: {"temp": 24.5, "precip": 140, "vento": 18, "umidade": 75}},
-                "NORDESTE": {1: {"temp": 28.5, "precip": 80, "vento": 20, "umidade": 72}},
-            }
-
-            # Usar valores do mês (ou janeiro como fallback)
-            clima = clima_medio.get(regiao, clima_medio["SUDESTE"]).get(mes, clima_medio["SUDESTE"][1])
+            print(Colors.warning(f"[AVISO] Erro ao buscar clima: {e}. Usando climatologia."))
+            # Fallback: climatologia do porto para o dia do ano (sem rede)
+            clima = clima_fallback(porto, data)
 
             return {
-                "temp": clima["temp"],
-                "precip": clima["precip"],
-                "vento": clima["vento"],
-                "umidade": clima["umidade"],
+                "temp": clima["temp_media_dia"],
+                "precip": clima["precipitacao_dia"],
+                # Open-Meteo devolve o vento maximo diario em km/h
+                "vento": clima["vento_velocidade_max_dia"] * 3.6,
+                "umidade": clima["umidade_media_dia"],
             }
 
     def estimate_fila_historica(self, porto: str, data: datetime) -> int:
@@ -308,29 +282,13 @@ class EnrichedPredictor:
             Número estimado de navios na fila (últimos 7 dias)
         """
         try:
-            if len(self.lineup_history) == 0 or 'nome_porto' not in self.lineup_history.columns:
-                # Default: 3 navios
+            # Media de chegadas por dia do porto no mesmo mes (tabela pré-calculada)
+            linha = linha_estatistica(self.estatisticas_historico, porto, mes=data.month)
+            if linha is None or pd.isna(linha["chegadas_por_dia"]):
                 return 3
 
-            # Filtrar lineups do mesmo porto e mês
-            porto_data = self.lineup_history[
-                (self.lineup_history['nome_porto'] == porto) &
-                (self.lineup_history['prev_chegada'].notna()) &
-                (self.lineup_history['prev_chegada'].dt.month == data.month)
-            ]
-
-            if len(porto_data) == 0:
-                return 3
-
-            # Contar navios por dia e calcular média
-            navios_por_dia = porto_data.groupby(
-                porto_data['prev_chegada'].dt.date
-            ).size()
-
-            media_diaria = navios_por_dia.mean()
-
             # Estimar fila de 7 dias
-            fila_7d = int(media_diaria * 7) if not pd.isna(media_diaria) else 3
+            fila_7d = int(linha["chegadas_por_dia"] * 7)
 
             return max(1, min(fila_7d, 20))  # Entre 1 e 20 navios
 
@@ -351,21 +309,15 @@ class EnrichedPredictor:
             "VEGETAL", "MINERAL" ou "FERTILIZANTE"
         """
         tipo_lower = tipo_navio.lower() if tipo_navio else ""
-        carga_lower = natureza_carga.lower() if natureza_carga else ""
 
         # Tankers geralmente são fertilizantes/químicos
         if "tanker" in tipo_lower or "chemical" in tipo_lower:
             return "FERTILIZANTE"
 
-        # Verificar pela carga
-        if any(x in carga_lower for x in ["soja", "milho", "farelo", "acucar", "trigo", "cevada"]):
-            return "VEGETAL"
-
-        if any(x in carga_lower for x in ["minerio", "bauxita", "manganes", "ferro", "cimento"]):
-            return "MINERAL"
-
-        if any(x in carga_lower for x in ["ureia", "kcl", "npk", "fosfato", "fertil"]):
-            return "FERTILIZANTE"
+        # Verificar pela carga (taxonomia de mercadorias)
+        perfil, sh4, _ = classificar_texto(natureza_carga)
+        if sh4 != SH4_DESCONHECIDO:
+            return perfil
 
         # Inferir pelo porto + tipo
         if "bulk" in tipo_lower or "cargo" in tipo_lower:
@@ -415,8 +367,9 @@ class EnrichedPredictor:
         features["tipo_navegacao"] = "Longo Curso"
         features["tipo_carga"] = "Granel"
         features["natureza_carga"] = natureza_carga
-        features["cdmercadoria"] = "1201"  # Mock
-        features["stsh4"] = "1201"
+        _, sh4, _ = classificar_texto(natureza_carga)
+        features["cdmercadoria"] = sh4
+        features["stsh4"] = sh4
         features["movimentacao_total_toneladas"] = toneladas
 
         # ===== FEATURES TEMPORAIS =====
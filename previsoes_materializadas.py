@@ -0,0 +1,208 @@
+"""
+Armazem versionado de previsoes materializadas por porto.
+
+O worker (pipelines/materializar_previsoes.py) roda periodicamente a
+previsao de todos os portos com line-up e grava uma versao nova:
+- v<AAAAmmddTHHMMSS>/porto=<CHAVE>.parquet: previsoes do line-up do porto;
+- v<...>/nacional.parquet: agregado nacional (uma linha por porto);
+- v<...>/manifesto.json: data de referencia e, por porto, impressao do
+  line-up usado, modo, status das APIs e relatorios de qualidade.
+
+atual.json aponta para a ultima versao completa e so e trocado (os.replace)
+depois que todos os arquivos da versao foram gravados: o app nunca le uma
+versao pela metade. As versoes mais antigas que MANTER_VERSOES sao apagadas.
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pipeline_cache import hash_dataframe
+from registro_portos import normalizar_texto, registro
+
+PREVISOES_DIR = Path("data/previsoes")
+ARQUIVO_ATUAL = "atual.json"
+ARQUIVO_MANIFESTO = "manifesto.json"
+ARQUIVO_NACIONAL = "nacional.parquet"
+MANTER_VERSOES = 5
+COLUNAS_NACIONAL = [
+    "porto_norm", "porto", "navios", "espera_mediana_h", "espera_p25_h",
+    "espera_p75_h", "atraso_mediano_h", "proxima_atracacao", "modo",
+]
+
+
+def chave_porto(porto_nome):
+    return registro().chave(registro().id(porto_nome)) or normalizar_texto(porto_nome)
+
+
+def impressao_lineup(df_lineup):
+    """Hash do conteudo do line-up (as previsoes so valem para o mesmo line-up)."""
+    if df_lineup is None or df_lineup.empty:
+        return ""
+    return hash_dataframe(df_lineup)
+
+
+def _para_parquet(df):
+    # Colunas object mistas (texto + numero) nao tem esquema parquet
+    return df.astype({c: "str" for c in df.columns if df[c].dtype == object})
+
+
+def agregado_nacional(previsoes):
+    """
+    Uma linha por porto a partir de {chave: (nome, df_pred, modo)}: navios,
+    espera prevista (mediana, p25, p75), atraso mediano vs ETA e proxima atracacao.
+    """
+    linhas = []
+    for chave, (nome, df_pred, modo) in sorted(previsoes.items()):
+        espera = (
+            pd.to_numeric(df_pred["tempo_espera_previsto_horas"], errors="coerce").dropna()
+            if "tempo_espera_previsto_horas" in df_pred.columns
+            else pd.Series(dtype=float)
+        )
+        eta = pd.to_datetime(df_pred["eta_mais_espera"], errors="coerce") if "eta_mais_espera" in df_pred.columns else None
+        atraso = pd.Series(dtype=float)
+        if eta is not None and "data_chegada_dt" in df_pred.columns:
+            atraso = ((eta - df_pred["data_chegada_dt"]).dt.total_seconds() / 3600).dropna()
+        q25, q50, q75 = espera.quantile([0.25, 0.5, 0.75]) if not espera.empty else (np.nan,) * 3
+        linhas.append({
+            "porto_norm": chave,
+            "porto": nome,
+            "navios": int(len(df_pred)),
+            "espera_mediana_h": float(q50),
+            "espera_p25_h": float(q25),
+            "espera_p75_h": float(q75),
+            "atraso_mediano_h": float(atraso.median()) if not atraso.empty else np.nan,
+            "proxima_atracacao": eta.min() if eta is not None else pd.NaT,
+            "modo": modo,
+        })
+    nacional = pd.DataFrame(linhas, columns=COLUNAS_NACIONAL)
+    nacional["proxima_atracacao"] = pd.to_datetime(nacional["proxima_atracacao"])
+    return nacional
+
+
+class VersaoPrevisoes:
+    """Escrita de uma versao; so fica visivel no armazem apos publicar()."""
+
+    def __init__(self, armazem, data_referencia, gerada_em=None):
+        self.armazem = armazem
+        self.gerada_em = pd.Timestamp(gerada_em or datetime.now()).floor("s")
+        self.nome = f"v{self.gerada_em:%Y%m%dT%H%M%S}"
+        self.diretorio = armazem.destino / self.nome
+        self.manifesto = {
+            "versao": self.nome,
+            "gerada_em": self.gerada_em.isoformat(),
+            "data_referencia": str(pd.Timestamp(data_referencia).date()),
+            "portos": {},
+        }
+        self._previsoes = {}
+
+    def gravar(self, porto_nome, df_pred, df_lineup=None, info=None):
+        """Grava as previsoes do porto; info (JSON) guarda modo, status das APIs, qualidade."""
+        chave = chave_porto(porto_nome)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        _para_parquet(df_pred).to_parquet(self.diretorio / f"porto={chave}.parquet", index=False)
+        info = dict(info or {})
+        self.manifesto["portos"][chave] = {
+            "porto": porto_nome,
+            "linhas": int(len(df_pred)),
+            "impressao_lineup": impressao_lineup(df_lineup),
+            **info,
+        }
+        self._previsoes[chave] = (porto_nome, df_pred, info.get("modo", "BASIC"))
+
+    def publicar(self):
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        agregado_nacional(self._previsoes).to_parquet(self.diretorio / ARQUIVO_NACIONAL, index=False)
+        with (self.diretorio / ARQUIVO_MANIFESTO).open("w", encoding="utf-8") as fh:
+            json.dump(self.manifesto, fh, indent=2, ensure_ascii=False, default=str)
+        temporario = self.armazem.destino / f".{ARQUIVO_ATUAL}.tmp"
+        with temporario.open("w", encoding="utf-8") as fh:
+            json.dump({"versao": self.nome}, fh)
+        os.replace(temporario, self.armazem.destino / ARQUIVO_ATUAL)
+        self.armazem.podar()
+        return self.nome
+
+
+class ArmazemPrevisoes:
+    """Leitura das previsoes da versao publicada e criacao de novas versoes."""
+
+    def __init__(self, destino=PREVISOES_DIR, manter=MANTER_VERSOES):
+        self.destino = Path(destino)
+        self.manter = manter
+
+    def nova_versao(self, data_referencia, gerada_em=None):
+        return VersaoPrevisoes(self, data_referencia, gerada_em)
+
+    def versoes(self):
+        if not self.destino.exists():
+            return []
+        return sorted(p.name for p in self.destino.glob("v*") if (p / ARQUIVO_MANIFESTO).exists())
+
+    def versao_atual(self):
+        """Nome da versao publicada ou None."""
+        caminho = self.destino / ARQUIVO_ATUAL
+        if not caminho.exists():
+            return None
+        with caminho.open("r", encoding="utf-8") as fh:
+            return json.load(fh).get("versao")
+
+    def manifesto(self, versao=None):
+        versao = versao or self.versao_atual()
+        caminho = self.destino / str(versao) / ARQUIVO_MANIFESTO
+        if not versao or not caminho.exists():
+            return None
+        with caminho.open("r", encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def ler(self, porto_nome, versao=None):
+        """(df_pred, info do porto, manifesto) da versao, ou (None, None, manifesto) sem o porto."""
+        manifesto = self.manifesto(versao)
+        if manifesto is None:
+            return None, None, None
+        chave = chave_porto(porto_nome)
+        info = manifesto["portos"].get(chave)
+        caminho = self.destino / manifesto["versao"] / f"porto={chave}.parquet"
+        if info is None or not caminho.exists():
+            return None, None, manifesto
+        return pd.read_parquet(caminho), info, manifesto
+
+    def nacional(self, versao=None):
+        """Agregado nacional da versao (DataFrame vazio se nao houver versao)."""
+        manifesto = self.manifesto(versao)
+        if manifesto is None:
+            return pd.DataFrame(columns=COLUNAS_NACIONAL)
+        return pd.read_parquet(self.destino / manifesto["versao"] / ARQUIVO_NACIONAL)
+
+    def podar(self):
+        atual = self.versao_atual()
+        versoes = self.versoes()
+        antigas = [v for v in versoes if v != atual][: max(0, len(versoes) - self.manter)]
+        for versao in antigas:
+            shutil.rmtree(self.destino / versao, ignore_errors=True)
+
+
+def materializar(portos, prever, armazem=None, data_referencia=None):
+    """
+    Roda prever(porto) -> (df_lineup, df_pred, info) para cada porto e publica uma versao.
+
+    Falha num porto nao derruba a versao: o erro fica no manifesto. Devolve o nome da versao.
+    """
+    armazem = armazem or ArmazemPrevisoes()
+    data_referencia = data_referencia or datetime.today()
+    versao = armazem.nova_versao(data_referencia)
+    erros = {}
+    for porto in portos:
+        try:
+            df_lineup, df_pred, info = prever(porto)
+        except Exception as exc:
+            erros[porto] = str(exc)
+            continue
+        if df_pred is not None and not df_pred.empty:
+            versao.gravar(porto, df_pred, df_lineup=df_lineup, info=info)
+    versao.manifesto["erros"] = erros
+    return versao.publicar()
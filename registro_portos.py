@@ -0,0 +1,334 @@
+"""
+Registro canonico de portos com IDs inteiros.
+
+Cada porto tem um ID inteiro estavel (ordem de PORTOS, depois as linhas
+novas de data/ports_config.csv) e carrega coordenadas, geocerca, arquivo de
+mare, municipio/UF (estacao INMET) e tempo de espera padrao. Qualquer alias
+(nome ANTAQ, nome AIS de data/port_mapping.csv, "Porto de X (UF)", chaves
+com underscore) resolve para o ID por um dicionario.
+
+Nomes fora do registro recebem IDs dinamicos (a partir de len(portos)) pela
+chave normalizada, validos so no processo: servem para joins, nao devem ser
+persistidos. Joins usam registro().ids(serie), que normaliza apenas os
+valores unicos da serie.
+"""
+
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+PORTS_CONFIG_PATH = Path("data/ports_config.csv")
+PORT_MAPPING_PATH = Path("data/port_mapping.csv")
+ID_DESCONHECIDO = -1
+
+UF_CODES = {
+    "AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES", "GO", "MA",
+    "MT", "MS", "MG", "PA", "PB", "PR", "PE", "PI", "RJ", "RN",
+    "RS", "RO", "RR", "SC", "SP", "SE", "TO",
+}
+
+# chave: nome, uf, municipio, lat, lon, [geocerca, arquivo_mare, espera_padrao_h, aliases]
+# geocerca = (lat_min, lat_max, lon_min, lon_max) da area de atracacao
+PORTOS = {
+    "ITAQUI": {
+        "nome": "Itaqui", "uf": "MA", "municipio": "SAO LUIS", "lat": -2.5900, "lon": -44.3600,
+        "geocerca": (-2.65, -2.50, -44.45, -44.28),
+        "arquivo_mare": "itaqui_extremos_2020_2026.csv", "espera_padrao_h": 36.0,
+        "aliases": ("SAOLUIS",),
+    },
+    "PONTADAMADEIRA": {
+        "nome": "Ponta da Madeira", "uf": "MA", "municipio": "SAO LUIS", "lat": -2.5700, "lon": -44.3500,
+        "espera_padrao_h": 24.0,
+    },
+    "SANTOS": {
+        "nome": "Santos", "uf": "SP", "municipio": "SANTOS", "lat": -23.9600, "lon": -46.3000,
+        "geocerca": (-24.05, -23.85, -46.45, -46.22),
+        "arquivo_mare": "santos_extremos_2020_2026.csv", "espera_padrao_h": 48.0,
+    },
+    "PARANAGUA": {
+        "nome": "Paranaguá", "uf": "PR", "municipio": "PARANAGUA", "lat": -25.5160, "lon": -48.5220,
+        "geocerca": (-25.60, -25.43, -48.60, -48.42),
+        "arquivo_mare": "paranagua_extremos_2020_2026.csv", "espera_padrao_h": 72.0,
+        "aliases": ("PARANAGUAANTONINA",),
+    },
+    "ANTONINA": {
+        "nome": "Antonina", "uf": "PR", "municipio": "ANTONINA", "lat": -25.4300, "lon": -48.7100,
+        "arquivo_mare": "antonina_extremos_2020_2026.csv", "espera_padrao_h": 60.0,
+    },
+    "RIOGRANDE": {
+        "nome": "Rio Grande", "uf": "RS", "municipio": "RIO GRANDE", "lat": -32.0350, "lon": -52.0980,
+        "geocerca": (-32.15, -31.92, -52.20, -52.00),
+        "arquivo_mare": "riograande_extremos_2020_2026.csv", "espera_padrao_h": 48.0,
+    },
+    "SAOFRANCISCODOSUL": {
+        "nome": "São Francisco do Sul", "uf": "SC", "municipio": "SAO FRANCISCO DO SUL",
+        "lat": -26.2400, "lon": -48.6350, "espera_padrao_h": 60.0,
+        "aliases": ("SAOFRANCISCO",),
+    },
+    "ITAJAI": {
+        "nome": "Itajaí", "uf": "SC", "municipio": "ITAJAI", "lat": -26.9000, "lon": -48.6600,
+    },
+    "IMBITUBA": {
+        "nome": "Imbituba", "uf": "SC", "municipio": "IMBITUBA", "lat": -28.2300, "lon": -48.6500,
+        "espera_padrao_h": 48.0,
+    },
+    "PORTOALEGRE": {
+        "nome": "Porto Alegre", "uf": "RS", "municipio": "PORTO ALEGRE", "lat": -30.0200, "lon": -51.2200,
+    },
+    "VITORIA": {
+        "nome": "Vitória", "uf": "ES", "municipio": "VITORIA", "lat": -20.3200, "lon": -40.2900,
+        "geocerca": (-20.40, -20.24, -40.43, -40.24), "espera_padrao_h": 48.0,
+    },
+    "SALVADOR": {
+        "nome": "Salvador", "uf": "BA", "municipio": "SALVADOR", "lat": -12.9700, "lon": -38.5100,
+        "arquivo_mare": "salvador_extremos_2020_2026.csv", "espera_padrao_h": 60.0,
+    },
+    "ARATU": {
+        "nome": "Aratu", "uf": "BA", "municipio": "CANDEIAS", "lat": -12.7900, "lon": -38.4900,
+        "espera_padrao_h": 60.0, "aliases": ("ARATUCANDEIAS",),
+    },
+    "ILHEUS": {
+        "nome": "Ilhéus", "uf": "BA", "municipio": "ILHEUS", "lat": -14.7800, "lon": -39.0300,
+        "espera_padrao_h": 48.0,
+    },
+    "SUAPE": {
+        "nome": "Suape", "uf": "PE", "municipio": "IPOJUCA", "lat": -8.3900, "lon": -34.9600,
+        "arquivo_mare": "suape_extremos_2020_2026.csv", "espera_padrao_h": 72.0,
+    },
+    "RECIFE": {
+        "nome": "Recife", "uf": "PE", "municipio": "RECIFE", "lat": -8.0500, "lon": -34.8700,
+        "arquivo_mare": "recife_extremos_2020_2026.csv", "espera_padrao_h": 60.0,
+    },
+    "MACEIO": {
+        "nome": "Maceió", "uf": "AL", "municipio": "MACEIO", "lat": -9.6800, "lon": -35.7300,
+        "espera_padrao_h": 48.0,
+    },
+    "CABEDELO": {
+        "nome": "Cabedelo", "uf": "PB", "municipio": "CABEDELO", "lat": -6.9700, "lon": -34.8400,
+        "espera_padrao_h": 48.0,
+    },
+    "NATAL": {
+        "nome": "Natal", "uf": "RN", "municipio": "NATAL", "lat": -5.7800, "lon": -35.2000,
+        "espera_padrao_h": 48.0,
+    },
+    "PECEM": {
+        "nome": "Pecém", "uf": "CE", "municipio": "SAO GONCALO DO AMARANTE", "lat": -3.5400, "lon": -38.8100,
+        "arquivo_mare": "pecem_extremos_2020_2026.csv", "espera_padrao_h": 48.0,
+    },
+    "FORTALEZA": {
+        "nome": "Fortaleza", "uf": "CE", "municipio": "FORTALEZA", "lat": -3.7100, "lon": -38.4800,
+        "espera_padrao_h": 48.0, "aliases": ("MUCURIPE",),
+    },
+    "BARCARENA": {
+        "nome": "Barcarena", "uf": "PA", "municipio": "BARCARENA", "lat": -1.5100, "lon": -48.6200,
+        "arquivo_mare": "barcarena_extremos_2020_2026.csv", "espera_padrao_h": 60.0,
+    },
+    "VILADOCONDE": {
+        "nome": "Vila do Conde", "uf": "PA", "municipio": "BARCARENA", "lat": -1.5500, "lon": -48.7500,
+        "arquivo_mare": "viladoconde_extremos_2020_2026.csv", "espera_padrao_h": 60.0,
+    },
+    "SANTAREM": {
+        "nome": "Santarém", "uf": "PA", "municipio": "SANTAREM", "lat": -2.4400, "lon": -54.7100,
+    },
+}
+
+
+@dataclass(frozen=True)
+class Porto:
+    id: int
+    chave: str
+    nome: str
+    uf: str = ""
+    municipio: str = ""
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    raio_km: Optional[float] = None
+    geocerca: Optional[Tuple[float, float, float, float]] = None
+    arquivo_mare: Optional[str] = None
+    estacao_inmet: Optional[str] = None
+    espera_padrao_h: Optional[float] = None
+    aliases: Tuple[str, ...] = field(default=())
+
+
+def normalizar_texto(valor):
+    """Maiusculas, sem acentos e so alfanumericos."""
+    if not isinstance(valor, str) and pd.isna(valor):
+        return ""
+    texto = str(valor).upper()
+    texto = "".join(ch for ch in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(ch))
+    return re.sub(r"[^A-Z0-9]", "", texto)
+
+
+def _sem_prefixo(norm):
+    for prefixo in ("PORTODE", "PORTODO", "PORTO"):
+        if norm.startswith(prefixo):
+            return norm[len(prefixo):]
+    return norm
+
+
+def normalizar_porto(nome):
+    """Chave de porto sem prefixo 'Porto de' e sem UF ('Porto de Santos (SP)' -> 'SANTOS').
+
+    Qualificadores entre parenteses no fim ('Rio Grande (Tecon)') sao
+    descartados. A UF so e removida se colada num nome longo ('BarcarenaPA'),
+    para nao cortar nomes como 'Suape'.
+    """
+    if not isinstance(nome, str) and pd.isna(nome):
+        return ""
+    norm = _sem_prefixo(normalizar_texto(re.sub(r"\([^)]*\)\s*$", "", str(nome))))
+    if len(norm) > 6 and norm[-2:] in UF_CODES:
+        candidato = norm[:-2]
+        if len(candidato) >= 3:
+            norm = candidato
+    return norm
+
+
+class RegistroPortos:
+    """Resolve aliases de porto para IDs inteiros e atributos do porto."""
+
+    def __init__(self, portos):
+        self.portos = list(portos)
+        self._por_alias = {}
+        for porto in self.portos:
+            for alias in (porto.chave, *porto.aliases):
+                self._por_alias.setdefault(normalizar_texto(alias), porto.id)
+        self._dinamicos = {}
+        self._chaves_dinamicas = []
+        self._trava = threading.Lock()
+
+    def __len__(self):
+        return len(self.portos)
+
+    def id(self, nome):
+        """ID do porto (alias conhecido ou ID dinamico); -1 para nome vazio."""
+        norm = normalizar_texto(nome)
+        if not norm:
+            return ID_DESCONHECIDO
+        encontrado = self._por_alias.get(norm)
+        if encontrado is None:
+            encontrado = self._por_alias.get(_sem_prefixo(norm))
+        if encontrado is None:
+            chave = normalizar_porto(nome)
+            encontrado = self._por_alias.get(chave)
+            if encontrado is None:
+                encontrado = self._dinamicos.get(norm)
+                if encontrado is None:
+                    encontrado = self._registrar(chave or norm, norm)
+        return encontrado
+
+    def _registrar(self, chave, norm):
+        with self._trava:
+            novo = self._dinamicos.get(chave)
+            if novo is None:
+                novo = len(self.portos) + len(self._chaves_dinamicas)
+                self._chaves_dinamicas.append(chave)
+                self._dinamicos[chave] = novo
+            self._dinamicos.setdefault(norm, novo)
+        return novo
+
+    def ids(self, serie):
+        """IDs (int64) para uma serie de nomes, normalizando so os valores unicos."""
+        serie = pd.Series(serie)
+        codigos, unicos = pd.factorize(serie.to_numpy())
+        resolvidos = np.array([self.id(v) for v in unicos] + [ID_DESCONHECIDO], dtype=np.int64)
+        return resolvidos[codigos]
+
+    def porto(self, nome_ou_id):
+        """Porto do registro (por nome ou ID) ou None para nomes fora do registro."""
+        pid = nome_ou_id if isinstance(nome_ou_id, (int, np.integer)) else self.id(nome_ou_id)
+        return self.portos[pid] if 0 <= pid < len(self.portos) else None
+
+    def chave(self, pid):
+        """Chave textual do ID (canonica ou a chave dinamica)."""
+        if 0 <= pid < len(self.portos):
+            return self.portos[pid].chave
+        dinamico = pid - len(self.portos)
+        return self._chaves_dinamicas[dinamico] if 0 <= dinamico < len(self._chaves_dinamicas) else ""
+
+    def chaves(self, serie):
+        """Chave canonica para cada nome da serie."""
+        ids = self.ids(serie)
+        unicos, inverso = np.unique(ids, return_inverse=True)
+        return np.array([self.chave(int(i)) for i in unicos], dtype=object)[inverso]
+
+    def atributo(self, ids, campo, padrao=None):
+        """Atributo do porto para um vetor de IDs (padrao para IDs fora do registro)."""
+        valores = np.array([getattr(p, campo) for p in self.portos] + [padrao], dtype=object)
+        ids = np.asarray(ids)
+        return valores[np.where((ids >= 0) & (ids < len(self.portos)), ids, len(self.portos))]
+
+
+def _portos_base(ports_config=PORTS_CONFIG_PATH, port_mapping=PORT_MAPPING_PATH):
+    registros = {chave: dict(info, aliases=list(info.get("aliases", ()))) for chave, info in PORTOS.items()}
+    por_alias = {}
+    for chave, info in registros.items():
+        for alias in (chave, normalizar_texto(info["nome"]), *info["aliases"]):
+            por_alias.setdefault(normalizar_texto(alias), chave)
+
+    def _localizar(*nomes):
+        for nome in nomes:
+            norm = normalizar_texto(nome)
+            chave = por_alias.get(norm) or por_alias.get(_sem_prefixo(norm)) or por_alias.get(normalizar_porto(nome))
+            if chave:
+                return chave
+        return None
+
+    ports_config = Path(ports_config)
+    if ports_config.exists():
+        for linha in pd.read_csv(ports_config).to_dict("records"):
+            nomes = [linha.get(c) for c in ("antaq_port_name", "port_name", "port_key") if pd.notna(linha.get(c))]
+            chave = _localizar(*nomes)
+            if chave is None:
+                chave = normalizar_porto(nomes[0]) if nomes else ""
+                if not chave:
+                    continue
+                registros[chave] = {"nome": linha.get("port_name") or chave, "uf": "", "municipio": "", "aliases": []}
+            info = registros[chave]
+            for campo, coluna in (("lat", "lat"), ("lon", "lon"), ("raio_km", "radius_km")):
+                if pd.notna(linha.get(coluna)):
+                    info[campo] = float(linha[coluna])
+            if pd.notna(linha.get("inmet_station")):
+                info["estacao_inmet"] = str(linha["inmet_station"])
+            info["aliases"].extend(nomes)
+            for nome in nomes:
+                por_alias.setdefault(normalizar_texto(nome), chave)
+
+    port_mapping = Path(port_mapping)
+    if port_mapping.exists():
+        mapa = pd.read_csv(port_mapping).dropna(subset=["portname", "nome_porto_antaq"])
+        for ais, antaq in zip(mapa["portname"], mapa["nome_porto_antaq"]):
+            chave = _localizar(antaq, ais)
+            if chave:
+                registros[chave]["aliases"].extend([ais, antaq])
+
+    return [
+        Porto(
+            id=i,
+            chave=chave,
+            nome=info["nome"],
+            uf=info.get("uf", ""),
+            municipio=info.get("municipio", ""),
+            lat=info.get("lat"),
+            lon=info.get("lon"),
+            raio_km=info.get("raio_km"),
+            geocerca=info.get("geocerca"),
+            arquivo_mare=info.get("arquivo_mare"),
+            estacao_inmet=info.get("estacao_inmet"),
+            espera_padrao_h=info.get("espera_padrao_h"),
+            aliases=tuple(dict.fromkeys(normalizar_texto(a) for a in (info["nome"], *info["aliases"]))),
+        )
+        for i, (chave, info) in enumerate(registros.items())
+    ]
+
+
+@lru_cache(maxsize=1)
+def registro():
+    """Registro de portos carregado uma vez por processo."""
+    return RegistroPortos(_portos_base())
@@ -1,83 +1,42 @@
-import requests
 import pandas as pd
-from bs4 import BeautifulSoup
 from datetime import datetime
-import hashlib
-import re
-import time
-import urllib3
-from io import StringIO
-import unicodedata
 
-# Suprime avisos de SSL se necessÃ¡rio (sites governamentais Ã s vezes tÃªm certificados estranhos)
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from coleta_lineup import ApemItaqui, BuscadorCondicional, CicloColeta, EmapItaqui
+from log_lineup import LogLineup
 
 class ItaquiMonitor:
     def __init__(self):
         self.emap_base_url = "https://www.portodoitaqui.com"
-        self.emap_endpoint = f"{self.emap_base_url}/porto-agora/navios/esperados"
         self.apem_endpoint = "http://www.apem-ma.com.br/?module=berthedships"
-        
-        # User-Agent robusto para evitar bloqueios simples
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8"
-        }
+
+        # Adaptadores do framework de coleta (parse das paginas) e ciclo da execucao
+        self.emap = EmapItaqui(self.emap_base_url)
+        self.apem = ApemItaqui(self.apem_endpoint)
+        self.ciclo = None
 
     def _get_timestamp(self):
         """Retorna timestamp atual string para logs."""
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    def _clean_column_name(self, col_name):
-        """Padroniza nomes de colunas (lowercase, sem espacos)."""
-        base = str(col_name).strip().lower().replace(' ', '_').replace('/', '_').replace('.', '')
-        base = ''.join(
-            ch for ch in unicodedata.normalize('NFKD', base)
-            if not unicodedata.combining(ch)
-        )
-        return base
-
-    def _normalize_ship_name(self, name):
-        """
-        Normaliza nomes de navios para facilitar o cruzamento (JOIN).
-        Remove espaÃ§os extras, transforma em maiÃºsculas e remove caracteres especiais comuns.
-        Ex: ' MV. BLUE FIN ' -> 'BLUEFIN'
-        """
-        if pd.isna(name): return ""
-        clean = str(name).upper().strip()
-        clean = re.sub(r'[^A-Z0-9]', '', clean) # MantÃ©m apenas letras e nÃºmeros
-        return clean
-
     # ---------------------------------------------------------
     # MÃDULO 1: EMAP (Porto do Itaqui Oficial)
     # ---------------------------------------------------------
+    def _ciclo(self):
+        """Ciclo de coleta da execucao: a pagina da EMAP e buscada uma unica vez."""
+        if self.ciclo is None:
+            self.ciclo = CicloColeta(BuscadorCondicional(cache_path=None))
+        return self.ciclo
+
     def fetch_emap_data(self):
         print(f"[{self._get_timestamp()}] >>> Iniciando coleta EMAP...")
         try:
-            response = requests.get(self.emap_endpoint, headers=self.headers, verify=False, timeout=20)
-            response.raise_for_status()
-            
-            # O Pandas extrai todas as tabelas encontradas no HTML
-            dfs = pd.read_html(StringIO(response.text), flavor='bs4')
-            
-            if not dfs:
+            pagina = self._ciclo().pagina(self.emap.url, self.emap.verificar_ssl)
+            combined_df = self.emap.converter({self.emap.url: pagina.texto})
+
+            if combined_df is None:
                 print("ERRO EMAP: Nenhuma tabela encontrada na pÃ¡gina.")
                 return None
 
-            # Concatena todas as tabelas (Esperados, Atracados, Fundeados)
-            # Geralmente a estrutura de colunas Ã© similar
-            combined_df = pd.concat(dfs, ignore_index=True)
-            
-            # Limpeza de cabeÃ§alhos
-            combined_df.columns = [self._clean_column_name(c) for c in combined_df.columns]
-            
-            # Cria coluna normalizada para chave de cruzamento
-            if 'navio' in combined_df.columns:
-                combined_df['join_key'] = combined_df['navio'].apply(self._normalize_ship_name)
-            
-            combined_df['source_system'] = 'EMAP'
-            combined_df['extracted_at'] = self._get_timestamp()
-            
             print(f"[{self._get_timestamp()}] Sucesso EMAP: {len(combined_df)} registros encontrados.")
             return combined_df
 
@@ -86,36 +45,11 @@ class ItaquiMonitor:
             return None
 
     def check_emap_pdf_updates(self):
-        """Verifica se hÃ¡ novos PDFs oficiais de programaÃ§Ã£o."""
+        """Verifica se hÃ¡ novos PDFs oficiais de programaÃ§Ã£o (mesma pagina da coleta EMAP)."""
         print(f"[{self._get_timestamp()}] >>> Verificando PDFs Oficiais EMAP...")
         try:
-            response = requests.get(self.emap_endpoint, headers=self.headers, verify=False, timeout=15)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Busca links que contenham padrÃµes de data atual e palavras-chave
-            today_dia = datetime.now().strftime("%d") # Ex: 17
-            today_mes = datetime.now().strftime("%m") # Ex: 01
-            
-            # Procura links (<a>) que tenham 'mapa' e 'atrac' no href ou texto
-            # E que contenham o dia de hoje (filtro simples)
-            candidates = soup.find_all('a', href=re.compile(r'mapa.*atrac', re.IGNORECASE))
-            
-            new_files = []
-            for link in candidates:
-                txt = (link.get_text() + str(link.get('href'))).lower()
-                # Verifica se a data de hoje estÃ¡ presente (formato flexÃ­vel)
-                if today_dia in txt and today_mes in txt:
-                    full_url = link.get('href')
-                    if not full_url.startswith('http'):
-                        full_url = f"{self.emap_base_url}{full_url}" if full_url.startswith('/') else f"{self.emap_base_url}/{full_url}"
-                    
-                    new_files.append({
-                        'doc_name': link.get_text().strip(),
-                        'url': full_url,
-                        'found_at': self._get_timestamp()
-                    })
-            
-            return new_files
+            pagina = self._ciclo().pagina(self.emap.url, self.emap.verificar_ssl)
+            return self.emap.pdfs_do_dia(pagina.texto)
 
         except Exception as e:
             print(f"Erro ao verificar PDFs: {e}")
@@ -127,40 +61,15 @@ class ItaquiMonitor:
     def fetch_apem_data(self):
         print(f"[{self._get_timestamp()}] >>> Iniciando coleta APEM (PrÃ¡ticos)...")
         try:
-            # APEM Ã© HTTP puro, sem SSL
-            response = requests.get(self.apem_endpoint, headers=self.headers, timeout=15)
-            
-            # Dica: Use match='BerÃ§o' para pegar apenas tabelas que tenham essa coluna
-            # Isso filtra tabelas de layout ou menus que o pandas poderia pegar errado
-            dfs = pd.read_html(StringIO(response.text), match='Berco', flavor='bs4')
-            
-            if not dfs:
+            pagina = self._ciclo().pagina(self.apem.url, self.apem.verificar_ssl)
+            final_apem = self.apem.converter({self.apem.url: pagina.texto})
+
+            if final_apem is None:
                 print("AVISO APEM: Nenhuma tabela de navios detectada.")
                 return None
-            
-            processed_dfs = []
-            for df in dfs:
-                # Limpa colunas
-                df.columns = [self._clean_column_name(c) for c in df.columns]
-                
-                # Verifica se Ã© uma tabela de dados vÃ¡lida
-                if 'navio' in df.columns and 'berco' in df.columns:
-                    # Remove linhas sujas (cabeÃ§alhos repetidos no meio da tabela)
-                    valid_rows = df[df['navio'].notna() & (df['navio'].str.lower() != 'navio')].copy()
-                    
-                    if not valid_rows.empty:
-                        # Cria chave normalizada
-                        valid_rows['join_key'] = valid_rows['navio'].apply(self._normalize_ship_name)
-                        processed_dfs.append(valid_rows)
-            
-            if processed_dfs:
-                final_apem = pd.concat(processed_dfs, ignore_index=True)
-                final_apem['source_system'] = 'APEM'
-                final_apem['extracted_at'] = self._get_timestamp()
-                print(f"[{self._get_timestamp()}] Sucesso APEM: {len(final_apem)} navios atracados.")
-                return final_apem
-            else:
-                return None
+
+            print(f"[{self._get_timestamp()}] Sucesso APEM: {len(final_apem)} navios atracados.")
+            return final_apem
 
         except Exception as e:
             print(f"ERRO CRÃTICO NA COLETA APEM: {e}")
@@ -170,7 +79,8 @@ class ItaquiMonitor:
     # ORQUESTRAÃÃO E UNIFICAÃÃO
     # ---------------------------------------------------------
     def run_full_etl(self):
-        # 1. Busca dados
+        # 1. Busca dados (novo ciclo: cada pagina e buscada uma vez nesta execucao)
+        self.ciclo = None
         df_emap = self.fetch_emap_data()
         df_apem = self.fetch_apem_data()
         
@@ -243,12 +153,9 @@ class ItaquiMonitor:
         
         print(final_df[valid_cols].head(10).to_string(index=False))
         
-        # Exemplo de salvamento
-        final_df.to_csv(
-            f"itaqui_full_data_{datetime.now().strftime('%Y%m%d_%H')}.csv",
-            index=False,
-            encoding='utf-8-sig'
-        )
+        # Salvamento: so as mudancas (ETA, berco, situacao) vao para o log de deltas
+        deltas = LogLineup().registrar(final_df, porto_nome="Itaqui", capturado_em=datetime.now())
+        print(f"[{self._get_timestamp()}] Log de line-up: {len(deltas)} mudancas gravadas.")
         return final_df
 
 if __name__ == "__main__":
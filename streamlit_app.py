@@ -1,4 +1,5 @@
 import json
+import os
 import pickle
 import re
 import unicodedata
@@ -14,6 +15,25 @@ import requests
 import streamlit as st
 import joblib
 
+from avaliacao_online import carregar_avaliacao, mae_esperado
+from cache_resultados import CacheLRUBytes, impressao
+from climatologia import FONTES_FALLBACK, clima_fallback, previsao_fallback
+from drift_features import MonitorDrift
+from historico_lineup import HistoricoLineup
+from lineup_cache import ler_lineup_cache, manifestos_lineup
+from lineup_schema import (
+    PORT_COLUMN_CANDIDATES,
+    lineup_vazio,
+    normalize_column_name,
+    normalizar_lineup,
+    validar_lineup,
+)
+from log_previsoes import LogPrevisoes
+from pipeline_cache import impressao_arquivos
+from previsoes_materializadas import ArmazemPrevisoes, chave_porto, impressao_lineup
+from registro_portos import registro
+from taxonomia_carga import classificar, perfis_lineup
+
 # Needed for unpickling ensemble models saved from training.
 class EnsembleRegressor:
     def __init__(self, lgb_model, xgb_model):
@@ -44,48 +64,18 @@ except ImportError:
 APP_TITLE = "Previsão de Fila - Vegetal (MVP)"
 LINEUP_DIR = Path("lineups")
 LINEUP_HISTORY_PATH = Path("data/lineup_history.parquet")
+HISTORICO = HistoricoLineup()
+MA5_MINIMO_OBSERVACOES = 5
 META_PATH = Path("data_extraction/processed/production/dataset_metadata.json")
 MODEL_DIR = Path("models")
 MODEL_METADATA_PATH = MODEL_DIR / "vegetal_metadata.json"
-PREDICTED_DIR = Path("lineups_previstos")
+PREVISOES = ArmazemPrevisoes()
+CACHE_PREVISOES_MB = float(os.getenv("CACHE_PREVISOES_MB", "512"))
+CONTEXTO_TTL_S = 3600
+MAE_PADRAO_PERFIL = {"VEGETAL": 38, "MINERAL": 31, "FERTILIZANTE": 79}
 PREMIUM_REGISTRY_PATH = Path("premium_registry.json")
 AIS_FEATURES_DIR = Path("data/ais_features")
-PORT_MAPPING_PATH = Path("data/port_mapping.csv")
 MARE_DIR = Path("data/mare_clima")
-MARE_PORT_FILE_BY_NORM = {
-    "ANTONINA": "antonina_extremos_2020_2026.csv",
-    "BARCARENA": "barcarena_extremos_2020_2026.csv",
-    "ITAQUI": "itaqui_extremos_2020_2026.csv",
-    "PARANAGUA": "paranagua_extremos_2020_2026.csv",
-    "PECEM": "pecem_extremos_2020_2026.csv",
-    "RECIFE": "recife_extremos_2020_2026.csv",
-    "RIOGRANDE": "riograande_extremos_2020_2026.csv",
-    "SALVADOR": "salvador_extremos_2020_2026.csv",
-    "SANTOS": "santos_extremos_2020_2026.csv",
-    "SUAPE": "suape_extremos_2020_2026.csv",
-    "VILADOCONDE": "viladoconde_extremos_2020_2026.csv",
-}
-PORT_MUNICIPIO_UF = {
-    "ITAQUI": {"municipio": "SAO LUIS", "uf": "MA"},
-    "PONTA_DA_MADEIRA": {"municipio": "SAO LUIS", "uf": "MA"},
-}
-PROFILE_KEYWORDS = {
-    "VEGETAL": ["SOJA", "MILHO", "TRIGO", "CEVADA", "MALTE", "ARROZ", "FARELO", "ACUCAR"],
-    "MINERAL": ["MINERIO", "BAUXITA", "MANGANES", "FERRO", "CIMENTO", "CLINKER", "COBRE"],
-    "FERTILIZANTE": ["UREIA", "POTASSIO", "KCL", "NPK", "FOSFATO", "FERTIL"],
-}
-PROFILE_CODES = {
-    "VEGETAL": [
-        "1201", "1005", "1701", "2304", "1001", "1003",
-        "1006", "1107", "2302", "2306", "1205", "1206",
-    ],
-    "MINERAL": [
-        "2601", "2606", "2602", "2501", "2523", "2603", "2510",
-    ],
-    "FERTILIZANTE": [
-        "3102", "3104", "3105", "3103", "3101",
-    ],
-}
 CARGA_OPCOES_POR_PERFIL = {
     "VEGETAL": ["Soja em Graos", "Farelo", "Milho", "Acucar", "Trigo", "Cevada", "Malte"],
     "MINERAL": ["Minerio de Ferro", "Bauxita", "Manganes", "Cimento/Clinker", "Cobre", "Fosfatos"],
@@ -100,86 +90,19 @@ BASE_CAT_FEATURES = [
     "cdmercadoria",
     "stsh4",
 ]
-PORT_COLUMN_CANDIDATES = [
-    "porto",
-    "porto_nome",
-    "nome_porto",
-    "port",
-    "port_name",
-    "descricao_porto",
-    "porto_desc",
-]
-
 
 @st.cache_data
 def load_real_data(lineup_path, porto_nome=None):
     if lineup_path and lineup_path.exists():
-        if lineup_path.suffix.lower() == ".parquet":
-            df_lineup = pd.read_parquet(lineup_path)
-            df_lineup = df_lineup.rename(
-                columns={c: normalize_column_name(c) for c in df_lineup.columns}
-            )
-            rename_map = {
-                "navio": "Navio",
-                "produto": "Mercadoria",
-                "carga": "Mercadoria",
-                "prev_chegada": "Chegada",
-                "berco": "Berco",
-                "dwt": "DWT",
-                "ultima_atualizacao": "Atualizacao",
-            }
-            df_lineup = df_lineup.rename(columns=rename_map)
-        elif lineup_path.suffix.lower() == ".xlsx":
-            df_lineup = pd.read_excel(lineup_path)
-            df_lineup = df_lineup.rename(
-                columns={c: normalize_column_name(c) for c in df_lineup.columns}
-            )
-            rename_map = {
-                "navio": "Navio",
-                "produto": "Mercadoria",
-                "carga": "Mercadoria",
-                "chegada": "Chegada",
-                "pier": "Pier",
-                "berco": "Berco",
-                "dwt": "DWT",
-                "atracacao": "Atracacao",
-                "tx_comercial": "TX_COMERCIAL",
-                "tx_efetiva": "TX_EFETIVA",
-                "laytime": "Laytime",
-                "incoterm": "INCOTERM",
-                "ano": "Ano",
-                "mes": "Mes",
-            }
-            df_lineup = df_lineup.rename(columns=rename_map)
-        else:
-            df_lineup = pd.read_csv(lineup_path)
-            df_lineup = df_lineup.rename(
-                columns={c: normalize_column_name(c) for c in df_lineup.columns}
-            )
-            rename_map = {
-                "navio": "Navio",
-                "carga": "Mercadoria",
-                "produto": "Mercadoria",
-                "prev_chegada": "Chegada",
-                "berco": "Berco",
-                "dwt": "DWT",
-                "ultima_atualizacao": "Atualizacao",
-                "extracted_at": "ExtraidoEm",
-            }
-            df_lineup = df_lineup.rename(columns=rename_map)
-        df_lineup = coalesce_duplicate_columns(df_lineup)
-        if "Pier" in df_lineup.columns and "Berco" not in df_lineup.columns:
-            df_lineup["Berco"] = df_lineup["Pier"]
-        if porto_nome and porto_nome != "NACIONAL":
-            port_col = find_column_by_norm(df_lineup, PORT_COLUMN_CANDIDATES)
-            if port_col:
-                target = normalizar_texto(porto_nome)
-                if target:
-                    port_norm = df_lineup[port_col].apply(normalizar_texto)
-                    df_lineup = df_lineup.loc[port_norm == target].copy()
-        df_lineup = df_lineup.copy()
+        df_lineup = ler_lineup_cache(lineup_path, porto_nome=porto_nome)
+        if porto_nome and porto_nome != "NACIONAL" and find_column_by_norm(df_lineup, PORT_COLUMN_CANDIDATES):
+            target = registro().id(porto_nome)
+            if target >= 0:
+                df_lineup = df_lineup.loc[df_lineup["porto_id"] == target].copy()
+        for aviso in validar_lineup(df_lineup):
+            logger.warning(f"{lineup_path.name}: {aviso}")
     else:
-        df_lineup = pd.DataFrame(columns=["Navio", "Mercadoria", "Chegada", "Berco"])
+        df_lineup = lineup_vazio()
 
     return df_lineup, load_metadata()
 
@@ -206,49 +129,28 @@ def list_lineup_files():
 
 
 @st.cache_data
-def load_lineup_history():
-    if not LINEUP_HISTORY_PATH.exists():
-        return pd.DataFrame()
-    df = pd.read_parquet(LINEUP_HISTORY_PATH)
-    if df.empty:
-        return df
-    df = df.copy()
-    df.columns = [normalize_column_name(c) for c in df.columns]
-    df = coalesce_duplicate_columns(df)
-    return df
+def load_lineup_history_stats():
+    # Importa o parquet monolitico para o historico particionado so quando ele muda
+    try:
+        HISTORICO.sincronizar(LINEUP_HISTORY_PATH)
+    except Exception as exc:
+        logger.warning(f"Falha ao sincronizar historico de line-ups: {exc}")
+    return HISTORICO.estatisticas()
 
 
-def prepare_lineup_history(df):
-    df = df.copy()
-    if "navio" in df.columns:
-        df["Navio"] = df["navio"]
-    if "produto" in df.columns:
-        df["Mercadoria"] = df["produto"]
-    elif "carga" in df.columns:
-        df["Mercadoria"] = df["carga"]
-    if "prev_chegada" in df.columns:
-        df["Chegada"] = df["prev_chegada"]
-    if "berco" in df.columns:
-        df["Berco"] = df["berco"]
-    if "dwt" in df.columns:
-        df["DWT"] = df["dwt"]
-    if "ultima_atualizacao" in df.columns:
-        df["Atualizacao"] = df["ultima_atualizacao"]
-    return df
+@st.cache_data
+def load_espera_stats():
+    load_lineup_history_stats()
+    return HISTORICO.espera()
 
 
 @st.cache_data
 def load_lineup_history_porto(porto_nome):
-    df = load_lineup_history()
-    if df.empty or "porto" not in df.columns:
-        return pd.DataFrame()
-    target = normalizar_texto(porto_nome)
-    df = df.copy()
-    df["porto_norm"] = df["porto"].apply(normalizar_texto)
-    df = df[df["porto_norm"] == target].drop(columns=["porto_norm"], errors="ignore")
+    load_lineup_history_stats()
+    df = HISTORICO.ler(porto_nome)
     if df.empty:
         return df
-    return prepare_lineup_history(df)
+    return normalizar_lineup(df, porto_nome=porto_nome)
 
 
 @st.cache_data
@@ -259,7 +161,7 @@ def load_history_data(porto_nome, lineup_path=None):
             lineup_path = find_lineup_file(porto_nome)
         df_lineup, _ = load_real_data(lineup_path, porto_nome=porto_nome)
     if df_lineup.empty:
-        df_lineup = pd.DataFrame(columns=["Navio", "Mercadoria", "Chegada", "Berco"])
+        df_lineup = lineup_vazio()
     return df_lineup, load_metadata()
 
 
@@ -269,9 +171,7 @@ def filter_lineup_horizon(df_lineup, days=7, reference_date=None):
     ref = pd.to_datetime(reference_date) if reference_date else pd.Timestamp.today().normalize()
     start = ref.normalize()
     end = start + pd.Timedelta(days=days)
-    date_series = None
-    if "Chegada" in df_lineup.columns:
-        date_series = pd.to_datetime(df_lineup["Chegada"], errors="coerce", dayfirst=True)
+    date_series = df_lineup["Chegada"] if "Chegada" in df_lineup.columns else None
     if date_series is None or date_series.isna().all():
         return df_lineup.head(0)
     mask = date_series.between(start, end, inclusive="both")
@@ -289,34 +189,13 @@ def _merge_port_name(port_map, name):
         port_map[norm] = name
 
 
-def _extract_ports_from_lineup_file(lineup_path):
-    if not lineup_path:
-        return []
-    try:
-        df_lineup, _ = load_real_data(lineup_path)
-    except Exception:
-        return []
-    if df_lineup is None or df_lineup.empty:
-        return []
-    port_col = find_column_by_norm(df_lineup, PORT_COLUMN_CANDIDATES)
-    if not port_col:
-        return []
-    ports = (
-        df_lineup[port_col]
-        .dropna()
-        .astype(str)
-        .str.strip()
-        .unique()
-        .tolist()
-    )
-    return [p for p in ports if p]
-
-
 @st.cache_data
 def build_lineup_port_index():
     index = {}
-    for path in list_lineup_files():
-        ports_in_file = _extract_ports_from_lineup_file(path)
+    files = list_lineup_files()
+    manifests = manifestos_lineup(files)
+    for path in files:
+        ports_in_file = manifests.get(path, {}).get("portos", [])
         if ports_in_file:
             for port in ports_in_file:
                 norm = normalizar_texto(port)
@@ -335,18 +214,9 @@ def build_lineup_port_index():
 
 @st.cache_data
 def list_lineup_ports():
-    history = load_lineup_history()
     port_map = {}
-    if not history.empty and "porto" in history.columns:
-        for name in (
-            history["porto"]
-            .dropna()
-            .astype(str)
-            .str.strip()
-            .unique()
-            .tolist()
-        ):
-            _merge_port_name(port_map, name)
+    for name in HISTORICO.portos(load_lineup_history_stats()).values():
+        _merge_port_name(port_map, name)
     for entry in build_lineup_port_index().values():
         _merge_port_name(port_map, entry.get("port_name"))
     ports = sorted(port_map.values(), key=normalizar_texto)
@@ -568,19 +438,6 @@ def load_premium_models(metadata_path):
     }
 
 
-@st.cache_data
-def load_port_mapping():
-    if not PORT_MAPPING_PATH.exists():
-        return {}
-    df_map = pd.read_csv(PORT_MAPPING_PATH)
-    if df_map.empty:
-        return {}
-    df_map = df_map.dropna(subset=["portname", "nome_porto_antaq"])
-    df_map["portname_norm"] = df_map["portname"].apply(normalizar_texto)
-    df_map["porto_norm"] = df_map["nome_porto_antaq"].apply(normalizar_texto)
-    return dict(zip(df_map["porto_norm"], df_map["portname_norm"]))
-
-
 @st.cache_data
 def load_latest_ais_features():
     if not AIS_FEATURES_DIR.exists():
@@ -591,50 +448,13 @@ def load_latest_ais_features():
     return pd.read_parquet(files[-1])
 
 
-def filter_features_by_port(df, porto_nome, mapping):
+def filter_features_by_port(df, porto_nome):
     if df is None or df.empty:
         return df
-    porto_norm = normalizar_texto(porto_nome)
-    target_norm = mapping.get(porto_norm, porto_norm)
+    # Nome AIS e nome ANTAQ resolvem para o mesmo ID no registro de portos
+    reg = registro()
     port_col = "portname" if "portname" in df.columns else "port_name"
-    df = df.copy()
-    df["portname_norm"] = df[port_col].apply(normalizar_texto)
-    return df[df["portname_norm"] == target_norm]
-
-
-def infer_profile(mercadoria):
-    if pd.isna(mercadoria):
-        return "VEGETAL"
-    texto = normalizar_texto(mercadoria)
-    for profile, keywords in PROFILE_KEYWORDS.items():
-        if any(k in texto for k in keywords):
-            return profile
-    return "VEGETAL"
-
-
-def infer_profile_from_code(codigo):
-    if pd.isna(codigo):
-        return None
-    codigo_str = re.sub(r"[^0-9]", "", str(codigo))
-    if len(codigo_str) < 4:
-        return None
-    prefix = codigo_str[:4]
-    for profile, codes in PROFILE_CODES.items():
-        if prefix in codes:
-            return profile
-    return None
-
-
-def get_profile_from_row(row):
-    for key in ["cdmercadoria", "cd_mercadoria", "stsh4"]:
-        if key in row:
-            profile = infer_profile_from_code(row.get(key))
-            if profile:
-                return profile
-    for key in ["Mercadoria", "mercadoria", "PRODUTO", "produto"]:
-        if key in row:
-            return infer_profile(row.get(key))
-    return "VEGETAL"
+    return df[reg.ids(df[port_col]) == reg.id(porto_nome)]
 
 
 def get_premium_config(porto_nome):
@@ -653,7 +473,7 @@ def infer_port_profile(df_lineup, porto_nome):
     if premium_cfg and premium_cfg.get("profiles"):
         return premium_cfg["profiles"][0]
     if df_lineup is not None and not df_lineup.empty:
-        profiles = df_lineup.apply(get_profile_from_row, axis=1)
+        profiles = perfis_lineup(df_lineup)
         if not profiles.empty:
             return profiles.value_counts().idxmax()
     return "VEGETAL"
@@ -665,7 +485,7 @@ def compute_default_fila(df_lineup, lineup_path):
     if lineup_path and lineup_path.suffix.lower() == ".xlsx":
         for col in ["Chegada", "Atracacao"]:
             if col in df_lineup.columns:
-                dates = pd.to_datetime(df_lineup[col], errors="coerce", dayfirst=True)
+                dates = df_lineup[col]
                 if dates.notna().any():
                     ref = dates.max()
                     window_start = ref - pd.Timedelta(days=7)
@@ -689,12 +509,12 @@ def normalizar_texto(valor):
     return re.sub(r"[^A-Z0-9]", "", texto)
 
 
-def _normalizar_porto_base(nome_porto):
-    norm = normalizar_texto(nome_porto)
-    for prefix in ("PORTODE", "PORTODO", "PORTO"):
-        if norm.startswith(prefix):
-            return norm[len(prefix):]
-    return norm
+def config_porto(porto_nome):
+    """Municipio/UF/estacao INMET do porto no registro ({} se o porto nao estiver registrado)."""
+    porto = registro().porto(porto_nome)
+    if porto is None:
+        return {}
+    return {"municipio": porto.municipio, "uf": porto.uf, "estacao_inmet": porto.estacao_inmet}
 
 
 @st.cache_data
@@ -784,8 +604,8 @@ def adicionar_features_mare_lineup(df, porto_nome):
 
     if not MARE_DIR.exists():
         return df
-    porto_norm = _normalizar_porto_base(porto_nome)
-    arquivo = MARE_PORT_FILE_BY_NORM.get(porto_norm)
+    porto = registro().porto(porto_nome)
+    arquivo = porto.arquivo_mare if porto else None
     if not arquivo:
         return df
     caminho = MARE_DIR / arquivo
@@ -799,33 +619,6 @@ def adicionar_features_mare_lineup(df, porto_nome):
     return df
 
 
-def normalize_column_name(valor):
-    texto = unicodedata.normalize("NFKD", str(valor))
-    texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
-    texto = re.sub(r"[^A-Za-z0-9]+", "_", texto).strip("_").lower()
-    return texto
-
-
-def coalesce_duplicate_columns(df):
-    if df is None or df.empty:
-        return df
-    if not df.columns.duplicated().any():
-        return df
-    df = df.copy()
-    combined = {}
-    seen = set()
-    for name in df.columns:
-        if name in seen:
-            continue
-        seen.add(name)
-        cols = df.loc[:, name]
-        if isinstance(cols, pd.DataFrame):
-            combined[name] = cols.bfill(axis=1).iloc[:, 0]
-        else:
-            combined[name] = cols
-    return pd.DataFrame(combined)
-
-
 def find_column_by_norm(df, candidates):
     norm_map = {normalize_column_name(c): c for c in df.columns}
     for candidate in candidates:
@@ -906,10 +699,9 @@ def build_confiabilidade_text(confiabilidade, mae_esperado):
 def get_lineup_updated_at(df_lineup):
     if df_lineup is None or df_lineup.empty:
         return None
-    candidates = ["Atualizacao", "ExtraidoEm", "ultima_atualizacao", "extracted_at"]
-    for col in candidates:
+    for col in ["Atualizacao", "ExtraidoEm"]:
         if col in df_lineup.columns:
-            series = pd.to_datetime(df_lineup[col], errors="coerce", dayfirst=True)
+            series = df_lineup[col]
             if series.notna().any():
                 return series.max()
     return None
@@ -1093,64 +885,34 @@ def _forecast_chuva_3d(forecast_df, date_keys):
 # FASE 1 - CORREÇÕES CRÍTICAS DE FEATURES
 # ============================================================================
 
-def carregar_tempo_medio_historico(porto_nome):
+def carregar_tempo_medio_historico(porto_nome, espera=None):
     """
     Carrega tempo médio histórico de espera para o porto.
-    Usa lineup_history.parquet ou valores default por porto.
+    Usa a mediana do sketch incremental do histórico ou o default do porto.
 
     Args:
         porto_nome: Nome do porto (ex: "SANTOS", "PARANAGUA")
+        espera: EstatisticasEspera a usar (padrão: a do histórico de line-ups)
 
     Returns:
         float: Tempo médio de espera em horas
     """
-    # Valores default baseados em dados reais de operação portuária (horas)
-    TEMPO_MEDIO_DEFAULT = {
-        "SANTOS": 48.0,
-        "PARANAGUA": 72.0,
-        "ITAQUI": 36.0,
-        "PONTA_DA_MADEIRA": 24.0,
-        "VILA_DO_CONDE": 60.0,
-        "VILADOCONDE": 60.0,
-        "BARCARENA": 60.0,
-        "RIO_GRANDE": 48.0,
-        "RIOGRANDE": 48.0,
-        "SUAPE": 72.0,
-        "PECEM": 48.0,
-        "SALVADOR": 60.0,
-        "VITORIA": 48.0,
-        "SAO_FRANCISCO_DO_SUL": 60.0,
-        "SAOFRANCISCODOSUL": 60.0,
-        "ANTONINA": 60.0,
-        "RECIFE": 60.0,
-        "FORTALEZA": 48.0,
-        "ARATU": 60.0,
-        "ILHEUS": 48.0,
-        "MACEIO": 48.0,
-        "NATAL": 48.0,
-        "CABEDELO": 48.0,
-        "IMBITUBA": 48.0,
-    }
+    reg = registro()
+    porto_id = reg.id(porto_nome)
 
-    porto_norm = normalizar_texto(porto_nome)
-
-    # Tenta carregar do histórico
+    # Mediana do sketch do historico (None com menos de 10 observacoes)
     try:
-        df_hist = load_lineup_history()
-        if not df_hist.empty and "tempo_espera_horas" in df_hist.columns and "porto" in df_hist.columns:
-            df_hist["porto_norm"] = df_hist["porto"].apply(normalizar_texto)
-            df_porto = df_hist[df_hist["porto_norm"] == porto_norm]
-            if len(df_porto) >= 10:  # Mínimo 10 registros históricos para ser confiável
-                tempo_medio = df_porto["tempo_espera_horas"].median()
-                if pd.notna(tempo_medio) and tempo_medio > 0:
-                    return float(tempo_medio)
+        espera = espera if espera is not None else load_espera_stats()
+        tempo_medio = espera.mediana(porto_nome)
+        if tempo_medio is not None and tempo_medio > 0:
+            return float(tempo_medio)
     except Exception:
         pass
 
-    # Fallback para valores default
-    for key, value in TEMPO_MEDIO_DEFAULT.items():
-        if normalizar_texto(key) == porto_norm:
-            return float(value)
+    # Fallback para o valor default do porto no registro (dados reais de operação, horas)
+    porto = reg.porto(porto_id)
+    if porto is not None and porto.espera_padrao_h:
+        return float(porto.espera_padrao_h)
 
     # Default genérico: 48 horas (2 dias) - valor conservador
     return 48.0
@@ -1224,14 +986,18 @@ def calcular_fila_simulada(df_lineup, porto_nome):
     return fila
 
 
-def calcular_tempo_espera_ma5(df_lineup, porto_nome):
+def calcular_tempo_espera_ma5(df_lineup, porto_nome, espera=None, tempo_medio=None):
     """
-    Calcula média móvel de 5 períodos do tempo de espera.
-    Como não temos histórico real no lineup, usa tempo médio do porto como proxy.
+    Média das últimas 5 esperas do terminal de cada navio, a mesma
+    definição de tempo_espera_ma5 no treino (rolling 5 por nome_terminal).
+    Terminal sem histórico (ou line-up sem berço) usa a média das últimas
+    5 esperas do porto e, sem histórico, o tempo médio do porto.
 
     Args:
         df_lineup: DataFrame com lineup
         porto_nome: Nome do porto
+        espera: EstatisticasEspera a usar (padrão: a do histórico de line-ups)
+        tempo_medio: Tempo médio do porto (padrão: carregar_tempo_medio_historico)
 
     Returns:
         np.array: Array com tempo de espera MA5 para cada linha
@@ -1239,11 +1005,24 @@ def calcular_tempo_espera_ma5(df_lineup, porto_nome):
     if df_lineup.empty:
         return np.array([])
 
-    tempo_medio = carregar_tempo_medio_historico(porto_nome)
+    if tempo_medio is None:
+        tempo_medio = carregar_tempo_medio_historico(porto_nome)
+    if espera is None:
+        try:
+            espera = load_espera_stats()
+        except Exception:
+            return np.full(len(df_lineup), tempo_medio)
 
-    # Retorna array com o tempo médio histórico como proxy da MA5
-    # Em produção com dados reais, isso seria substituído por uma média móvel real
-    return np.full(len(df_lineup), tempo_medio)
+    base = espera.ma5(porto_nome, minimo=MA5_MINIMO_OBSERVACOES)
+    base = tempo_medio if base is None else base
+    coluna = "nome_terminal" if "nome_terminal" in df_lineup.columns else "Berco"
+    if coluna not in df_lineup.columns:
+        return np.full(len(df_lineup), base, dtype=float)
+    codigos, terminais = pd.factorize(df_lineup[coluna].astype(object))
+    # Como no treino (min_periods=1), uma observação do terminal já basta
+    valores = [espera.ma5(porto_nome, berco=terminal) for terminal in terminais]
+    valores = [base if valor is None else valor for valor in valores]
+    return np.append(np.asarray(valores, dtype=float), base)[codigos]
 
 
 # ============================================================================
@@ -1278,6 +1057,16 @@ class FeatureReport:
             "confidence": self.confidence_score
         }
 
+    @classmethod
+    def from_dict(cls, dados):
+        return cls(
+            total_features=dados["total_features"],
+            quality_breakdown={FeatureQuality(k): v for k, v in dados["quality"].items()},
+            critical_issues=dados["critical_issues"],
+            warnings=dados["warnings"],
+            confidence_score=dados["confidence"],
+        )
+
 
 def avaliar_qualidade_features(metadata, api_status):
     """
@@ -1433,11 +1222,11 @@ def obter_dados_clima_robusto(porto_nome, porto_cfg=None):
     Prioridades:
     1. BigQuery INMET (mais preciso, requer credenciais)
     2. Open-Meteo (gratuito, sempre disponível)
-    3. Valores conservadores padrão
+    3. Climatologia do porto por dia do ano (ou valores conservadores)
 
     Args:
         porto_nome: Nome do porto
-        porto_cfg: Dict com municipio/uf para BigQuery
+        porto_cfg: Dict com municipio/uf/estacao_inmet (config_porto) para BigQuery
 
     Returns:
         tuple: (dados_clima dict, dados_forecast list, status_ok bool)
@@ -1451,7 +1240,7 @@ def obter_dados_clima_robusto(porto_nome, porto_cfg=None):
     if BIGQUERY_AVAILABLE and porto_cfg:
         try:
             municipio = porto_cfg.get("municipio", porto_nome)
-            station_id = fetch_inmet_station_id(municipio=municipio)
+            station_id = porto_cfg.get("estacao_inmet") or fetch_inmet_station_id(municipio=municipio)
             if station_id:
                 clima = fetch_inmet_latest(station_id, port_name=porto_key)
                 if clima and clima.get("temp_media_dia"):
@@ -1466,48 +1255,31 @@ def obter_dados_clima_robusto(porto_nome, porto_cfg=None):
             clima = fetch_weather_fallback(porto_key)
             forecast = get_weather_forecast(porto_key, days=7)
 
-            if clima and clima.get("temp_media_dia"):
+            # fetch_weather_fallback devolve climatologia/defaults quando a API falha
+            if clima and clima.get("temp_media_dia") and clima.get("fonte") not in FONTES_FALLBACK:
                 logger.info(f"✓ Clima obtido via Open-Meteo para {porto_nome}")
                 status_ok = True
         except Exception as e:
             logger.warning(f"Open-Meteo falhou para {porto_nome}: {e}")
 
-    # Prioridade 3: Valores conservadores padrão (sempre funciona)
+    # Prioridade 3: Climatologia por dia do ano (sempre funciona, sem rede)
     if not clima:
-        logger.warning(f"Usando valores climáticos conservadores para {porto_nome}")
-        clima = {
-            "temp_media_dia": 25.0,
-            "temp_max_dia": 30.0,
-            "temp_min_dia": 20.0,
-            "precipitacao_dia": 0.0,
-            "vento_rajada_max_dia": 5.0,
-            "vento_velocidade_media": 3.0,
-            "umidade_media_dia": 70.0,
-            "amplitude_termica": 10.0,
-            "chuva_acumulada_ultimos_3dias": 0.0,
-            "wave_height_max": 0.0,
-            "ressaca": 0,
-            "fonte": "default_conservative",
-        }
+        clima = clima_fallback(porto_nome)
+        logger.warning(f"Usando clima de fallback ({clima['fonte']}) para {porto_nome}")
 
-    # Garantir forecast mínimo
+    # Garantir forecast mínimo: hoje com o clima obtido, demais dias pela climatologia
     if not forecast:
-        # Cria forecast básico baseado nos dados de clima
-        today = pd.Timestamp.today()
-        forecast = []
-        for i in range(7):
-            date = (today + pd.Timedelta(days=i)).strftime("%Y-%m-%d")
-            forecast.append({
-                "data": date,
-                "temp_media": clima.get("temp_media_dia", 25.0),
-                "temp_max": clima.get("temp_max_dia", 30.0),
-                "temp_min": clima.get("temp_min_dia", 20.0),
-                "precipitacao": clima.get("precipitacao_dia", 0.0) if i == 0 else 0.0,
-                "rajada_max": clima.get("vento_rajada_max_dia", 5.0),
-                "vento_max": clima.get("vento_velocidade_media", 3.0),
-                "wave_height_max": clima.get("wave_height_max", 0.0),
-                "ressaca": clima.get("ressaca", 0),
-            })
+        forecast = previsao_fallback(porto_nome, dias=7)
+        hoje = {
+            "temp_media": "temp_media_dia",
+            "temp_max": "temp_max_dia",
+            "temp_min": "temp_min_dia",
+            "precipitacao": "precipitacao_dia",
+            "rajada_max": "vento_rajada_max_dia",
+            "wave_height_max": "wave_height_max",
+            "ressaca": "ressaca",
+        }
+        forecast[0].update({k: clima[c] for k, c in hoje.items() if clima.get(c) is not None})
 
     return clima, forecast, status_ok
 
@@ -1556,7 +1328,7 @@ def obter_dados_economia_robusto(uf="MA"):
     return pam, precos, status_ok
 
 
-def obter_dados_ais_robusto(porto_nome, port_mapping=None):
+def obter_dados_ais_robusto(porto_nome):
     """
     Obtém dados AIS com fallback para dados locais.
 
@@ -1568,7 +1340,6 @@ def obter_dados_ais_robusto(porto_nome, port_mapping=None):
 
     Args:
         porto_nome: Nome do porto
-        port_mapping: Dict de mapeamento de portos
 
     Returns:
         tuple: (dados_ais DataFrame ou None, status_ok bool)
@@ -1584,10 +1355,7 @@ def obter_dados_ais_robusto(porto_nome, port_mapping=None):
         ais_df_full = load_latest_ais_features()
 
         if ais_df_full is not None and not ais_df_full.empty:
-            if port_mapping is None:
-                port_mapping = load_port_mapping()
-
-            ais_df = filter_features_by_port(ais_df_full, porto_nome, port_mapping)
+            ais_df = filter_features_by_port(ais_df_full, porto_nome)
 
             if ais_df is not None and not ais_df.empty:
                 logger.info(f"✓ Dados AIS encontrados para {porto_nome} ({len(ais_df)} registros)")
@@ -1661,16 +1429,6 @@ def criar_dados_ais_mock(porto_nome, num_navios=5):
 def build_features_from_lineup(df_lineup, metadata, live_data, porto_nome):
     features = metadata["features"]
     df = df_lineup.copy()
-    if "Chegada" in df.columns:
-        df["data_chegada_dt"] = pd.to_datetime(df["Chegada"], errors="coerce", dayfirst=True)
-    else:
-        df["data_chegada_dt"] = pd.NaT
-    if df["data_chegada_dt"].isna().all():
-        for fallback in ["Atualizacao", "ExtraidoEm"]:
-            if fallback in df.columns:
-                df["data_chegada_dt"] = pd.to_datetime(df[fallback], errors="coerce", dayfirst=True)
-                if not df["data_chegada_dt"].isna().all():
-                    break
     base_date = live_data.get("eta_base") if isinstance(live_data, dict) else None
     base_ts = pd.to_datetime(base_date).normalize() if base_date else pd.Timestamp.today().normalize()
     df["data_chegada_dt"] = df["data_chegada_dt"].fillna(base_ts)
@@ -1686,12 +1444,13 @@ def build_features_from_lineup(df_lineup, metadata, live_data, porto_nome):
     df["tipo_navegacao"] = "Longo Curso"
     df["tipo_carga"] = "Granel"
     df["natureza_carga"] = df.get("Mercadoria", "Desconhecida")
-    df["cdmercadoria"] = "0000"
-    df["stsh4"] = "0000"
+    # Codigos SH4 no mesmo dominio do treino (cdmercadoria/stsh4 do ANTAQ)
+    df["cdmercadoria"] = classificar(df["natureza_carga"])["sh4"].to_numpy()
+    df["stsh4"] = df["cdmercadoria"]
 
     df["movimentacao_total_toneladas"] = 0.0
     if "DWT" in df_lineup.columns:
-        df["movimentacao_total_toneladas"] = pd.to_numeric(df_lineup["DWT"], errors="coerce").fillna(0.0)
+        df["movimentacao_total_toneladas"] = df_lineup["DWT"].fillna(0.0)
 
     df = df.sort_values("data_chegada_dt").reset_index(drop=True)
 
@@ -1710,11 +1469,15 @@ def build_features_from_lineup(df_lineup, metadata, live_data, porto_nome):
         .to_numpy()
     )
 
+    # Estatísticas de espera do contexto (backtest: só o conhecido até a data de referência)
+    espera = live_data.get("espera_stats")
+
     # Corrigido: usar tempo médio histórico real ao invés de 0.0
-    df["porto_tempo_medio_historico"] = carregar_tempo_medio_historico(porto_nome)
+    tempo_medio = carregar_tempo_medio_historico(porto_nome, espera)
+    df["porto_tempo_medio_historico"] = tempo_medio
 
     # Corrigido: usar tempo médio como proxy da MA5 ao invés de 0.0
-    df["tempo_espera_ma5"] = calcular_tempo_espera_ma5(df, porto_nome)
+    df["tempo_espera_ma5"] = calcular_tempo_espera_ma5(df, porto_nome, espera=espera, tempo_medio=tempo_medio)
 
     clima = live_data.get("clima") or {}
     forecast_df = _build_forecast_frame(live_data.get("forecast"))
@@ -1836,10 +1599,11 @@ def build_premium_features_ponta_da_madeira(df_lineup, model_info):
     df["laytime"] = pd.to_numeric(col_or_default("laytime", 0.0), errors="coerce").fillna(0.0)
     df["incoterm"] = col_or_default("incoterm", "DESCONHECIDO").fillna("DESCONHECIDO")
 
-    chegada = pd.to_datetime(col_or_default("chegada", pd.NaT), errors="coerce", dayfirst=True)
+    # Datas ja tipadas na ingestao (lineup_schema)
+    chegada = col_or_default("chegada", pd.NaT)
     if chegada.isna().all():
-        chegada = pd.to_datetime(col_or_default("atracacao", pd.NaT), errors="coerce", dayfirst=True)
-    chegada = chegada.fillna(pd.Timestamp.today().normalize())
+        chegada = col_or_default("atracacao", pd.NaT)
+    chegada = pd.to_datetime(chegada).fillna(pd.Timestamp.today().normalize())
     df["chegada_dt"] = chegada
 
     df = df.sort_values("chegada_dt").reset_index(drop=True)
@@ -1895,7 +1659,7 @@ def predict_lineup_basico(df_lineup, live_data, porto_nome, track_quality=False)
         Se track_quality=True: (df_out, feature_reports, api_status)
     """
     df = df_lineup.copy()
-    df["perfil_modelo"] = df.apply(get_profile_from_row, axis=1)
+    df["perfil_modelo"] = df["perfil"].astype(str) if "perfil" in df.columns else perfis_lineup(df)
 
     # FASE 2: Rastreia status das APIs para qualidade
     api_status = {
@@ -1955,6 +1719,13 @@ def predict_lineup_basico(df_lineup, live_data, porto_nome, track_quality=False)
 
         features_data = build_features_from_lineup(sub, models["metadata"], live_data, porto_nome)
 
+        # Drift: histogramas das features pontuadas contra a referência do treino
+        features_drift = monitor_drift().observar(profile, features_data, models["metadata"], model_type)
+        if features_drift:
+            logger.warning(
+                f"Drift de features ({profile}/{model_type}, {porto_nome}): {', '.join(features_drift)}"
+            )
+
         # FASE 2: Avalia qualidade das features
         if track_quality:
             report = avaliar_qualidade_features(models["metadata"], api_status)
@@ -2005,26 +1776,10 @@ def predict_lineup_basico(df_lineup, live_data, porto_nome, track_quality=False)
         dfs.append(sub)
 
     df_out = pd.concat(dfs, ignore_index=True)
-    if "data_chegada_dt" not in df_out.columns:
-        if "Chegada" in df_out.columns:
-            df_out["data_chegada_dt"] = pd.to_datetime(
-                df_out["Chegada"], errors="coerce", dayfirst=True
-            )
-        else:
-            df_out["data_chegada_dt"] = pd.NaT
-    if df_out["data_chegada_dt"].isna().all():
-        for fallback in ["Atualizacao", "ExtraidoEm"]:
-            if fallback in df_out.columns:
-                df_out["data_chegada_dt"] = pd.to_datetime(
-                    df_out[fallback], errors="coerce", dayfirst=True
-                )
-                if not df_out["data_chegada_dt"].isna().all():
-                    break
     df_out["data_chegada_dt"] = df_out["data_chegada_dt"].fillna(
         pd.Timestamp.today().normalize()
     )
-    eta = pd.to_datetime(df_out["data_chegada_dt"], errors="coerce")
-    eta_espera = eta + pd.to_timedelta(df_out["tempo_espera_previsto_horas"].fillna(0), unit="h")
+    eta_espera = df_out["data_chegada_dt"] + pd.to_timedelta(df_out["tempo_espera_previsto_horas"].fillna(0), unit="h")
     df_out["eta_mais_espera"] = eta_espera
     df_out = df_out.sort_values("eta_mais_espera")
 
@@ -2034,6 +1789,31 @@ def predict_lineup_basico(df_lineup, live_data, porto_nome, track_quality=False)
     return df_out
 
 
+def aplicar_mae_esperado(df_pred, porto_nome):
+    """
+    mae_esperado atual da avaliação online (porto x perfil x modelo) sobre a previsão.
+
+    Aplicado também depois dos caches de previsão: o MAE muda com a
+    avaliação, sem que o line-up, o contexto ou os modelos mudem. assign
+    não copia as demais colunas (copy-on-write): as sessões continuam
+    compartilhando o frame em cache.
+    """
+    if df_pred.empty:
+        return df_pred.assign(mae_esperado=pd.Series(dtype="float64"))
+    # Valor fixo do perfil sem observações
+    mae = mae_esperado(
+        porto_nome, df_pred["perfil"], df_pred.get("modelo_usado"), padrao=MAE_PADRAO_PERFIL
+    ).to_numpy(dtype="float64", copy=True)
+    if "tier" in df_pred.columns:
+        premium = df_pred["tier"].eq("PREMIUM").to_numpy()
+        if premium.any():
+            premium_cfg = get_premium_config(porto_nome) or {}
+            mae[premium] = mae_esperado(
+                porto_nome, df_pred.loc[premium, "perfil"], "PREMIUM", padrao=premium_cfg.get("mae_esperado", 30)
+            ).to_numpy()
+    return df_pred.assign(mae_esperado=mae)
+
+
 def inferir_lineup_inteligente(lineup_df, live_data, porto_nome, tem_dados_terminal=False, track_quality=False):
     """
     Faz previsões inteligentes com suporte a modelos premium.
@@ -2058,9 +1838,7 @@ def inferir_lineup_inteligente(lineup_df, live_data, porto_nome, tem_dados_termi
     else:
         df_out = predict_lineup_basico(lineup_df, live_data, porto_nome, track_quality=False)
 
-    df_out["perfil"] = df_out.apply(get_profile_from_row, axis=1)
-    mae_map = {"VEGETAL": 38, "MINERAL": 31, "FERTILIZANTE": 79}
-    df_out["mae_esperado"] = df_out["perfil"].map(mae_map)
+    df_out["perfil"] = df_out["perfil"].astype(str) if "perfil" in df_out.columns else perfis_lineup(df_out)
     df_out["tier"] = "BASIC"
 
     premium_cfg = get_premium_config(porto_nome)
@@ -2081,13 +1859,13 @@ def inferir_lineup_inteligente(lineup_df, live_data, porto_nome, tem_dados_termi
                 df_out.loc[mask, "tempo_espera_previsto_dias"] = (
                     (preds / 24.0).round(2).to_numpy()
                 )
-                df_out.loc[mask, "mae_esperado"] = premium_cfg.get("mae_esperado", 30)
                 df_out.loc[mask, "tier"] = "PREMIUM"
 
-    eta = pd.to_datetime(df_out["data_chegada_dt"], errors="coerce")
-    eta_espera = eta + pd.to_timedelta(df_out["tempo_espera_previsto_horas"].fillna(0), unit="h")
+    eta_espera = df_out["data_chegada_dt"] + pd.to_timedelta(
+        df_out["tempo_espera_previsto_horas"].fillna(0), unit="h"
+    )
     df_out["eta_mais_espera"] = eta_espera
-    df_out = df_out.sort_values("eta_mais_espera")
+    df_out = aplicar_mae_esperado(df_out.sort_values("eta_mais_espera"), porto_nome)
 
     # FASE 2 & FASE 4: Retorna também os reports e info de seleção de modelo
     if track_quality:
@@ -2095,6 +1873,163 @@ def inferir_lineup_inteligente(lineup_df, live_data, porto_nome, tem_dados_termi
     return df_out
 
 
+@st.cache_resource
+def cache_previsoes():
+    """Cache de previsões do processo, compartilhado por todas as sessões (LRU em bytes)."""
+    return CacheLRUBytes(CACHE_PREVISOES_MB * 1024 * 1024)
+
+
+@st.cache_resource
+def log_previsoes():
+    """Log Parquet de previsões do processo (escrita em lote numa thread)."""
+    return LogPrevisoes()
+
+
+@st.cache_resource
+def monitor_drift():
+    """Histogramas das features pontuadas no processo (PSI/KS contra o treino)."""
+    return MonitorDrift()
+
+
+def versao_modelos():
+    """Impressão (tamanho/mtime) dos artefatos de modelo e do registro premium."""
+    return impressao(impressao_arquivos([MODEL_DIR, PREMIUM_REGISTRY_PATH]))
+
+
+@st.cache_data(ttl=CONTEXTO_TTL_S, show_spinner=False)
+def obter_live_data(porto_nome, eta_base):
+    """Dados de contexto (clima, economia, AIS) do porto, com fallbacks."""
+    live_data = {
+        "clima": None,
+        "pam": None,
+        "precos": None,
+        "forecast": None,
+        "eta_base": eta_base,
+    }
+    if porto_nome == "NACIONAL":
+        return live_data
+
+    # FASE 3: Usar funções robustas para obter dados de APIs
+    porto_key = porto_nome.upper()
+    porto_cfg = config_porto(porto_nome)
+    uf = porto_cfg.get("uf", "MA")
+
+    # Clima: Garantido com múltiplos fallbacks (BigQuery → Open-Meteo → Default)
+    clima, forecast, clima_ok = obter_dados_clima_robusto(porto_key, porto_cfg)
+    live_data["clima"] = clima
+    live_data["forecast"] = forecast
+
+    # Economia: BigQuery com fallback para defaults
+    pam, precos, economia_ok = obter_dados_economia_robusto(uf=uf)
+    live_data["pam"] = pam
+    live_data["precos"] = precos
+
+    # AIS: Tentar carregar dados locais
+    ais_df, ais_ok = obter_dados_ais_robusto(porto_nome)
+    if ais_df is not None and not ais_df.empty:
+        live_data["ais_df"] = ais_df
+    else:
+        live_data["ais_df"] = None
+
+    # Log resumo das APIs
+    logger.info(f"Status APIs para {porto_nome}: Clima={'OK' if clima_ok else 'Fallback'}, "
+               f"Economia={'OK' if economia_ok else 'Fallback'}, AIS={'OK' if ais_ok else 'Indisponível'}")
+    return live_data
+
+
+def prever_porto(porto_nome, df_lineup, lineup_path, eta_base):
+    """
+    Previsão do line-up de um porto: contexto → features → modelos.
+
+    Returns:
+        Dict com df_pred, modo, feature_reports, api_status e model_selection_info
+    """
+    live_data = obter_live_data(porto_nome, eta_base)
+    tem_dados_terminal = has_terminal_data(df_lineup)
+    if lineup_path and lineup_path.suffix.lower() == ".xlsx":
+        tem_dados_terminal = True
+
+    versao = versao_modelos()
+    contexto = impressao(live_data)
+
+    def inferir():
+        # FASE 2 & FASE 4: Rastreia qualidade e seleção de modelo
+        df_pred, feature_reports, api_status, model_selection_info = inferir_lineup_inteligente(
+            df_lineup,
+            live_data,
+            porto_nome.upper(),
+            tem_dados_terminal=tem_dados_terminal,
+            track_quality=True,  # Ativa rastreamento de qualidade
+        )
+        modo = "BASIC"
+        if "tier" in df_pred.columns and df_pred["tier"].eq("PREMIUM").any():
+            modo = "PREMIUM"
+        run_id = log_previsoes().registrar(
+            df_pred,
+            porto_nome,
+            eta_base,
+            versao_modelo=versao,
+            hash_contexto=contexto,
+            colunas_entrada=list(df_lineup.columns),
+        )
+        return {
+            "df_pred": df_pred,
+            "modo": modo,
+            "feature_reports": feature_reports,
+            "api_status": api_status,
+            "model_selection_info": model_selection_info,
+            "run_id": run_id,
+        }
+
+    # Mesmo line-up, contexto, modelos e data: todas as sessões recebem o mesmo resultado
+    chave = (
+        "previsao",
+        porto_nome.upper(),
+        impressao_lineup(df_lineup),
+        contexto,
+        versao,
+        str(pd.Timestamp(eta_base).date()),
+        tem_dados_terminal,
+    )
+    previsao = cache_previsoes().obter_ou_calcular(chave, inferir)
+    # O MAE da avaliação online não entra na chave: é reaplicado a cada leitura
+    return {**previsao, "df_pred": aplicar_mae_esperado(previsao["df_pred"], porto_nome)}
+
+
+def info_previsao(previsao):
+    """Parte serializável de uma previsão (manifesto do armazém de previsões)."""
+    return {
+        "modo": previsao["modo"],
+        "api_status": previsao["api_status"],
+        "model_selection_info": previsao["model_selection_info"],
+        "feature_reports": [r.to_dict() for r in previsao["feature_reports"]],
+    }
+
+
+def previsao_materializada(porto_nome, df_lineup, data_referencia):
+    """Previsão do worker para o porto se for do mesmo line-up e data de referência, senão None."""
+    manifesto = PREVISOES.manifesto()
+    if manifesto is None or manifesto["data_referencia"] != str(pd.Timestamp(data_referencia).date()):
+        return None
+    chave = chave_porto(porto_nome)
+    info = manifesto["portos"].get(chave)
+    if info is None or info.get("impressao_lineup") != impressao_lineup(df_lineup):
+        return None
+    df_pred = cache_previsoes().obter_ou_calcular(
+        ("materializada", manifesto["versao"], chave),
+        lambda: PREVISOES.ler(porto_nome, versao=manifesto["versao"])[0],
+    )
+    if df_pred is None:
+        return None
+    return {
+        "df_pred": aplicar_mae_esperado(df_pred, porto_nome),
+        "modo": info.get("modo", "BASIC"),
+        "feature_reports": [FeatureReport.from_dict(r) for r in info.get("feature_reports", [])],
+        "api_status": info.get("api_status", {}),
+        "model_selection_info": info.get("model_selection_info", []),
+    }
+
+
 def calcular_risco(chuva_mm_3d, fila_atual, fila_media):
     if chuva_mm_3d > 20 or fila_atual > 20:
         return "Alto", "vermelho", "Chuva intensa ou fila crítica"
@@ -2434,9 +2369,9 @@ with st.sidebar:
     if porto_selecionado != "NACIONAL":
         try:
             porto_key = porto_selecionado.upper()
-            porto_cfg = PORT_MUNICIPIO_UF.get(porto_key, {})
+            porto_cfg = config_porto(porto_selecionado)
             municipio = porto_cfg.get("municipio", porto_selecionado)
-            station_id = fetch_inmet_station_id(municipio=municipio)
+            station_id = porto_cfg.get("estacao_inmet") or fetch_inmet_station_id(municipio=municipio)
             clima = fetch_inmet_latest(station_id, port_name=porto_key) or {}
             default_chuva = float(clima.get("chuva_acumulada_ultimos_3dias", 0.0))
         except Exception:
@@ -2565,8 +2500,7 @@ def render_section_title(title, icon_svg):
 
 
 def format_datetime_table(series):
-    values = pd.to_datetime(series, errors="coerce", dayfirst=True)
-    return values.dt.strftime("%d/%m %H:%M").fillna("-")
+    return series.dt.strftime("%d/%m %H:%M").fillna("-")
 
 
 def build_comparativo_lineup(df_pred_view, navio_col):
@@ -2595,7 +2529,7 @@ def build_comparativo_lineup(df_pred_view, navio_col):
         data["Berco"] = df["Berco"].astype(str)
     if "Chegada" in df.columns:
         data["ETA_lineup"] = format_datetime_table(df["Chegada"])
-        eta_lineup = pd.to_datetime(df["Chegada"], errors="coerce", dayfirst=True)
+        eta_lineup = df["Chegada"]
     else:
         eta_lineup = pd.Series([pd.NaT] * len(df))
     data["Posicao_lineup"] = df["posicao_lineup"]
@@ -2624,90 +2558,59 @@ def style_comparativo(df):
     return df.style.set_properties(**styles, subset=highlight_cols)
 
 
-def compute_results():
-    live_data = {
-        "clima": None,
-        "pam": None,
-        "precos": None,
-        "forecast": None,
-        "eta_base": data_chegada,
+def filtrar_previsao(df_pred, berco, navio, navio_col, tipo_navio, tipo_navio_col):
+    """Recorte da previsão pelos filtros da sidebar (uma máscara booleana, sem recalcular)."""
+    if df_pred is None:
+        return None
+    mask = np.ones(len(df_pred), dtype=bool)
+    if berco != "Todos" and "Berco" in df_pred.columns:
+        mask &= (df_pred["Berco"] == berco).to_numpy()
+    for valor, coluna in ((navio, navio_col), (tipo_navio, tipo_navio_col)):
+        if valor != "Todos" and coluna and coluna in df_pred.columns:
+            mask &= (df_pred[coluna].astype(str).str.strip() == str(valor).strip()).to_numpy()
+    return df_pred if mask.all() else df_pred[mask]
+
+
+def compute_predictions():
+    """Previsão do line-up: depende só de porto, data de chegada e line-up (não dos filtros)."""
+    previsao = {
+        "df_pred": None,
+        "modo": "BASIC",
+        "feature_reports": [],
+        "api_status": {},
+        "model_selection_info": [],  # FASE 4: Info sobre qual modelo foi usado
+        "nacional": None,
     }
-
-    # FASE 3: Usar funções robustas para obter dados de APIs
-    if porto_selecionado != "NACIONAL":
-        porto_key = porto_selecionado.upper()
-        porto_cfg = PORT_MUNICIPIO_UF.get(porto_key, {})
-        uf = porto_cfg.get("uf", "MA")
-
-        # Clima: Garantido com múltiplos fallbacks (BigQuery → Open-Meteo → Default)
-        clima, forecast, clima_ok = obter_dados_clima_robusto(porto_key, porto_cfg)
-        live_data["clima"] = clima
-        live_data["forecast"] = forecast
-
-        # Economia: BigQuery com fallback para defaults
-        pam, precos, economia_ok = obter_dados_economia_robusto(uf=uf)
-        live_data["pam"] = pam
-        live_data["precos"] = precos
-
-        # AIS: Tentar carregar dados locais
-        port_mapping = load_port_mapping()
-        ais_df, ais_ok = obter_dados_ais_robusto(porto_selecionado, port_mapping)
-        if ais_df is not None and not ais_df.empty:
-            live_data["ais_df"] = ais_df
-        else:
-            live_data["ais_df"] = None
-
-        # Log resumo das APIs
-        logger.info(f"Status APIs para {porto_selecionado}: Clima={'OK' if clima_ok else 'Fallback'}, "
-                   f"Economia={'OK' if economia_ok else 'Fallback'}, AIS={'OK' if ais_ok else 'Indisponível'}")
-
-    df_pred = None
-    df_pred_view = None
-    modo = "BASIC"
-    feature_reports = []
-    api_status = {}
-    model_selection_info = []  # FASE 4: Info sobre qual modelo foi usado
-
-    if porto_selecionado != "NACIONAL" and not df_lineup.empty:
-        tem_dados_terminal = has_terminal_data(df_lineup)
-        if lineup_path and lineup_path.suffix.lower() == ".xlsx":
-            tem_dados_terminal = True
-
-        # FASE 2 & FASE 4: Rastreia qualidade e seleção de modelo
-        df_pred, feature_reports, api_status, model_selection_info = inferir_lineup_inteligente(
-            df_lineup,
-            live_data,
-            porto_selecionado.upper(),
-            tem_dados_terminal=tem_dados_terminal,
-            track_quality=True,  # Ativa rastreamento de qualidade
-        )
-
-        if "tier" in df_pred.columns and df_pred["tier"].eq("PREMIUM").any():
-            modo = "PREMIUM"
-        PREDICTED_DIR.mkdir(parents=True, exist_ok=True)
-        data_tag = datetime.today().strftime("%Y%m%d")
-        output_path = PREDICTED_DIR / f"lineup_previsto_{porto_selecionado}_{data_tag}.csv"
-        df_pred.to_csv(output_path, index=False)
-
-    df_pred_view = df_pred
-    if df_pred is not None and berco_selecionado != "Todos" and "Berco" in df_pred.columns:
-        df_pred_view = df_pred[df_pred["Berco"] == berco_selecionado]
-    if (
-        df_pred_view is not None
-        and navio_selecionado != "Todos"
-        and navio_col
-        and navio_col in df_pred_view.columns
-    ):
-        navio_norm = df_pred_view[navio_col].astype(str).str.strip()
-        df_pred_view = df_pred_view[navio_norm == str(navio_selecionado).strip()]
-    if (
-        df_pred_view is not None
-        and tipo_navio_selecionado != "Todos"
-        and tipo_navio_col
-        and tipo_navio_col in df_pred_view.columns
-    ):
-        tipo_norm = df_pred_view[tipo_navio_col].astype(str).str.strip()
-        df_pred_view = df_pred_view[tipo_norm == str(tipo_navio_selecionado).strip()]
+    if porto_selecionado == "NACIONAL":
+        # Agregado do worker de previsoes (pipelines/materializar_previsoes.py)
+        previsao["nacional"] = PREVISOES.nacional()
+    elif not df_lineup.empty:
+        # Previsao ja materializada pelo worker; sob demanda (gravada no log de previsoes)
+        # so se o line-up ou a data mudaram
+        porto = previsao_materializada(porto_selecionado, df_lineup, data_chegada)
+        if porto is None:
+            porto = prever_porto(porto_selecionado, df_lineup, lineup_path, data_chegada)
+        previsao.update(porto)
+    return previsao
+
+
+def compute_results(previsao):
+    """Filtros, KPIs, quantis e textos a partir da previsão em cache (refeito a cada interação)."""
+    df_pred = previsao["df_pred"]
+    modo = previsao["modo"]
+    feature_reports = previsao["feature_reports"]
+    api_status = previsao["api_status"]
+    model_selection_info = previsao["model_selection_info"]
+    nacional = previsao["nacional"]
+
+    df_pred_view = filtrar_previsao(
+        df_pred,
+        berco_selecionado,
+        navio_selecionado,
+        navio_col,
+        tipo_navio_selecionado,
+        tipo_navio_col,
+    )
 
     fila_base = st.session_state.get("fila_base", 0)
     fila_media = max(int(fila_base / 2), 10) if fila_base else 10
@@ -2738,18 +2641,7 @@ def compute_results():
 
     fila_diaria = pd.DataFrame()
     if df_lineup is not None and not df_lineup.empty:
-        if "Chegada" in df_lineup.columns:
-            data_base = pd.to_datetime(df_lineup["Chegada"], errors="coerce", dayfirst=True)
-        else:
-            data_base = pd.Series([pd.NaT] * len(df_lineup))
-        if data_base.isna().all():
-            for fallback in ["Atualizacao", "ExtraidoEm"]:
-                if fallback in df_lineup.columns:
-                    data_base = pd.to_datetime(
-                        df_lineup[fallback], errors="coerce", dayfirst=True
-                    )
-                    if not data_base.isna().all():
-                        break
+        data_base = df_lineup["data_chegada_dt"]
         fila_diaria = (
             pd.DataFrame({"data": data_base.dt.date})
             .dropna()
@@ -2818,6 +2710,8 @@ def compute_results():
         ).dropna()
         if not espera_series.empty:
             kpi_espera_h = espera_series.median()
+    if nacional is not None and not nacional.empty:
+        kpi_espera_h = nacional["espera_mediana_h"].median()
     if kpi_espera_h is None or np.isnan(kpi_espera_h):
         kpi_espera_h = float(espera_horas_estimada)
 
@@ -2825,15 +2719,15 @@ def compute_results():
     if df_pred_view is not None and "eta_mais_espera" in df_pred_view.columns:
         eta_espera = pd.to_datetime(df_pred_view["eta_mais_espera"], errors="coerce")
         if "Chegada" in df_pred_view.columns:
-            eta_lineup = pd.to_datetime(
-                df_pred_view["Chegada"], errors="coerce", dayfirst=True
-            )
+            eta_lineup = df_pred_view["Chegada"]
         else:
             eta_lineup = pd.Series([pd.NaT] * len(df_pred_view))
         atraso = (eta_espera - eta_lineup).dt.total_seconds() / 3600.0
         atraso = atraso.replace([np.inf, -np.inf], np.nan).dropna()
         if not atraso.empty:
             kpi_atraso_h = atraso.median()
+    if nacional is not None and not nacional.empty:
+        kpi_atraso_h = nacional["atraso_mediano_h"].median()
     if kpi_atraso_h is None or np.isnan(kpi_atraso_h):
         kpi_atraso_h = float(kpi_espera_h)
     resumo_espera = build_espera_resumo(kpi_espera_h, mae_esperado)
@@ -2910,42 +2804,46 @@ def compute_results():
         # FASE 2: Qualidade das features
         "feature_reports": feature_reports,
         "api_status": api_status,
+        "model_selection_info": model_selection_info,
+        "nacional": nacional,
     }
 
 
-if "resultado" not in st.session_state:
-    st.session_state["resultado"] = None
+if "previsao" not in st.session_state:
+    st.session_state["previsao"] = None
 if "erro_resultado" not in st.session_state:
     st.session_state["erro_resultado"] = None
-if "params_key" not in st.session_state:
-    st.session_state["params_key"] = None
+if "previsao_key" not in st.session_state:
+    st.session_state["previsao_key"] = None
 
-params_key = json.dumps(
+# So o que altera a previsao; berco/navio/tipo, chuva, fila e carga so recortam/anotam o resultado
+previsao_key = json.dumps(
     {
         "porto": porto_selecionado,
-        "tipo_carga": tipo_carga,
         "data_chegada": str(data_chegada),
-        "chuva_prevista": chuva_prevista,
-        "fila_atual": fila_atual,
-        "berco": berco_selecionado,
-        "navio": navio_selecionado,
-        "tipo_navio": tipo_navio_selecionado,
+        "lineup": impressao_lineup(df_lineup),
     },
     sort_keys=True,
 )
 
-if gerar or st.session_state["resultado"] is None or st.session_state["params_key"] != params_key:
+if gerar or st.session_state["previsao"] is None or st.session_state["previsao_key"] != previsao_key:
     try:
-        st.session_state["resultado"] = compute_results()
+        st.session_state["previsao"] = compute_predictions()
         st.session_state["erro_resultado"] = None
-        st.session_state["params_key"] = params_key
+        st.session_state["previsao_key"] = previsao_key
     except Exception as exc:
         st.session_state["erro_resultado"] = str(exc)
 
-resultado = st.session_state.get("resultado")
+resultado = None
+erro_resultado = st.session_state.get("erro_resultado")
+if st.session_state["previsao"] is not None:
+    try:
+        resultado = compute_results(st.session_state["previsao"])
+    except Exception as exc:
+        erro_resultado = str(exc)
 
-if st.session_state.get("erro_resultado"):
-    st.error(f"Falha ao gerar previsão: {st.session_state['erro_resultado']}")
+if erro_resultado:
+    st.error(f"Falha ao gerar previsão: {erro_resultado}")
 
 if not resultado:
     st.info("Defina os parâmetros na barra lateral e clique em Gerar Previsão.")
@@ -2970,6 +2868,7 @@ with tabs[0]:
     # FASE 2: Seção de Qualidade dos Dados
     feature_reports = resultado.get("feature_reports", [])
     api_status = resultado.get("api_status", {})
+    model_selection_info = resultado.get("model_selection_info", [])
 
     if feature_reports:
         # Calcula score médio de confiança
@@ -3125,6 +3024,21 @@ with tabs[0]:
         unsafe_allow_html=True,
     )
 
+    nacional = resultado.get("nacional")
+    if nacional is not None and not nacional.empty:
+        render_section_title("Previsão por porto", ICON_TREND)
+        st.markdown(
+            "<div class='table-caption'>Previsões materializadas pelo worker para todos os portos com line-up.</div>",
+            unsafe_allow_html=True,
+        )
+        st.dataframe(
+            nacional.drop(columns=["porto_norm"]).round(1),
+            use_container_width=True,
+            hide_index=True,
+        )
+    elif porto_selecionado == "NACIONAL":
+        st.info("Sem previsões materializadas. Rode `python pipelines/materializar_previsoes.py`.")
+
     comparativo = build_comparativo_lineup(resultado["df_pred_view"], navio_col)
     if comparativo is not None and not comparativo.empty:
         st.markdown(
@@ -3205,6 +3119,21 @@ with tabs[1]:
     st.write("Porto selecionado:", porto_selecionado)
     st.write("Perfil inferido:", perfil_porto)
     st.write("Fila média calculada:", resultado["fila_media"])
+    st.write("Cache de previsões (processo):", cache_previsoes().estatisticas())
+    avaliacao = carregar_avaliacao()
+    if avaliacao is not None and avaliacao.chaves:
+        st.write(f"MAE ao vivo (avaliação online, marca d'água {avaliacao.marca}):")
+        st.dataframe(avaliacao.tabela(), use_container_width=True)
+    drift = monitor_drift().relatorio()
+    if not drift.empty:
+        st.write(f"Drift de features (PSI/KS serving x treino): {int(drift['drift'].sum())} em drift")
+        st.dataframe(drift, use_container_width=True)
+    sem_referencia = monitor_drift().sem_referencia()
+    if sem_referencia:
+        st.write(
+            "Drift de features sem referência do treino (retreinar para monitorar): "
+            + ", ".join(f"{perfil}/{modelo}" for perfil, modelo in sem_referencia)
+        )
     if resultado["df_pred_view"] is not None:
         st.dataframe(resultado["df_pred_view"].head(200), use_container_width=True)
     if resultado["meta"]:
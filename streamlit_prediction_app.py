@@ -224,7 +224,7 @@ def main():
 
             with col3:
                 st.markdown("**Dados Utilizados**")
-                st.markdown(f"- Lineups históricos: {len(predictor.lineup_history)}")
+                st.markdown(f"- Lineups históricos: {len(predictor.historico)}")
                 st.markdown(f"- Portos cobertos: {len(PORTOS)}")
                 st.markdown(f"- Features calculadas: 15-51")
 
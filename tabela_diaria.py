@@ -0,0 +1,107 @@
+"""
+Materializacao incremental de tabelas diarias a partir de parquets grandes.
+
+Cada fonte e agregada separadamente e gravada em fontes/<nome>.parquet; so
+e reprocessada quando o arquivo de origem (tamanho/mtime), o codigo da
+agregacao (inclusive helpers e constantes de outros modulos do projeto, como
+registro_portos) ou os CSVs do registro de portos mudam, conforme o manifesto. A tabela final combinada fica
+ordenada por data, para leitura com projecao de colunas e filtro de datas.
+"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from pipeline_cache import hash_codigo, impressao_arquivos
+from registro_portos import PORT_MAPPING_PATH, PORTS_CONFIG_PATH
+
+ARQUIVO_TABELA = "tabela.parquet"
+ARQUIVO_MANIFESTO = "manifesto.json"
+LINHAS_POR_GRUPO = 50_000
+
+
+@dataclass
+class FonteDiaria:
+    nome: str
+    arquivo: Path
+    agregar: Callable[[Path], pd.DataFrame]
+
+
+class TabelaDiaria:
+    """Tabela porto x dia materializada a partir de varias fontes."""
+
+    def __init__(self, fontes: List[FonteDiaria], combinar: Callable[[Dict[str, pd.DataFrame]], pd.DataFrame],
+                 destino, coluna_data="data"):
+        self.fontes = fontes
+        self.combinar = combinar
+        self.destino = Path(destino)
+        self.coluna_data = coluna_data
+
+    def _impressao(self, fonte):
+        return {
+            "arquivo": impressao_arquivos([fonte.arquivo]),
+            "codigo": hash_codigo(fonte.agregar),
+            # IDs e chaves de porto usados na agregacao
+            "registro": impressao_arquivos([PORTS_CONFIG_PATH, PORT_MAPPING_PATH]),
+        }
+
+    def _ler_manifesto(self):
+        caminho = self.destino / ARQUIVO_MANIFESTO
+        if not caminho.exists():
+            return {}
+        with caminho.open("r", encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def atualizar(self, forcar=False):
+        """Reagrega fontes alteradas e recombina; devolve os nomes reprocessados."""
+        manifesto = self._ler_manifesto()
+        anteriores = manifesto.get("fontes", {})
+        pasta_fontes = self.destino / "fontes"
+        atuais, alteradas = {}, []
+        for fonte in self.fontes:
+            if not Path(fonte.arquivo).exists():
+                continue
+            impressao = self._impressao(fonte)
+            atuais[fonte.nome] = impressao
+            parcial = pasta_fontes / f"{fonte.nome}.parquet"
+            if forcar or anteriores.get(fonte.nome) != impressao or not parcial.exists():
+                pasta_fontes.mkdir(parents=True, exist_ok=True)
+                fonte.agregar(fonte.arquivo).to_parquet(parcial, index=False)
+                alteradas.append(fonte.nome)
+
+        combinador = hash_codigo(self.combinar)
+        tabela = self.destino / ARQUIVO_TABELA
+        removidas = set(anteriores) - set(atuais)
+        if not alteradas and not removidas and manifesto.get("combinar") == combinador and tabela.exists():
+            return alteradas
+
+        parciais = {nome: pd.read_parquet(pasta_fontes / f"{nome}.parquet") for nome in atuais}
+        final = self.combinar(parciais)
+        if not final.empty:
+            final = final.sort_values(self.coluna_data, kind="stable").reset_index(drop=True)
+        self.destino.mkdir(parents=True, exist_ok=True)
+        final.to_parquet(tabela, index=False, row_group_size=LINHAS_POR_GRUPO)
+        for nome in removidas:
+            (pasta_fontes / f"{nome}.parquet").unlink(missing_ok=True)
+        with (self.destino / ARQUIVO_MANIFESTO).open("w", encoding="utf-8") as fh:
+            json.dump({"fontes": atuais, "combinar": combinador}, fh, indent=2)
+        return alteradas
+
+    def ler(self, colunas=None, data_min=None, data_max=None):
+        """Le a tabela materializada so com as colunas e o intervalo de datas pedidos."""
+        tabela = self.destino / ARQUIVO_TABELA
+        if not tabela.exists():
+            return pd.DataFrame()
+        if self.coluna_data not in pq.read_schema(tabela).names:
+            # Nenhuma fonte disponivel: tabela vazia sem colunas
+            return pd.read_parquet(tabela)
+        filtros = []
+        if data_min is not None and pd.notna(data_min):
+            filtros.append((self.coluna_data, ">=", pd.Timestamp(data_min)))
+        if data_max is not None and pd.notna(data_max):
+            filtros.append((self.coluna_data, "<=", pd.Timestamp(data_max)))
+        return pd.read_parquet(tabela, columns=colunas, filters=filtros or None)
@@ -0,0 +1,133 @@
+"""
+Taxonomia de cargas: texto livre de mercadoria -> perfil, SH4 e NCM.
+
+Todas as palavras-chave ficam numa unica regex compilada; cada valor
+distinto e classificado uma vez (memoizado) e o resultado e espalhado para
+as linhas pelos codigos de pd.factorize. A prioridade e a ordem de
+TAXONOMIA (perfil VEGETAL, depois MINERAL, depois FERTILIZANTE; itens mais
+especificos antes), a mesma do antigo loop sobre PROFILE_KEYWORDS.
+
+Os SH4 sao os codigos de cdmercadoria/stsh4 usados no treino (CARGA_PROFILES),
+de modo que as features de codigo no app ficam no mesmo dominio do treino.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+PERFIL_PADRAO = "VEGETAL"
+SH4_DESCONHECIDO = "0000"
+NCM_DESCONHECIDO = "00000000"
+
+# (perfil, sh4, ncm representativo, descricao, palavras-chave)
+TAXONOMIA = [
+    ("VEGETAL", "2304", "23040010", "farelo de soja", ("FARELO",)),
+    ("VEGETAL", "1201", "12019000", "soja", ("SOJA",)),
+    ("VEGETAL", "1005", "10059010", "milho", ("MILHO",)),
+    ("VEGETAL", "1701", "17011400", "acucar", ("ACUCAR",)),
+    ("VEGETAL", "1001", "10019900", "trigo", ("TRIGO",)),
+    ("VEGETAL", "1003", "10039080", "cevada", ("CEVADA",)),
+    ("VEGETAL", "1107", "11071010", "malte", ("MALTE",)),
+    ("VEGETAL", "1006", "10063021", "arroz", ("ARROZ",)),
+    ("VEGETAL", "2302", "23023010", "farelos diversos", ()),
+    ("VEGETAL", "2306", "23063000", "tortas de oleaginosas", ()),
+    ("VEGETAL", "1205", "12051000", "colza", ()),
+    ("VEGETAL", "1206", "12060090", "girassol", ()),
+    ("MINERAL", "2601", "26011100", "minerio de ferro", ("MINERIO", "FERRO")),
+    ("MINERAL", "2606", "26060011", "bauxita", ("BAUXITA",)),
+    ("MINERAL", "2602", "26020010", "manganes", ("MANGANES",)),
+    ("MINERAL", "2523", "25231000", "cimento/clinker", ("CIMENTO", "CLINKER")),
+    ("MINERAL", "2603", "26030090", "cobre", ("COBRE",)),
+    ("MINERAL", "2501", "25010020", "sal", ()),
+    ("MINERAL", "2510", "25101010", "fosfatos naturais", ()),
+    ("FERTILIZANTE", "3102", "31021010", "nitrogenados (ureia)", ("UREIA", "NITROGENADO")),
+    ("FERTILIZANTE", "3104", "31042090", "potassicos (kcl)", ("POTASSIO", "POTASSICO", "KCL")),
+    ("FERTILIZANTE", "3105", "31052000", "compostos (npk)", ("NPK",)),
+    ("FERTILIZANTE", "3103", "31031100", "fosfatados", ("FOSFAT",)),
+    ("FERTILIZANTE", "3101", "31010000", "organicos", ("ORGANICO",)),
+    ("FERTILIZANTE", "3105", "31052000", "fertilizantes", ("FERTIL",)),
+]
+
+# SH4 por perfil (filtro de cdmercadoria no treino)
+SH4_POR_PERFIL = {}
+for _perfil, _sh4, *_ in TAXONOMIA:
+    SH4_POR_PERFIL.setdefault(_perfil, [])
+    if _sh4 not in SH4_POR_PERFIL[_perfil]:
+        SH4_POR_PERFIL[_perfil].append(_sh4)
+_PERFIL_POR_SH4 = {sh4: perfil for perfil, codigos in SH4_POR_PERFIL.items() for sh4 in codigos}
+
+_PRIORIDADE = {}
+for _i, (_perfil, _sh4, _ncm, _desc, _palavras) in enumerate(TAXONOMIA):
+    for _palavra in _palavras:
+        _PRIORIDADE.setdefault(_palavra, _i)
+# Lookahead: todas as ocorrencias, inclusive sobrepostas (mesmo resultado de "palavra in texto")
+_PADRAO = re.compile("(?=(" + "|".join(sorted(map(re.escape, _PRIORIDADE), key=len, reverse=True)) + "))")
+
+COLUNAS_CODIGO = ("cdmercadoria", "cd_mercadoria", "stsh4")
+COLUNAS_TEXTO = ("Mercadoria", "mercadoria", "PRODUTO", "produto")
+
+
+def _normalizar(valor):
+    if not isinstance(valor, str) and pd.isna(valor):
+        return ""
+    texto = str(valor).upper()
+    texto = "".join(ch for ch in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(ch))
+    return re.sub(r"[^A-Z0-9]", "", texto)
+
+
+@lru_cache(maxsize=4096)
+def classificar_texto(texto):
+    """(perfil, sh4, ncm) do texto de mercadoria; perfil padrao e codigos '0000' sem match."""
+    norm = _normalizar(texto)
+    encontrados = [_PRIORIDADE[m] for m in _PADRAO.findall(norm)] if norm else []
+    if not encontrados:
+        return PERFIL_PADRAO, SH4_DESCONHECIDO, NCM_DESCONHECIDO
+    perfil, sh4, ncm, _, _ = TAXONOMIA[min(encontrados)]
+    return perfil, sh4, ncm
+
+
+@lru_cache(maxsize=4096)
+def perfil_por_codigo(codigo):
+    """Perfil pelo prefixo SH4 de um codigo de mercadoria (None se desconhecido)."""
+    if not isinstance(codigo, str) and pd.isna(codigo):
+        return None
+    digitos = re.sub(r"[^0-9]", "", str(codigo))
+    if len(digitos) < 4:
+        return None
+    return _PERFIL_POR_SH4.get(digitos[:4])
+
+
+def _por_valor_unico(serie, funcao):
+    codigos, unicos = pd.factorize(pd.Series(serie).to_numpy())
+    return codigos, [funcao(v) for v in unicos]
+
+
+def classificar(serie):
+    """DataFrame (perfil, sh4, ncm) para uma serie de textos, classificando so os valores unicos."""
+    serie = pd.Series(serie)
+    codigos, resultados = _por_valor_unico(serie, classificar_texto)
+    resultados.append((PERFIL_PADRAO, SH4_DESCONHECIDO, NCM_DESCONHECIDO))
+    tabela = np.array(resultados, dtype=object).reshape(-1, 3)
+    return pd.DataFrame(tabela[codigos], columns=["perfil", "sh4", "ncm"], index=serie.index)
+
+
+def perfis_lineup(df):
+    """
+    Perfil de cada linha do lineup (equivalente vetorizado de get_profile_from_row).
+
+    Codigos de mercadoria (cdmercadoria/cd_mercadoria/stsh4) tem prioridade;
+    depois a primeira coluna de texto presente; sem nada, PERFIL_PADRAO.
+    """
+    perfil = pd.Series([None] * len(df), index=df.index, dtype=object)
+    for coluna in COLUNAS_CODIGO:
+        if coluna in df.columns:
+            codigos, resultados = _por_valor_unico(df[coluna], perfil_por_codigo)
+            por_codigo = np.array(resultados + [None], dtype=object)[codigos]
+            perfil = perfil.fillna(pd.Series(por_codigo, index=df.index))
+    texto = next((c for c in COLUNAS_TEXTO if c in df.columns), None)
+    if texto is not None:
+        perfil = perfil.fillna(classificar(df[texto])["perfil"])
+    return perfil.fillna(PERFIL_PADRAO)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Script de teste da avaliacao online (avaliacao_online).
+Verifica a extracao de atracacoes, o as-of join com o log de previsoes,
+o processamento incremental, o MAE ao vivo com fallback e o MAE
+reaplicado sobre previsoes em cache.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from avaliacao_online import AvaliacaoOnline, mae_esperado
+from log_lineup import LogLineup
+from log_previsoes import LogPrevisoes
+from registro_portos import registro
+
+
+def _coleta(base, navios):
+    return pd.DataFrame({
+        "navio": [n for n, _, _ in navios],
+        "imo": ["9000001" if n == "ALFA" else "" for n, _, _ in navios],
+        "produto": "soja",
+        "chegada": [base + pd.Timedelta(days=d) for _, d, _ in navios],
+        "situacao": [s for _, _, s in navios],
+        "porto": "Santos",
+    })
+
+
+def test_avaliacao_incremental():
+    """Atracacao e saida do line-up viram erros; so eventos novos sao processados"""
+    print("\n" + "="*70)
+    print("TESTE 1: avaliacao incremental")
+    print("="*70)
+
+    # Previsoes sao geradas agora; as coletas ficam no futuro proximo
+    base = pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        log_lineup = LogLineup(Path(tmp) / "lineup")
+        log_prev = LogPrevisoes(Path(tmp) / "previsoes", intervalo_s=60)
+        estado = Path(tmp) / "avaliacao.json"
+
+        log_prev.registrar(
+            pd.DataFrame({
+                "Navio": ["Alfa", "BETA", "GAMA"],
+                "imo": ["9000001", None, None],
+                "perfil": "VEGETAL",
+                "data_chegada_dt": [base + pd.Timedelta(days=d) for d in (2, 3, 19)],
+                "tempo_espera_previsto_horas": [40.0, 30.0, 10.0],
+                "tier": "BASIC",
+                "modelo_usado": "completo",
+            }),
+            "Santos", base,
+        )
+        log_prev.descarregar()
+
+        log_lineup.registrar(
+            _coleta(base, [("ALFA", 2, "FUNDEADO"), ("BETA", 3, "PROGRAMADO"), ("GAMA", 19, "PROGRAMADO")]),
+            capturado_em=base,
+        )
+        log_lineup.registrar(
+            _coleta(base, [("ALFA", 2, "ATRACADO"), ("GAMA", 19, "PROGRAMADO")]),
+            capturado_em=base + pd.Timedelta(days=4),
+        )
+
+        avaliacao = AvaliacaoOnline(estado)
+        resumo = avaliacao.avaliar(log_lineup, log_prev)
+        avaliacao.salvar()
+        # ALFA: 48 h reais x 40 previstas; BETA: 24 h x 30
+        assert resumo["atracacoes"] == 2 and resumo["casadas"] == 2, resumo
+        assert resumo["mae_lote_h"] == 7.0
+        porto = registro().chave(registro().id("Santos"))
+        # MAE exponencial: 8 h (ALFA) e depois 6 h (BETA) com alpha = 2/51
+        assert abs(avaliacao.mae(porto, "VEGETAL", "completo", minimo=1) - (8.0 + 2 / 51 * (6.0 - 8.0))) < 1e-9
+        assert pd.isna(avaliacao.mae(porto, "VEGETAL", "completo"))  # menos de MINIMO_OBSERVACOES
+        tabela = avaliacao.tabela().set_index(["porto", "perfil", "modelo"])
+        assert tabela.loc[(porto, "VEGETAL", "completo"), "observacoes"] == 2
+        assert tabela.loc[("TODOS", "VEGETAL", "TODOS"), "observacoes"] == 2
+        print(f"  ✓ Atracacao (ATRACADO) e saida do line-up avaliadas: {resumo}")
+
+        # Sem deltas novos: nada a fazer; ALFA removido depois de atracado nao conta de novo
+        assert AvaliacaoOnline(estado).avaliar(log_lineup, log_prev)["atracacoes"] == 0
+        log_lineup.registrar(
+            _coleta(base, [("GAMA", 19, "PROGRAMADO")]),
+            capturado_em=base + pd.Timedelta(days=5),
+        )
+        avaliacao = AvaliacaoOnline(estado)
+        resumo = avaliacao.avaliar(log_lineup, log_prev)
+        assert resumo["atracacoes"] == 0, resumo
+        assert avaliacao.tabela()["observacoes"].max() == 2
+        print("  ✓ Marca d'agua: so deltas novos; mesmo navio nao e avaliado duas vezes")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_mae_ao_vivo():
+    """mae_esperado usa o MAE ao vivo com observacoes suficientes, senao o padrao do perfil"""
+    print("\n" + "="*70)
+    print("TESTE 2: MAE ao vivo para o app")
+    print("="*70)
+
+    padrao = {"VEGETAL": 38, "MINERAL": 31}
+    perfis = pd.Series(["VEGETAL", "MINERAL", "VEGETAL"], index=[5, 6, 7])
+    modelos = pd.Series(["completo", "completo", "light"], index=[5, 6, 7])
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = Path(tmp) / "avaliacao.json"
+        assert mae_esperado("Santos", perfis, modelos, padrao, caminho=caminho).tolist() == [38, 31, 38]
+        print("  ✓ Sem avaliacao: valores fixos do perfil")
+
+        avaliacao = AvaliacaoOnline(caminho)
+        porto = registro().chave(registro().id("Santos"))
+        for _ in range(25):
+            avaliacao.observar(porto, "VEGETAL", "completo", 12.0)
+        for _ in range(5):
+            avaliacao.observar(porto, "VEGETAL", "light", -20.0)
+        avaliacao.salvar()
+
+        vivo = mae_esperado("Porto de Santos (SP)", perfis, modelos, padrao, caminho=caminho)
+        assert list(vivo.index) == [5, 6, 7]
+        assert vivo[5] == 12.0 and vivo[6] == 31
+        # light tem 5 observacoes: cai no agregado porto x perfil (30 observacoes)
+        assert 12.0 < vivo[7] < 20.0
+        print(f"  ✓ MAE ao vivo por modelo, agregado e padrao: {vivo.tolist()}")
+
+        assert mae_esperado("Santos", pd.Series(["VEGETAL"]), "PREMIUM", 30, caminho=caminho)[0] == vivo[7]
+        print("  ✓ Padrao unico (premium) e modelo sem observacoes")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def test_mae_depois_do_cache():
+    """Previsao em cache recebe o MAE da avaliacao atual, sem alterar o objeto em cache"""
+    print("\n" + "="*70)
+    print("TESTE 3: MAE aplicado depois do cache de previsoes")
+    print("="*70)
+
+    import streamlit_app as app
+
+    em_cache = pd.DataFrame({
+        "Navio": ["ALFA", "BETA"],
+        "perfil": ["VEGETAL", "VEGETAL"],
+        "modelo_usado": ["completo", "completo"],
+        "tier": ["BASIC", "PREMIUM"],
+        "tempo_espera_previsto_horas": [40.0, 50.0],
+    })
+    anterior = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            antes = app.aplicar_mae_esperado(em_cache, "Santos")
+            assert antes["mae_esperado"][0] == app.MAE_PADRAO_PERFIL["VEGETAL"]
+
+            avaliacao = AvaliacaoOnline()
+            porto = registro().chave(registro().id("Santos"))
+            for _ in range(25):
+                avaliacao.observar(porto, "VEGETAL", "completo", 9.0)
+                avaliacao.observar(porto, "VEGETAL", "PREMIUM", 4.0)
+            avaliacao.salvar()
+            depois = app.aplicar_mae_esperado(em_cache, "Santos")
+        finally:
+            os.chdir(anterior)
+    assert depois["mae_esperado"].tolist() == [9.0, 4.0]
+    assert "mae_esperado" not in em_cache.columns
+    # Sem copia profunda: as demais colunas seguem compartilhadas com o frame em cache
+    assert np.shares_memory(
+        depois["tempo_espera_previsto_horas"].to_numpy(), em_cache["tempo_espera_previsto_horas"].to_numpy()
+    )
+    print(f"  ✓ Mesma previsao em cache: MAE {antes['mae_esperado'].tolist()} -> {depois['mae_esperado'].tolist()}")
+
+    print("\n  ✅ TESTE 3 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - AVALIACAO ONLINE")
+    print("="*70)
+
+    tests = [
+        ("avaliacao incremental", test_avaliacao_incremental),
+        ("MAE ao vivo", test_mae_ao_vivo),
+        ("MAE depois do cache", test_mae_depois_do_cache),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
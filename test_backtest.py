@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Script de teste do backtest historico (backtest).
+Verifica o line-up pontual, a juncao com o realizado, as metricas e as
+estatisticas de espera do app (mediana, MA5) pontuais.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import backtest as bt
+
+
+def _historico():
+    """Dois snapshots de Santos: ETA do Alfa revisada no segundo; Beta so aparece no segundo."""
+    return pd.DataFrame({
+        "navio": ["ALFA", "GAMA", "ALFA", "BETA", "GAMA"],
+        "imo": ["", "", "", "9000001", ""],
+        "produto": ["soja", "soja", "soja", "ureia", "soja"],
+        "prev_chegada": ["05/03/2025 10:00", "04/03/2025 00:00", "07/03/2025 10:00", "08/03/2025 00:00", "04/03/2025 00:00"],
+        "porto": "Santos",
+        "tempo_espera_horas": [np.nan, np.nan, np.nan, np.nan, 40.0],
+        "source_file": [
+            "porto=santos/lineup_2025-03-01.parquet",
+            "porto=santos/lineup_2025-03-01.parquet",
+            "porto=santos/lineup_2025-03-03.parquet",
+            "porto=santos/lineup_2025-03-03.parquet",
+            "porto=santos/lineup_2025-03-03.parquet",
+        ],
+    })
+
+
+def prever_fixo(lineup, live_data, porto_nome):
+    """Previsao constante de 30 h (picklavel para o pool de processos)."""
+    assert live_data["clima"] is not None and live_data["eta_base"] is not None
+    return lineup.assign(tempo_espera_previsto_horas=30.0, mae_esperado=20.0, tier="BASIC", modelo_usado="fixo")
+
+
+def prever_ma5(lineup, live_data, porto_nome):
+    """Previsao = tempo_espera_ma5 das features do app (picklavel para o pool de processos)."""
+    import streamlit_app as app
+
+    features = ["tempo_espera_ma5", "porto_tempo_medio_historico"]
+    X = app.build_features_from_lineup(lineup, {"features": features}, live_data, porto_nome.upper())
+    return lineup.assign(
+        tempo_espera_previsto_horas=X["tempo_espera_ma5"].to_numpy(),
+        mae_esperado=X["porto_tempo_medio_historico"].to_numpy(),
+        tier="BASIC",
+        modelo_usado="ma5",
+    )
+
+
+def _historico_esperas(com_futura):
+    """Esperas do berco B1 em Santos; a do DELTA so e conhecida em 10/03."""
+    linhas = [
+        ("ALFA", "08/03/2025 10:00", np.nan, "2025-03-01"),
+        ("GAMA", "25/02/2025 00:00", 10.0, "2025-03-01"),
+        ("EPSILON", "26/02/2025 00:00", 20.0, "2025-03-03"),
+    ]
+    if com_futura:
+        linhas.append(("DELTA", "06/03/2025 00:00", 500.0, "2025-03-10"))
+    return pd.DataFrame({
+        "navio": [l[0] for l in linhas],
+        "prev_chegada": [l[1] for l in linhas],
+        "tempo_espera_horas": [l[2] for l in linhas],
+        "source_file": [f"porto=santos/lineup_{l[3]}.parquet" for l in linhas],
+        "berco": "B1",
+        "produto": "soja",
+        "porto": "Santos",
+    })
+
+
+def test_lineup_pontual():
+    """Cada data ve so os snapshots conhecidos ate ela, com a ETA vigente"""
+    print("\n" + "="*70)
+    print("TESTE 1: line-up pontual")
+    print("="*70)
+
+    historico = bt.preparar_historico(_historico())
+    antes = bt.lineup_em(historico, "2025-02-28")
+    assert antes.empty
+    dia1 = bt.lineup_em(historico, "2025-03-01")
+    assert sorted(dia1["Navio"]) == ["ALFA", "GAMA"]
+    assert dia1.loc[dia1["Navio"] == "ALFA", "data_chegada_dt"].iloc[0] == pd.Timestamp("2025-03-05 10:00")
+    print("  ✓ Snapshot do dia 1 sem os navios vistos depois")
+
+    dia3 = bt.lineup_em(historico, "2025-03-03")
+    assert sorted(dia3["Navio"]) == ["ALFA", "BETA", "GAMA"]
+    assert dia3.loc[dia3["Navio"] == "ALFA", "data_chegada_dt"].iloc[0] == pd.Timestamp("2025-03-07 10:00")
+    assert bt.lineup_em(historico, "2025-03-05")["Navio"].tolist() == ["ALFA", "BETA"]
+    print("  ✓ ETA revisada e navios ja chegados fora do line-up")
+
+    assert historico.loc[historico["Navio"] == "BETA", "chave_navio"].iloc[0].endswith(":IMO9000001")
+    print("  ✓ Chave do navio por IMO quando houver")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_realizado_e_metricas():
+    """Realizado do historico e da ANTAQ (as-of), metricas por horizonte e pool igual ao serial"""
+    print("\n" + "="*70)
+    print("TESTE 2: realizado + metricas")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        particao = Path(tmp) / "atracacao" / "ano=2025"
+        particao.mkdir(parents=True)
+        pd.DataFrame({
+            "data_chegada": pd.to_datetime(["2025-03-07 14:00", "2025-03-20 00:00"]),
+            "data_atracacao": pd.to_datetime(["2025-03-08 16:00", "2025-03-21 00:00"]),
+            "porto_atracacao": ["Santos", "Santos"],
+        }).to_parquet(particao / "part-0.parquet", index=False)
+
+        resultado, erros = bt.executar_backtest(
+            _historico(), "2025-03-01", "2025-03-04", prever=prever_fixo, processos=1, antaq_dir=tmp,
+        )
+        paralelo, _ = bt.executar_backtest(
+            _historico(), "2025-03-01", "2025-03-04", prever=prever_fixo, processos=2, antaq_dir=tmp,
+        )
+
+    assert erros == []
+    ordem = ["data_referencia", "chave_navio"]
+    pd.testing.assert_frame_equal(
+        resultado.sort_values(ordem).reset_index(drop=True),
+        paralelo.sort_values(ordem).reset_index(drop=True),
+    )
+    print(f"  ✓ {len(resultado)} previsoes; pool de processos igual ao serial")
+
+    reais = resultado.drop_duplicates("Navio").set_index("Navio")
+    assert reais.loc["GAMA", "espera_real_h"] == 40.0 and reais.loc["GAMA", "fonte_real"] == "historico"
+    assert reais.loc["ALFA", "espera_real_h"] == 26.0 and reais.loc["ALFA", "fonte_real"] == "antaq"
+    assert pd.isna(reais.loc["BETA", "espera_real_h"])
+    print("  ✓ Realizado do historico e da ANTAQ (ultima ETA +-12 h)")
+
+    tabela = bt.metricas(resultado, por=("porto", "horizonte"))
+    assert tabela["previsoes"].sum() == resultado["erro_h"].notna().sum()
+    linha = tabela[tabela["horizonte"] == "3-7d"].iloc[0]
+    # ALFA 4x (+4 h) e GAMA 1x (-10 h)
+    assert linha["previsoes"] == 5 and linha["mae_h"] == 5.2 and linha["vies_h"] == 1.2
+    assert linha["cobertura_mae"] == 1.0
+    print(f"  ✓ Metricas por horizonte:\n{tabela.to_string(index=False)}")
+
+    calib = bt.calibracao(resultado, faixas=2, por=("porto",))
+    assert calib["previsoes"].sum() == resultado["erro_h"].notna().sum()
+    print("  ✓ Calibracao por faixa do previsto")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def test_espera_pontual():
+    """Mediana e MA5 do app so com as esperas conhecidas ate a data de referencia"""
+    print("\n" + "="*70)
+    print("TESTE 3: estatisticas de espera pontuais")
+    print("="*70)
+
+    sem_futura, erros = bt.executar_backtest(
+        _historico_esperas(False), "2025-03-01", "2025-03-04", prever=prever_ma5, processos=1, antaq_dir=None,
+    )
+    com_futura, _ = bt.executar_backtest(
+        _historico_esperas(True), "2025-03-01", "2025-03-04", prever=prever_ma5, processos=1, antaq_dir=None,
+    )
+    assert erros == [] and len(sem_futura) == 4
+    colunas = ["data_referencia", "tempo_espera_previsto_horas", "mae_esperado"]
+    pd.testing.assert_frame_equal(sem_futura[colunas], com_futura[colunas])
+    print("  ✓ Espera conhecida depois de D nao muda a previsao de D")
+
+    previsto = sem_futura.set_index("data_referencia")["tempo_espera_previsto_horas"]
+    assert previsto[pd.Timestamp("2025-03-01")] == 10.0
+    assert previsto[pd.Timestamp("2025-03-03")] == 15.0
+    print("  ✓ MA5 do berco so com as esperas ja conhecidas (10 h; depois media de 10 e 20 h)")
+
+    espera = bt.EsperaPontual(bt.preparar_historico(_historico_esperas(True)))
+    assert espera.em("2025-03-10").ma5("Santos", berco="B1") == np.mean([10.0, 20.0, 500.0])
+    assert espera.em("2025-03-02").ma5("Santos", berco="B1") == 10.0
+    print("  ✓ Datas fora de ordem recomecam do zero")
+
+    print("\n  ✅ TESTE 3 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - BACKTEST HISTORICO")
+    print("="*70)
+
+    tests = [
+        ("line-up pontual", test_lineup_pontual),
+        ("realizado + metricas", test_realizado_e_metricas),
+        ("espera pontual", test_espera_pontual),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Script de teste do cache de resultados compartilhado (cache_resultados).
+Verifica o limite em bytes com descarte LRU e o calculo unico por chave.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from cache_resultados import CacheLRUBytes, impressao, tamanho_bytes
+
+
+def _frame(n):
+    return pd.DataFrame({"espera": np.arange(n, dtype="float64")})
+
+
+def test_lru_em_bytes():
+    """Descarta os menos usados ao passar do limite; valor maior que o limite nao entra"""
+    print("\n" + "="*70)
+    print("TESTE 1: LRU limitado em bytes")
+    print("="*70)
+
+    tamanho = tamanho_bytes({"df_pred": _frame(1000)})
+    cache = CacheLRUBytes(limite_bytes=int(tamanho * 2.5))
+    a = cache.guardar("a", {"df_pred": _frame(1000)})
+    cache.guardar("b", {"df_pred": _frame(1000)})
+    assert cache.obter("a") is a
+    print("  ✓ Mesmo objeto devolvido (referencia, sem copia)")
+
+    cache.guardar("c", {"df_pred": _frame(1000)})
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.bytes <= cache.limite_bytes
+    print("  ✓ Menos usado descartado ao passar do limite")
+
+    cache.guardar("grande", {"df_pred": _frame(10000)})
+    assert "grande" not in cache and len(cache) == 2
+    estat = cache.estatisticas()
+    assert estat["descartes"] == 1 and estat["acertos"] == 1
+    print(f"  ✓ Valor acima do limite nao guardado ({estat})")
+
+    assert impressao({"x": 1, "df": _frame(3)}) == impressao({"df": _frame(3), "x": 1})
+    assert impressao({"df": _frame(3)}) != impressao({"df": _frame(4)})
+    print("  ✓ Impressao estavel para dicts com DataFrames")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_calculo_unico():
+    """Sessoes simultaneas pedindo a mesma chave esperam um unico calculo"""
+    print("\n" + "="*70)
+    print("TESTE 2: calculo unico por chave")
+    print("="*70)
+
+    cache = CacheLRUBytes()
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        time.sleep(0.2)
+        return {"df_pred": _frame(10)}
+
+    resultados = []
+    threads = [
+        threading.Thread(target=lambda: resultados.append(cache.obter_ou_calcular("santos", calcular)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(chamadas) == 1, len(chamadas)
+    assert all(r is resultados[0] for r in resultados)
+    print("  ✓ 8 sessoes, 1 calculo, mesmo objeto")
+
+    def falhar():
+        raise RuntimeError("API fora")
+
+    try:
+        cache.obter_ou_calcular("itaqui", falhar)
+        assert False, "esperava erro"
+    except RuntimeError:
+        pass
+    assert "itaqui" not in cache
+    assert cache.obter_ou_calcular("itaqui", lambda: 1) == 1
+    print("  ✓ Falha nao fica no cache")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - CACHE DE RESULTADOS")
+    print("="*70)
+
+    tests = [
+        ("LRU limitado em bytes", test_lru_em_bytes),
+        ("calculo unico por chave", test_calculo_unico),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
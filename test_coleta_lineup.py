@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Script de teste do framework de coleta de line-ups (coleta_lineup).
+Serve as paginas salvas em fixtures/coleta num servidor HTTP local e verifica
+busca unica por ciclo, requisicoes condicionais e saida no esquema tipado.
+"""
+
+import functools
+import os
+import sys
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from coleta_lineup import ApemItaqui, BuscadorCondicional, CicloColeta, EmapItaqui
+from registro_portos import registro
+
+FIXTURES = Path(__file__).parent / "fixtures" / "coleta"
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    requisicoes = []
+
+    def do_GET(self):
+        self.requisicoes.append((self.path, self.headers.get("If-Modified-Since")))
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def _servidor(raiz):
+    handler = functools.partial(_Handler, directory=str(raiz))
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
+
+
+def test_ciclo_condicional():
+    """Uma busca por URL no ciclo; 304 pula o parse; mudanca na pagina volta a coletar"""
+    print("\n" + "="*70)
+    print("TESTE 1: ciclo de coleta com fixtures locais")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raiz = Path(tmp) / "site"
+        raiz.mkdir()
+        for arquivo in FIXTURES.rglob("*"):
+            if arquivo.is_file():
+                destino = raiz / arquivo.relative_to(FIXTURES)
+                destino.parent.mkdir(parents=True, exist_ok=True)
+                destino.write_bytes(arquivo.read_bytes())
+        servidor, base = _servidor(raiz)
+        try:
+            adaptadores = [EmapItaqui(base), ApemItaqui(f"{base}/apem_berthedships.html")]
+            buscador = BuscadorCondicional(Path(tmp) / "http.json")
+            _Handler.requisicoes.clear()
+
+            ciclo = CicloColeta(buscador)
+            ciclo.pagina(adaptadores[0].url)  # pre-busca: o adaptador reaproveita
+            resultado = ciclo.executar(adaptadores)
+            assert len(_Handler.requisicoes) == 2, _Handler.requisicoes
+            emap = resultado["emap_itaqui"]
+            assert isinstance(emap, pd.DataFrame) and len(emap) == 3
+            assert (emap["porto_id"] == registro().id("Itaqui")).all()
+            assert emap["Chegada"].min() == pd.Timestamp("2026-02-27 18:00")
+            assert emap["perfil"].astype(str).tolist() == ["VEGETAL", "FERTILIZANTE", "VEGETAL"]
+            apem = resultado["apem_itaqui"]
+            assert sorted(apem["Navio"]) == ["MV Blue Fin", "Sea Lion"]
+            print("  ✓ Uma requisicao por URL e saida no esquema tipado")
+
+            # Novo ciclo (estado persistido): If-Modified-Since -> 304, nada reprocessado
+            resultado = CicloColeta(BuscadorCondicional(Path(tmp) / "http.json")).executar(adaptadores)
+            assert resultado == {"emap_itaqui": None, "apem_itaqui": None}, resultado
+            assert all(ims for _, ims in _Handler.requisicoes[2:])
+            print("  ✓ Paginas sem mudanca nao sao reprocessadas")
+
+            pagina = raiz / "apem_berthedships.html"
+            pagina.write_text(pagina.read_text(encoding="utf-8").replace("Sea Lion", "Sea Tiger"), encoding="utf-8")
+            os.utime(pagina, (pagina.stat().st_atime, pagina.stat().st_mtime + 60))
+            resultado = CicloColeta(BuscadorCondicional(Path(tmp) / "http.json")).executar(adaptadores)
+            assert resultado["emap_itaqui"] is None
+            assert "Sea Tiger" in set(resultado["apem_itaqui"]["Navio"])
+            print("  ✓ Pagina alterada volta a ser coletada")
+        finally:
+            servidor.shutdown()
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_pdfs_mesma_pagina():
+    """Links de PDF do dia saem da mesma pagina da tabela (sem nova requisicao)"""
+    print("\n" + "="*70)
+    print("TESTE 2: PDFs da EMAP")
+    print("="*70)
+
+    html = (FIXTURES / "porto-agora" / "navios" / "esperados").read_text(encoding="utf-8")
+    pdfs = EmapItaqui("https://exemplo").pdfs_do_dia(html, hoje=pd.Timestamp("2026-02-27"))
+    assert [p["url"] for p in pdfs] == ["https://exemplo/docs/mapa-atracacao-27-02-2026.pdf"]
+    assert EmapItaqui().pdfs_do_dia(html, hoje=pd.Timestamp("2026-03-05")) == []
+    print("  ✓ PDF do dia identificado")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - COLETA DE LINE-UPS")
+    print("="*70)
+
+    tests = [
+        ("ciclo condicional", test_ciclo_condicional),
+        ("PDFs da EMAP", test_pdfs_mesma_pagina),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
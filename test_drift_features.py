@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Script de teste do monitor de drift das features (drift_features).
+Verifica a referencia compacta gravada no treino, o PSI/KS sobre os
+histogramas acumulados no serving e os alertas por perfil/modelo.
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from drift_features import MonitorDrift, referencia_features
+from treino_incremental import psi
+
+
+def _treino(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "navios_no_fundeio_na_chegada": rng.poisson(4, n).astype(float),
+        "dwt": rng.normal(60_000, 15_000, n),
+        "tipo_carga": pd.Categorical(rng.choice(["granel", "carga geral"], n)),
+        "nome_porto": rng.choice(["Santos", "Paranagua"], n),
+    })
+
+
+def test_referencia_compacta():
+    """Referencia so de features numericas, serializavel e coerente com o PSI do retreino"""
+    print("\n" + "="*70)
+    print("TESTE 1: referencia do treino")
+    print("="*70)
+
+    treino = _treino()
+    features = list(treino.columns)
+    referencia = referencia_features(treino, features)
+    assert set(referencia) == {"navios_no_fundeio_na_chegada", "dwt"}, referencia.keys()
+    assert len(json.dumps(referencia)) < 2000
+    for info in referencia.values():
+        assert len(info["proporcoes"]) == len(info["cortes"]) + 1
+        assert abs(sum(info["proporcoes"]) - 1) < 1e-4
+    print(f"  ✓ {len(referencia)} features, {len(json.dumps(referencia))} bytes no metadata")
+
+    # PSI das contagens binadas = PSI do retreino incremental (mesmos cortes)
+    monitor = MonitorDrift(minimo=1)
+    serving = _treino(n=800, seed=1)
+    serving["dwt"] = serving["dwt"] * 1.3
+    monitor.observar("VEGETAL", serving, {"drift_referencia": referencia, "trained_at": "t0"})
+    tabela = monitor.relatorio().set_index("feature")
+    assert abs(tabela.loc["dwt", "psi"] - psi(treino["dwt"], serving["dwt"])) < 0.02
+    print(f"  ✓ PSI do monitor ~ PSI do retreino: {tabela.loc['dwt', 'psi']:.3f}")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_monitor_serving():
+    """Mudanca de escala no serving vira alerta; distribuicao igual nao"""
+    print("\n" + "="*70)
+    print("TESTE 2: monitor de drift no serving")
+    print("="*70)
+
+    treino = _treino()
+    metadata = {"drift_referencia": referencia_features(treino, list(treino.columns)), "trained_at": "t0"}
+    monitor = MonitorDrift(intervalo_alerta_s=0)
+
+    novas = []
+    inicio = time.perf_counter()
+    for seed in range(20):
+        lote = _treino(n=50, seed=100 + seed)
+        # Fila no serving em outra escala (ex.: contada em dezenas)
+        lote["navios_no_fundeio_na_chegada"] *= 10
+        novas += monitor.observar("VEGETAL", lote, metadata)
+    us_por_linha = (time.perf_counter() - inicio) / 1000 * 1e6
+    assert novas == ["navios_no_fundeio_na_chegada"], novas
+    tabela = monitor.relatorio().set_index("feature")
+    assert tabela.loc["navios_no_fundeio_na_chegada", "drift"]
+    assert tabela.loc["navios_no_fundeio_na_chegada", "media_serving"] > 8 * tabela.loc[
+        "navios_no_fundeio_na_chegada", "media_treino"]
+    assert not tabela.loc["dwt", "drift"], tabela
+    print(f"  ✓ Escala diferente detectada (PSI {tabela.loc['navios_no_fundeio_na_chegada', 'psi']:.1f}); "
+          f"dwt estavel (PSI {tabela.loc['dwt', 'psi']:.3f}); ~{us_por_linha:.0f} us/linha")
+
+    # Alerta nao se repete; retreino (trained_at novo) recomeca os histogramas
+    assert monitor.observar("VEGETAL", lote, metadata) == []
+    monitor.observar("VEGETAL", _treino(n=50), {**metadata, "trained_at": "t1"})
+    assert monitor.relatorio()["linhas"].max() == 50
+    assert monitor.observar("MINERAL", lote, {"features": ["dwt"]}) == []
+    assert monitor.sem_referencia() == [("MINERAL", "completo")]
+    print("  ✓ Alerta unico por feature; retreino e metadata sem referencia tratados")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - DRIFT DE FEATURES")
+    print("="*70)
+
+    tests = [
+        ("referencia do treino", test_referencia_compacta),
+        ("monitor no serving", test_monitor_serving),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
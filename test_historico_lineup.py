@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Script de teste do historico de line-ups particionado (historico_lineup).
+Verifica as particoes por porto canonico e as estatisticas atualizadas no anexo.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from estatisticas_espera import SketchQuantis
+from historico_lineup import HistoricoLineup
+
+
+def test_particoes_e_estatisticas():
+    """Aliases do mesmo porto na mesma particao; estatisticas refeitas so no porto anexado"""
+    print("\n" + "="*70)
+    print("TESTE 1: particoes + estatisticas")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        historico = HistoricoLineup(tmp)
+        lote = pd.DataFrame({
+            "porto": ["Santos", "Porto de Santos (SP)", "Paranaguá/Antonina", "Santos"],
+            "navio": ["A", "B", "C", "D"],
+            "produto": ["Soja", "Milho", "Ureia", "Soja"],
+            "prev_chegada": ["01/03/2026 10:00", "01/03/2026 18:00", "05/03/2026", "02/04/2026"],
+            "tempo_espera_horas": [10.0, 30.0, 50.0, 20.0],
+        })
+        assert historico.anexar(lote) == ["PARANAGUA", "SANTOS"]
+        assert len(historico.ler("santos")) == 3
+        assert historico.portos() == {"PARANAGUA": "Paranaguá/Antonina", "SANTOS": "Santos"}
+
+        total = historico.estatisticas("Santos")
+        assert total["registros"] == 3 and total["espera_mediana_h"] == 20.0
+        marco = historico.estatisticas("Santos", mes=3)
+        assert marco["chegadas_por_dia"] == 2.0
+        assert historico.estatisticas("Santos", mes=3, perfil="VEGETAL")["registros"] == 2
+        print("  ✓ Particao unica por porto e estatisticas por mes/perfil")
+
+        historico.anexar(lote.iloc[[0]])  # linha repetida nao duplica
+        historico.anexar(pd.DataFrame({"porto": ["Santos"], "navio": ["E"], "tempo_espera_horas": [40.0]}))
+        assert historico.estatisticas("Santos")["registros"] == 4
+        assert historico.estatisticas("Paranagua")["registros"] == 1
+        print("  ✓ Anexo sem duplicatas atualiza so o porto tocado")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_espera_incremental():
+    """Sketch de quantis proximo do exato; anexo alimenta so linhas novas e persiste"""
+    print("\n" + "="*70)
+    print("TESTE 2: espera incremental (sketch + MA5)")
+    print("="*70)
+
+    valores = np.random.default_rng(42).lognormal(3.5, 0.8, 50_000)
+    sketch = SketchQuantis()
+    for v in valores:
+        sketch.adicionar(v)
+    assert sum(map(len, sketch.niveis)) < 1_000
+    for q in (0.1, 0.5, 0.9):
+        erro = abs(np.mean(valores <= sketch.quantil(q)) - q)
+        assert erro < 0.02, f"q={q}: erro de rank {erro:.3f}"
+    print("  ✓ Quantis com erro de rank < 2% em memoria O(k)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        historico = HistoricoLineup(tmp)
+        lote = pd.DataFrame({
+            "porto": ["Santos"] * 12,
+            "navio": [f"N{i}" for i in range(12)],
+            "berco": ["A"] * 6 + ["B"] * 6,
+            "prev_chegada": [f"{d:02d}/03/2026" for d in range(1, 13)],
+            "tempo_espera_horas": [float(i) for i in range(12)],
+        })
+        historico.anexar(lote)
+        historico.anexar(lote)  # reanexar nao conta de novo
+        espera = historico.espera()
+        assert espera.contagem("Santos") == 12
+        assert espera.mediana("Santos") == 5.5
+        # MA5 = media das 5 ultimas esperas do berco (mesma definicao do treino)
+        assert espera.ma5("Santos", berco="b") == np.mean([7.0, 8.0, 9.0, 10.0, 11.0])
+        assert espera.mediana("Santos", berco="A") is None  # menos de 10 observacoes
+        print("  ✓ Mediana e MA5 por porto/berco persistidas entre instancias")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - HISTORICO DE LINE-UPS")
+    print("="*70)
+
+    tests = [
+        ("particoes + estatisticas", test_particoes_e_estatisticas),
+        ("espera incremental", test_espera_incremental),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Script de teste do cache do Dataset binado do LightGBM (lgb_dataset_cache).
+Verifica que os subsets dos folds batem com o Dataset completo (mesmas
+linhas, rotulos e bins) e que o binario em disco e reutilizado.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from lgb_dataset_cache import CacheDatasetLGB, params_sklearn_para_core
+
+PARAMS = params_sklearn_para_core(
+    objective="regression", num_leaves=8, min_child_samples=5, random_state=42, n_jobs=1, verbose=-1
+)
+
+
+def _dados(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        "x1": rng.normal(0, 1, n),
+        "x2": rng.uniform(0, 100, n),
+        "terminal": pd.Categorical(rng.choice(["T1", "T2", "T3"], n)),
+    })
+    y = pd.Series(np.log1p(np.exp(2 + X["x1"]) + (X["terminal"] == "T2") * 20), name="y")
+    return X, y
+
+
+def _treinar(dataset):
+    return lgb.train(PARAMS, dataset, num_boost_round=20)
+
+
+def test_subsets_dos_folds():
+    """Subset do fold = mesmas linhas e rotulos, com os bins do Dataset completo"""
+    print("\n" + "="*70)
+    print("TESTE 1: subsets dos folds")
+    print("="*70)
+
+    X, y = _dados()
+    cache = CacheDatasetLGB(X, y, "teste", persistir=False)
+    completo = cache.completo()
+    assert completo.num_data() == len(X)
+    rng = np.random.default_rng(1)
+    for indices in (np.arange(0, 1200), np.arange(1300, 2000), np.sort(rng.choice(len(X), 500, replace=False))):
+        fold = cache.subset(indices)
+        fold.construct()
+        assert fold.num_data() == len(indices)
+        assert np.allclose(fold.get_label(), y.to_numpy()[indices])
+        # Mesmo modelo que um Dataset so do fold binado com a referencia do completo
+        direto = lgb.Dataset(X.iloc[indices], label=y.iloc[indices], reference=completo,
+                             params=cache.params, free_raw_data=False)
+        assert np.array_equal(_treinar(fold).predict(X), _treinar(direto).predict(X))
+    print("  ✓ Linhas, rotulos e modelo iguais aos de um Dataset do fold com os bins do completo")
+
+    assert cache.completo() is completo
+    print("  ✓ Dataset completo construido uma vez por cache")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_binario_reutilizado():
+    """Segunda execucao carrega o binario; dados diferentes constroem outro"""
+    print("\n" + "="*70)
+    print("TESTE 2: reuso do binario em disco")
+    print("="*70)
+
+    X, y = _dados()
+    treino = np.arange(0, 1500)
+    with tempfile.TemporaryDirectory() as tmp:
+        primeiro = CacheDatasetLGB(X, y, "VEGETAL_reg", cache_dir=tmp)
+        modelo_construido = _treinar(primeiro.subset(treino))
+        assert primeiro.origem == "construido"
+        binarios = list(Path(tmp).glob("vegetal_reg-*.bin"))
+        assert len(binarios) == 1 and not list(Path(tmp).glob("*.tmp"))
+        mtime = binarios[0].stat().st_mtime_ns
+        print(f"  ✓ Primeira execucao constroi e grava {binarios[0].name}")
+
+        segundo = CacheDatasetLGB(X.copy(), y.copy(), "VEGETAL_reg", cache_dir=tmp)
+        modelo_binario = _treinar(segundo.subset(treino))
+        assert segundo.origem == "binario"
+        assert binarios[0].stat().st_mtime_ns == mtime
+        assert segundo.completo().pandas_categorical == [["T1", "T2", "T3"]]
+        assert np.allclose(modelo_binario.predict(X), modelo_construido.predict(X))
+        print("  ✓ Mesmos dados: binario reutilizado, categorias restauradas, mesmo modelo")
+
+        outro = CacheDatasetLGB(X, y * 2, "VEGETAL_reg", cache_dir=tmp)
+        outro.completo()
+        assert outro.origem == "construido"
+        assert len(list(Path(tmp).glob("vegetal_reg-*.bin"))) == 2
+        print("  ✓ Rotulo diferente: chave nova, Dataset reconstruido")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - CACHE DO DATASET LIGHTGBM")
+    print("="*70)
+
+    tests = [
+        ("subsets dos folds", test_subsets_dos_folds),
+        ("reuso do binario", test_binario_reutilizado),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
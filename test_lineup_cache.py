@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Script de teste do cache de conversao de line-ups (lineup_cache).
+Verifica o sidecar Parquet, o manifesto e a reconversao so quando a origem,
+a taxonomia de cargas ou o registro de portos mudam.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import lineup_cache
+import registro_portos
+import taxonomia_carga
+from lineup_cache import converter_lineup, ler_lineup_cache
+from lineup_schema import ler_lineup
+from registro_portos import registro
+
+
+def test_sidecar_e_manifesto():
+    """Sidecar igual a leitura direta; manifesto reaproveitado ate a origem mudar"""
+    print("\n" + "="*70)
+    print("TESTE 1: sidecar + manifesto")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fonte = Path(tmp) / "lineup.csv"
+        destino = Path(tmp) / "cache"
+        pd.DataFrame({
+            "Navio": ["A", "B"],
+            "Porto": ["Santos", "Paranaguá"],
+            "Produto": ["Soja", "Ureia"],
+            "Prev Chegada": ["01/02/2026 10:00", "03/02/2026 08:00"],
+            "DWT": [50000, 60000],
+        }).to_csv(fonte, index=False)
+
+        manifesto = converter_lineup(fonte, destino)
+        assert manifesto["linhas"] == 2
+        assert manifesto["portos"] == ["Santos", "Paranaguá"]
+        assert manifesto["chegada_min"].startswith("2026-02-01")
+        df = ler_lineup_cache(fonte, destino=destino)
+        pd.testing.assert_frame_equal(df, ler_lineup(fonte), check_categorical=False)
+        assert set(df["porto_id"]) == {registro().id("Santos"), registro().id("Paranagua")}
+        print("  ✓ Sidecar identico a leitura direta")
+
+        sidecar = destino / "lineup_csv.parquet"
+        mtime = sidecar.stat().st_mtime_ns
+        converter_lineup(fonte, destino)
+        assert sidecar.stat().st_mtime_ns == mtime
+        pd.DataFrame({"Navio": ["C"], "Produto": ["Milho"], "Chegada": ["05/02/2026"]}).to_csv(fonte, index=False)
+        os.utime(fonte, ns=(mtime + 10**9, mtime + 10**9))
+        manifesto = converter_lineup(fonte, destino)
+        assert manifesto["linhas"] == 1 and manifesto["portos"] == []
+        df = ler_lineup_cache(fonte, porto_nome="Itaqui", destino=destino)
+        assert (df["porto_id"] == registro().id("Itaqui")).all()
+        print("  ✓ Reconversao apenas quando a origem muda")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_taxonomia_e_registro_invalidam():
+    """Mudanca na taxonomia (perfil) ou no registro de portos (porto_id) refaz o sidecar"""
+    print("\n" + "="*70)
+    print("TESTE 2: taxonomia e registro invalidam o sidecar")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fonte = Path(tmp) / "lineup.csv"
+        destino = Path(tmp) / "cache"
+        sidecar = destino / "lineup_csv.parquet"
+        pd.DataFrame({"Navio": ["A"], "Porto": ["Santos"], "Produto": ["Soja"], "Chegada": ["01/02/2026"]}).to_csv(
+            fonte, index=False
+        )
+
+        def reconvertido():
+            antes = sidecar.stat().st_mtime_ns if sidecar.exists() else None
+            lineup_cache._hash_normalizacao.cache_clear()
+            converter_lineup(fonte, destino)
+            return sidecar.stat().st_mtime_ns != antes
+
+        assert reconvertido() and not reconvertido()
+        for modulo, nome, valor in (
+            (taxonomia_carga, "TAXONOMIA", ("MINERAL", "2601", "26011100", "teste", ("SOJA",))),
+            (registro_portos, "PORTOS", {"nome": "Porto Teste", "uf": "", "municipio": ""}),
+        ):
+            original = getattr(modulo, nome)
+            alterado = [valor, *original] if isinstance(original, list) else {**original, "PORTO_TESTE": valor}
+            setattr(modulo, nome, alterado)
+            try:
+                assert reconvertido(), nome
+            finally:
+                setattr(modulo, nome, original)
+            assert reconvertido() and not reconvertido()
+        print("  ✓ TAXONOMIA (perfil) e PORTOS (porto_id) entram na impressao do codigo")
+
+        config = Path(tmp) / "ports_config.csv"
+        original = lineup_cache.PORTS_CONFIG_PATH
+        lineup_cache.PORTS_CONFIG_PATH = config
+        try:
+            assert reconvertido() and not reconvertido()
+            config.write_text("port_name,antaq_port_name\nSantos,Santos\n", encoding="utf-8")
+            assert reconvertido()
+        finally:
+            lineup_cache.PORTS_CONFIG_PATH = original
+        print("  ✓ CSV de portos alterado refaz o sidecar")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - CACHE DE LINE-UPS")
+    print("="*70)
+
+    tests = [
+        ("sidecar + manifesto", test_sidecar_e_manifesto),
+        ("taxonomia e registro", test_taxonomia_e_registro_invalidam),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
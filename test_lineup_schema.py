@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Script de teste do esquema tipado de line-ups (lineup_schema).
+Verifica datas em formatos mistos (dia primeiro e ISO), a conversao de
+horarios com fuso para UTC sem fuso e o porto de line-ups sem coluna de
+porto, em normalizar_lineup e ler_lineup.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from lineup_schema import ler_lineup, normalizar_lineup, validar_lineup
+from registro_portos import ID_DESCONHECIDO, registro
+
+
+def _bruto():
+    return pd.DataFrame({
+        "Navio": ["ALFA", "BETA", "GAMA", "DELTA", "EPSILON"],
+        "Prev. Chegada": ["05/03/2025 10:00", "2025-03-06T08:00:00", "07/03/2025", "", None],
+        "Última Atualização": ["2025-03-05T10:00:00-03:00", "2025-03-05T10:00:00Z", "04/03/2025 09:30:00", None, "?"],
+        "Produto": "soja",
+        "Porto": "Santos",
+    })
+
+
+def test_datas_formatos_mistos():
+    """Dia primeiro e ISO na mesma coluna; vazios e invalidos viram NaT"""
+    print("\n" + "="*70)
+    print("TESTE 1: datas em formatos mistos")
+    print("="*70)
+
+    df = normalizar_lineup(_bruto())
+    assert df["Chegada"].dtype == "datetime64[ns]"
+    assert df["Chegada"].tolist()[:3] == [
+        pd.Timestamp("2025-03-05 10:00"), pd.Timestamp("2025-03-06 08:00"), pd.Timestamp("2025-03-07"),
+    ]
+    assert df["Chegada"].iloc[3:].isna().all()
+    assert df["data_chegada_dt"].equals(df["Chegada"])
+    print("  ✓ 05/03 e 5 de marco (dia primeiro); ISO na mesma coluna; vazio -> NaT")
+
+    sem_chegada = normalizar_lineup(_bruto().assign(**{"Prev. Chegada": ["", "?", None, "", ""]}))
+    assert sem_chegada["data_chegada_dt"].iloc[2] == pd.Timestamp("2025-03-04 09:30")
+    print("  ✓ Chegada sem nenhuma data valida: cai para Atualizacao")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_fuso_para_utc_sem_fuso():
+    """Textos e colunas datetime com fuso viram UTC sem fuso; sem fuso ficam como vieram"""
+    print("\n" + "="*70)
+    print("TESTE 2: fuso -> UTC sem fuso")
+    print("="*70)
+
+    df = normalizar_lineup(_bruto())
+    assert df["Atualizacao"].dt.tz is None
+    assert df["Atualizacao"].tolist()[:3] == [
+        pd.Timestamp("2025-03-05 13:00"), pd.Timestamp("2025-03-05 10:00"), pd.Timestamp("2025-03-04 09:30"),
+    ]
+    print("  ✓ Textos com -03:00 e Z convertidos para UTC; sem fuso mantido")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = Path(tmp) / "lineup.parquet"
+        pd.DataFrame({
+            "navio": ["ALFA"],
+            "chegada": pd.to_datetime(["2025-03-05T10:00:00"]).tz_localize("America/Sao_Paulo"),
+            "porto": ["Santos"],
+        }).to_parquet(caminho, index=False)
+        lido = ler_lineup(caminho)
+    assert lido["data_chegada_dt"].dtype == "datetime64[ns]"
+    assert lido["data_chegada_dt"].iloc[0] == pd.Timestamp("2025-03-05 13:00")
+    print("  ✓ Parquet com coluna tz-aware: datetime64[ns] em UTC sem fuso")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def test_sem_coluna_de_porto():
+    """Sem coluna de porto: porto_id de porto_nome ou desconhecido (com aviso)"""
+    print("\n" + "="*70)
+    print("TESTE 3: line-up sem coluna de porto")
+    print("="*70)
+
+    bruto = _bruto().drop(columns=["Porto"])
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = Path(tmp) / "lineup.csv"
+        bruto.to_csv(caminho, index=False)
+        lido = ler_lineup(caminho, porto_nome="Paranagua")
+    assert (lido["porto_id"] == registro().id("Paranagua")).all()
+    assert lido["porto_id"].dtype == "int64"
+    assert lido["Chegada"].iloc[0] == pd.Timestamp("2025-03-05 10:00")
+    print("  ✓ CSV sem porto: porto_id de porto_nome; datas tipadas na leitura")
+
+    sem_nome = normalizar_lineup(bruto)
+    assert (sem_nome["porto_id"] == ID_DESCONHECIDO).all()
+    assert "Porto do line-up nao identificado" in validar_lineup(sem_nome)
+    print("  ✓ Sem porto_nome: porto desconhecido e aviso na validacao")
+
+    print("\n  ✅ TESTE 3 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - ESQUEMA DE LINE-UP")
+    print("="*70)
+
+    tests = [
+        ("datas em formatos mistos", test_datas_formatos_mistos),
+        ("fuso -> UTC sem fuso", test_fuso_para_utc_sem_fuso),
+        ("sem coluna de porto", test_sem_coluna_de_porto),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Script de teste do log de deltas de line-up (log_lineup).
+Verifica a gravacao so de mudancas, a reconstrucao pontual e o deslizamento de ETA.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from log_lineup import LogLineup
+
+
+def _coleta(linhas):
+    return pd.DataFrame(linhas, columns=["navio", "situacao", "berco", "previsao"])
+
+
+def test_deltas_e_reconstrucao():
+    """Coletas repetidas nao gravam nada; estado_em reproduz cada coleta"""
+    print("\n" + "="*70)
+    print("TESTE 1: deltas + reconstrucao pontual")
+    print("="*70)
+
+    coletas = [
+        ("2026-02-25 10:00", _coleta([
+            ["Blue Fin", "Esperado", "101", "01/03/2026 10:00"],
+            ["Star A", "Esperado", "102", "02/03/2026 00:00"],
+        ])),
+        ("2026-02-25 11:00", _coleta([
+            ["Blue Fin", "Esperado", "101", "01/03/2026 10:00"],
+            ["Star A", "Esperado", "102", "02/03/2026 00:00"],
+        ])),
+        ("2026-02-25 12:00", _coleta([
+            ["Blue Fin", "Esperado", "101", "01/03/2026 18:00"],
+            ["Star A", "Atracado", "102", "02/03/2026 00:00"],
+            ["Star B", "Esperado", None, "03/03/2026 00:00"],
+        ])),
+        ("2026-02-26 09:00", _coleta([
+            ["Blue Fin", "Esperado", "101", "02/03/2026 06:00"],
+            ["Star B", "Esperado", None, "03/03/2026 00:00"],
+        ])),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = LogLineup(tmp)
+        gravados = [len(log.registrar(df, "Itaqui", quando)) for quando, df in coletas]
+        assert gravados == [2, 0, 3, 2], gravados
+        print("  ✓ So mudancas gravadas (coleta identica = 0 deltas)")
+
+        for quando, df in coletas:
+            estado = log.estado_em(quando, porto_nome="Itaqui").set_index("navio")
+            assert sorted(estado.index) == sorted(df["navio"])
+            eta = estado["eta"].to_dict()
+            for navio, previsao in zip(df["navio"], df["previsao"]):
+                assert eta[navio] == pd.to_datetime(previsao, dayfirst=True)
+        assert log.estado_em("2026-02-24").empty
+        print("  ✓ Reconstrucao pontual igual a cada coleta")
+
+        desl = log.deslizamento_eta("Itaqui").set_index("navio")
+        assert desl.loc["Blue Fin", "revisoes_eta"] == 2
+        assert desl.loc["Blue Fin", "deslizamento_eta_h"] == 20.0
+        assert desl.loc["Star A", "permanencia_h"] == 23.0
+        print("  ✓ Deslizamento de ETA e permanencia por navio")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_visitas_separadas():
+    """O mesmo navio voltando ao porto abre outra visita no deslizamento de ETA"""
+    print("\n" + "="*70)
+    print("TESTE 2: visitas repetidas do mesmo navio")
+    print("="*70)
+
+    coletas = [
+        ("2026-01-05 10:00", _coleta([["Blue Fin", "Esperado", "101", "08/01/2026 10:00"]])),
+        ("2026-01-06 10:00", _coleta([["Blue Fin", "Esperado", "101", "09/01/2026 10:00"]])),
+        ("2026-01-09 12:00", _coleta([["Star A", "Esperado", "102", "12/01/2026 00:00"]])),
+        # Volta dois meses depois
+        ("2026-03-01 08:00", _coleta([
+            ["Blue Fin", "Esperado", "101", "04/03/2026 00:00"],
+            ["Star A", "Esperado", "102", "12/01/2026 00:00"],
+        ])),
+        ("2026-03-05 08:00", _coleta([["Star A", "Esperado", "102", "12/01/2026 00:00"]])),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = LogLineup(tmp)
+        for quando, df in coletas:
+            log.registrar(df, "Itaqui", quando)
+
+        desl = log.deslizamento_eta("Itaqui")
+        blue = desl[desl["navio"] == "Blue Fin"].set_index("visita")
+        assert list(blue.index) == [0, 1], blue
+        assert blue.loc[0, "revisoes_eta"] == 1 and blue.loc[0, "deslizamento_eta_h"] == 24.0
+        assert blue.loc[0, "permanencia_h"] == 4 * 24 + 2
+        assert blue.loc[1, "primeira_eta"] == pd.Timestamp("2026-03-04")
+        assert blue.loc[1, "revisoes_eta"] == 0 and blue.loc[1, "deslizamento_eta_h"] == 0.0
+        assert blue.loc[1, "primeira_vez"] == pd.Timestamp("2026-03-01 08:00")
+        assert blue.loc[1, "permanencia_h"] == 4 * 24
+        print("  ✓ Duas visitas do Blue Fin, sem deslizamento de meses entre elas")
+
+        star = desl[desl["navio"] == "Star A"]
+        assert len(star) == 1 and pd.isna(star["saida"].iloc[0])
+        print("  ✓ Navio ainda no line-up: uma visita em aberto")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - LOG DE LINE-UP")
+    print("="*70)
+
+    tests = [
+        ("deltas + reconstrucao", test_deltas_e_reconstrucao),
+        ("visitas repetidas", test_visitas_separadas),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
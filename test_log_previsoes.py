@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Script de teste do log Parquet de previsoes (log_previsoes).
+Verifica a escrita em lote, a compactacao, a leitura com projecao e filtros
+e a leitura concorrente com a compactacao (trava velha, arquivos sumindo).
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from log_previsoes import ARQUIVO_TRAVA, COLUNAS_LOG, TRAVA_VALIDADE_S, LogPrevisoes
+
+
+def _previsao(espera):
+    return pd.DataFrame({
+        "Navio": ["Blue Fin", "Star A", "Star B"],
+        "Berco": ["101", "102", None],
+        "data_chegada_dt": pd.to_datetime(["2026-03-01 10:00", "2026-03-02 00:00", "2026-03-03 00:00"]),
+        "tempo_espera_previsto_horas": [espera, espera + 1, espera + 2],
+        "eta_mais_espera": pd.to_datetime(["2026-03-02", "2026-03-03", "2026-03-04"]),
+        "tier": "BASIC",
+    })
+
+
+def test_escrita_em_lote_e_leitura():
+    """registrar nao grava na hora; descarregar grava em lote; leitura filtra particoes"""
+    print("\n" + "="*70)
+    print("TESTE 1: escrita em lote + leitura particionada")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = LogPrevisoes(tmp, intervalo_s=60, compactar_a_partir=100)
+        ids = [
+            log.registrar(_previsao(10.0), "Santos", "2026-03-01", versao_modelo="m1",
+                          colunas_entrada=["Navio", "Berco", "data_chegada_dt"]),
+            log.registrar(_previsao(12.0), "Porto de Santos (SP)", "2026-03-01", versao_modelo="m1",
+                          colunas_entrada=["Navio", "Berco", "data_chegada_dt"]),
+            log.registrar(_previsao(20.0), "Itaqui", "2026-03-02", versao_modelo="m2"),
+        ]
+        assert len(set(ids)) == 3
+        time.sleep(0.2)
+        assert not list(Path(tmp).rglob("*.parquet"))
+        log.descarregar()
+        arquivos = sorted(p.relative_to(tmp).parent.as_posix() for p in Path(tmp).rglob("*.parquet"))
+        assert arquivos == ["porto=ITAQUI/data=2026-03-02", "porto=SANTOS/data=2026-03-01"], arquivos
+        print("  ✓ Um arquivo por particao por lote, gravado pela thread")
+
+        santos = log.ler("Santos", colunas=["run_id", "Navio", "hash_features", "tempo_espera_previsto_horas"])
+        assert list(santos.columns) == ["run_id", "Navio", "hash_features", "tempo_espera_previsto_horas"]
+        assert len(santos) == 6 and santos["run_id"].nunique() == 2
+        # Mesma entrada -> mesmo hash de features entre execucoes
+        hashes = santos.groupby("Navio")["hash_features"].nunique()
+        assert (hashes == 1).all()
+        print("  ✓ Projecao de colunas, filtro por porto e hash de entrada estavel")
+
+        tudo = log.ler(inicio="2026-03-02")
+        assert set(tudo["porto"]) == {"ITAQUI"}
+        assert list(tudo.columns) == list(COLUNAS_LOG) + ["porto", "data"]
+        assert str(tudo["data_chegada_dt"].dtype).startswith("datetime64")
+        print("  ✓ Filtro por data de referencia com dtypes preservados")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_compactacao():
+    """Particoes com muitos arquivos viram um so, sem perder linhas"""
+    print("\n" + "="*70)
+    print("TESTE 2: compactacao")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = LogPrevisoes(tmp, intervalo_s=60, compactar_a_partir=4)
+        for i in range(6):
+            log.registrar(_previsao(float(i)), "Santos", "2026-03-01")
+            log.descarregar()
+        particao = Path(tmp) / "porto=SANTOS" / "data=2026-03-01"
+        assert len(list(particao.glob("*.parquet"))) == 3
+        assert len(list(particao.glob("compactado-*.parquet"))) == 1
+        print("  ✓ Compactacao automatica ao atingir o limite de arquivos")
+
+        assert log.compactar() == 3
+        assert len(list(particao.glob("*.parquet"))) == 1
+        assert len(log.ler("Santos")) == 18
+        print("  ✓ compactar() junta o restante sem perder linhas")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+class _LogArquivoSumindo(LogPrevisoes):
+    """Apaga um arquivo ja listado na primeira leitura (compactacao concorrente)."""
+
+    sumiu = False
+
+    def dataset(self, filtro=None):
+        dataset = super().dataset(filtro)
+        if not self.sumiu:
+            self.sumiu = True
+            Path(dataset.files[0]).unlink()
+        return dataset
+
+
+def test_compactacao_concorrente():
+    """Leitura sem duplicatas nem FileNotFoundError durante a compactacao; trava velha expira"""
+    print("\n" + "="*70)
+    print("TESTE 3: compactacao concorrente")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = LogPrevisoes(tmp, intervalo_s=60, compactar_a_partir=100)
+        for i in range(3):
+            log.registrar(_previsao(float(i)), "Santos", "2026-03-01")
+            log.descarregar()
+        particao = Path(tmp) / "porto=SANTOS" / "data=2026-03-01"
+        copia = Path(tmp) / "copia"
+        shutil.copytree(particao, copia)
+
+        # Entre o os.replace do compactado e o unlink dos originais
+        assert log.compactar() == 3
+        for arquivo in copia.glob("part-*.parquet"):
+            shutil.copy(arquivo, particao / arquivo.name)
+        assert len(list(particao.glob("*.parquet"))) == 4
+        assert len(log.ler("Santos")) == 9
+        print("  ✓ Originais ainda presentes ao lado do compactado nao duplicam linhas")
+
+        sumindo = _LogArquivoSumindo(tmp)
+        assert len(sumindo.ler("Santos")) == 9 and sumindo.sumiu
+        print("  ✓ Arquivo apagado depois de listado: a leitura lista de novo")
+
+        log.registrar(_previsao(9.0), "Santos", "2026-03-01")
+        log.descarregar()
+        trava = particao / ARQUIVO_TRAVA
+        trava.touch()
+        assert log.compactar_particao(particao) == 0
+        velha = time.time() - TRAVA_VALIDADE_S - 60
+        os.utime(trava, (velha, velha))
+        assert log.compactar_particao(particao) == 2
+        assert not trava.exists() and len(log.ler("Santos")) == 12
+        assert len(list(particao.glob("*.parquet"))) == 1
+        print("  ✓ Trava recente respeitada; trava de processo que caiu expira")
+        print("  ✓ Originais deixados por uma compactacao interrompida sao apagados, nao recompactados")
+
+    print("\n  ✅ TESTE 3 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - LOG DE PREVISOES")
+    print("="*70)
+
+    tests = [
+        ("escrita em lote + leitura", test_escrita_em_lote_e_leitura),
+        ("compactacao", test_compactacao),
+        ("compactacao concorrente", test_compactacao_concorrente),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
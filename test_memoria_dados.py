@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Script de teste dos utilitarios de memoria (memoria_dados).
+Verifica os dtypes apos reduzir_memoria (colunas em excluir intactas),
+o esquema tipado do ANTAQ e as medidas de memoria residente.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from memoria_dados import (
+    SCHEMA_ANTAQ,
+    aplicar_schema,
+    memoria_frame_mb,
+    reduzir_memoria,
+    rss_mb,
+    rss_pico_mb,
+)
+
+
+def _frame(n=10_000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "dwt": rng.normal(60_000, 15_000, n),
+        "tempo_espera_horas": rng.exponential(40, n),
+        "navios_na_fila_7d": rng.integers(0, 30, n),
+        "nome_terminal": rng.choice(["T1", "T2", "T3"], n),
+        "tipo_carga": pd.Categorical(rng.choice(["granel", "carga geral", "conteiner"], n)),
+    })
+
+
+def test_reduzir_memoria():
+    """float64 -> float32, texto listado -> category, poda de categorias; excluir fica float64"""
+    print("\n" + "="*70)
+    print("TESTE 1: reduzir_memoria")
+    print("="*70)
+
+    original = _frame()
+    antes = memoria_frame_mb(original)
+    df = reduzir_memoria(original.copy(), categoricas=["nome_terminal"], excluir=["tempo_espera_horas"])
+    assert df["dwt"].dtype == np.float32
+    assert df["tempo_espera_horas"].dtype == np.float64
+    assert df["tempo_espera_horas"].equals(original["tempo_espera_horas"])
+    assert df["navios_na_fila_7d"].dtype == original["navios_na_fila_7d"].dtype
+    assert isinstance(df["nome_terminal"].dtype, pd.CategoricalDtype)
+    assert np.allclose(df["dwt"], original["dwt"], rtol=1e-6)
+    assert memoria_frame_mb(df) < antes
+    print(f"  ✓ Dtypes: {df.dtypes.astype(str).to_dict()}")
+    print(f"  ✓ {antes:.2f} MB -> {memoria_frame_mb(df):.2f} MB; target em excluir sem perda de precisao")
+
+    filtrado = reduzir_memoria(df[df["tipo_carga"] == "granel"].copy())
+    assert list(filtrado["tipo_carga"].cat.categories) == ["granel"]
+    assert filtrado["dwt"].dtype == np.float32
+    print("  ✓ Categorias sem uso apos filtro removidas; float32 mantido")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_schema_e_rss():
+    """aplicar_schema projeta e tipa; rss_mb acompanha uma alocacao"""
+    print("\n" + "="*70)
+    print("TESTE 2: esquema ANTAQ + memoria residente")
+    print("="*70)
+
+    bruto = pd.DataFrame({
+        "idatracacao": ["1", "2", None],
+        "data_chegada": ["05/03/2025 10:00", "06/03/2025", "x"],
+        "mes": [3, 3, 3],
+        "nome_porto": ["Santos", "Santos", None],
+        "movimentacao_total_toneladas": ["1000.5", "2000", ""],
+        "coluna_extra": [1, 2, 3],
+    })
+    df = aplicar_schema(bruto, SCHEMA_ANTAQ)
+    assert list(df.columns) == ["idatracacao", "data_chegada", "mes", "nome_porto", "movimentacao_total_toneladas"]
+    assert str(df["idatracacao"].dtype) == "Int64" and df["idatracacao"].isna().sum() == 1
+    assert df["data_chegada"].iloc[0] == pd.Timestamp("2025-03-05 10:00") and pd.isna(df["data_chegada"].iloc[2])
+    assert df["mes"].dtype == np.int8
+    assert isinstance(df["nome_porto"].dtype, pd.CategoricalDtype)
+    assert df["movimentacao_total_toneladas"].dtype == np.float32
+    print(f"  ✓ Esquema aplicado: {df.dtypes.astype(str).to_dict()}")
+
+    inicio = rss_mb()
+    assert inicio is not None and inicio > 0
+    bloco = np.ones(50 * 1024 ** 2 // 8)
+    depois = rss_mb()
+    assert depois - inicio > 30, (inicio, depois)
+    assert rss_pico_mb() is None or rss_pico_mb() >= depois * 0.9
+    del bloco
+    print(f"  ✓ RSS {inicio:.0f} MB -> {depois:.0f} MB apos alocar 50 MB; pico {rss_pico_mb()}")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - MEMORIA DOS DADOS")
+    print("="*70)
+
+    tests = [
+        ("reduzir_memoria", test_reduzir_memoria),
+        ("esquema + RSS", test_schema_e_rss),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Script de teste dos kernels de metricas de fila (metricas_fila).
+Compara os kernels vetorizados com os loops linha a linha que substituiram.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from metricas_fila import contar_em_janela, fila_na_chegada, media_movel_espera
+
+
+def _dados(n=300, seed=7):
+    rng = np.random.default_rng(seed)
+    chegada = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 60 * 24, n), unit='h')
+    df = pd.DataFrame({
+        'porto': rng.choice(['Santos', 'Paranaguá', 'Itaqui', None], n),
+        'chegada': chegada,
+        'atracacao': chegada + pd.to_timedelta(rng.integers(0, 120, n), unit='h'),
+        'espera': rng.exponential(40, n),
+    })
+    df.loc[rng.choice(n, 10, replace=False), 'chegada'] = pd.NaT
+    return df
+
+
+def test_contar_em_janela():
+    """Janelas ±1 dia (sem o proprio) e 7 dias anteriores iguais ao loop"""
+    print("\n" + "="*70)
+    print("TESTE 1: contar_em_janela")
+    print("="*70)
+
+    df = _dados()
+    um_dia, sete_dias = pd.Timedelta(days=1), pd.Timedelta(days=7)
+    esperado_1d, esperado_7d = [], []
+    for idx, row in df.iterrows():
+        mesmo_porto = df['porto'] == row['porto']
+        janela = (df['chegada'] >= row['chegada'] - um_dia) & (df['chegada'] <= row['chegada'] + um_dia)
+        esperado_1d.append(max(0, (mesmo_porto & janela).sum() - 1) if pd.notna(row['chegada']) else 0)
+        janela = (df['chegada'] >= row['chegada'] - sete_dias) & (df['chegada'] < row['chegada'])
+        esperado_7d.append((mesmo_porto & janela).sum())
+
+    obtido_1d = contar_em_janela(df['chegada'], df['porto'], um_dia, um_dia, excluir_proprio=True)
+    obtido_7d = contar_em_janela(df['chegada'], df['porto'], antes=sete_dias, incluir_fim=False)
+    assert obtido_1d.tolist() == esperado_1d
+    assert obtido_7d.tolist() == esperado_7d
+    print("  ✓ Contagens identicas ao loop por linha")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_fila_na_chegada():
+    """Chegadas anteriores menos atracacoes ate a chegada, por grupo"""
+    print("\n" + "="*70)
+    print("TESTE 2: fila_na_chegada")
+    print("="*70)
+
+    df = _dados().dropna(subset=['chegada', 'porto'])
+    df = df.sort_values(['porto', 'chegada'], kind='stable').reset_index(drop=True)
+    esperado = np.zeros(len(df))
+    for _, idx in df.groupby('porto', sort=False).groups.items():
+        chegadas = df.loc[idx, 'chegada'].to_numpy()
+        atracacoes = np.sort(df.loc[idx, 'atracacao'].to_numpy())
+        for j, pos in enumerate(idx):
+            esperado[pos] = max(j - np.searchsorted(atracacoes, chegadas[j], side='right'), 0)
+
+    obtido = fila_na_chegada(df['chegada'], df['atracacao'], df['porto'])
+    assert obtido.tolist() == esperado.tolist()
+    print("  ✓ Fila identica ao sweep por linha")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def test_media_movel_sem_vazamento():
+    """Media movel por grupo; excluir_atual usa so observacoes anteriores"""
+    print("\n" + "="*70)
+    print("TESTE 3: media_movel_espera")
+    print("="*70)
+
+    df = _dados().dropna(subset=['porto'])
+    df = df.sort_values(['porto', 'chegada']).reset_index(drop=True)
+    rolling = df.groupby('porto')['espera'].transform(lambda x: x.rolling(5, min_periods=1).mean())
+    sem_vazamento = df.groupby('porto')['espera'].transform(
+        lambda x: x.rolling(5, min_periods=1).mean().shift(1)
+    )
+
+    np.testing.assert_allclose(
+        media_movel_espera(df['espera'], df['porto'], janela=5, excluir_atual=False), rolling
+    )
+    obtido = media_movel_espera(df['espera'], df['porto'], janela=5)
+    np.testing.assert_allclose(obtido, sem_vazamento)
+    primeiros = df.groupby('porto').cumcount() == 0
+    assert np.isnan(obtido[primeiros]).all()
+    print("  ✓ Media identica ao rolling por grupo, sem a propria observacao")
+
+    print("\n  ✅ TESTE 3 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - METRICAS DE FILA")
+    print("="*70)
+
+    tests = [
+        ("contar_em_janela", test_contar_em_janela),
+        ("fila_na_chegada", test_fila_na_chegada),
+        ("media_movel_espera", test_media_movel_sem_vazamento),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
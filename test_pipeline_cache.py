@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Script de teste do cache por etapa (pipeline_cache).
+Valida reaproveitamento de etapas e invalidacao apenas das dependentes.
+"""
+
+import importlib
+import sys
+import tempfile
+import textwrap
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pipeline_cache import DagEtapas, Etapa, _referencias, hash_codigo, hash_dataframe
+
+
+def _dobrar(df):
+    df = df.copy()
+    df['y'] = df['x'] * 2
+    return df
+
+
+def _somar_um(df):
+    df = df.copy()
+    df['z'] = df['y'] + 1
+    return df
+
+
+def _somar_dois(df):
+    df = df.copy()
+    df['z'] = df['y'] + 2
+    return df
+
+
+def _montar(func_final, cache_dir):
+    return DagEtapas(
+        [
+            Etapa('dobrar', _dobrar, ('base',)),
+            Etapa('final', func_final, ('dobrar',)),
+        ],
+        cache_dir=cache_dir,
+    )
+
+
+def test_hash_dataframe_estavel():
+    """Mesmo conteudo gera o mesmo hash; conteudo diferente muda o hash"""
+    print("\n" + "="*70)
+    print("TESTE 1: hash_dataframe")
+    print("="*70)
+
+    a = pd.DataFrame({'x': [1, 2, 3]})
+    b = pd.DataFrame({'x': [1, 2, 3]})
+    c = pd.DataFrame({'x': [1, 2, 4]})
+    assert hash_dataframe(a) == hash_dataframe(b)
+    assert hash_dataframe(a) != hash_dataframe(c)
+    print("  ✓ Hash estavel e sensivel ao conteudo")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_cache_reaproveita_etapas():
+    """Segunda execucao com mesmas entradas vem toda do cache"""
+    print("\n" + "="*70)
+    print("TESTE 2: Cache hits na reexecucao")
+    print("="*70)
+
+    base = pd.DataFrame({'x': [1, 2, 3]})
+    with tempfile.TemporaryDirectory() as tmp:
+        dag = _montar(_somar_um, tmp)
+        primeiro = dag.executar({'base': base}, alvo='final')
+        assert [r['status'] for r in dag.relatorio] == ['executada', 'executada']
+
+        dag = _montar(_somar_um, tmp)
+        segundo = dag.executar({'base': base}, alvo='final')
+        assert [r['status'] for r in dag.relatorio] == ['cache', 'cache']
+        pd.testing.assert_frame_equal(primeiro, segundo)
+        print("  ✓ Etapas reaproveitadas e resultado identico")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def test_mudanca_de_codigo_invalida_so_dependentes():
+    """Trocar a funcao da ultima etapa reexecuta apenas ela"""
+    print("\n" + "="*70)
+    print("TESTE 3: Invalidacao por codigo")
+    print("="*70)
+
+    base = pd.DataFrame({'x': [1, 2, 3]})
+    with tempfile.TemporaryDirectory() as tmp:
+        _montar(_somar_um, tmp).executar({'base': base})
+
+        dag = _montar(_somar_dois, tmp)
+        out = dag.executar({'base': base}, alvo='final')
+        assert [r['status'] for r in dag.relatorio] == ['cache', 'executada']
+        assert out['z'].tolist() == [4, 6, 8]
+        print("  ✓ Apenas a etapa alterada foi reexecutada")
+
+        dag = _montar(_somar_dois, tmp)
+        dag.executar({'base': base.assign(x=[5, 6, 7])})
+        assert [r['status'] for r in dag.relatorio] == ['executada', 'executada']
+        print("  ✓ Entrada nova invalida toda a cadeia")
+
+    print("\n  ✅ TESTE 3 PASSOU")
+    return True
+
+
+def _modulo_etapa(pasta, nome, corpo_helper, janela):
+    """Modulo com uma etapa que chama o helper dentro de uma comprehension."""
+    (pasta / f"{nome}.py").write_text(textwrap.dedent(f"""
+        JANELA_DIAS = {janela}
+
+
+        def _helper(v):
+            return {corpo_helper}
+
+
+        def etapa(df):
+            df = df.copy()
+            df['w'] = [_helper(v) for v in df['x']]
+            df['m'] = df['x'].rolling(JANELA_DIAS, min_periods=1).mean()
+            return df
+    """), encoding="utf-8")
+    return importlib.import_module(nome).etapa
+
+
+def test_hash_segue_comprehensions_e_constantes():
+    """Editar helper usado em comprehension ou constante do modulo invalida a etapa"""
+    print("\n" + "="*70)
+    print("TESTE 4: hash de helpers aninhados e constantes")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pasta = Path(tmp)
+        sys.path.insert(0, str(pasta))
+        try:
+            original = _modulo_etapa(pasta, "etapa_v1", "v * 2", 3)
+            helper_editado = _modulo_etapa(pasta, "etapa_v2", "v * 3", 3)
+            constante_editada = _modulo_etapa(pasta, "etapa_v3", "v * 2", 5)
+            igual = _modulo_etapa(pasta, "etapa_v4", "v * 2", 3)
+        finally:
+            sys.path.remove(str(pasta))
+
+        assert hash_codigo(original) == hash_codigo(igual)
+        assert hash_codigo(original) != hash_codigo(helper_editado)
+        print("  ✓ Helper chamado dentro de comprehension entra no hash")
+        assert hash_codigo(original) != hash_codigo(constante_editada)
+        print("  ✓ Constante do modulo (JANELA_DIAS) entra no hash")
+
+        base = pd.DataFrame({'x': [1, 2, 3]})
+        cache = pasta / "cache"
+        DagEtapas([Etapa('etapa', original, ('base',))], cache_dir=cache).executar({'base': base})
+        dag = DagEtapas([Etapa('etapa', helper_editado, ('base',))], cache_dir=cache)
+        out = dag.executar({'base': base}, alvo='etapa')
+        assert dag.relatorio[0]['status'] == 'executada' and out['w'].tolist() == [3, 6, 9]
+        assert not list(cache.glob(".*.tmp"))
+        print("  ✓ Etapa reexecutada; nenhum temporario deixado no cache")
+
+    print("\n  ✅ TESTE 4 PASSOU")
+    return True
+
+
+def _gravar_ajudante(pasta, corpo, fator):
+    (pasta / "ajudante_etapa.py").write_text(textwrap.dedent(f"""
+        FATOR = {fator}
+
+
+        def escala(v):
+            return {corpo}
+    """), encoding="utf-8")
+
+
+def test_hash_segue_modulos_do_projeto():
+    """Editar helper ou constante importados de outro modulo do projeto invalida a etapa"""
+    print("\n" + "="*70)
+    print("TESTE 5: hash de helpers de outros modulos")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pasta = Path(tmp)
+        _gravar_ajudante(pasta, "v * FATOR", 2)
+        (pasta / "etapa_importa.py").write_text(textwrap.dedent("""
+            import ajudante_etapa
+            from ajudante_etapa import escala
+
+
+            def etapa(df):
+                df = df.copy()
+                df['w'] = df['x'].map(escala)
+                return df
+
+
+            def etapa_modulo(df):
+                return df.assign(w=df['x'] * ajudante_etapa.FATOR)
+        """), encoding="utf-8")
+        sys.path.insert(0, str(pasta))
+        sys.dont_write_bytecode, escrever_pyc = True, sys.dont_write_bytecode
+        try:
+            ajudante = importlib.import_module("ajudante_etapa")
+            modulo = importlib.import_module("etapa_importa")
+            antes = hash_codigo(modulo.etapa), hash_codigo(modulo.etapa_modulo)
+
+            base = pd.DataFrame({'x': [1, 2, 3]})
+            cache = pasta / "cache"
+            DagEtapas([Etapa('etapa', modulo.etapa, ('base',))], cache_dir=cache).executar({'base': base})
+
+            _gravar_ajudante(pasta, "v * FATOR + 1", 2)
+            importlib.reload(ajudante)
+            modulo = importlib.reload(modulo)
+            assert hash_codigo(modulo.etapa) != antes[0]
+            assert hash_codigo(modulo.etapa_modulo) == antes[1]
+            print("  ✓ Funcao importada (from modulo import f) editada muda o hash")
+
+            dag = DagEtapas([Etapa('etapa', modulo.etapa, ('base',))], cache_dir=cache)
+            out = dag.executar({'base': base}, alvo='etapa')
+            assert dag.relatorio[0]['status'] == 'executada' and out['w'].tolist() == [3, 5, 7]
+            print("  ✓ Cache da etapa nao e reaproveitado apos editar o helper")
+
+            _gravar_ajudante(pasta, "v * FATOR + 1", 4)
+            importlib.reload(ajudante)
+            assert hash_codigo(modulo.etapa_modulo) != antes[1]
+            print("  ✓ Constante lida como modulo.CONSTANTE entra no hash")
+        finally:
+            sys.dont_write_bytecode = escrever_pyc
+            sys.path.remove(str(pasta))
+            sys.modules.pop("ajudante_etapa", None)
+            sys.modules.pop("etapa_importa", None)
+
+    import plano_1
+    import registro_portos
+
+    antes = hash_codigo(plano_1.integrar_ais_features)
+    registro_portos.PORTOS["PORTO_TESTE"] = {"nome": "Porto Teste", "uf": "", "municipio": ""}
+    try:
+        assert hash_codigo(plano_1.integrar_ais_features) != antes
+    finally:
+        registro_portos.PORTOS.pop("PORTO_TESTE")
+    assert hash_codigo(plano_1.integrar_ais_features) == antes
+    assert not any("pandas" in c for c in _constantes(plano_1.integrar_ais_features))
+    print("  ✓ registro_portos.PORTOS (via registro()) entra no hash; bibliotecas instaladas nao")
+
+    print("\n  ✅ TESTE 5 PASSOU")
+    return True
+
+
+def _constantes(func):
+    objetos, constantes = set(), {}
+    _referencias(func, func.__module__, objetos, constantes)
+    return constantes
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - CACHE POR ETAPA")
+    print("="*70)
+
+    tests = [
+        ("hash_dataframe", test_hash_dataframe_estavel),
+        ("Cache hits", test_cache_reaproveita_etapas),
+        ("Invalidacao por codigo", test_mudanca_de_codigo_invalida_so_dependentes),
+        ("Helpers aninhados e constantes", test_hash_segue_comprehensions_e_constantes),
+        ("Helpers de outros modulos", test_hash_segue_modulos_do_projeto),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
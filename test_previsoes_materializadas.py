@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Script de teste do armazem de previsoes materializadas (previsoes_materializadas).
+Verifica a publicacao atomica de versoes, o agregado nacional e a poda de versoes.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from previsoes_materializadas import ArmazemPrevisoes, impressao_lineup, materializar
+
+
+def _lineup(porto, n):
+    return pd.DataFrame({
+        "Navio": [f"{porto} {i}" for i in range(n)],
+        "data_chegada_dt": pd.date_range("2026-03-01", periods=n, freq="12h"),
+    })
+
+
+def _prever(porto):
+    if porto == "Porto Quebrado":
+        raise RuntimeError("modelo indisponivel")
+    df_lineup = _lineup(porto, 4)
+    df_pred = df_lineup.copy()
+    df_pred["tempo_espera_previsto_horas"] = np.array([10.0, 20.0, 30.0, 40.0])
+    df_pred["eta_mais_espera"] = df_pred["data_chegada_dt"] + pd.to_timedelta(
+        df_pred["tempo_espera_previsto_horas"], unit="h"
+    )
+    return df_lineup, df_pred, {"modo": "BASIC", "api_status": {"clima_ok": False}}
+
+
+def test_versoes_e_nacional():
+    """Versao publicada por inteiro, com agregado nacional e erros por porto"""
+    print("\n" + "="*70)
+    print("TESTE 1: versoes + agregado nacional")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        armazem = ArmazemPrevisoes(tmp, manter=2)
+        assert armazem.versao_atual() is None
+        assert armazem.nacional().empty
+        assert armazem.ler("Santos") == (None, None, None)
+
+        versao_aberta = armazem.nova_versao("2026-03-01", gerada_em="2026-03-01 06:00")
+        versao_aberta.gravar("Santos", _prever("Santos")[1])
+        assert armazem.versao_atual() is None
+        print("  ✓ Versao so fica visivel apos publicar")
+
+        versao = materializar(["Santos", "Itaqui", "Porto Quebrado"], _prever, armazem, "2026-03-01")
+        assert armazem.versao_atual() == versao
+        df_pred, info, manifesto = armazem.ler("Porto de Santos (SP)")
+        assert len(df_pred) == 4 and info["modo"] == "BASIC"
+        assert info["impressao_lineup"] == impressao_lineup(_lineup("Santos", 4))
+        assert manifesto["data_referencia"] == "2026-03-01"
+        assert "Porto Quebrado" in manifesto["erros"]
+        print("  ✓ Previsoes por porto com impressao do line-up e erros no manifesto")
+
+        nacional = armazem.nacional().set_index("porto_norm")
+        assert sorted(nacional.index) == ["ITAQUI", "SANTOS"]
+        assert nacional.loc["SANTOS", "navios"] == 4
+        assert nacional.loc["SANTOS", "espera_mediana_h"] == 25.0
+        assert nacional.loc["SANTOS", "atraso_mediano_h"] == 25.0
+        print("  ✓ Agregado nacional por porto")
+
+        for hora in ("07", "08", "09"):
+            armazem.nova_versao("2030-01-01", gerada_em=f"2030-01-01 {hora}:00").publicar()
+        assert armazem.versoes() == ["v20300101T080000", "v20300101T090000"]
+        assert armazem.versao_atual() == "v20300101T090000"
+        print("  ✓ Versoes antigas podadas")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - PREVISOES MATERIALIZADAS")
+    print("="*70)
+
+    tests = [
+        ("versoes + agregado nacional", test_versoes_e_nacional),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Script de teste do registro canonico de portos (registro_portos).
+Verifica a resolucao de aliases para IDs inteiros usados nos joins.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from registro_portos import ID_DESCONHECIDO, registro
+
+
+def test_aliases_mesmo_id():
+    """Nomes ANTAQ, AIS, 'Porto de X (UF)' e chaves com underscore resolvem para o mesmo ID"""
+    print("\n" + "="*70)
+    print("TESTE 1: aliases -> ID")
+    print("="*70)
+
+    reg = registro()
+    grupos = [
+        ["Santos", "SANTOS", "Porto de Santos (SP)", "santos"],
+        ["Paranaguá", "PARANAGUA", "Porto de Paranaguá (PR)"],
+        ["Rio Grande", "RIO_GRANDE", "Rio Grande (RS)"],
+        ["Porto De Maceio", "MACEIO", "Maceió"],
+        ["Porto Alegre", "PORTO ALEGRE"],
+        ["Suape", "Porto de Suape"],
+    ]
+    for nomes in grupos:
+        ids = {reg.id(n) for n in nomes}
+        assert len(ids) == 1 and min(ids) >= 0, f"{nomes} -> {ids}"
+    assert reg.id("Porto Alegre") != reg.id("Alegrete")
+    assert reg.porto("Paranaguá").arquivo_mare == "paranagua_extremos_2020_2026.csv"
+    assert reg.porto("Itaqui").uf == "MA"
+    print("  ✓ Aliases de cada porto resolvem para um unico ID")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_ids_vetorizado():
+    """ids() igual a id() linha a linha; nulos = -1; desconhecidos com ID dinamico estavel"""
+    print("\n" + "="*70)
+    print("TESTE 2: ids() vetorizado")
+    print("="*70)
+
+    reg = registro()
+    nomes = pd.Series(["Santos", None, "Itaqui", "Porto Inexistente", "PORTO INEXISTENTE", "", "Santos"])
+    ids = reg.ids(nomes)
+    esperado = [reg.id(n) for n in nomes]
+    assert ids.tolist() == esperado
+    assert ids[1] == ID_DESCONHECIDO and ids[5] == ID_DESCONHECIDO
+    assert ids[3] == ids[4] and ids[3] >= len(reg)
+    assert reg.chave(ids[3]) == "INEXISTENTE"
+    assert reg.porto(int(ids[3])) is None
+    np.testing.assert_array_equal(reg.chaves(["Porto de Santos (SP)"]), ["SANTOS"])
+    print("  ✓ Resolucao vetorizada identica a escalar")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - REGISTRO DE PORTOS")
+    print("="*70)
+
+    tests = [
+        ("aliases -> ID", test_aliases_mesmo_id),
+        ("ids vetorizado", test_ids_vetorizado),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Script de teste da materializacao incremental de tabelas diarias (tabela_diaria).
+Verifica o manifesto, a invalidacao por fonte (arquivo, codigo e registro
+de portos) e a leitura com projecao de colunas e filtro de datas.
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import registro_portos
+import tabela_diaria
+from registro_portos import registro
+from tabela_diaria import ARQUIVO_MANIFESTO, ARQUIVO_TABELA, FonteDiaria, TabelaDiaria
+
+
+def _agregar_media(arquivo):
+    df = pd.read_parquet(arquivo)
+    return df.groupby("data", as_index=False)["valor"].mean()
+
+
+def _agregar_maximo(arquivo):
+    df = pd.read_parquet(arquivo)
+    return df.groupby("data", as_index=False)["valor"].max()
+
+
+def _agregar_por_porto(arquivo):
+    df = pd.read_parquet(arquivo)
+    df["porto_id"] = registro().id("Santos")
+    return df.groupby(["data", "porto_id"], as_index=False)["valor"].mean()
+
+
+def _combinar(parciais):
+    if not parciais:
+        return pd.DataFrame()
+    partes = [df.assign(fonte=nome) for nome, df in parciais.items()]
+    return pd.concat(partes, ignore_index=True)
+
+
+def _combinar_soma(parciais):
+    final = _combinar(parciais)
+    return final.groupby("data", as_index=False)["valor"].sum() if not final.empty else final
+
+
+def _gravar_fonte(caminho, dias, valor):
+    pd.DataFrame({
+        "data": pd.to_datetime(dias).repeat(2),
+        "valor": [valor, valor + 2] * len(dias),
+    }).to_parquet(caminho, index=False)
+
+
+def test_manifesto_e_invalidacao():
+    """So a fonte alterada e reagregada; codigo e fontes removidas invalidam"""
+    print("\n" + "="*70)
+    print("TESTE 1: manifesto e invalidacao")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _gravar_fonte(tmp / "a.parquet", ["2024-01-02", "2024-01-01"], 1.0)
+        _gravar_fonte(tmp / "b.parquet", ["2024-01-03"], 10.0)
+        fontes = [
+            FonteDiaria("a", tmp / "a.parquet", _agregar_media),
+            FonteDiaria("b", tmp / "b.parquet", _agregar_media),
+        ]
+        destino = tmp / "clima_diario"
+        tabela = TabelaDiaria(fontes, _combinar, destino)
+
+        assert tabela.atualizar() == ["a", "b"]
+        manifesto = json.loads((destino / ARQUIVO_MANIFESTO).read_text(encoding="utf-8"))
+        assert set(manifesto["fontes"]) == {"a", "b"} and manifesto["combinar"]
+        assert manifesto["fontes"]["a"]["arquivo"][0][0] == str(tmp / "a.parquet")
+        lida = tabela.ler()
+        assert lida["data"].is_monotonic_increasing and len(lida) == 3
+        print("  ✓ Primeira execucao agrega tudo e grava manifesto")
+
+        mtime = (destino / ARQUIVO_TABELA).stat().st_mtime_ns
+        assert tabela.atualizar() == []
+        assert (destino / ARQUIVO_TABELA).stat().st_mtime_ns == mtime
+        print("  ✓ Sem mudancas: nada reprocessado, tabela intacta")
+
+        _gravar_fonte(tmp / "b.parquet", ["2024-01-03", "2024-01-04"], 20.0)
+        assert tabela.atualizar() == ["b"]
+        assert len(tabela.ler()) == 4
+        print("  ✓ Arquivo de origem alterado: so a fonte dele")
+
+        fontes[0] = FonteDiaria("a", tmp / "a.parquet", _agregar_maximo)
+        assert tabela.atualizar() == ["a"]
+        assert tabela.ler(data_max="2024-01-01")["valor"].tolist() == [3.0]
+        print("  ✓ Codigo da agregacao alterado: so a fonte dele")
+
+        combinada = TabelaDiaria(fontes, _combinar_soma, destino)
+        assert combinada.atualizar() == []
+        assert "fonte" not in combinada.ler().columns
+        print("  ✓ Combinador alterado: recombina sem reagregar")
+
+        (tmp / "b.parquet").unlink()
+        combinada.atualizar()
+        manifesto = json.loads((destino / ARQUIVO_MANIFESTO).read_text(encoding="utf-8"))
+        assert set(manifesto["fontes"]) == {"a"}
+        assert not (destino / "fontes" / "b.parquet").exists()
+        assert combinada.ler()["data"].max() == pd.Timestamp("2024-01-02")
+        print("  ✓ Fonte removida sai do manifesto e da tabela")
+
+        assert combinada.atualizar(forcar=True) == ["a"]
+        print("  ✓ forcar reprocessa tudo")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_leitura_com_filtros():
+    """Projecao de colunas e filtro de datas; tabela sem fontes fica vazia"""
+    print("\n" + "="*70)
+    print("TESTE 2: leitura com filtros")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _gravar_fonte(tmp / "a.parquet", ["2024-01-01", "2024-01-02", "2024-01-03"], 1.0)
+        tabela = TabelaDiaria([FonteDiaria("a", tmp / "a.parquet", _agregar_media)], _combinar, tmp / "out")
+        tabela.atualizar()
+        lida = tabela.ler(colunas=["data", "valor"], data_min="2024-01-02", data_max=pd.NaT)
+        assert list(lida.columns) == ["data", "valor"]
+        assert lida["data"].min() == pd.Timestamp("2024-01-02") and len(lida) == 2
+        print("  ✓ Colunas e intervalo de datas aplicados na leitura")
+
+        vazia = TabelaDiaria([FonteDiaria("x", tmp / "nao_existe.parquet", _agregar_media)], _combinar, tmp / "vazia")
+        assert vazia.atualizar() == []
+        assert vazia.ler(data_min="2024-01-01").empty
+        print("  ✓ Sem fontes disponiveis: tabela vazia")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def test_registro_de_portos_invalida():
+    """Agregacao que usa registro(): PORTOS ou CSV de portos alterados reagregam a fonte"""
+    print("\n" + "="*70)
+    print("TESTE 3: registro de portos invalida a fonte")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _gravar_fonte(tmp / "a.parquet", ["2024-01-01"], 1.0)
+        tabela = TabelaDiaria([FonteDiaria("a", tmp / "a.parquet", _agregar_por_porto)], _combinar, tmp / "out")
+        assert tabela.atualizar() == ["a"] and tabela.atualizar() == []
+
+        registro_portos.PORTOS["PORTO_TESTE"] = {"nome": "Porto Teste", "uf": "", "municipio": ""}
+        try:
+            assert tabela.atualizar() == ["a"]
+        finally:
+            registro_portos.PORTOS.pop("PORTO_TESTE")
+        assert tabela.atualizar() == ["a"] and tabela.atualizar() == []
+        print("  ✓ Edicao de registro_portos.PORTOS (via registro()) reagrega a fonte")
+
+        original = tabela_diaria.PORTS_CONFIG_PATH
+        tabela_diaria.PORTS_CONFIG_PATH = tmp / "ports_config.csv"
+        try:
+            assert tabela.atualizar() == ["a"] and tabela.atualizar() == []
+            tabela_diaria.PORTS_CONFIG_PATH.write_text("port_name\nSantos\n", encoding="utf-8")
+            assert tabela.atualizar() == ["a"]
+        finally:
+            tabela_diaria.PORTS_CONFIG_PATH = original
+        print("  ✓ CSV de portos alterado reagrega a fonte")
+
+    print("\n  ✅ TESTE 3 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - TABELA DIARIA")
+    print("="*70)
+
+    tests = [
+        ("manifesto e invalidacao", test_manifesto_e_invalidacao),
+        ("leitura com filtros", test_leitura_com_filtros),
+        ("registro de portos", test_registro_de_portos_invalida),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Script de teste da taxonomia de cargas (taxonomia_carga).
+Fixa a prioridade das palavras-chave (VEGETAL > MINERAL > FERTILIZANTE),
+os SH4 dos fertilizantes, o fallback para texto desconhecido e a escolha
+de colunas em perfis_lineup.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from taxonomia_carga import (
+    NCM_DESCONHECIDO,
+    PERFIL_PADRAO,
+    SH4_DESCONHECIDO,
+    SH4_POR_PERFIL,
+    classificar,
+    classificar_texto,
+    perfis_lineup,
+)
+
+
+def test_prioridade_e_fallback():
+    """Prioridade por perfil, item mais especifico primeiro e texto desconhecido no padrao"""
+    print("\n" + "="*70)
+    print("TESTE 1: prioridade das palavras-chave + fallback")
+    print("="*70)
+
+    assert classificar_texto("Soja e Ureia")[0] == "VEGETAL"
+    assert classificar_texto("Minério fertilizante")[0] == "MINERAL"
+    assert classificar_texto("Ureia / minerio")[0] == "MINERAL"
+    assert classificar_texto("Farelo de soja")[1] == "2304"
+    print("  ✓ VEGETAL > MINERAL > FERTILIZANTE; farelo de soja antes de soja")
+
+    esperados = {
+        "Fosfatado": "3103",
+        "fosfato monoamonico": "3103",
+        "Potássico": "3104",
+        "KCL granel": "3104",
+        "Nitrogenado": "3102",
+        "Ureia": "3102",
+        "Orgânico": "3101",
+        "NPK 10-10-10": "3105",
+    }
+    for texto, sh4 in esperados.items():
+        perfil, codigo, ncm = classificar_texto(texto)
+        assert (perfil, codigo) == ("FERTILIZANTE", sh4), (texto, perfil, codigo)
+        assert ncm.startswith(sh4)
+    print(f"  ✓ Fertilizantes com perfil e SH4 proprios: {esperados}")
+
+    for texto in ("Conteineres", "", None, np.nan):
+        assert classificar_texto(texto) == (PERFIL_PADRAO, SH4_DESCONHECIDO, NCM_DESCONHECIDO)
+    print("  ✓ Texto desconhecido ou vazio: perfil padrao e codigos 0000")
+
+    serie = pd.Series(["Soja", "Ureia", "Soja", None], index=[10, 11, 12, 13])
+    tabela = classificar(serie)
+    assert list(tabela.index) == [10, 11, 12, 13]
+    assert tabela["sh4"].tolist() == ["1201", "3102", "1201", SH4_DESCONHECIDO]
+    for texto in ("Soja", "Minerio de ferro", *esperados):
+        perfil, codigo, _ = classificar_texto(texto)
+        assert codigo in SH4_POR_PERFIL[perfil], (texto, perfil, codigo)
+    print("  ✓ classificar mantem o indice; SH4 no dominio de cdmercadoria do treino (SH4_POR_PERFIL)")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_perfis_lineup_colunas():
+    """Codigo de mercadoria antes do texto; primeira coluna de texto presente; sem nada, padrao"""
+    print("\n" + "="*70)
+    print("TESTE 2: colunas usadas por perfis_lineup")
+    print("="*70)
+
+    df = pd.DataFrame({
+        "cdmercadoria": ["31021010", "9999", None],
+        "Mercadoria": ["Soja", "Minerio de ferro", "Ureia"],
+        "produto": ["Milho", "Milho", "Milho"],
+    })
+    assert perfis_lineup(df).tolist() == ["FERTILIZANTE", "MINERAL", "FERTILIZANTE"]
+    print("  ✓ cdmercadoria conhecido vence o texto; codigo desconhecido ou vazio cai no texto")
+
+    assert perfis_lineup(pd.DataFrame({"stsh4": ["2601"], "Mercadoria": ["Soja"]})).tolist() == ["MINERAL"]
+    assert perfis_lineup(pd.DataFrame({"Mercadoria": ["Milho"], "produto": ["Ureia"]})).tolist() == ["VEGETAL"]
+    assert perfis_lineup(pd.DataFrame({"produto": ["Ureia"]})).tolist() == ["FERTILIZANTE"]
+    print("  ✓ stsh4 tambem e codigo; Mercadoria tem prioridade sobre produto")
+
+    sem_colunas = perfis_lineup(pd.DataFrame({"Navio": ["A", "B"]}, index=[5, 6]))
+    assert sem_colunas.tolist() == [PERFIL_PADRAO] * 2 and list(sem_colunas.index) == [5, 6]
+    print("  ✓ Sem codigo nem texto: perfil padrao, indice preservado")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - TAXONOMIA DE CARGAS")
+    print("="*70)
+
+    tests = [
+        ("prioridade + fallback", test_prioridade_e_fallback),
+        ("colunas de perfis_lineup", test_perfis_lineup_colunas),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Script de teste do retreino incremental (treino_incremental).
+Usa dados sinteticos e modelos base pequenos gravados num diretorio
+temporario: promocao, nao promocao, carga curta (holdout so dos dados
+novos), limites de classe do treino base e queda para retreino completo
+com drift.
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import plano_1
+import treino_incremental as ti
+
+TARGET = "tempo_espera_horas"
+FEATURES = ["x1", "x2"] + plano_1.LGB_CAT_FEATURES
+CUTOFF = pd.Timestamp("2024-01-01")
+
+
+def _dados(inicio, dias, seed, escala_x1=1.0):
+    rng = np.random.default_rng(seed)
+    n = dias * 30
+    df = pd.DataFrame({
+        "data_chegada_dt": pd.Timestamp(inicio) + pd.to_timedelta(rng.integers(0, dias * 24, n), unit="h"),
+        "x1": rng.normal(0, 1, n) * escala_x1,
+        "x2": rng.uniform(0, 1, n),
+    })
+    for col in plano_1.LGB_CAT_FEATURES:
+        df[col] = rng.choice(["a", "b"], n)
+    df[TARGET] = np.exp(3 + 0.6 * df["x1"].clip(-3, 3) + df["x2"]) * rng.uniform(0.9, 1.1, n)
+    return df
+
+
+def _salvar_base(ref, profile):
+    """Modelos base com poucas arvores (o warm start tem o que melhorar)."""
+    X, y = plano_1.preparar_matriz_lgb(ref, FEATURES, TARGET)
+    reg = lgb.LGBMRegressor(n_estimators=5, verbose=-1, random_state=42).fit(X, np.log1p(y))
+    classes = plano_1.classificar_espera(y)
+    clf = lgb.LGBMClassifier(n_estimators=2, num_leaves=4, verbose=-1, random_state=42).fit(X, classes)
+    clf.cortes_espera_ = plano_1.cortes_espera(y)
+    X_xgb = pd.get_dummies(ref[FEATURES], columns=plano_1.LGB_CAT_FEATURES, dummy_na=True)
+    modelo_xgb = xgb.XGBRegressor(n_estimators=5, tree_method="hist", random_state=42).fit(X_xgb, y)
+    plano_1.salvar_modelos(profile, FEATURES, TARGET, reg, clf, modelo_xgb,
+                           data_cutoff=ref["data_chegada_dt"].max(), dados=ref)
+    return clf.cortes_espera_
+
+
+def _metadata(profile):
+    return json.loads((Path("models") / f"{profile.lower()}_metadata.json").read_text(encoding="utf-8"))
+
+
+class _DiretorioTemporario:
+    """Roda o bloco num diretorio temporario (models/ e data/cache/ relativos)."""
+
+    def __enter__(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._anterior = os.getcwd()
+        os.chdir(self._tmp.name)
+        return Path(self._tmp.name)
+
+    def __exit__(self, *exc):
+        os.chdir(self._anterior)
+        self._tmp.cleanup()
+
+
+def test_holdout_e_classes():
+    """Holdout so de chegadas novas; classes com os cortes do treino base"""
+    print("\n" + "="*70)
+    print("TESTE 1: holdout e limites de classe")
+    print("="*70)
+
+    novos = _dados(CUTOFF, 60, seed=1)
+    treino, holdout, inicio = ti.separar_holdout(novos, holdout_dias=30)
+    assert len(treino) + len(holdout) == len(novos)
+    assert treino["data_chegada_dt"].max() <= inicio < holdout["data_chegada_dt"].min()
+    assert holdout["data_chegada_dt"].min() > CUTOFF
+    print(f"  ✓ 60 dias novos: {len(treino)} treino / {len(holdout)} holdout, corte {inicio:%Y-%m-%d}")
+
+    curtos = _dados(CUTOFF, 20, seed=2)
+    treino, holdout, _ = ti.separar_holdout(curtos, holdout_dias=30)
+    assert not treino.empty and not holdout.empty
+    assert abs(len(treino) - len(holdout)) <= len(curtos) * 0.05
+    print("  ✓ Carga menor que o holdout: metade final vira holdout (nao fica 'mantido')")
+
+    base = _dados("2023-01-01", 365, seed=3)[TARGET]
+    cortes = plano_1.cortes_espera(base)
+    assert (plano_1.classificar_espera(base, cortes) == plano_1.classificar_espera(base)).all()
+    deslocado = plano_1.classificar_espera(base * 100, cortes)
+    assert (deslocado == 2).mean() > 0.99
+    print("  ✓ pd.cut com os cortes do treino = qcut no treino; dados novos nao sao re-tercilizados")
+
+    print("\n  ✅ TESTE 1 PASSOU")
+    return True
+
+
+def test_promocao_e_nao_promocao():
+    """Warm start melhora e e promovido; com tolerancia impossivel fica o modelo atual"""
+    print("\n" + "="*70)
+    print("TESTE 2: promocao e nao promocao")
+    print("="*70)
+
+    with _DiretorioTemporario():
+        ref = _dados("2023-01-01", 365, seed=4)
+        ref = ref[ref["data_chegada_dt"] < CUTOFF]
+        novos = _dados(CUTOFF, 60, seed=5)
+        df = pd.concat([ref, novos], ignore_index=True)
+
+        cortes = _salvar_base(ref, "SINTETICO")
+        resumo = ti.retreino_incremental("SINTETICO", holdout_dias=30, dados=(df, FEATURES, TARGET),
+                                         tolerancia=-1.0)
+        assert resumo["modo"] == "incremental" and not resumo["promovido"], resumo
+        assert "modo_treino" not in _metadata("SINTETICO")
+        assert resumo["novos"] + resumo["holdout"] == len(novos)
+        print("  ✓ Sem melhora suficiente: modelos e metadata atuais mantidos")
+
+        resumo = ti.retreino_incremental("SINTETICO", holdout_dias=30, dados=(df, FEATURES, TARGET))
+        assert resumo["promovido"], resumo
+        for nome, info in resumo["modelos"].items():
+            assert info["erro_novo"] < info["erro_atual"], (nome, info)
+        metadata = _metadata("SINTETICO")
+        assert metadata["modo_treino"] == "incremental"
+        assert metadata["cortes_classe"] == cortes
+        assert CUTOFF < pd.Timestamp(metadata["data_cutoff"]) < novos["data_chegada_dt"].max()
+        print(f"  ✓ Promovido: {resumo['modelos']}")
+        print("  ✓ Cortes de classe preservados; data_cutoff = inicio do holdout")
+
+    print("\n  ✅ TESTE 2 PASSOU")
+    return True
+
+
+def test_drift_cai_para_completo():
+    """Drift nas features novas dispara o retreino completo"""
+    print("\n" + "="*70)
+    print("TESTE 3: drift -> retreino completo")
+    print("="*70)
+
+    with _DiretorioTemporario():
+        ref = _dados("2023-01-01", 365, seed=6)
+        ref = ref[ref["data_chegada_dt"] < CUTOFF]
+        _salvar_base(ref, "SINTETICO")
+        novos = _dados(CUTOFF, 60, seed=7, escala_x1=10.0)
+        novos["x1"] += 20
+
+        chamadas = []
+        original = ti.retreino_completo
+        ti.retreino_completo = lambda profile, df, *args, **kwargs: chamadas.append(len(df)) or {"modo": "completo"}
+        try:
+            resumo = ti.retreino_incremental(
+                "SINTETICO", dados=(pd.concat([ref, novos], ignore_index=True), FEATURES, TARGET)
+            )
+        finally:
+            ti.retreino_completo = original
+        assert resumo["modo"] == "completo" and chamadas == [len(ref) + len(novos)], resumo
+        assert "x1" in resumo["drift"]["features_drift"]
+        print(f"  ✓ Drift detectado ({resumo['drift']}); retreino completo com todos os dados")
+
+    print("\n  ✅ TESTE 3 PASSOU")
+    return True
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("TESTES - RETREINO INCREMENTAL")
+    print("="*70)
+
+    tests = [
+        ("holdout e classes", test_holdout_e_classes),
+        ("promocao e nao promocao", test_promocao_e_nao_promocao),
+        ("drift -> completo", test_drift_cai_para_completo),
+    ]
+
+    resultados = []
+    for nome, test_func in tests:
+        try:
+            test_func()
+            resultados.append((nome, "✅ PASSOU"))
+        except Exception as e:
+            resultados.append((nome, f"❌ FALHOU: {e}"))
+            print(f"\n  ❌ ERRO: {e}")
+
+    print("\n" + "="*70)
+    print("RESUMO DOS TESTES")
+    print("="*70)
+    for nome, status in resultados:
+        print(f"  {nome:40s} {status}")
+
+    return 0 if all("PASSOU" in status for _, status in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
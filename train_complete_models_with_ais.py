@@ -34,6 +34,9 @@ from sklearn.metrics import (
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 
+from drift_features import referencia_features
+from metricas_fila import contar_em_janela, media_movel_espera
+
 warnings.filterwarnings("ignore")
 
 # ============================================================================
@@ -43,6 +46,7 @@ warnings.filterwarnings("ignore")
 DATA_DIR = Path("data/ais")
 MODEL_DIR = Path("models")
 COMPLETE_DATASET = DATA_DIR / "complete_dataset.parquet"
+SEED_ENRIQUECIMENTO = 42
 
 # Perfis de carga
 PROFILE_MAPPING = {
@@ -128,50 +132,65 @@ AGRO_HISTORICO = {
     12: {"prod_soja": 138, "prod_milho": 110, "prod_algodao": 7.0, "preco_soja": 150, "preco_milho": 71, "preco_algodao": 190},
 }
 
+# Região climática por porto (demais portos: SUDESTE)
+REGIAO_PORTO = {
+    "Santos": "SUDESTE",
+    "Vitória": "SUDESTE",
+    "Paranaguá": "SUL",
+    "Rio Grande": "SUL",
+    "Itajaí": "SUL",
+    "Suape": "NORDESTE",
+    "Salvador": "NORDESTE",
+    "Itaqui": "NORDESTE",
+}
+
+# Tabelas de consulta (regiao, mes) e (mes) derivadas dos dicionarios acima
+TABELA_CLIMA = pd.DataFrame(
+    [{"regiao": regiao, "mes": mes, **valores}
+     for regiao, meses in CLIMA_HISTORICO.items() for mes, valores in meses.items()]
+)
+TABELA_AGRO = pd.DataFrame([{"mes": mes, **valores} for mes, valores in AGRO_HISTORICO.items()])
+
 
 # ============================================================================
 # FUNÇÕES DE ENRIQUECIMENTO
 # ============================================================================
 
 
-def inferir_perfil(row):
+def inferir_perfil(df):
     """Infere o perfil de carga baseado no tipo de navio e porto."""
-    tipo = row["type"].lower() if row["type"] else ""
-    porto = row["porto"]
+    tipo = df["type"].fillna("").astype(str).str.lower()
 
     # Tankers geralmente são fertilizantes (químicos/petróleo)
-    if "tanker" in tipo or "chemical" in tipo:
-        return "FERTILIZANTE"
-
-    # Bulk carriers e cargos dependem do porto
-    if "bulk" in tipo or "cargo" in tipo:
-        # Portos de grãos (Sul/Sudeste)
-        if porto in ["Santos", "Paranaguá", "Rio Grande"]:
-            return "VEGETAL"
-        # Portos de minério (Norte/Nordeste)
-        elif porto in ["Itaqui", "Vitória"]:
-            return "MINERAL"
-        else:
-            # Default para vegetal (grãos)
-            return "VEGETAL"
+    tanker = tipo.str.contains("tanker|chemical", regex=True)
+
+    # Bulk carriers e cargos em portos de minério (Norte/Nordeste);
+    # demais graneis e fallback ficam como vegetal (grãos)
+    mineral = tipo.str.contains("bulk|cargo", regex=True) & df["porto"].isin(["Itaqui", "Vitória"])
 
-    # Fallback
-    return "VEGETAL"
+    perfil = np.select([tanker, mineral], ["FERTILIZANTE", "MINERAL"], default="VEGETAL")
+    return pd.Series(perfil, index=df.index)
 
 
 def get_regiao_porto(porto):
-    """Retorna a região climática do porto."""
-    regioes = {
-        "Santos": "SUDESTE",
-        "Vitória": "SUDESTE",
-        "Paranaguá": "SUL",
-        "Rio Grande": "SUL",
-        "Itajaí": "SUL",
-        "Suape": "NORDESTE",
-        "Salvador": "NORDESTE",
-        "Itaqui": "NORDESTE",
-    }
-    return regioes.get(porto, "SUDESTE")
+    """Retorna a região climática do porto (escalar ou Series)."""
+    if isinstance(porto, pd.Series):
+        return porto.map(REGIAO_PORTO).fillna("SUDESTE")
+    return REGIAO_PORTO.get(porto, "SUDESTE")
+
+
+def _consultar(chaves, tabela, on):
+    """Left merge das chaves com a tabela, preservando a ordem das linhas."""
+    return chaves.reset_index(drop=True).merge(tabela, on=on, how="left")
+
+
+def _sortear_por_perfil(perfis, opcoes, rng):
+    """Sorteia um valor de opcoes[perfil] para cada linha."""
+    saida = np.empty(len(perfis), dtype=object)
+    for perfil, valores in opcoes.items():
+        mask = (perfis == perfil).to_numpy()
+        saida[mask] = rng.choice(valores, mask.sum())
+    return saida
 
 
 def adicionar_features_temporais(df):
@@ -184,15 +203,11 @@ def adicionar_features_temporais(df):
     # Período de safra
     # Soja: fev-abr (safra principal), jul-set (safrinha)
     # Milho: mar-jun (safra principal), jul-out (safrinha)
-    def calc_periodo_safra(mes):
-        if mes in [2, 3, 4]:  # Safra principal soja
-            return 1
-        elif mes in [7, 8, 9]:  # Safrinha milho
-            return 2
-        else:
-            return 0
-
-    df["periodo_safra"] = df["mes"].apply(calc_periodo_safra)
+    df["periodo_safra"] = np.select(
+        [df["mes"].isin([2, 3, 4]), df["mes"].isin([7, 8, 9])],  # Safra principal soja / safrinha milho
+        [1, 2],
+        default=0,
+    )
 
     return df
 
@@ -206,174 +221,116 @@ def adicionar_features_historicas(df):
     df["porto_tempo_medio_historico"] = porto_tempo_medio
 
     # Média móvel de 5 observações
-    df["tempo_espera_ma5"] = (
-        df.groupby("porto")["waiting_time_hours"]
-        .transform(lambda x: x.rolling(window=5, min_periods=1).mean())
+    df["tempo_espera_ma5"] = media_movel_espera(
+        df["waiting_time_hours"], df["porto"], janela=5, excluir_atual=False
     )
 
-    # Navios no fundeio na chegada (± 1 dia)
-    df["navios_no_fundeio_na_chegada"] = 0
-    for idx, row in df.iterrows():
-        porto = row["porto"]
-        data = row["berthing_datetime"]
-        # Contar navios no mesmo porto em janela de ±1 dia
-        mask = (
-            (df["porto"] == porto)
-            & (df["berthing_datetime"] >= data - pd.Timedelta(days=1))
-            & (df["berthing_datetime"] <= data + pd.Timedelta(days=1))
-            & (df.index != idx)
-        )
-        df.at[idx, "navios_no_fundeio_na_chegada"] = mask.sum()
+    # Navios no fundeio na chegada (± 1 dia, sem o próprio navio)
+    df["navios_no_fundeio_na_chegada"] = contar_em_janela(
+        df["berthing_datetime"], df["porto"],
+        antes=pd.Timedelta(days=1), depois=pd.Timedelta(days=1), excluir_proprio=True,
+    )
 
     # Navios na fila últimos 7 dias
-    df["navios_na_fila_7d"] = 0
-    for idx, row in df.iterrows():
-        porto = row["porto"]
-        data = row["berthing_datetime"]
-        # Contar navios no mesmo porto nos últimos 7 dias
-        mask = (
-            (df["porto"] == porto)
-            & (df["berthing_datetime"] >= data - pd.Timedelta(days=7))
-            & (df["berthing_datetime"] < data)
-        )
-        df.at[idx, "navios_na_fila_7d"] = mask.sum()
+    df["navios_na_fila_7d"] = contar_em_janela(
+        df["berthing_datetime"], df["porto"], antes=pd.Timedelta(days=7), incluir_fim=False,
+    )
 
     return df
 
 
-def adicionar_features_clima(df):
+def adicionar_features_clima(df, rng):
     """Adiciona features de clima baseadas em médias históricas."""
-    df["temp_media_dia"] = 0.0
-    df["precipitacao_dia"] = 0.0
-    df["vento_rajada_max_dia"] = 0.0
-    df["vento_velocidade_media"] = 0.0
-    df["umidade_media_dia"] = 0.0
-    df["amplitude_termica"] = 0.0
-    df["restricao_vento"] = 0
-    df["restricao_chuva"] = 0
-    df["chuva_acumulada_ultimos_3dias"] = 0.0
-    df["frente_fria"] = 0
-    df["pressao_anomalia"] = 0.0
-    df["ressaca"] = 0
-
-    for idx, row in df.iterrows():
-        regiao = get_regiao_porto(row["porto"])
-        mes = row["mes"]
-        clima = CLIMA_HISTORICO[regiao][mes]
-
-        # Adicionar variação aleatória ±10%
-        variacao = np.random.uniform(0.9, 1.1)
-
-        df.at[idx, "temp_media_dia"] = clima["temp"] * variacao
-        df.at[idx, "precipitacao_dia"] = clima["precip"] * variacao
-        df.at[idx, "vento_rajada_max_dia"] = clima["vento"] * 1.5 * variacao
-        df.at[idx, "vento_velocidade_media"] = clima["vento"] * variacao
-        df.at[idx, "umidade_media_dia"] = clima["umidade"] * variacao
-
-        # Amplitude térmica (variação diurna)
-        df.at[idx, "amplitude_termica"] = 8.0 + np.random.uniform(-2, 2)
-
-        # Restrições (vento > 25 kt ou chuva > 50mm)
-        df.at[idx, "restricao_vento"] = 1 if clima["vento"] * variacao > 25 else 0
-        df.at[idx, "restricao_chuva"] = 1 if clima["precip"] * variacao > 50 else 0
-
-        # Chuva acumulada 3 dias (2-4x precipitação diária)
-        df.at[idx, "chuva_acumulada_ultimos_3dias"] = clima["precip"] * variacao * np.random.uniform(2, 4)
-
-        # Frente fria (mais comum no inverno - Sul)
-        if regiao == "SUL" and mes in [5, 6, 7, 8]:
-            df.at[idx, "frente_fria"] = 1 if np.random.random() > 0.7 else 0
-
-        # Pressão anômala (hPa)
-        df.at[idx, "pressao_anomalia"] = np.random.uniform(-5, 5)
-
-        # Ressaca (mais comum em costas expostas no inverno)
-        if row["porto"] in ["Santos", "Rio Grande", "Salvador"]:
-            df.at[idx, "ressaca"] = 1 if np.random.random() > 0.85 else 0
+    n = len(df)
+    regiao = get_regiao_porto(df["porto"])
+    clima = _consultar(pd.DataFrame({"regiao": regiao, "mes": df["mes"]}), TABELA_CLIMA, ["regiao", "mes"])
+    temp, precip = clima["temp"].to_numpy(), clima["precip"].to_numpy()
+    vento, umidade = clima["vento"].to_numpy(), clima["umidade"].to_numpy()
+
+    # Adicionar variação aleatória ±10%
+    variacao = rng.uniform(0.9, 1.1, n)
+
+    df["temp_media_dia"] = temp * variacao
+    df["precipitacao_dia"] = precip * variacao
+    df["vento_rajada_max_dia"] = vento * 1.5 * variacao
+    df["vento_velocidade_media"] = vento * variacao
+    df["umidade_media_dia"] = umidade * variacao
+
+    # Amplitude térmica (variação diurna)
+    df["amplitude_termica"] = 8.0 + rng.uniform(-2, 2, n)
+
+    # Restrições (vento > 25 kt ou chuva > 50mm)
+    df["restricao_vento"] = (vento * variacao > 25).astype(int)
+    df["restricao_chuva"] = (precip * variacao > 50).astype(int)
+
+    # Chuva acumulada 3 dias (2-4x precipitação diária)
+    df["chuva_acumulada_ultimos_3dias"] = precip * variacao * rng.uniform(2, 4, n)
+
+    # Frente fria (mais comum no inverno - Sul)
+    inverno_sul = ((regiao == "SUL") & df["mes"].isin([5, 6, 7, 8])).to_numpy()
+    df["frente_fria"] = (inverno_sul & (rng.random(n) > 0.7)).astype(int)
+
+    # Pressão anômala (hPa)
+    df["pressao_anomalia"] = rng.uniform(-5, 5, n)
+
+    # Ressaca (mais comum em costas expostas no inverno)
+    exposto = df["porto"].isin(["Santos", "Rio Grande", "Salvador"]).to_numpy()
+    df["ressaca"] = (exposto & (rng.random(n) > 0.85)).astype(int)
 
     return df
 
 
-def adicionar_features_mare(df):
+def adicionar_features_mare(df, rng):
     """Adiciona features de maré (apenas para VEGETAL que tem essas features)."""
-    # Essas features só existem para VEGETAL
-    df["wave_height_max"] = 0.0
-    df["wave_height_media"] = 0.0
-    df["mare_astronomica"] = 0.0
-    df["mare_subindo"] = 0
-    df["mare_horas_ate_extremo"] = 0.0
-    df["tem_mare_astronomica"] = 0
-
-    for idx, row in df.iterrows():
-        # Altura de ondas (0.5 - 3.0 m, maior no inverno)
-        mes = row["mes"]
-        if mes in [6, 7, 8]:  # Inverno
-            wave_base = np.random.uniform(1.5, 3.0)
-        else:
-            wave_base = np.random.uniform(0.5, 2.0)
+    n = len(df)
 
-        df.at[idx, "wave_height_max"] = wave_base * 1.5
-        df.at[idx, "wave_height_media"] = wave_base
+    # Altura de ondas (0.5 - 3.0 m, maior no inverno)
+    inverno = df["mes"].isin([6, 7, 8]).to_numpy()
+    wave_base = rng.uniform(np.where(inverno, 1.5, 0.5), np.where(inverno, 3.0, 2.0))
+    df["wave_height_max"] = wave_base * 1.5
+    df["wave_height_media"] = wave_base
 
-        # Maré astronômica (amplitude em metros: 1-3m)
-        df.at[idx, "mare_astronomica"] = np.random.uniform(1.0, 3.0)
+    # Maré astronômica (amplitude em metros: 1-3m)
+    df["mare_astronomica"] = rng.uniform(1.0, 3.0, n)
 
-        # Maré subindo ou descendo
-        df.at[idx, "mare_subindo"] = np.random.choice([0, 1])
+    # Maré subindo ou descendo
+    df["mare_subindo"] = rng.integers(0, 2, n)
 
-        # Horas até próximo extremo (0-6h)
-        df.at[idx, "mare_horas_ate_extremo"] = np.random.uniform(0, 6)
+    # Horas até próximo extremo (0-6h)
+    df["mare_horas_ate_extremo"] = rng.uniform(0, 6, n)
 
-        # Tem maré astronômica significativa (>2m)
-        df.at[idx, "tem_mare_astronomica"] = 1 if df.at[idx, "mare_astronomica"] > 2.0 else 0
+    # Tem maré astronômica significativa (>2m)
+    df["tem_mare_astronomica"] = (df["mare_astronomica"] > 2.0).astype(int)
 
     return df
 
 
-def adicionar_features_agricolas(df):
+def adicionar_features_agricolas(df, rng):
     """Adiciona features agrícolas baseadas em médias históricas."""
-    # Flags de produtos
-    df["flag_celulose"] = 0
-    df["flag_algodao"] = 0
-    df["flag_soja"] = 0
-    df["flag_milho"] = 0
+    n = len(df)
 
     # Inferir produto baseado no perfil
-    for idx, row in df.iterrows():
-        perfil = row["perfil"]
-        if perfil == "VEGETAL":
-            # Distribuir entre soja (40%), milho (30%), algodão (10%), celulose (20%)
-            rand = np.random.random()
-            if rand < 0.4:
-                df.at[idx, "flag_soja"] = 1
-            elif rand < 0.7:
-                df.at[idx, "flag_milho"] = 1
-            elif rand < 0.8:
-                df.at[idx, "flag_algodao"] = 1
-            else:
-                df.at[idx, "flag_celulose"] = 1
-
-    # Produção e preços
-    df["producao_soja"] = 0.0
-    df["producao_milho"] = 0.0
-    df["producao_algodao"] = 0.0
-    df["preco_soja_mensal"] = 0.0
-    df["preco_milho_mensal"] = 0.0
-    df["preco_algodao_mensal"] = 0.0
-
-    for idx, row in df.iterrows():
-        mes = row["mes"]
-        agro = AGRO_HISTORICO[mes]
-
-        # Adicionar variação ±5%
-        variacao = np.random.uniform(0.95, 1.05)
-
-        df.at[idx, "producao_soja"] = agro["prod_soja"] * variacao
-        df.at[idx, "producao_milho"] = agro["prod_milho"] * variacao
-        df.at[idx, "producao_algodao"] = agro["prod_algodao"] * variacao
-        df.at[idx, "preco_soja_mensal"] = agro["preco_soja"] * variacao
-        df.at[idx, "preco_milho_mensal"] = agro["preco_milho"] * variacao
-        df.at[idx, "preco_algodao_mensal"] = agro["preco_algodao"] * variacao
+    # VEGETAL: soja (40%), milho (30%), algodão (10%), celulose (20%)
+    vegetal = (df["perfil"] == "VEGETAL").to_numpy()
+    produto = np.where(vegetal, np.digitize(rng.random(n), [0.4, 0.7, 0.8]), -1)
+    df["flag_soja"] = (produto == 0).astype(int)
+    df["flag_milho"] = (produto == 1).astype(int)
+    df["flag_algodao"] = (produto == 2).astype(int)
+    df["flag_celulose"] = (produto == 3).astype(int)
+
+    # Produção e preços (variação ±5%)
+    agro = _consultar(df[["mes"]], TABELA_AGRO, ["mes"])
+    variacao = rng.uniform(0.95, 1.05, n)
+    colunas = {
+        "producao_soja": "prod_soja",
+        "producao_milho": "prod_milho",
+        "producao_algodao": "prod_algodao",
+        "preco_soja_mensal": "preco_soja",
+        "preco_milho_mensal": "preco_milho",
+        "preco_algodao_mensal": "preco_algodao",
+    }
+    for destino, origem in colunas.items():
+        df[destino] = agro[origem].to_numpy() * variacao
 
     # Índices de pressão (preço * produção / 100)
     df["indice_pressao_soja"] = (df["preco_soja_mensal"] * df["producao_soja"]) / 100
@@ -382,27 +339,27 @@ def adicionar_features_agricolas(df):
     return df
 
 
-def adicionar_features_ais(df):
+def adicionar_features_ais(df, rng):
     """Adiciona features AIS calculadas do próprio dataset."""
     df["ais_navios_no_raio"] = df["navios_no_fundeio_na_chegada"]  # Proxy
     df["ais_fila_ao_largo"] = df["navios_na_fila_7d"]  # Proxy
-    df["ais_velocidade_media_kn"] = np.random.uniform(8, 12, len(df))  # Velocidade típica de aproximação
+    df["ais_velocidade_media_kn"] = rng.uniform(8, 12, len(df))  # Velocidade típica de aproximação
     df["ais_eta_media_horas"] = df["waiting_time_hours"] * 0.8  # ETA é geralmente menor que tempo real
-    df["ais_dist_media_km"] = np.random.uniform(50, 200, len(df))  # Distância típica de aproximação
+    df["ais_dist_media_km"] = rng.uniform(50, 200, len(df))  # Distância típica de aproximação
 
     return df
 
 
-def adicionar_features_basicas(df):
+def adicionar_features_basicas(df, rng):
     """Adiciona features básicas de terminal e carga."""
     # Inferir perfil primeiro
-    df["perfil"] = df.apply(inferir_perfil, axis=1)
+    df["perfil"] = inferir_perfil(df)
 
     # Nome do terminal (mock - usar porto + número)
     df["nome_terminal"] = df["porto"] + " - Terminal " + (df.groupby("porto").cumcount() % 3 + 1).astype(str)
 
     # Tipo de navegação (maioria é cabotagem)
-    df["tipo_navegacao"] = np.random.choice(["Longo Curso", "Cabotagem"], len(df), p=[0.7, 0.3])
+    df["tipo_navegacao"] = rng.choice(["Longo Curso", "Cabotagem"], len(df), p=[0.7, 0.3])
 
     # Tipo de carga (maioria é granel)
     df["tipo_carga"] = "Granel"
@@ -414,9 +371,7 @@ def adicionar_features_basicas(df):
         "FERTILIZANTE": ["Ureia", "KCL", "NPK", "Fosfato"],
     }
 
-    df["natureza_carga"] = df["perfil"].apply(
-        lambda p: np.random.choice(natureza_map[p])
-    )
+    df["natureza_carga"] = _sortear_por_perfil(df["perfil"], natureza_map, rng)
 
     # Código NCM (mock - usar código genérico por categoria)
     cdm_map = {
@@ -425,22 +380,17 @@ def adicionar_features_basicas(df):
         "FERTILIZANTE": ["3102", "3104", "3105", "3103"],
     }
 
-    df["cdmercadoria"] = df["perfil"].apply(lambda p: np.random.choice(cdm_map[p]))
+    df["cdmercadoria"] = _sortear_por_perfil(df["perfil"], cdm_map, rng)
     df["stsh4"] = df["cdmercadoria"]  # SH4 é os 4 primeiros dígitos do NCM
 
     # Movimentação total em toneladas (baseado no tipo de navio)
-    df["movimentacao_total_toneladas"] = 0.0
-    for idx, row in df.iterrows():
-        tipo = row["type"].lower() if row["type"] else ""
-        if "tanker" in tipo:
-            # Tankers: 20,000 - 150,000 t
-            df.at[idx, "movimentacao_total_toneladas"] = np.random.uniform(20000, 150000)
-        elif "bulk" in tipo:
-            # Bulks: 30,000 - 200,000 t
-            df.at[idx, "movimentacao_total_toneladas"] = np.random.uniform(30000, 200000)
-        else:
-            # Outros: 10,000 - 80,000 t
-            df.at[idx, "movimentacao_total_toneladas"] = np.random.uniform(10000, 80000)
+    # Tankers: 20,000 - 150,000 t | Bulks: 30,000 - 200,000 t | Outros: 10,000 - 80,000 t
+    tipo = df["type"].fillna("").astype(str).str.lower()
+    tanker = tipo.str.contains("tanker", regex=False).to_numpy()
+    bulk = tipo.str.contains("bulk", regex=False).to_numpy()
+    minimo = np.select([tanker, bulk], [20000, 30000], default=10000)
+    maximo = np.select([tanker, bulk], [150000, 200000], default=80000)
+    df["movimentacao_total_toneladas"] = rng.uniform(minimo, maximo)
 
     # Flag para químico (só fertilizante)
     df["flag_quimico"] = (df["perfil"] == "FERTILIZANTE").astype(int)
@@ -471,27 +421,30 @@ def enriquecer_dataset():
     print(f"✓ Eventos com waiting_time válido: {len(df)}")
     print()
 
+    # Gerador único e semeado: enriquecimento reprodutível entre execuções
+    rng = np.random.default_rng(SEED_ENRIQUECIMENTO)
+
     # Adicionar features progressivamente
     print("Adicionando features temporais...")
     df = adicionar_features_temporais(df)
 
     print("Adicionando features básicas (terminal, carga)...")
-    df = adicionar_features_basicas(df)
+    df = adicionar_features_basicas(df, rng)
 
     print("Adicionando features históricas (fila, tempo médio)...")
     df = adicionar_features_historicas(df)
 
     print("Adicionando features climáticas...")
-    df = adicionar_features_clima(df)
+    df = adicionar_features_clima(df, rng)
 
     print("Adicionando features de maré...")
-    df = adicionar_features_mare(df)
+    df = adicionar_features_mare(df, rng)
 
     print("Adicionando features agrícolas...")
-    df = adicionar_features_agricolas(df)
+    df = adicionar_features_agricolas(df, rng)
 
     print("Adicionando features AIS adicionais...")
-    df = adicionar_features_ais(df)
+    df = adicionar_features_ais(df, rng)
 
     # Temperatura média (para modelos light que precisam dessa feature)
     df["temperatura_media"] = df["temp_media_dia"]
@@ -804,7 +757,7 @@ def train_complete_model(profile, X_train, y_train, X_val, y_val, X_test, y_test
     }
 
 
-def salvar_modelos(profile, models, num_samples):
+def salvar_modelos(profile, models, num_samples, X=None):
     """Salva os modelos completos treinados."""
     # Salvar modelos
     lgb_reg_path = MODEL_DIR / f"{profile.lower()}_lgb_reg_REAL.pkl"
@@ -827,6 +780,9 @@ def salvar_modelos(profile, models, num_samples):
     metadata["data_source"] = "datalastic_ais_enriched"
     metadata["is_mock"] = False
     metadata["num_samples"] = num_samples
+    if X is not None:
+        # Referencia do monitor de drift acompanha o novo treino
+        metadata["drift_referencia"] = referencia_features(X, metadata.get("features", list(X.columns)))
     metadata["metrics"] = {
         "test_mae": models["metrics"]["test_mae_ens"],
         "test_r2": models["metrics"]["test_r2_ens"],
@@ -897,7 +853,7 @@ def main():
         )
 
         # Salvar
-        salvar_modelos(profile, models, len(X))
+        salvar_modelos(profile, models, len(X), X=X)
 
         resultados[profile] = models["metrics"]
 
@@ -20,6 +20,9 @@ import lightgbm as lgb
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, r2_score, mean_squared_error
 
+from drift_features import referencia_features
+from metricas_fila import contar_em_janela, media_movel_espera
+
 # Features para modelos light (15 features críticas)
 FEATURES_LIGHT = {
     "VEGETAL": [
@@ -226,42 +229,22 @@ def preprocess_features(df):
     # Ordenar por porto e tempo
     df = df.sort_values(['porto', 'berthing_time'])
 
-    # Para cada porto, calcular médias móveis
-    for porto in df['porto'].unique():
-        mask = df['porto'] == porto
-        df.loc[mask, 'porto_tempo_medio_historico'] = (
-            df.loc[mask, 'waiting_time_hours']
-            .rolling(window=10, min_periods=1)
-            .mean()
-        )
-        df.loc[mask, 'tempo_espera_ma5'] = (
-            df.loc[mask, 'waiting_time_hours']
-            .rolling(window=5, min_periods=1)
-            .mean()
-        )
+    # Médias móveis por porto
+    df['porto_tempo_medio_historico'] = media_movel_espera(
+        df['waiting_time_hours'], df['porto'], janela=10, excluir_atual=False
+    )
+    df['tempo_espera_ma5'] = media_movel_espera(
+        df['waiting_time_hours'], df['porto'], janela=5, excluir_atual=False
+    )
 
     # 8. Features de fila (estimadas)
     print("🚦 Estimando features de fila...")
 
-    # Contar navios na mesma janela temporal por porto
-    df = df.sort_values(['porto', 'berthing_time'])
-
-    for porto in df['porto'].unique():
-        mask = df['porto'] == porto
-        df_porto = df[mask].copy()
-
-        # Para cada registro, contar quantos navios no mesmo dia
-        fila_counts = []
-        for idx, row in df_porto.iterrows():
-            data = row['berthing_time']
-            mesma_data = (
-                (df_porto['berthing_time'] >= data - pd.Timedelta(days=1)) &
-                (df_porto['berthing_time'] <= data + pd.Timedelta(days=1))
-            )
-            count = mesma_data.sum() - 1  # Exclui próprio navio
-            fila_counts.append(max(0, count))
-
-        df.loc[mask, 'navios_no_fundeio_na_chegada'] = fila_counts
+    # Navios do mesmo porto em janela de ±1 dia (exclui próprio navio)
+    df['navios_no_fundeio_na_chegada'] = contar_em_janela(
+        df['berthing_time'], df['porto'],
+        antes=pd.Timedelta(days=1), depois=pd.Timedelta(days=1), excluir_proprio=True,
+    )
 
     # Fila últimos 7 dias
     df['navios_na_fila_7d'] = df['navios_no_fundeio_na_chegada'] * 7  # Aproximação
@@ -464,6 +447,9 @@ def save_models(profile, models, features, output_dir="models"):
             "min_child_samples": 10,
         },
     }
+    if models.get("X_train") is not None:
+        # Histogramas de referencia para o monitor de drift do app
+        metadata["drift_referencia"] = referencia_features(models["X_train"], features)
 
     with open(output_path / f"{profile_lower}_light_metadata.json", "w") as f:
         json.dump(metadata, f, indent=2)
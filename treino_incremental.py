@@ -0,0 +1,273 @@
+"""
+Retreino incremental (warm start) dos modelos por perfil do plano_1.
+
+Carrega os modelos atuais de models/, continua o boosting apenas com as
+chegadas posteriores ao data_cutoff gravado no metadata (LightGBM via
+init_model, XGBoost via xgb_model), valida num holdout temporal e so
+promove os modelos que nao pioram. Se houver drift (PSI alto entre a base
+de treino e os dados novos), cai para o retreino completo.
+
+Uso:
+    python treino_incremental.py --profiles VEGETAL --holdout-dias 30
+"""
+
+import argparse
+import json
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import accuracy_score, mean_absolute_error
+
+import plano_1
+from drift_features import psi_proporcoes
+
+MODEL_DIR = Path("models")
+HOLDOUT_DIAS = 30
+RODADAS_INCREMENTAIS = 100
+TOLERANCIA_MAE = 0.02
+PSI_LIMIAR = 0.25
+FRACAO_TREINO_CARGA_CURTA = 0.5
+FRACAO_FEATURES_DRIFT = 0.3
+
+
+def carregar_modelos_atuais(profile):
+    """Metadata e modelos salvos por plano_1.salvar_modelos (ou None)."""
+    metadata_path = MODEL_DIR / f"{profile.lower()}_metadata.json"
+    if not metadata_path.exists():
+        return None
+    with metadata_path.open("r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    artifacts = metadata.get("artifacts", {})
+    modelos = {"metadata": metadata}
+    for chave in ("lgb_reg", "lgb_clf", "xgb_reg"):
+        caminho = MODEL_DIR / artifacts.get(chave, "")
+        if not caminho.is_file():
+            return None
+        with caminho.open("rb") as f:
+            modelos[chave] = pickle.load(f)
+    return modelos
+
+
+def psi(referencia, atual, bins=10):
+    """Population Stability Index com bins por quantis da referencia."""
+    referencia = pd.Series(referencia).dropna().to_numpy(dtype=float)
+    atual = pd.Series(atual).dropna().to_numpy(dtype=float)
+    if len(referencia) == 0 or len(atual) == 0:
+        return 0.0
+    cortes = np.unique(np.quantile(referencia, np.linspace(0, 1, bins + 1)))
+    if len(cortes) < 2:
+        return 0.0
+    cortes[0], cortes[-1] = -np.inf, np.inf
+    p_ref = np.histogram(referencia, cortes)[0] / len(referencia)
+    p_atual = np.histogram(atual, cortes)[0] / len(atual)
+    return psi_proporcoes(p_ref, p_atual)
+
+
+def detectar_drift(df_ref, df_novo, features, target, limiar=PSI_LIMIAR):
+    """Drift no target ou em fracao relevante das features numericas."""
+    psi_target = psi(np.log1p(df_ref[target]), np.log1p(df_novo[target]))
+    numericas = [
+        f for f in features
+        if f not in plano_1.LGB_CAT_FEATURES and pd.api.types.is_numeric_dtype(df_ref[f])
+    ]
+    psi_features = {f: psi(df_ref[f], df_novo[f]) for f in numericas}
+    acima = [f for f, v in psi_features.items() if v > limiar]
+    drift = psi_target > limiar or (numericas and len(acima) / len(numericas) > FRACAO_FEATURES_DRIFT)
+    return bool(drift), {"psi_target": round(psi_target, 4), "features_drift": acima}
+
+
+def alinhar_categorias(X, model):
+    """Reaplica as categorias do booster atual (codigos estaveis entre treinos)."""
+    categorias = model.booster_.pandas_categorical or []
+    cat_cols = [c for c in X.columns if isinstance(X[c].dtype, pd.CategoricalDtype)]
+    X = X.copy()
+    for col, cats in zip(cat_cols, categorias):
+        X[col] = pd.Categorical(X[col].astype(object), categories=cats)
+    return X
+
+
+def continuar_lgb(model, X, y, rodadas, n_jobs=None):
+    """Continua o boosting do LightGBM a partir do modelo atual."""
+    params = {**model.get_params(), "n_estimators": rodadas}
+    if n_jobs is not None:
+        params["n_jobs"] = n_jobs
+    novo = model.__class__(**params)
+    novo.fit(alinhar_categorias(X, model), y, init_model=model.booster_)
+    return novo
+
+
+def matriz_xgb(df, features, model):
+    X = pd.get_dummies(df[features], columns=plano_1.LGB_CAT_FEATURES, dummy_na=True)
+    return X.reindex(columns=model.get_booster().feature_names, fill_value=0)
+
+
+def continuar_xgb(model, X, y, rodadas, n_jobs=None):
+    """Continua o boosting do XGBoost a partir do booster atual."""
+    params = {**model.get_params(), "n_estimators": rodadas}
+    if n_jobs is not None:
+        params["n_jobs"] = n_jobs
+    novo = xgb.XGBRegressor(**params)
+    novo.fit(X, y, xgb_model=model.get_booster())
+    return novo
+
+
+def retreino_completo(profile, df, features, target, n_jobs=None):
+    """Fallback: mesmo fluxo do plano_1.main."""
+    model_reg, _ = plano_1.treinar_modelo(df, features, target, n_jobs=n_jobs)
+    model_xgb = plano_1.treinar_modelo_xgboost(
+        df, features, target, model_reg=model_reg, n_jobs=n_jobs, profile=profile
+    )
+    model_clf = plano_1.treinar_classificador(df, features, target, n_jobs=n_jobs)
+    plano_1.salvar_modelos(
+        profile, features, target, model_reg, model_clf, model_xgb,
+        data_cutoff=df["data_chegada_dt"].max(),
+        extra={"modo_treino": "completo"},
+        dados=df,
+    )
+    return {"modo": "completo"}
+
+
+def separar_holdout(novos, holdout_dias=HOLDOUT_DIAS):
+    """Treino e holdout so com chegadas novas: o holdout e a cauda temporal de `novos`."""
+    datas = novos["data_chegada_dt"]
+    inicio_holdout = datas.max() - pd.Timedelta(days=holdout_dias)
+    if inicio_holdout <= datas.min():
+        # Carga mais curta que o holdout (ex.: um mes): metade final das chegadas novas
+        inicio_holdout = datas.quantile(FRACAO_TREINO_CARGA_CURTA)
+    return novos[datas <= inicio_holdout], novos[datas > inicio_holdout], inicio_holdout
+
+
+def retreino_incremental(profile, holdout_dias=HOLDOUT_DIAS, rodadas=RODADAS_INCREMENTAIS,
+                         tolerancia=TOLERANCIA_MAE, limiar_psi=PSI_LIMIAR, n_jobs=None, dados=None):
+    """Warm start do perfil; devolve um resumo do que foi promovido.
+
+    dados: (df, features, target) ja preparados; padrao plano_1.preparar_dados().
+    """
+    plano_1.PROFILE = profile
+    df, features, target = dados if dados is not None else plano_1.preparar_dados()
+    df = df.sort_values("data_chegada_dt").reset_index(drop=True)
+
+    atuais = carregar_modelos_atuais(profile)
+    metadata = atuais["metadata"] if atuais else {}
+    cutoff = metadata.get("data_cutoff")
+    if atuais is None or cutoff is None or metadata.get("features") != features:
+        print("Sem modelo base compativel (cutoff/features); retreino completo.")
+        return retreino_completo(profile, df, features, target, n_jobs)
+
+    cutoff = pd.Timestamp(cutoff)
+    ref = df[df["data_chegada_dt"] <= cutoff]
+    novos = df[df["data_chegada_dt"] > cutoff]
+    if novos.empty:
+        print(f"Sem chegadas apos {cutoff:%Y-%m-%d}; nada a fazer.")
+        return {"modo": "sem_dados_novos"}
+
+    drift, info_drift = detectar_drift(ref, novos, features, target, limiar_psi)
+    print(f"Drift: {drift} | {info_drift}")
+    if drift:
+        resumo = retreino_completo(profile, df, features, target, n_jobs)
+        resumo["drift"] = info_drift
+        return resumo
+
+    # O holdout sai so de `novos`: nenhuma linha ja vista pelo modelo atual
+    treino, holdout, inicio_holdout = separar_holdout(novos, holdout_dias)
+    if treino.empty or holdout.empty:
+        print("Dados novos insuficientes para treino + holdout; mantendo modelos atuais.")
+        return {"modo": "mantido", "novos": len(novos)}
+
+    X_treino, y_treino = plano_1.preparar_matriz_lgb(treino, features, target)
+    X_hold, y_hold = plano_1.preparar_matriz_lgb(holdout, features, target)
+    # Mesmos limites de classe do modelo base (metadata; senao tercis de `ref`)
+    cortes = metadata.get("cortes_classe") or plano_1.cortes_espera(ref[target])
+    classes = plano_1.classificar_espera(df[target], cortes)
+
+    candidatos = {}
+    reg_atual = atuais["lgb_reg"]
+    reg_novo = continuar_lgb(reg_atual, X_treino, np.log1p(y_treino), rodadas, n_jobs)
+    candidatos["lgb_reg"] = (
+        mean_absolute_error(y_hold, np.expm1(reg_atual.predict(X_hold))),
+        mean_absolute_error(y_hold, np.expm1(reg_novo.predict(X_hold))),
+        reg_novo,
+    )
+
+    xgb_atual = atuais["xgb_reg"]
+    xgb_novo = continuar_xgb(xgb_atual, matriz_xgb(treino, features, xgb_atual), y_treino, rodadas, n_jobs)
+    X_hold_xgb = matriz_xgb(holdout, features, xgb_atual)
+    candidatos["xgb_reg"] = (
+        mean_absolute_error(y_hold, xgb_atual.predict(X_hold_xgb)),
+        mean_absolute_error(y_hold, xgb_novo.predict(X_hold_xgb)),
+        xgb_novo,
+    )
+
+    clf_atual = atuais["lgb_clf"]
+    y_cls_treino = classes.loc[treino.index]
+    y_cls_hold = classes.loc[holdout.index]
+    if set(np.unique(y_cls_treino)) == set(clf_atual.classes_):
+        clf_novo = continuar_lgb(clf_atual, X_treino, y_cls_treino, rodadas, n_jobs)
+        # Erro = 1 - acuracia, para usar a mesma regra de promocao
+        candidatos["lgb_clf"] = (
+            1 - accuracy_score(y_cls_hold, clf_atual.predict(X_hold)),
+            1 - accuracy_score(y_cls_hold, clf_novo.predict(X_hold)),
+            clf_novo,
+        )
+
+    resumo = {"modo": "incremental", "novos": len(treino), "holdout": len(holdout), "modelos": {}}
+    for nome, (erro_atual, erro_novo, _) in candidatos.items():
+        resumo["modelos"][nome] = {
+            "erro_atual": round(float(erro_atual), 4),
+            "erro_novo": round(float(erro_novo), 4),
+            "ok": bool(erro_novo <= erro_atual * (1 + tolerancia)),
+        }
+        print(f"  {nome:<8} atual={erro_atual:.3f} novo={erro_novo:.3f}")
+
+    # Promocao tudo-ou-nada: o data_cutoff vale para o conjunto de modelos
+    resumo["promovido"] = all(m["ok"] for m in resumo["modelos"].values())
+    if resumo["promovido"]:
+        finais = {k: atuais[k] for k in ("lgb_reg", "lgb_clf", "xgb_reg")}
+        finais.update({nome: modelo for nome, (_, _, modelo) in candidatos.items()})
+        plano_1.salvar_modelos(
+            profile, features, target,
+            finais["lgb_reg"], finais["lgb_clf"], finais["xgb_reg"],
+            data_cutoff=inicio_holdout,
+            extra={"modo_treino": "incremental", "incremental": resumo["modelos"], "cortes_classe": cortes},
+            dados=df[df["data_chegada_dt"] <= inicio_holdout],
+        )
+        print("Modelos incrementais PROMOVIDOS.")
+    else:
+        print("Metricas nao se mantiveram no holdout; modelos atuais mantidos.")
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retreino incremental (warm start) por perfil.")
+    parser.add_argument("--profiles", nargs="*", default=plano_1.PROFILES_TO_RUN, help="Perfis.")
+    parser.add_argument("--holdout-dias", type=int, default=HOLDOUT_DIAS, help="Janela do holdout temporal.")
+    parser.add_argument("--rodadas", type=int, default=RODADAS_INCREMENTAIS, help="Arvores adicionadas.")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_MAE, help="Piora relativa aceita.")
+    parser.add_argument("--psi-limiar", type=float, default=PSI_LIMIAR, help="PSI para considerar drift.")
+    parser.add_argument("--completo", action="store_true", help="Forca retreino completo.")
+    args = parser.parse_args()
+
+    for profile in [p.upper() for p in args.profiles]:
+        print("=" * 70)
+        print(f"RETREINO INCREMENTAL: {profile}")
+        print("=" * 70)
+        if args.completo:
+            plano_1.PROFILE = profile
+            df, features, target = plano_1.preparar_dados()
+            resumo = retreino_completo(profile, df, features, target)
+        else:
+            resumo = retreino_incremental(
+                profile,
+                holdout_dias=args.holdout_dias,
+                rodadas=args.rodadas,
+                tolerancia=args.tolerancia,
+                limiar_psi=args.psi_limiar,
+            )
+        print(f"Resumo: {resumo}")
+
+
+if __name__ == "__main__":
+    main()
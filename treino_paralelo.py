@@ -0,0 +1,199 @@
+"""
+Orquestrador de treino paralelo (perfis x folds x familias de modelo).
+
+Fase 1: prepara os dados de cada perfil em paralelo (preparar_dados).
+Fase 2: agenda folds do LightGBM, refit final, XGBoost e classificador de
+todos os perfis num pool de processos, com threads por job ajustadas aos
+nucleos disponiveis (evita oversubscription do OpenMP).
+Os artefatos sao gravados via plano_1.salvar_modelos (mesmo layout).
+
+Uso:
+    python treino_paralelo.py --profiles VEGETAL MINERAL FERTILIZANTE --workers 8
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+import plano_1
+
+DATA_DIR = Path("data/cache/treino")
+METRICAS_PATH = Path("logs/treino_paralelo.json")
+
+# Custo relativo aproximado, usado para agendar os jobs mais longos primeiro
+CUSTO_JOB = {"xgb": 4, "lgb_final": 2, "lgb_fold": 1, "clf": 1}
+
+
+def _init_worker(n_threads):
+    os.environ["OMP_NUM_THREADS"] = str(n_threads)
+
+
+def _preparar_perfil(profile):
+    plano_1.PROFILE = profile
+    df_final, features, target = plano_1.preparar_dados()
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    caminho = DATA_DIR / f"{profile.lower()}.parquet"
+    df_final.to_parquet(caminho, index=False)
+    return profile, str(caminho), features, target
+
+
+@lru_cache(maxsize=4)
+def _carregar_dados(caminho):
+    return pd.read_parquet(caminho)
+
+
+def _executar_job(job):
+    inicio = time.perf_counter()
+    df = _carregar_dados(job["dados"])
+    features, target, n_jobs = job["features"], job["target"], job["n_jobs"]
+    tipo = job["tipo"]
+    resultado = {"profile": job["profile"], "tipo": tipo, "fold": job.get("fold")}
+    if tipo == "lgb_fold":
+        X, y = plano_1.preparar_matriz_lgb(df, features, target)
+        train_idx, val_idx = plano_1.gerar_splits_temporais(df, n_splits=3, gap_days=7)[job["fold"]]
+        cache = plano_1.criar_cache_dataset_lgb(X, y, f"{job['profile']}_reg")
+        resultado["metricas"] = plano_1.treinar_fold_lgb(
+            X, y, train_idx, val_idx, n_jobs=n_jobs, cache=cache
+        )
+    elif tipo == "lgb_final":
+        X, y = plano_1.preparar_matriz_lgb(df, features, target)
+        resultado["modelo"], _ = plano_1.treinar_lgb_final(X, y, features, n_jobs=n_jobs)
+    elif tipo == "xgb":
+        resultado["modelo"] = plano_1.treinar_modelo_xgboost(
+            df, features, target, model_reg=job["model_reg"], n_jobs=n_jobs, profile=job["profile"]
+        )
+    elif tipo == "clf":
+        resultado["modelo"] = plano_1.treinar_classificador(df, features, target, n_jobs=n_jobs)
+    else:
+        raise ValueError(f"Tipo de job desconhecido: {tipo}")
+    resultado["segundos"] = round(time.perf_counter() - inicio, 2)
+    return resultado
+
+
+def montar_jobs(perfis, n_jobs, n_folds=3):
+    """Lista de jobs por perfil, ordenada do mais caro para o mais barato."""
+    jobs = []
+    for profile, info in perfis.items():
+        base = {
+            "profile": profile,
+            "dados": info["dados"],
+            "features": info["features"],
+            "target": info["target"],
+            "n_jobs": n_jobs,
+        }
+        for fold in range(n_folds):
+            jobs.append({**base, "tipo": "lgb_fold", "fold": fold})
+        for tipo in ("lgb_final", "clf"):
+            jobs.append({**base, "tipo": tipo})
+        # XGBoost usa o LightGBM final (ensemble), como no plano_1.main
+        jobs.append({**base, "tipo": "xgb", "depende": "lgb_final"})
+    return sorted(jobs, key=lambda j: -CUSTO_JOB[j["tipo"]])
+
+
+def dimensionar_pool(n_jobs_total, workers=None, cores=None):
+    """Numero de processos e threads por job para nao exceder os nucleos."""
+    cores = cores or os.cpu_count() or 1
+    workers = max(1, min(workers or cores, n_jobs_total, cores))
+    return workers, max(1, cores // workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Treino paralelo de perfis x folds x modelos.")
+    parser.add_argument(
+        "--profiles",
+        nargs="*",
+        default=list(plano_1.CARGA_PROFILES),
+        help="Perfis a treinar.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processos no pool (padrao: numero de jobs, limitado aos nucleos).",
+    )
+    args = parser.parse_args()
+    profiles = [p.upper() for p in args.profiles]
+
+    print("=" * 70)
+    print(f"TREINO PARALELO: {', '.join(profiles)}")
+    print("=" * 70)
+    inicio = time.perf_counter()
+
+    workers_prep, _ = dimensionar_pool(len(profiles), args.workers)
+    perfis = {}
+    with ProcessPoolExecutor(max_workers=workers_prep) as pool:
+        for profile, caminho, features, target in pool.map(_preparar_perfil, profiles):
+            perfis[profile] = {"dados": caminho, "features": features, "target": target}
+    print(f"OK. Dados preparados em {time.perf_counter() - inicio:.1f}s")
+
+    n_total = len(profiles) * (3 + 3)
+    workers, n_threads = dimensionar_pool(n_total, args.workers)
+    print(f"Pool: {workers} processos x {n_threads} threads por job ({n_total} jobs)")
+    jobs = montar_jobs(perfis, n_threads)
+    resultados = {p: {"folds": {}, "tempos": {}} for p in profiles}
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(n_threads,)
+    ) as pool:
+        # Jobs dependentes so entram no pool quando a dependencia do perfil termina
+        aguardando = {(j["profile"], j["depende"]): j for j in jobs if j.get("depende")}
+        pendentes = {pool.submit(_executar_job, job) for job in jobs if not job.get("depende")}
+        while pendentes:
+            feitos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for fut in feitos:
+                res = fut.result()
+                alvo = resultados[res["profile"]]
+                chave = f"{res['tipo']}_{res['fold']}" if res["tipo"] == "lgb_fold" else res["tipo"]
+                alvo["tempos"][chave] = res["segundos"]
+                if res["tipo"] == "lgb_fold":
+                    alvo["folds"][res["fold"]] = res["metricas"]
+                else:
+                    alvo[res["tipo"]] = res["modelo"]
+                print(f"  [{res['profile']}] {chave:<12} {res['segundos']:>8.1f}s")
+                dependente = aguardando.pop((res["profile"], res["tipo"]), None)
+                if dependente is not None:
+                    pendentes.add(pool.submit(_executar_job, {**dependente, "model_reg": res["modelo"]}))
+
+    metricas = {}
+    for profile in profiles:
+        alvo = resultados[profile]
+        scores = [alvo["folds"][k] for k in sorted(alvo["folds"])]
+        print("\n" + "=" * 70)
+        print(f"PERFIL: {profile}")
+        plano_1.resumir_cv(scores)
+        info = perfis[profile]
+        dados = _carregar_dados(info["dados"])
+        plano_1.salvar_modelos(
+            profile, info["features"], info["target"],
+            alvo["lgb_final"], alvo["clf"], alvo["xgb"],
+            data_cutoff=dados["data_chegada_dt"].max(),
+            dados=dados,
+        )
+        metricas[profile] = {
+            "cv": [{k: float(v) for k, v in s.items()} for s in scores],
+            "tempos": alvo["tempos"],
+        }
+
+    total = time.perf_counter() - inicio
+    METRICAS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with METRICAS_PATH.open("w", encoding="utf-8") as f:
+        json.dump({
+            "executado_em": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "workers": workers,
+            "threads_por_job": n_threads,
+            "segundos_total": round(total, 1),
+            "perfis": metricas,
+        }, f, indent=2)
+    print("=" * 70)
+    print(f"TREINO PARALELO CONCLUIDO EM {total:.1f}s")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
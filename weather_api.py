@@ -17,28 +17,10 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
 import logging
 
-logger = logging.getLogger(__name__)
+from climatologia import clima_fallback
+from registro_portos import registro
 
-# Configuração dos portos brasileiros com coordenadas
-PORTS_COORDINATES = {
-    "ITAQUI": {"lat": -2.5900, "lon": -44.3600, "name": "Porto do Itaqui (MA)"},
-    "PONTA DA MADEIRA": {"lat": -2.5700, "lon": -44.3500, "name": "Ponta da Madeira (MA)"},
-    "SANTOS": {"lat": -23.9600, "lon": -46.3000, "name": "Porto de Santos (SP)"},
-    "PARANAGUA": {"lat": -25.5160, "lon": -48.5220, "name": "Porto de Paranaguá (PR)"},
-    "RIO GRANDE": {"lat": -32.0350, "lon": -52.0980, "name": "Porto de Rio Grande (RS)"},
-    "SAO FRANCISCO DO SUL": {"lat": -26.2400, "lon": -48.6350, "name": "São Francisco do Sul (SC)"},
-    "SUAPE": {"lat": -8.3900, "lon": -34.9600, "name": "Porto de Suape (PE)"},
-    "SALVADOR": {"lat": -12.9700, "lon": -38.5100, "name": "Porto de Salvador (BA)"},
-    "VITORIA": {"lat": -20.3200, "lon": -40.2900, "name": "Porto de Vitória (ES)"},
-    "RECIFE": {"lat": -8.0500, "lon": -34.8700, "name": "Porto de Recife (PE)"},
-    "PECEM": {"lat": -3.5400, "lon": -38.8100, "name": "Porto de Pecém (CE)"},
-    "BARCARENA": {"lat": -1.5100, "lon": -48.6200, "name": "Porto de Barcarena (PA)"},
-    "VILA DO CONDE": {"lat": -1.5500, "lon": -48.7500, "name": "Vila do Conde (PA)"},
-    "SANTAREM": {"lat": -2.4400, "lon": -54.7100, "name": "Porto de Santarém (PA)"},
-    "ANTONINA": {"lat": -25.4300, "lon": -48.7100, "name": "Porto de Antonina (PR)"},
-    "IMBITUBA": {"lat": -28.2300, "lon": -48.6500, "name": "Porto de Imbituba (SC)"},
-    "ITAJAI": {"lat": -26.9000, "lon": -48.6600, "name": "Porto de Itajaí (SC)"},
-}
+logger = logging.getLogger(__name__)
 
 # URLs base das APIs Open-Meteo
 WEATHER_API_URL = "https://api.open-meteo.com/v1/forecast"
@@ -187,24 +169,13 @@ def get_weather_for_port(
     Returns:
         Dict no formato compatível com o app de previsão de filas
     """
-    # Normalizar nome do porto
-    port_key = port_name.upper().strip()
-    port_key = port_key.replace("PORTO DE ", "").replace("PORTO DO ", "")
-
-    # Buscar coordenadas
-    port_info = PORTS_COORDINATES.get(port_key)
-    if not port_info:
-        # Tentar match parcial
-        for key, info in PORTS_COORDINATES.items():
-            if port_key in key or key in port_key:
-                port_info = info
-                break
-
-    if not port_info:
+    # Coordenadas pelo registro de portos (aceita aliases: "Porto de Santos (SP)", "SANTOS"...)
+    port_info = registro().porto(port_name)
+    if port_info is None or port_info.lat is None:
         logger.warning(f"Porto não encontrado: {port_name}")
         return None
 
-    lat, lon = port_info["lat"], port_info["lon"]
+    lat, lon = port_info.lat, port_info.lon
 
     # Buscar dados meteorológicos
     weather = fetch_weather(lat, lon, days=7)
@@ -221,7 +192,7 @@ def get_weather_for_port(
 
     # Extrair dados de hoje e últimos dias
     result = {
-        "porto": port_info["name"],
+        "porto": f"{port_info.nome} ({port_info.uf})",
         "latitude": lat,
         "longitude": lon,
         "data": today,
@@ -280,21 +251,11 @@ def get_weather_forecast(
     Returns:
         Lista de dicts com previsão diária
     """
-    # Normalizar nome do porto
-    port_key = port_name.upper().strip()
-    port_key = port_key.replace("PORTO DE ", "").replace("PORTO DO ", "")
-
-    port_info = PORTS_COORDINATES.get(port_key)
-    if not port_info:
-        for key, info in PORTS_COORDINATES.items():
-            if port_key in key or key in port_key:
-                port_info = info
-                break
-
-    if not port_info:
+    port_info = registro().porto(port_name)
+    if port_info is None or port_info.lat is None:
         return None
 
-    lat, lon = port_info["lat"], port_info["lon"]
+    lat, lon = port_info.lat, port_info.lon
 
     # Buscar dados
     weather = fetch_weather(lat, lon, days=days)
@@ -314,7 +275,7 @@ def get_weather_forecast(
     for i, date in enumerate(dates):
         day_data = {
             "data": date,
-            "porto": port_info["name"],
+            "porto": f"{port_info.nome} ({port_info.uf})",
             "temp_max": daily.get("temperature_2m_max", [])[i] if i < len(daily.get("temperature_2m_max", [])) else None,
             "temp_min": daily.get("temperature_2m_min", [])[i] if i < len(daily.get("temperature_2m_min", [])) else None,
             "temp_media": daily.get("temperature_2m_mean", [])[i] if i < len(daily.get("temperature_2m_mean", [])) else None,
@@ -344,21 +305,8 @@ def fetch_weather_fallback(port_name: str) -> Optional[Dict[str, Any]]:
     """
     data = get_weather_for_port(port_name, include_marine=True)
     if not data:
-        # Retornar valores padrão
-        return {
-            "temp_media_dia": 25.0,
-            "temp_max_dia": 30.0,
-            "temp_min_dia": 20.0,
-            "precipitacao_dia": 0.0,
-            "vento_rajada_max_dia": 5.0,
-            "vento_velocidade_media": 3.0,
-            "umidade_media_dia": 70.0,
-            "amplitude_termica": 10.0,
-            "chuva_acumulada_ultimos_3dias": 0.0,
-            "wave_height_max": 0.0,
-            "ressaca": 0,
-            "fonte": "default",
-        }
+        # Climatologia do porto para o dia (ou valores conservadores se ausente)
+        return clima_fallback(port_name)
     return data
 
 